@@ -1,3 +1,4 @@
+import os
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -5,6 +6,10 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from app.busqueda import es_tabla_busqueda
+from app.particiones import es_particion
+from app.orm_models import Base
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -14,11 +19,19 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-# add your model's MetaData object here
-# for 'autogenerate' support
-# from myapp import mymodel
-# target_metadata = mymodel.Base.metadata
-target_metadata = None
+# MetaData de los modelos ORM para 'autogenerate'
+target_metadata = Base.metadata
+
+
+
+def incluir_nombre(nombre, tipo, padres) -> bool:
+    """Excluye de autogenerate las tablas de búsqueda FTS5 y las particiones de servicios, que no están en los modelos ORM."""
+    return not (tipo == "table" and (es_tabla_busqueda(nombre) or es_particion(nombre)))
+
+
+# La base de datos de la aplicación (DATABASE_PATH) tiene prioridad sobre alembic.ini
+if os.getenv("DATABASE_PATH"):
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{os.environ['DATABASE_PATH']}")
 
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
@@ -44,6 +57,8 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_name=incluir_nombre,
     )
 
     with context.begin_transaction():
@@ -56,7 +71,14 @@ def run_migrations_online() -> None:
     In this scenario we need to create an Engine
     and associate a connection with the context.
 
+    Si se invoca desde la aplicación (app.database.aplicar_migraciones),
+    se reutiliza la conexión recibida en config.attributes.
     """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_migrations(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -64,12 +86,18 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+        _run_migrations(connection)
 
-        with context.begin_transaction():
-            context.run_migrations()
+
+def _run_migrations(connection) -> None:
+    # render_as_batch: SQLite no soporta la mayoría de ALTER TABLE
+    context.configure(
+        connection=connection, target_metadata=target_metadata, render_as_batch=True,
+        include_name=incluir_nombre
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
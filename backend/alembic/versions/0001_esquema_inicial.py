@@ -0,0 +1,78 @@
+"""Esquema inicial: empleados, tipos_servicios y servicios
+
+Adopta las bases de datos creadas con Base.metadata.create_all antes de usar
+Alembic: solo crea las tablas que faltan y añade la columna
+precio_por_defecto si no se aplicó scripts/apply_precio_changes.py.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tablas = set(inspector.get_table_names())
+
+    if 'empleados' not in tablas:
+        op.create_table(
+            'empleados',
+            sa.Column('id', sa.String(length=50), nullable=False),
+            sa.Column('nombre', sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'tipos_servicios' not in tablas:
+        op.create_table(
+            'tipos_servicios',
+            sa.Column('nombre', sa.String(length=50), nullable=False),
+            sa.Column('descripcion', sa.String(length=200), nullable=False),
+            sa.Column('porcentaje_comision', sa.Float(), nullable=False),
+            sa.Column('precio_por_defecto', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.CheckConstraint(
+                'porcentaje_comision >= 0 AND porcentaje_comision <= 100',
+                name='check_porcentaje_comision_range'
+            ),
+            sa.CheckConstraint(
+                'precio_por_defecto IS NULL OR precio_por_defecto > 0',
+                name='check_precio_por_defecto_positive'
+            ),
+            sa.PrimaryKeyConstraint('nombre')
+        )
+    elif 'precio_por_defecto' not in {c['name'] for c in inspector.get_columns('tipos_servicios')}:
+        op.add_column('tipos_servicios', sa.Column('precio_por_defecto', sa.Numeric(precision=10, scale=2), nullable=True))
+
+    if 'servicios' not in tablas:
+        op.create_table(
+            'servicios',
+            sa.Column('id', sa.String(length=50), nullable=False),
+            sa.Column('fecha', sa.Date(), nullable=False),
+            sa.Column('empleado_id', sa.String(length=50), nullable=False),
+            sa.Column('tipo_servicio', sa.String(length=50), nullable=False),
+            sa.Column('precio', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.Column('comision_calculada', sa.Numeric(precision=10, scale=2), nullable=False),
+            sa.CheckConstraint('precio > 0', name='check_precio_positive'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_servicios_fecha', 'servicios', ['fecha'])
+        op.create_index('ix_servicios_empleado_id', 'servicios', ['empleado_id'])
+        op.create_index('idx_servicios_empleado_fecha', 'servicios', ['empleado_id', 'fecha'])
+        op.create_index('idx_servicios_fecha', 'servicios', ['fecha'])
+
+
+def downgrade() -> None:
+    op.drop_table('servicios')
+    op.drop_table('tipos_servicios')
+    op.drop_table('empleados')
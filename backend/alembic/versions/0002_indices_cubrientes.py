@@ -0,0 +1,54 @@
+"""Índices cubrientes para reportes y pago de empleados
+
+Elimina los índices duplicados ix_servicios_fecha (igual que
+idx_servicios_fecha) e ix_servicios_empleado_id (prefijo de
+idx_servicios_empleado_fecha), amplía los índices por fecha y por empleado
+para que cubran las columnas que leen los reportes y añade un índice por
+tipo de servicio.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_servicios_fecha', table_name='servicios', if_exists=True)
+    op.drop_index('ix_servicios_empleado_id', table_name='servicios', if_exists=True)
+
+    op.drop_index('idx_servicios_fecha', table_name='servicios', if_exists=True)
+    op.create_index('idx_servicios_fecha', 'servicios', ['fecha', 'precio', 'comision_calculada'])
+
+    op.drop_index('idx_servicios_empleado_fecha', table_name='servicios', if_exists=True)
+    op.create_index(
+        'idx_servicios_empleado_fecha',
+        'servicios',
+        ['empleado_id', 'fecha', 'tipo_servicio', 'precio', 'comision_calculada']
+    )
+
+    op.create_index('idx_servicios_tipo_fecha', 'servicios', ['tipo_servicio', 'fecha'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_servicios_tipo_fecha', table_name='servicios')
+
+    op.drop_index('idx_servicios_empleado_fecha', table_name='servicios')
+    op.create_index('idx_servicios_empleado_fecha', 'servicios', ['empleado_id', 'fecha'])
+
+    op.drop_index('idx_servicios_fecha', table_name='servicios')
+    op.create_index('idx_servicios_fecha', 'servicios', ['fecha'])
+
+    op.create_index('ix_servicios_empleado_id', 'servicios', ['empleado_id'])
+    op.create_index('ix_servicios_fecha', 'servicios', ['fecha'])
@@ -0,0 +1,64 @@
+"""Índices de búsqueda FTS5 de empleados y tipos de servicio
+
+Crea las tablas virtuales empleados_fts y tipos_servicios_fts (sin
+mayúsculas ni tildes, con índices de prefijo) y los triggers que las
+mantienen sincronizadas con sus tablas, y las rellena con las filas
+existentes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPCIONES_FTS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+
+def upgrade() -> None:
+    op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS empleados_fts USING fts5(id, nombre, {OPCIONES_FTS})")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS empleados_fts_insertar AFTER INSERT ON empleados BEGIN
+        INSERT INTO empleados_fts (id, nombre) VALUES (new.id, new.nombre);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS empleados_fts_actualizar AFTER UPDATE ON empleados BEGIN
+        UPDATE empleados_fts SET id = new.id, nombre = new.nombre WHERE id = old.id;
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS empleados_fts_eliminar AFTER DELETE ON empleados BEGIN
+        DELETE FROM empleados_fts WHERE id = old.id;
+    END""")
+    op.execute("DELETE FROM empleados_fts")
+    op.execute("INSERT INTO empleados_fts (id, nombre) SELECT id, nombre FROM empleados")
+
+    op.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS tipos_servicios_fts USING fts5(nombre, descripcion, {OPCIONES_FTS})"
+    )
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tipos_servicios_fts_insertar AFTER INSERT ON tipos_servicios BEGIN
+        INSERT INTO tipos_servicios_fts (nombre, descripcion) VALUES (new.nombre, new.descripcion);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tipos_servicios_fts_actualizar AFTER UPDATE ON tipos_servicios BEGIN
+        UPDATE tipos_servicios_fts SET nombre = new.nombre, descripcion = new.descripcion
+        WHERE nombre = old.nombre;
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tipos_servicios_fts_eliminar AFTER DELETE ON tipos_servicios BEGIN
+        DELETE FROM tipos_servicios_fts WHERE nombre = old.nombre;
+    END""")
+    op.execute("DELETE FROM tipos_servicios_fts")
+    op.execute(
+        "INSERT INTO tipos_servicios_fts (nombre, descripcion) SELECT nombre, descripcion FROM tipos_servicios"
+    )
+
+
+def downgrade() -> None:
+    for tabla in ("empleados", "tipos_servicios"):
+        for operacion in ("insertar", "actualizar", "eliminar"):
+            op.execute(f"DROP TRIGGER IF EXISTS {tabla}_fts_{operacion}")
+        op.execute(f"DROP TABLE IF EXISTS {tabla}_fts")
@@ -0,0 +1,64 @@
+"""Log de cambios para la sincronización incremental
+
+Crea la tabla cambios (secuencia AUTOINCREMENT, tabla, clave, operación y
+momento) y los triggers que registran en ella cada INSERT, UPDATE y DELETE
+de empleados, tipos_servicios y servicios. Los datos existentes no se
+registran: los clientes empiezan con una carga completa. Adopta las bases
+de datos creadas con create_all, que ya tienen la tabla.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLAS = {"empleados": "id", "tipos_servicios": "nombre", "servicios": "id"}
+MOMENTO = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def upgrade() -> None:
+    conexion = op.get_bind()
+    # Las bases de datos creadas con create_all ya tienen la tabla (no los triggers)
+    if 'cambios' not in sa.inspect(conexion).get_table_names():
+        op.create_table(
+            'cambios',
+            sa.Column('seq', sa.Integer(), nullable=False),
+            sa.Column('tabla', sa.String(length=30), nullable=False),
+            sa.Column('clave', sa.String(length=50), nullable=False),
+            sa.Column('operacion', sa.String(length=10), nullable=False),
+            sa.Column('momento', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('seq'),
+            sqlite_autoincrement=True
+        )
+
+    for tabla, clave in TABLAS.items():
+        insercion = f"INSERT INTO cambios (tabla, clave, operacion, momento) VALUES ('{tabla}', "
+        conexion.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_insertar AFTER INSERT ON {tabla} BEGIN
+        {insercion}new.{clave}, 'insertar', {MOMENTO});
+    END""")
+        conexion.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_actualizar AFTER UPDATE ON {tabla} BEGIN
+        INSERT INTO cambios (tabla, clave, operacion, momento)
+        SELECT '{tabla}', old.{clave}, 'eliminar', {MOMENTO} WHERE old.{clave} IS NOT new.{clave};
+        {insercion}new.{clave}, 'actualizar', {MOMENTO});
+    END""")
+        conexion.exec_driver_sql(f"""CREATE TRIGGER IF NOT EXISTS {tabla}_cambios_eliminar AFTER DELETE ON {tabla} BEGIN
+        {insercion}old.{clave}, 'eliminar', {MOMENTO});
+    END""")
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        for operacion in ("insertar", "actualizar", "eliminar"):
+            op.execute(f"DROP TRIGGER IF EXISTS {tabla}_cambios_{operacion}")
+    op.drop_table('cambios')
@@ -0,0 +1,82 @@
+"""Índices de búsqueda FTS5 de contenido externo
+
+Vuelve a crear empleados_fts y tipos_servicios_fts como tablas de
+contenido externo (content=) indexadas por el rowid de su tabla, con
+triggers que retiran las filas antiguas con el comando 'delete' de FTS5 en
+lugar de UPDATE/DELETE ... WHERE, que recorrían todo el índice. Los índices
+se rellenan con 'rebuild'.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPCIONES_FTS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+INDICES = {
+    "empleados_fts": ("empleados", ("id", "nombre")),
+    "tipos_servicios_fts": ("tipos_servicios", ("nombre", "descripcion")),
+}
+ACCIONES = ("insertar", "actualizar", "eliminar")
+
+
+def _eliminar(tabla_fts: str) -> None:
+    for accion in ACCIONES:
+        op.execute(f"DROP TRIGGER IF EXISTS {tabla_fts}_{accion}")
+    op.execute(f"DROP TABLE IF EXISTS {tabla_fts}")
+
+
+def upgrade() -> None:
+    for tabla_fts, (tabla, columnas) in INDICES.items():
+        _eliminar(tabla_fts)
+        lista = ", ".join(columnas)
+        insercion = (
+            f"INSERT INTO {tabla_fts} (rowid, {lista}) "
+            f"VALUES (new.rowid, {', '.join(f'new.{columna}' for columna in columnas)});"
+        )
+        borrado = (
+            f"INSERT INTO {tabla_fts} ({tabla_fts}, rowid, {lista}) "
+            f"VALUES ('delete', old.rowid, {', '.join(f'old.{columna}' for columna in columnas)});"
+        )
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla_fts} USING fts5({lista}, "
+            f"content='{tabla}', content_rowid='rowid', {OPCIONES_FTS})"
+        )
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_insertar AFTER INSERT ON {tabla} BEGIN
+        {insercion}
+    END""")
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_actualizar AFTER UPDATE ON {tabla} BEGIN
+        {borrado}
+        {insercion}
+    END""")
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_eliminar AFTER DELETE ON {tabla} BEGIN
+        {borrado}
+    END""")
+        op.execute(f"INSERT INTO {tabla_fts} ({tabla_fts}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    # Índices con copia de las filas de la revisión 0003
+    for tabla_fts, (tabla, (clave, segunda)) in INDICES.items():
+        _eliminar(tabla_fts)
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla_fts} USING fts5({clave}, {segunda}, {OPCIONES_FTS})")
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_insertar AFTER INSERT ON {tabla} BEGIN
+        INSERT INTO {tabla_fts} ({clave}, {segunda}) VALUES (new.{clave}, new.{segunda});
+    END""")
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_actualizar AFTER UPDATE ON {tabla} BEGIN
+        UPDATE {tabla_fts} SET {clave} = new.{clave}, {segunda} = new.{segunda} WHERE {clave} = old.{clave};
+    END""")
+        op.execute(f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_eliminar AFTER DELETE ON {tabla} BEGIN
+        DELETE FROM {tabla_fts} WHERE {clave} = old.{clave};
+    END""")
+        op.execute(f"INSERT INTO {tabla_fts} ({clave}, {segunda}) SELECT {clave}, {segunda} FROM {tabla}")
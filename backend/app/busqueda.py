@@ -0,0 +1,134 @@
+"""
+Búsqueda de texto completo de empleados y tipos de servicio con FTS5 de SQLite.
+
+Cada tabla tiene un índice FTS5 (`empleados_fts`, `tipos_servicios_fts`)
+que mantienen al día triggers sobre la tabla base, de modo que cualquier
+escritura (repositorio, migraciones, scripts) lo actualiza en la misma
+transacción. El tokenizador `unicode61` con `remove_diacritics 2` ignora
+mayúsculas y tildes: "jose" encuentra "José" y "peluqueria" encuentra
+"Peluquería".
+
+Los índices son de contenido externo (`content=`): no guardan una copia de
+las filas, leen las columnas de la tabla base por su rowid. Los triggers
+indexan por rowid y retiran las filas antiguas con el comando 'delete' de
+FTS5, sin recorrer el índice. Las tablas base no tienen INTEGER PRIMARY
+KEY, así que un VACUUM puede renumerar sus rowid: después de un VACUUM hay
+que reconstruir los índices (`reconstruir_indices_busqueda`). El VACUUM se
+hace con `python -m app.cli vacuum`, que los reconstruye a continuación.
+
+Las búsquedas son por prefijo de cada palabra ("mar gar" encuentra "María
+García") y se ordenan por relevancia (bm25), pesando más el nombre.
+"""
+import re
+from typing import List, Optional
+
+# Tokenizador sin mayúsculas ni tildes; índices de prefijo de 2 y 3 caracteres
+OPCIONES_FTS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"
+
+# Índices de búsqueda: tabla base y columnas indexadas
+INDICES_BUSQUEDA = {
+    "empleados_fts": ("empleados", ("id", "nombre")),
+    "tipos_servicios_fts": ("tipos_servicios", ("nombre", "descripcion")),
+}
+
+# Tablas virtuales de búsqueda (y prefijo de sus tablas internas *_data, *_idx...)
+TABLAS_BUSQUEDA = tuple(INDICES_BUSQUEDA)
+
+# Triggers de cada índice
+_ACCIONES = ("insertar", "actualizar", "eliminar")
+
+
+def _sentencias_indice(tabla_fts: str, tabla: str, columnas: tuple) -> List[str]:
+    """Tabla virtual de contenido externo de un índice y los triggers que la sincronizan por rowid."""
+    lista = ", ".join(columnas)
+    insercion = (
+        f"INSERT INTO {tabla_fts} (rowid, {lista}) "
+        f"VALUES (new.rowid, {', '.join(f'new.{columna}' for columna in columnas)});"
+    )
+    borrado = (
+        f"INSERT INTO {tabla_fts} ({tabla_fts}, rowid, {lista}) "
+        f"VALUES ('delete', old.rowid, {', '.join(f'old.{columna}' for columna in columnas)});"
+    )
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {tabla_fts} USING fts5({lista}, "
+        f"content='{tabla}', content_rowid='rowid', {OPCIONES_FTS})",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_insertar AFTER INSERT ON {tabla} BEGIN
+        {insercion}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_actualizar AFTER UPDATE ON {tabla} BEGIN
+        {borrado}
+        {insercion}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla_fts}_eliminar AFTER DELETE ON {tabla} BEGIN
+        {borrado}
+    END""",
+    ]
+
+
+SENTENCIAS_BUSQUEDA = [
+    sentencia
+    for tabla_fts, (tabla, columnas) in INDICES_BUSQUEDA.items()
+    for sentencia in _sentencias_indice(tabla_fts, tabla, columnas)
+]
+
+# Palabras de la búsqueda: secuencias de letras y dígitos
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def es_tabla_busqueda(nombre: str) -> bool:
+    """Indica si una tabla pertenece a los índices de búsqueda (no está en los modelos ORM)."""
+    return nombre.startswith(TABLAS_BUSQUEDA)
+
+
+def crear_indices_busqueda(conexion) -> None:
+    """
+    Crea los índices de búsqueda y sus triggers si no existen.
+
+    Un índice al que le falta algo (la tabla virtual o algún trigger, p. ej.
+    una base de datos anterior a la búsqueda) o que es de la versión con
+    copia de las filas (sin `content=`) se vuelve a crear y se reconstruye a
+    partir de su tabla.
+
+    Args:
+        conexion: Conexión de SQLAlchemy dentro de una transacción
+    """
+    for tabla_fts, (tabla, columnas) in INDICES_BUSQUEDA.items():
+        objetos = dict(conexion.exec_driver_sql(
+            f"SELECT name, sql FROM sqlite_master WHERE name IN ('{tabla_fts}', "
+            + ", ".join(f"'{tabla_fts}_{accion}'" for accion in _ACCIONES) + ")"
+        ).all())
+        if len(objetos) == 1 + len(_ACCIONES) and "content=" in objetos[tabla_fts]:
+            continue
+        for accion in _ACCIONES:
+            conexion.exec_driver_sql(f"DROP TRIGGER IF EXISTS {tabla_fts}_{accion}")
+        conexion.exec_driver_sql(f"DROP TABLE IF EXISTS {tabla_fts}")
+        for sentencia in _sentencias_indice(tabla_fts, tabla, columnas):
+            conexion.exec_driver_sql(sentencia)
+        conexion.exec_driver_sql(f"INSERT INTO {tabla_fts} ({tabla_fts}) VALUES ('rebuild')")
+
+
+def reconstruir_indices_busqueda(conexion) -> None:
+    """
+    Vuelve a indexar todas las filas de las tablas base (comando 'rebuild' de FTS5).
+
+    Args:
+        conexion: Conexión de SQLAlchemy dentro de una transacción
+    """
+    for tabla_fts in TABLAS_BUSQUEDA:
+        conexion.exec_driver_sql(f"INSERT INTO {tabla_fts} ({tabla_fts}) VALUES ('rebuild')")
+
+
+def expresion_busqueda(texto: str) -> Optional[str]:
+    """
+    Convierte el texto del usuario en una consulta MATCH de FTS5 por prefijos.
+
+    Cada palabra se entrecomilla (los operadores de FTS5 no se interpretan)
+    y se busca como prefijo; todas las palabras deben aparecer.
+
+    Returns:
+        Expresión MATCH, o None si el texto no tiene palabras
+    """
+    palabras: List[str] = _PALABRA.findall(texto)
+    if not palabras:
+        return None
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
@@ -0,0 +1,116 @@
+"""
+Log de cambios de empleados, tipos de servicio y servicios para la sincronización incremental.
+
+Cada INSERT, UPDATE y DELETE sobre las tablas registradas añade una fila a
+`cambios` con un número de secuencia creciente (`seq`). Lo hacen triggers de
+SQLite, de modo que la fila se escribe en la misma transacción que el cambio,
+sea quien sea el que escribe (repositorio, escritura agrupada, scripts).
+
+`seq` es `INTEGER PRIMARY KEY AUTOINCREMENT`: nunca se reutiliza, ni siquiera
+después de compactar el log, y el último valor asignado queda en
+`sqlite_sequence` aunque la tabla se vacíe.
+
+Un cliente guarda el `seq` hasta el que ha aplicado cambios y pide los
+siguientes con `GET /api/cambios?desde=<seq>`. Si el log ya no tiene los
+cambios que necesita (se compactaron) o `desde` es posterior al último, la
+respuesta le indica que debe volver a cargar las colecciones completas.
+"""
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+# Tablas con log de cambios y su clave primaria
+TABLAS_REGISTRADAS = {
+    "empleados": "id",
+    "tipos_servicios": "nombre",
+    "servicios": "id",
+}
+
+# Operaciones registradas
+OPERACIONES = ("insertar", "actualizar", "eliminar")
+
+# Momento del cambio en UTC con milisegundos, el formato de DateTime en SQLite
+_MOMENTO = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def _sentencias_triggers(tabla: str, clave: str, origen: Optional[str] = None) -> List[str]:
+    """
+    Triggers que registran los cambios de una tabla; un cambio de clave se registra como eliminar e insertar.
+
+    `origen` es la tabla física en la que se crean si no es `tabla` (las
+    particiones de servicios registran sus cambios como `servicios`).
+    """
+    origen = origen or tabla
+    insercion = f"INSERT INTO cambios (tabla, clave, operacion, momento) VALUES ('{tabla}', "
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {origen}_cambios_insertar AFTER INSERT ON {origen} BEGIN
+        {insercion}new.{clave}, 'insertar', {_MOMENTO});
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {origen}_cambios_actualizar AFTER UPDATE ON {origen} BEGIN
+        INSERT INTO cambios (tabla, clave, operacion, momento)
+        SELECT '{tabla}', old.{clave}, 'eliminar', {_MOMENTO} WHERE old.{clave} IS NOT new.{clave};
+        {insercion}new.{clave}, 'actualizar', {_MOMENTO});
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {origen}_cambios_eliminar AFTER DELETE ON {origen} BEGIN
+        {insercion}old.{clave}, 'eliminar', {_MOMENTO});
+    END""",
+    ]
+
+
+SENTENCIAS_CAMBIOS = [
+    sentencia
+    for tabla, clave in TABLAS_REGISTRADAS.items()
+    for sentencia in _sentencias_triggers(tabla, clave)
+]
+
+
+def crear_registro_cambios(conexion) -> None:
+    """
+    Crea los triggers del log de cambios si no existen.
+
+    La tabla `cambios` la crean `create_all` o las migraciones.
+
+    Args:
+        conexion: Conexión de SQLAlchemy dentro de una transacción
+    """
+    for sentencia in SENTENCIAS_CAMBIOS:
+        conexion.exec_driver_sql(sentencia)
+
+
+def crear_registro_cambios_particion(conexion, particion: str) -> None:
+    """
+    Crea los triggers del log de cambios de una partición de servicios (ver app.particiones).
+
+    Args:
+        conexion: Conexión de SQLAlchemy dentro de una transacción
+        particion: Nombre de la tabla de la partición
+    """
+    for sentencia in _sentencias_triggers("servicios", TABLAS_REGISTRADAS["servicios"], particion):
+        conexion.exec_driver_sql(sentencia)
+
+
+@contextmanager
+def sin_registro_cambios(conexion, *tablas: str) -> Iterator[None]:
+    """
+    Suspende el log de cambios de unas tablas dentro de la transacción en curso.
+
+    Para movimientos internos de filas que los clientes no deben ver como
+    cambios (p. ej. archivar servicios en su partición). Los triggers se
+    eliminan y se vuelven a crear con su definición original en la misma
+    transacción: el resto de conexiones no llega a verlos desaparecer, y si
+    la transacción falla se restauran con el rollback.
+
+    Args:
+        conexion: Conexión de SQLAlchemy dentro de una transacción
+        tablas: Tablas físicas cuyos triggers se suspenden
+    """
+    nombres = [f"{tabla}_cambios_{operacion}" for tabla in tablas for operacion in OPERACIONES]
+    marcadores = ", ".join("?" for _ in nombres)
+    triggers = conexion.exec_driver_sql(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({marcadores})",
+        tuple(nombres)
+    ).all()
+    for nombre, _ in triggers:
+        conexion.exec_driver_sql(f'DROP TRIGGER "{nombre}"')
+    yield
+    for _, sql in triggers:
+        conexion.exec_driver_sql(sql)
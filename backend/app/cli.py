@@ -0,0 +1,177 @@
+"""
+Comandos de administración del sistema de gestión de salón de peluquería.
+
+Uso:
+    python -m app.cli recalcular-comisiones Corte 2024-01-01 2024-03-31 --porcentaje 45 --simular
+    python -m app.cli crear-salon centro --directorio /data/salones
+    python -m app.cli compactar-cambios --dias 30
+    python -m app.cli archivar-servicios --hasta 2023
+    python -m app.cli vacuum
+"""
+import argparse
+import dataclasses
+import os
+import sys
+from contextlib import contextmanager
+from datetime import date
+from typing import Iterator, List, Optional
+
+from app.config import Settings
+from app.manager import SalonManager
+from app.tenancy import SalonRegistry, cerrar_manager, crear_manager
+from app.result import Ok, Err
+
+
+@contextmanager
+def _abrir_manager(database: str) -> Iterator[SalonManager]:
+    """
+    Abre un SalonManager sobre el fichero SQLite indicado y lo cierra al terminar.
+
+    Usa la configuración del entorno, igual que el servidor
+    (`USAR_MIGRACIONES`, modo de diario y sincronización de SQLite,
+    reintentos); `--database` sustituye a `DATABASE_PATH`.
+    """
+    settings = dataclasses.replace(Settings.desde_entorno(), database_path=database)
+    manager = crear_manager(settings, settings.database_url)
+    try:
+        yield manager
+    finally:
+        cerrar_manager(manager)
+
+
+def recalcular_comisiones(args: argparse.Namespace) -> int:
+    """Recalcula las comisiones de un tipo de servicio y muestra el desglose por empleado."""
+    with _abrir_manager(args.database) as manager:
+        resultado = manager.recalcular_comisiones(
+            args.tipo_servicio,
+            args.fecha_inicio,
+            args.fecha_fin,
+            args.porcentaje,
+            args.simular
+        )
+
+    match resultado:
+        case Ok(recalculo):
+            modo = "Simulación" if recalculo.simulado else "Recálculo aplicado"
+            print(f"{modo}: {recalculo.tipo_servicio} al {recalculo.porcentaje_comision}% "
+                  f"({recalculo.fecha_inicio} - {recalculo.fecha_fin})")
+            for ajuste in recalculo.ajustes:
+                print(f"  {ajuste.empleado_id}: {ajuste.servicios} servicios, "
+                      f"{ajuste.comision_anterior} -> {ajuste.comision_nueva} ({ajuste.diferencia:+})")
+            print(f"Servicios actualizados: {recalculo.servicios_actualizados}")
+            print(f"Diferencia total: {recalculo.diferencia_total:+}")
+            return 0
+        case Err(error):
+            print(f"Error: {error}", file=sys.stderr)
+            return 1
+
+
+def crear_salon(args: argparse.Namespace) -> int:
+    """Crea la base de datos de un salón para el modo multi-salón."""
+    registry = SalonRegistry(args.directorio, settings=Settings.desde_entorno())
+    match registry.crear_salon(args.salon_id):
+        case Ok(ruta):
+            print(f"Salón '{args.salon_id}' disponible en {ruta}")
+            return 0
+        case Err(error):
+            print(f"Error: {error.message}", file=sys.stderr)
+            return 1
+
+
+def compactar_cambios(args: argparse.Namespace) -> int:
+    """Elimina las entradas antiguas del log de cambios."""
+    with _abrir_manager(args.database) as manager:
+        eliminadas = manager.compactar_cambios(args.dias)
+    print(f"Entradas del log de cambios eliminadas: {eliminadas}")
+    return 0
+
+
+def archivar_servicios(args: argparse.Namespace) -> int:
+    """Mueve los servicios de los años cerrados a sus particiones anuales."""
+    with _abrir_manager(args.database) as manager:
+        resultado = manager.archivar_servicios(args.hasta)
+
+    match resultado:
+        case Ok(movidos):
+            for anio, cantidad in movidos.items():
+                print(f"  {anio}: {cantidad} servicios")
+            print(f"Servicios archivados: {sum(movidos.values())}")
+            return 0
+        case Err(error):
+            print(f"Error: {error.message}", file=sys.stderr)
+            return 1
+
+
+def vacuum(args: argparse.Namespace) -> int:
+    """Compacta el fichero de la base de datos y reconstruye los índices de búsqueda."""
+    with _abrir_manager(args.database) as manager:
+        manager.repository.vacuum()
+    print("Base de datos compactada e índices de búsqueda reconstruidos")
+    return 0
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Construye el parser de argumentos de la línea de comandos."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--database",
+        default=os.getenv("DATABASE_PATH", "salon.db"),
+        help="Ruta del fichero SQLite (por defecto $DATABASE_PATH o salon.db)"
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    recalculo = subparsers.add_parser(
+        "recalcular-comisiones",
+        help="Recalcula las comisiones de un tipo de servicio en un rango de fechas"
+    )
+    recalculo.add_argument("tipo_servicio", help="Nombre del tipo de servicio")
+    recalculo.add_argument("fecha_inicio", type=date.fromisoformat, help="Fecha de inicio (YYYY-MM-DD)")
+    recalculo.add_argument("fecha_fin", type=date.fromisoformat, help="Fecha de fin (YYYY-MM-DD)")
+    recalculo.add_argument("--porcentaje", type=float, default=None,
+                           help="Porcentaje a aplicar (por defecto, el actual del tipo)")
+    recalculo.add_argument("--simular", action="store_true",
+                           help="Solo mostrar las diferencias sin modificar datos")
+    recalculo.set_defaults(func=recalcular_comisiones)
+
+    salon = subparsers.add_parser(
+        "crear-salon",
+        help="Crea la base de datos de un salón (modo multi-salón)"
+    )
+    salon.add_argument("salon_id", help="Identificador del salón (minúsculas, dígitos, '-' y '_')")
+    salon.add_argument("--directorio", default=os.getenv("SALONES_DIR", "salones"),
+                       help="Directorio de bases de datos de salones (por defecto $SALONES_DIR o salones)")
+    salon.set_defaults(func=crear_salon)
+
+    compactacion = subparsers.add_parser(
+        "compactar-cambios",
+        help="Elimina del log de cambios las entradas antiguas (los clientes atrasados se resincronizan)"
+    )
+    compactacion.add_argument("--dias", type=int, default=30,
+                              help="Días de cambios que se conservan (por defecto 30)")
+    compactacion.set_defaults(func=compactar_cambios)
+
+    archivo = subparsers.add_parser(
+        "archivar-servicios",
+        help="Mueve los servicios de los años cerrados a tablas por año (servicios_<año>)"
+    )
+    archivo.add_argument("--hasta", type=int, default=None,
+                         help="Último año que se archiva (por defecto, el año pasado)")
+    archivo.set_defaults(func=archivar_servicios)
+
+    compactacion_fichero = subparsers.add_parser(
+        "vacuum",
+        help="Compacta el fichero SQLite (VACUUM) y reconstruye los índices de búsqueda"
+    )
+    compactacion_fichero.set_defaults(func=vacuum)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la línea de comandos."""
+    args = crear_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Compresión de las respuestas HTTP negociada con `Accept-Encoding`.
+
+Se usa brotli si el paquete `brotli` está instalado y el cliente lo acepta,
+y gzip en otro caso. Solo se comprimen tipos de contenido textuales (JSON,
+texto, CSV...) y respuestas de al menos `tamano_minimo` bytes; las
+respuestas sin cuerpo (`204`, `304`) y las que ya traen `Content-Encoding`
+pasan sin cambios.
+
+Las respuestas en streaming se comprimen por fragmentos: cada fragmento se
+vacía del compresor al enviarlo, de modo que el cliente lo recibe sin
+esperar al siguiente.
+"""
+import zlib
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Tipos de contenido que merece la pena comprimir (prefijos)
+TIPOS_COMPRIMIBLES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/problem+json",
+    "image/svg+xml",
+)
+
+# Códigos de estado cuyas respuestas no tienen cuerpo
+ESTADOS_SIN_CUERPO = (204, 304)
+
+
+def codificaciones_disponibles() -> tuple:
+    """Codificaciones soportadas por este proceso, en orden de preferencia."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negociar_codificacion(accept_encoding: str, disponibles: Iterable[str]) -> Optional[str]:
+    """
+    Elige la codificación de la respuesta según la cabecera `Accept-Encoding`.
+
+    Se respetan los valores `q` (`q=0` rechaza la codificación) y el comodín
+    `*`. A igual `q` se prefiere el orden de `disponibles`.
+
+    Args:
+        accept_encoding: Valor de la cabecera `Accept-Encoding`
+        disponibles: Codificaciones soportadas, en orden de preferencia
+
+    Returns:
+        La codificación elegida o None si no se debe comprimir
+    """
+    calidades = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        parametro = parametros.strip().replace(" ", "")
+        if parametro.startswith("q="):
+            try:
+                calidad = float(parametro[2:])
+            except ValueError:
+                calidad = 0.0
+        calidades[nombre] = calidad
+
+    mejor, mejor_calidad = None, 0.0
+    for codificacion in disponibles:
+        calidad = calidades.get(codificacion, calidades.get("*", 0.0))
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = codificacion, calidad
+    return mejor
+
+
+def es_comprimible(tipo_contenido: str) -> bool:
+    """Indica si un tipo de contenido (cabecera `Content-Type`) es comprimible."""
+    tipo = tipo_contenido.split(";", 1)[0].strip().lower()
+    return tipo.startswith(TIPOS_COMPRIMIBLES)
+
+
+class _Compresor:
+    """Compresor incremental de gzip o brotli."""
+
+    def __init__(self, codificacion: str, nivel_gzip: int, nivel_brotli: int):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._brotli = brotli.Compressor(quality=nivel_brotli)
+        else:
+            # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+            self._zlib = zlib.compressobj(nivel_gzip, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes, final: bool) -> bytes:
+        """Comprime un fragmento y vacía el compresor (cerrándolo si es el último)."""
+        if self.codificacion == "br":
+            return self._brotli.process(datos) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(datos) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class MiddlewareCompresion:
+    """
+    Middleware ASGI que comprime las respuestas según `Accept-Encoding`.
+
+    Las respuestas de un único fragmento por debajo de `tamano_minimo` se
+    envían sin comprimir. En streaming no se conoce el tamaño total, así que
+    se comprimen siempre que el primer fragmento no sea también el último.
+    """
+
+    def __init__(self, app, tamano_minimo: int = 1024, nivel_gzip: int = 6, nivel_brotli: int = 4):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            tamano_minimo: Bytes a partir de los que se comprime una respuesta
+            nivel_gzip: Nivel de compresión de gzip (1-9)
+            nivel_brotli: Calidad de brotli (0-11)
+        """
+        self.app = app
+        self.tamano_minimo = tamano_minimo
+        self.nivel_gzip = nivel_gzip
+        self.nivel_brotli = nivel_brotli
+        self.disponibles = codificaciones_disponibles()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = negociar_codificacion(Headers(scope=scope).get("accept-encoding", ""), self.disponibles)
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = {}
+        estado = {"compresor": None, "decidido": False}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                # Se retiene hasta ver el primer fragmento del cuerpo
+                inicio.update(mensaje)
+                return
+            if mensaje["type"] != "http.response.body":
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas_cuerpo = mensaje.get("more_body", False)
+            if not estado["decidido"]:
+                estado["decidido"] = True
+                if self._debe_comprimir(inicio, cuerpo, mas_cuerpo):
+                    estado["compresor"] = _Compresor(codificacion, self.nivel_gzip, self.nivel_brotli)
+                    cabeceras = MutableHeaders(raw=inicio["headers"])
+                    cabeceras["Content-Encoding"] = codificacion
+                    cabeceras.add_vary_header("Accept-Encoding")
+                    if mas_cuerpo:
+                        del cabeceras["Content-Length"]
+                    else:
+                        cuerpo = estado["compresor"].comprimir(cuerpo, final=True)
+                        cabeceras["Content-Length"] = str(len(cuerpo))
+                        await send(inicio)
+                        await send({**mensaje, "body": cuerpo})
+                        return
+                await send(inicio)
+
+            compresor = estado["compresor"]
+            if compresor is not None:
+                mensaje = {**mensaje, "body": compresor.comprimir(cuerpo, final=not mas_cuerpo)}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+    def _debe_comprimir(self, inicio: dict, cuerpo: bytes, mas_cuerpo: bool) -> bool:
+        """Decide si se comprime la respuesta a partir de sus cabeceras y su primer fragmento."""
+        if inicio["status"] in ESTADOS_SIN_CUERPO or inicio["status"] < 200:
+            return False
+        cabeceras = Headers(raw=inicio["headers"])
+        if "content-encoding" in cabeceras or not es_comprimible(cabeceras.get("content-type", "")):
+            return False
+        return mas_cuerpo or len(cuerpo) >= self.tamano_minimo
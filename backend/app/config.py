@@ -0,0 +1,120 @@
+"""
+Configuración de la aplicación a partir de variables de entorno.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _leer_bool(nombre: str, por_defecto: bool = False) -> bool:
+    """Lee una variable de entorno booleana ("1", "true", "si", "yes", "on")."""
+    valor = os.getenv(nombre)
+    if valor is None:
+        return por_defecto
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Parámetros de arranque de la aplicación.
+
+    Attributes:
+        database_path: Ruta del fichero SQLite por defecto
+        usar_migraciones: Si es True el esquema lo gestiona Alembic
+            (`alembic upgrade head` en el despliegue) y el arranque no
+            ejecuta `create_all`
+        salones_dir: Directorio de salones; None deshabilita el modo multi-salón
+        salones_max_abiertos: Número máximo de salones abiertos a la vez
+        salones_max_inactividad: Segundos sin uso tras los que se cierra un salón
+        plazo_reintentos: Segundos máximos reintentando una escritura bloqueada
+        sqlite_journal_mode: `PRAGMA journal_mode` de la base de datos por defecto
+        sqlite_synchronous: `PRAGMA synchronous` de la base de datos por
+            defecto; None deja el valor por defecto de SQLite
+        escritura_agrupada: Si es True los servicios se confirman por lotes (group commit)
+        escritura_agrupada_intervalo_ms: Milisegundos máximos que espera un lote a llenarse
+        escritura_agrupada_lote: Número máximo de servicios por lote
+        presupuesto_consultas: Consultas SQL por petición a partir de las que
+            se registra un aviso; None para no avisar
+        umbral_consulta_lenta_ms: Duración a partir de la que una sentencia SQL
+            se registra como lenta; None lo desactiva
+        token_admin: Token de las operaciones de administración (cabecera
+            `X-Admin-Token`); None las deshabilita
+        perfilado_dir: Directorio donde se guardan los perfiles de peticiones
+        perfilado_formato: Formato de perfil por defecto ("pstats" o "collapsed")
+        perfilado_muestreo: Perfilar 1 de cada N peticiones; None solo bajo demanda
+        perfilado_max: Número de perfiles que se conservan
+        log_accesos: Si es False no se escribe el log de accesos
+        log_accesos_muestreo: Fracción de peticiones con éxito que se escriben
+            en el log de accesos (los errores se escriben siempre)
+        compresion: Si es True las respuestas se comprimen con gzip o brotli
+        compresion_tamano_minimo: Bytes a partir de los que se comprime una respuesta
+    """
+    database_path: str = "salon.db"
+    usar_migraciones: bool = False
+    salones_dir: Optional[str] = None
+    salones_max_abiertos: int = 8
+    salones_max_inactividad: float = 300.0
+    plazo_reintentos: float = 10.0
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: Optional[str] = None
+    escritura_agrupada: bool = False
+    escritura_agrupada_intervalo_ms: float = 5.0
+    escritura_agrupada_lote: int = 100
+    presupuesto_consultas: Optional[int] = 20
+    umbral_consulta_lenta_ms: Optional[float] = 100.0
+    token_admin: Optional[str] = None
+    perfilado_dir: str = "perfiles"
+    perfilado_formato: str = "pstats"
+    perfilado_muestreo: Optional[int] = None
+    perfilado_max: int = 50
+    log_accesos: bool = True
+    log_accesos_muestreo: float = 1.0
+    compresion: bool = True
+    compresion_tamano_minimo: int = 1024
+
+    @property
+    def database_url(self) -> str:
+        """URL de SQLAlchemy de la base de datos por defecto."""
+        return f"sqlite:///{self.database_path}"
+
+    @classmethod
+    def desde_entorno(cls) -> "Settings":
+        """
+        Construye la configuración a partir de las variables de entorno.
+
+        Returns:
+            Settings con DATABASE_PATH, USAR_MIGRACIONES, SALONES_DIR,
+            SALONES_MAX_ABIERTOS, SALONES_MAX_INACTIVIDAD, PLAZO_REINTENTOS,
+            SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS,
+            ESCRITURA_AGRUPADA, ESCRITURA_AGRUPADA_INTERVALO_MS,
+            ESCRITURA_AGRUPADA_LOTE, PRESUPUESTO_CONSULTAS,
+            UMBRAL_CONSULTA_LENTA_MS, TOKEN_ADMIN, PERFILADO_DIR,
+            PERFILADO_FORMATO, PERFILADO_MUESTREO, PERFILADO_MAX,
+            LOG_ACCESOS, LOG_ACCESOS_MUESTREO, COMPRESION y
+            COMPRESION_TAMANO_MINIMO aplicados
+        """
+        return cls(
+            database_path=os.getenv("DATABASE_PATH", "salon.db"),
+            usar_migraciones=_leer_bool("USAR_MIGRACIONES"),
+            salones_dir=os.getenv("SALONES_DIR") or None,
+            salones_max_abiertos=int(os.getenv("SALONES_MAX_ABIERTOS", "8")),
+            salones_max_inactividad=float(os.getenv("SALONES_MAX_INACTIVIDAD", "300")),
+            plazo_reintentos=float(os.getenv("PLAZO_REINTENTOS", "10")),
+            sqlite_journal_mode=os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+            sqlite_synchronous=os.getenv("SQLITE_SYNCHRONOUS") or None,
+            escritura_agrupada=_leer_bool("ESCRITURA_AGRUPADA"),
+            escritura_agrupada_intervalo_ms=float(os.getenv("ESCRITURA_AGRUPADA_INTERVALO_MS", "5")),
+            escritura_agrupada_lote=int(os.getenv("ESCRITURA_AGRUPADA_LOTE", "100")),
+            presupuesto_consultas=int(os.getenv("PRESUPUESTO_CONSULTAS", "20")) or None,
+            umbral_consulta_lenta_ms=float(os.getenv("UMBRAL_CONSULTA_LENTA_MS", "100")) or None,
+            token_admin=os.getenv("TOKEN_ADMIN") or None,
+            perfilado_dir=os.getenv("PERFILADO_DIR", "perfiles"),
+            perfilado_formato=os.getenv("PERFILADO_FORMATO", "pstats"),
+            perfilado_muestreo=int(os.getenv("PERFILADO_MUESTREO", "0")) or None,
+            perfilado_max=int(os.getenv("PERFILADO_MAX", "50")),
+            log_accesos=_leer_bool("LOG_ACCESOS", True),
+            log_accesos_muestreo=float(os.getenv("LOG_ACCESOS_MUESTREO", "1")),
+            compresion=_leer_bool("COMPRESION", True),
+            compresion_tamano_minimo=int(os.getenv("COMPRESION_TAMANO_MINIMO", "1024"))
+        )
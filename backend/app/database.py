@@ -0,0 +1,277 @@
+"""
+Creación y configuración de engines SQLAlchemy para el sistema de gestión de salón.
+"""
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from app.instrumentacion_sql import instrumentar_engine
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Directorio de migraciones de Alembic (backend/alembic)
+DIRECTORIO_MIGRACIONES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+
+def es_sqlite_en_memoria(database_url: str) -> bool:
+    """Indica si la URL apunta a una base de datos SQLite en memoria."""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# Valores admitidos de `PRAGMA journal_mode` y `PRAGMA synchronous`
+MODOS_DIARIO = ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF")
+MODOS_SINCRONIZACION = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+@dataclass(frozen=True)
+class ConfiguracionSQLite:
+    """
+    Modo de diario y de sincronización de las conexiones SQLite en fichero.
+
+    Attributes:
+        journal_mode: `PRAGMA journal_mode` (por defecto WAL)
+        synchronous: `PRAGMA synchronous`; None deja el valor por defecto de SQLite (FULL)
+    """
+    journal_mode: str = "WAL"
+    synchronous: Optional[str] = None
+
+    def __post_init__(self):
+        if self.journal_mode.upper() not in MODOS_DIARIO:
+            raise ValueError(f"journal_mode no válido: {self.journal_mode}")
+        if self.synchronous is not None and self.synchronous.upper() not in MODOS_SINCRONIZACION:
+            raise ValueError(f"synchronous no válido: {self.synchronous}")
+
+
+def crear_engine(database_url: str, configuracion: ConfiguracionSQLite = ConfiguracionSQLite()) -> Engine:
+    """
+    Crea el engine principal (lectura y escritura).
+
+    Las bases de datos SQLite en fichero se configuran por defecto en modo
+    WAL, de forma que los lectores no bloquean a los escritores ni al revés.
+    Las bases de datos en memoria comparten una única conexión entre hilos,
+    ya que cada conexión a `:memory:` es una base de datos distinta.
+
+    Args:
+        database_url: URL de conexión a la base de datos
+        configuracion: Modo de diario y de sincronización de SQLite
+
+    Returns:
+        Engine configurado
+    """
+    if es_sqlite_en_memoria(database_url):
+        return instrumentar_engine(create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        ))
+
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _configurar_diario(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute(f"PRAGMA journal_mode={configuracion.journal_mode.upper()}")
+            if configuracion.synchronous is not None:
+                cursor.execute(f"PRAGMA synchronous={configuracion.synchronous.upper()}")
+            cursor.close()
+
+    return instrumentar_engine(engine)
+
+
+def crear_engine_lectura(database_url: str, engine: Engine) -> Engine:
+    """
+    Crea un engine de solo lectura con su propio pool para reportes y listados.
+
+    Para SQLite en fichero abre la base de datos con `mode=ro` y
+    `PRAGMA query_only`, y emite `BEGIN` explícito al iniciar cada
+    transacción: todas las consultas de una misma sesión leen la misma
+    instantánea de la base de datos. En otros casos (p. ej. SQLite en
+    memoria) devuelve el engine principal.
+
+    Args:
+        database_url: URL de conexión a la base de datos
+        engine: Engine principal, usado cuando no es posible un engine separado
+
+    Returns:
+        Engine de solo lectura
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite" or es_sqlite_en_memoria(database_url) or url.query.get("uri"):
+        return engine
+
+    url_lectura = url.set(
+        database=f"file:{os.path.abspath(url.database)}",
+        query={"mode": "ro", "uri": "true"}
+    )
+    engine_lectura = create_engine(url_lectura)
+
+    @event.listens_for(engine_lectura, "connect")
+    def _configurar_solo_lectura(dbapi_connection, connection_record):
+        # Desactivar la gestión implícita de transacciones de pysqlite para
+        # controlar el BEGIN desde SQLAlchemy
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine_lectura, "begin")
+    def _iniciar_transaccion_lectura(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return instrumentar_engine(engine_lectura)
+
+
+def aplicar_migraciones(engine: Engine, revision: str = "head") -> None:
+    """
+    Aplica las migraciones de Alembic sobre el engine indicado.
+
+    Equivale a `alembic upgrade <revision>` pero reutiliza el engine de la
+    aplicación (necesario para bases de datos en memoria).
+
+    Args:
+        engine: Engine sobre el que migrar
+        revision: Revisión destino (por defecto la última)
+    """
+    # Import diferido: Alembic solo se carga si se usan las migraciones
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", DIRECTORIO_MIGRACIONES)
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+# Mensajes de SQLite que indican que otra conexión tiene el bloqueo de escritura
+_MENSAJES_BLOQUEO = ("database is locked", "database is busy", "database table is locked")
+
+
+def es_error_de_bloqueo(error: BaseException) -> bool:
+    """Indica si un error de SQLAlchemy se debe a un bloqueo de SQLite (SQLITE_BUSY/SQLITE_LOCKED)."""
+    if not isinstance(error, OperationalError):
+        return False
+    mensaje = str(error.orig).lower()
+    return any(texto in mensaje for texto in _MENSAJES_BLOQUEO)
+
+
+@dataclass(frozen=True)
+class PoliticaReintentos:
+    """
+    Reintentos con backoff exponencial y jitter completo ante bloqueos de SQLite.
+
+    La espera antes del intento n es aleatoria entre 0 y
+    min(espera_maxima, espera_base * 2**n), y no se reintenta si la espera
+    superaría el plazo total.
+
+    Attributes:
+        espera_base: Espera base en segundos
+        espera_maxima: Espera máxima entre intentos en segundos
+        plazo: Tiempo máximo total en segundos desde el primer intento
+    """
+    espera_base: float = 0.01
+    espera_maxima: float = 0.5
+    plazo: float = 10.0
+
+
+class ContadorReintentos:
+    """Contadores de reintentos por bloqueo, seguros entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reintentos = 0
+        self.agotados = 0
+
+    def registrar_reintento(self) -> None:
+        with self._lock:
+            self.reintentos += 1
+
+    def registrar_agotado(self) -> None:
+        with self._lock:
+            self.agotados += 1
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self.reintentos = 0
+            self.agotados = 0
+
+
+# Contadores globales del proceso
+contador_reintentos = ContadorReintentos()
+
+
+def ejecutar_con_reintentos(operacion: Callable[[], T], politica: PoliticaReintentos,
+                            descripcion: str = "operación",
+                            reloj: Callable[[], float] = time.monotonic,
+                            dormir: Callable[[float], None] = time.sleep) -> T:
+    """
+    Ejecuta una transacción y la repite si falla por un bloqueo de SQLite.
+
+    Solo debe usarse con operaciones que abren, confirman y cierran su propia
+    transacción: un error de bloqueo implica que no se confirmó nada y que
+    repetir la operación completa es seguro.
+
+    Las esperas duermen el hilo que llama: no debe ejecutarse en el bucle de
+    eventos (los endpoints que escriben son funciones síncronas).
+
+    Args:
+        operacion: Transacción a ejecutar
+        politica: Esperas y plazo de los reintentos
+        descripcion: Nombre de la operación para el log
+        reloj: Fuente de tiempo (inyectable para pruebas)
+        dormir: Función de espera (inyectable para pruebas)
+
+    Returns:
+        El resultado de la operación
+
+    Raises:
+        OperationalError: Si el bloqueo persiste al agotar el plazo
+    """
+    limite = reloj() + politica.plazo
+    intento = 0
+    while True:
+        try:
+            return operacion()
+        except OperationalError as e:
+            if not es_error_de_bloqueo(e):
+                raise
+            espera = random.uniform(0, min(politica.espera_maxima, politica.espera_base * 2 ** intento))
+            if reloj() + espera > limite:
+                contador_reintentos.registrar_agotado()
+                logger.error(f"Base de datos bloqueada en {descripcion} tras {intento + 1} intentos")
+                raise
+            intento += 1
+            contador_reintentos.registrar_reintento()
+            logger.warning(f"Base de datos bloqueada en {descripcion}; reintento {intento} en {espera * 1000:.0f} ms")
+            dormir(espera)
+
+
+def reintentar_si_bloqueada(metodo: Callable[..., T]) -> Callable[..., T]:
+    """
+    Decora un método de escritura del repositorio para reintentarlo ante bloqueos.
+
+    Usa la política `reintentos` de la instancia. El método debe abrir y
+    confirmar su propia sesión y relanzar los errores de bloqueo sin
+    convertirlos (ver `es_error_de_bloqueo`).
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        return ejecutar_con_reintentos(
+            lambda: metodo(self, *args, **kwargs),
+            self.reintentos,
+            descripcion=metodo.__name__
+        )
+    return envoltura
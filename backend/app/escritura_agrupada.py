@@ -0,0 +1,165 @@
+"""
+Escritura agrupada (group commit) de servicios registrados.
+
+En SQLite cada commit implica un fsync, por lo que registrar servicios de uno
+en uno limita el rendimiento de escritura al número de fsync por segundo. La
+escritura agrupada encola los servicios y un único hilo escritor los confirma
+por lotes: cada lote se guarda en una sola transacción cuando se alcanza
+`tamano_lote` o cuando pasa `intervalo` segundos desde el primer servicio
+del lote. Quien encola un servicio espera hasta que su lote está confirmado.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List
+
+from app.metricas import Histograma
+from app.models import ServicioRegistrado
+from app.repository import DataRepository
+
+logger = logging.getLogger(__name__)
+
+# Límites de los histogramas de tamaño de lote y de latencia (ms)
+LIMITES_LOTE = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LIMITES_LATENCIA_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+@dataclass
+class _Pendiente:
+    """Servicio en cola junto al futuro que se resuelve al confirmarse."""
+    servicio: ServicioRegistrado
+    encolado: float
+    futuro: Future = field(default_factory=Future)
+
+
+class EscrituraAgrupada:
+    """Cola de servicios con un hilo escritor que confirma por lotes."""
+
+    def __init__(self, repository: DataRepository, intervalo: float = 0.005, tamano_lote: int = 100,
+                 reloj: Callable[[], float] = time.perf_counter):
+        """
+        Inicializa la escritura agrupada (sin arrancar el hilo escritor).
+
+        Args:
+            repository: Repositorio donde se guardan los lotes
+            intervalo: Segundos máximos que espera un lote a llenarse
+            tamano_lote: Número máximo de servicios por lote
+            reloj: Fuente de tiempo (inyectable para pruebas)
+        """
+        self.repository = repository
+        self.intervalo = intervalo
+        self.tamano_lote = tamano_lote
+        self._reloj = reloj
+        self._cola: "queue.Queue[_Pendiente | None]" = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.histograma_lotes = Histograma(LIMITES_LOTE)
+        self.histograma_latencias_ms = Histograma(LIMITES_LATENCIA_MS)
+
+    @property
+    def activa(self) -> bool:
+        """Indica si el hilo escritor está en marcha."""
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self) -> None:
+        """Arranca el hilo escritor."""
+        with self._lock:
+            if self.activa:
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="escritura-agrupada", daemon=True)
+            self._hilo.start()
+
+    def detener(self) -> None:
+        """Confirma los servicios pendientes y detiene el hilo escritor."""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+            if hilo is not None:
+                self._cola.put(None)
+        if hilo is not None:
+            hilo.join()
+
+    def guardar(self, servicio: ServicioRegistrado) -> None:
+        """
+        Encola un servicio y espera a que su lote esté confirmado.
+
+        Args:
+            servicio: Servicio a guardar
+
+        Raises:
+            La misma excepción que el repositorio si el guardado falla
+        """
+        pendiente = _Pendiente(servicio=servicio, encolado=self._reloj())
+        # Encolar bajo el lock para no quedar detrás de la marca de fin de detener()
+        with self._lock:
+            if not self.activa:
+                raise RuntimeError("La escritura agrupada no está iniciada")
+            self._cola.put(pendiente)
+        pendiente.futuro.result()
+
+    def _bucle(self) -> None:
+        """Hilo escritor: agrupa los servicios en cola y los confirma por lotes."""
+        detener = False
+        while not detener:
+            primero = self._cola.get()
+            if primero is None:
+                break
+            lote = [primero]
+            limite = self._reloj() + self.intervalo
+            while len(lote) < self.tamano_lote:
+                restante = limite - self._reloj()
+                if restante <= 0:
+                    break
+                try:
+                    pendiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if pendiente is None:
+                    detener = True
+                    break
+                lote.append(pendiente)
+            self._confirmar(lote)
+
+        # Confirmar lo que quedase en cola al detener
+        restantes = []
+        while True:
+            try:
+                pendiente = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if pendiente is not None:
+                restantes.append(pendiente)
+        for inicio in range(0, len(restantes), self.tamano_lote):
+            self._confirmar(restantes[inicio:inicio + self.tamano_lote])
+
+    def _confirmar(self, lote: List[_Pendiente]) -> None:
+        """Guarda un lote en una transacción y resuelve los futuros de sus servicios."""
+        try:
+            self.repository.guardar_servicios([pendiente.servicio for pendiente in lote])
+        except Exception as e:
+            if len(lote) == 1:
+                lote[0].futuro.set_exception(e)
+                return
+            # Aislar el servicio que falla: guardar el resto uno a uno
+            logger.warning(f"Error al confirmar un lote de {len(lote)} servicios; se guardan por separado: {e!r}")
+            for pendiente in lote:
+                self._confirmar([pendiente])
+            return
+
+        ahora = self._reloj()
+        self.histograma_lotes.observar(len(lote))
+        for pendiente in lote:
+            self.histograma_latencias_ms.observar((ahora - pendiente.encolado) * 1000)
+            pendiente.futuro.set_result(None)
+
+    def estadisticas(self) -> dict:
+        """Histogramas de tamaño de lote y de latencia hasta la confirmación."""
+        return {
+            "activa": self.activa,
+            "intervalo_ms": self.intervalo * 1000,
+            "tamano_lote": self.tamano_lote,
+            "lotes": self.histograma_lotes.to_dict(),
+            "latencias_ms": self.histograma_latencias_ms.to_dict(),
+        }
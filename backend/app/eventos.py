@@ -0,0 +1,178 @@
+"""
+Difusión de eventos de servicios a clientes conectados con Server-Sent Events.
+
+`SalonManager` publica un evento cuando se confirma el registro o la
+eliminación de un servicio, con los totales del día actualizados. Cada
+cliente de `GET /api/eventos` tiene su propia cola acotada: si no consume
+los eventos a tiempo y la cola se llena, se le descarta (se cierra su
+conexión) en lugar de acumular memoria o frenar al resto. `EventSource`
+se reconecta solo y recibe de nuevo los totales al conectarse.
+
+La difusión es en proceso: con varios workers, cada uno difunde los
+servicios que confirma él.
+"""
+import asyncio
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Eventos pendientes por cliente a partir de los que se le descarta
+TAMANO_COLA = 100
+
+# Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión
+INTERVALO_LATIDO = 15.0
+
+# Milisegundos que espera EventSource antes de reconectarse
+ESPERA_RECONEXION_MS = 3000
+
+
+def formatear_evento(tipo: str, datos: dict, id: Optional[int] = None) -> str:
+    """Serializa un evento en el formato de Server-Sent Events."""
+    lineas = [] if id is None else [f"id: {id}"]
+    lineas.append(f"event: {tipo}")
+    lineas.append(f"data: {json.dumps(datos, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lineas) + "\n\n"
+
+
+@dataclass(frozen=True)
+class Evento:
+    """Evento publicado a todos los clientes."""
+    id: int
+    tipo: str
+    datos: dict
+
+    def formatear(self) -> str:
+        """Serializa el evento en el formato de Server-Sent Events."""
+        return formatear_evento(self.tipo, self.datos, self.id)
+
+
+class Suscripcion:
+    """Cola acotada de eventos de un cliente, ligada al bucle de eventos que la creó."""
+
+    def __init__(self, difusor: "DifusorEventos", tamano_cola: int):
+        self._difusor = difusor
+        self._bucle = asyncio.get_running_loop()
+        self._cola: asyncio.Queue = asyncio.Queue(tamano_cola)
+        self.descartada = False
+
+    def _entregar(self, evento: Evento) -> None:
+        """Encola un evento (en el bucle del cliente); con la cola llena descarta al cliente."""
+        if self.descartada:
+            return
+        try:
+            self._cola.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.descartada = True
+            self._difusor._eliminar(self, descartada=True)
+            # Los eventos pendientes se sustituyen por la marca de fin
+            while not self._cola.empty():
+                self._cola.get_nowait()
+            self._cola.put_nowait(None)
+
+    async def siguiente(self, espera: float) -> Optional[Evento]:
+        """
+        Espera el siguiente evento.
+
+        Returns:
+            El evento, o None si el cliente se descartó por lento
+
+        Raises:
+            asyncio.TimeoutError: Si no llega ningún evento en `espera` segundos
+        """
+        return await asyncio.wait_for(self._cola.get(), espera)
+
+    def cancelar(self) -> None:
+        """Deja de recibir eventos."""
+        self._difusor._eliminar(self)
+
+
+class DifusorEventos:
+    """
+    Difusor en proceso de eventos a las suscripciones activas.
+
+    `publicar` se puede llamar desde cualquier hilo (los endpoints síncronos
+    y la escritura agrupada confirman fuera del bucle de eventos); cada
+    evento se entrega en el bucle de cada suscripción y en orden.
+    """
+
+    def __init__(self, tamano_cola: int = TAMANO_COLA):
+        """
+        Args:
+            tamano_cola: Eventos pendientes por cliente a partir de los que se le descarta
+        """
+        self.tamano_cola = tamano_cola
+        self.descartadas = 0
+        self._suscripciones: Set[Suscripcion] = set()
+        self._ultimo_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def suscriptores(self) -> int:
+        """Número de suscripciones activas."""
+        return len(self._suscripciones)
+
+    def suscribir(self) -> Suscripcion:
+        """Crea una suscripción en el bucle de eventos actual."""
+        suscripcion = Suscripcion(self, self.tamano_cola)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def publicar(self, tipo: str, datos: dict) -> None:
+        """Envía un evento a todas las suscripciones activas."""
+        with self._lock:
+            self._ultimo_id += 1
+            evento = Evento(self._ultimo_id, tipo, datos)
+            cerradas = []
+            for suscripcion in self._suscripciones:
+                try:
+                    suscripcion._bucle.call_soon_threadsafe(suscripcion._entregar, evento)
+                except RuntimeError:
+                    # Bucle de eventos cerrado
+                    cerradas.append(suscripcion)
+            self._suscripciones.difference_update(cerradas)
+
+    def _eliminar(self, suscripcion: Suscripcion, descartada: bool = False) -> None:
+        with self._lock:
+            if suscripcion not in self._suscripciones:
+                return
+            self._suscripciones.discard(suscripcion)
+            if descartada:
+                self.descartadas += 1
+        if descartada:
+            logger.warning("Cliente de eventos descartado: %d eventos sin consumir", self.tamano_cola)
+
+
+async def flujo_eventos(suscripcion: Suscripcion, inicial: str,
+                        latido: float = INTERVALO_LATIDO) -> AsyncIterator[str]:
+    """
+    Cuerpo de la respuesta Server-Sent Events de una suscripción.
+
+    Envía el evento inicial, los eventos publicados y un comentario de
+    latido cada `latido` segundos sin eventos. Termina si el cliente se
+    descarta por lento; la suscripción se cancela siempre al terminar
+    (también cuando el cliente cierra la conexión).
+
+    Args:
+        suscripcion: Suscripción del cliente
+        inicial: Evento ya formateado que se envía al conectar
+        latido: Segundos sin eventos tras los que se envía un latido
+    """
+    try:
+        yield f"retry: {ESPERA_RECONEXION_MS}\n\n"
+        yield inicial
+        while True:
+            try:
+                evento = await suscripcion.siguiente(latido)
+            except asyncio.TimeoutError:
+                yield ": latido\n\n"
+                continue
+            if evento is None:
+                return
+            yield evento.formatear()
+    finally:
+        suscripcion.cancelar()
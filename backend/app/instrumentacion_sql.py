@@ -0,0 +1,290 @@
+"""
+Instrumentación de las consultas SQL ejecutadas por los engines de la aplicación.
+
+Cada engine creado con app.database registra los eventos
+`before_cursor_execute`/`after_cursor_execute` de SQLAlchemy:
+
+- Las consultas y su duración se acumulan en las estadísticas de la petición
+  en curso, que viven en una ContextVar: las consultas ejecutadas fuera de una
+  petición (scripts, hilo de escritura agrupada) no se cuentan.
+- Las sentencias que superan el umbral de consulta lenta se registran en el
+  log `app.consultas_lentas` junto a su plan de ejecución.
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metricas import metodo_repositorio_actual
+
+logger = logging.getLogger(__name__)
+logger_lentas = logging.getLogger("app.consultas_lentas")
+
+
+@dataclass
+class EstadisticasConsultas:
+    """Consultas SQL ejecutadas y tiempo total de base de datos."""
+    consultas: int = 0
+    duracion_db: float = 0.0
+
+
+# Estadísticas de la petición en curso (None fuera de una petición)
+_estadisticas_actuales: ContextVar[Optional[EstadisticasConsultas]] = ContextVar(
+    "estadisticas_consultas", default=None
+)
+
+
+@contextmanager
+def medir_consultas() -> Iterator[EstadisticasConsultas]:
+    """
+    Acumula las consultas SQL ejecutadas dentro del bloque.
+
+    Yields:
+        Estadísticas que se actualizan con cada consulta del bloque
+    """
+    estadisticas = EstadisticasConsultas()
+    token = _estadisticas_actuales.set(estadisticas)
+    try:
+        yield estadisticas
+    finally:
+        _estadisticas_actuales.reset(token)
+
+
+def estadisticas_actuales() -> Optional[EstadisticasConsultas]:
+    """Estadísticas de consultas de la petición en curso (None fuera de una petición)."""
+    return _estadisticas_actuales.get()
+
+
+# Sentencias de las que se puede obtener un plan de ejecución
+_SENTENCIAS_CON_PLAN = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT|WITH)\b", re.IGNORECASE)
+
+# Recorrido completo de la tabla de servicios o de una partición archivada (sin índice)
+_RECORRIDO_SERVICIOS = re.compile(r"^SCAN (TABLE )?servicios(_\d{4})?$")
+
+
+@dataclass
+class ConsultaLenta:
+    """Sentencia que ha superado el umbral de consulta lenta."""
+    sql: str
+    parametros: str
+    duracion_ms: float
+    metodo: Optional[str]
+    momento: datetime
+    plan: Optional[List[str]] = None
+    recorre_servicios: bool = False
+
+    def to_dict(self) -> dict:
+        """Convierte la consulta lenta a diccionario."""
+        return {
+            "sql": self.sql,
+            "parametros": self.parametros,
+            "duracion_ms": round(self.duracion_ms, 3),
+            "metodo": self.metodo,
+            "momento": self.momento.isoformat(),
+            "plan": self.plan,
+            "recorre_servicios": self.recorre_servicios,
+        }
+
+
+def forma_parametros(parameters, executemany: bool) -> str:
+    """
+    Describe los parámetros de una sentencia por sus tipos, sin sus valores.
+
+    Ejemplos: "(str, date)", "100 x (str, Decimal)"
+    """
+    if executemany:
+        filas = list(parameters)
+        return f"{len(filas)} x {forma_parametros(filas[0], False)}" if filas else "0 x ()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{clave}: {type(valor).__name__}" for clave, valor in parameters.items()) + "}"
+    return "(" + ", ".join(type(valor).__name__ for valor in (parameters or ())) + ")"
+
+
+class RegistroConsultasLentas:
+    """
+    Registro de sentencias que superan un umbral de duración.
+
+    La primera vez que una forma de sentencia (su SQL con parámetros `?`) es
+    lenta se obtiene su `EXPLAIN QUERY PLAN`, y se marca si recorre la tabla
+    `servicios` completa. Se conservan las últimas consultas lentas en memoria.
+    """
+
+    def __init__(self, umbral_ms: Optional[float] = None, max_recientes: int = 100, max_formas: int = 1000):
+        """
+        Args:
+            umbral_ms: Duración mínima en ms para considerar lenta una sentencia (None lo desactiva)
+            max_recientes: Número de consultas lentas recientes que se conservan
+            max_formas: Número máximo de formas de sentencia con plan capturado
+        """
+        self.umbral_ms = umbral_ms
+        self.max_formas = max_formas
+        self._recientes: deque = deque(maxlen=max_recientes)
+        self._planes: dict = {}
+        self._lock = threading.Lock()
+
+    def configurar(self, umbral_ms: Optional[float]) -> None:
+        """Cambia el umbral y descarta los planes y consultas registrados."""
+        with self._lock:
+            self.umbral_ms = umbral_ms
+            self._recientes.clear()
+            self._planes.clear()
+
+    def es_lenta(self, duracion: float) -> bool:
+        """Indica si una duración (segundos) supera el umbral."""
+        return self.umbral_ms is not None and duracion * 1000 >= self.umbral_ms
+
+    def registrar(self, conn, statement: str, parameters, executemany: bool, duracion: float) -> ConsultaLenta:
+        """Registra una sentencia lenta y captura su plan si es la primera vez que se ve."""
+        consulta = ConsultaLenta(
+            sql=statement,
+            parametros=forma_parametros(parameters, executemany),
+            duracion_ms=duracion * 1000,
+            metodo=metodo_repositorio_actual.get(),
+            momento=datetime.now()
+        )
+
+        with self._lock:
+            conocida = statement in self._planes
+            plan = self._planes.get(statement)
+        if not conocida:
+            plan = self._explicar(conn, statement, parameters, executemany)
+            with self._lock:
+                if len(self._planes) < self.max_formas:
+                    self._planes[statement] = plan
+
+        if plan is not None:
+            consulta.plan = plan
+            consulta.recorre_servicios = any(_RECORRIDO_SERVICIOS.match(paso) for paso in plan)
+
+        with self._lock:
+            self._recientes.append(consulta)
+
+        mensaje = (
+            f"Consulta lenta ({consulta.duracion_ms:.1f} ms) en {consulta.metodo or 'desconocido'}: "
+            f"{' '.join(statement.split())} parámetros={consulta.parametros}"
+        )
+        if not conocida and plan is not None:
+            mensaje += f" plan={plan}"
+        if consulta.recorre_servicios:
+            mensaje += " [SCAN servicios: recorrido completo sin índice]"
+        logger_lentas.warning(mensaje)
+        return consulta
+
+    @staticmethod
+    def _explicar(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+        """Obtiene el EXPLAIN QUERY PLAN de una sentencia (solo SQLite)."""
+        if conn.dialect.name != "sqlite" or not _SENTENCIAS_CON_PLAN.match(statement):
+            return None
+        if executemany:
+            parameters = next(iter(parameters), ())
+        # Cursor propio: el de la sentencia aún tiene resultados pendientes de leer
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return [fila[-1] for fila in cursor.fetchall()]
+        except Exception as e:
+            logger.debug(f"No se pudo obtener el plan de ejecución: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def recientes(self) -> List[ConsultaLenta]:
+        """Consultas lentas recientes, de la más antigua a la más reciente."""
+        with self._lock:
+            return list(self._recientes)
+
+
+# Registro de consultas lentas del proceso (desactivado hasta configurarlo)
+consultas_lentas = RegistroConsultasLentas()
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_consulta = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - context._inicio_consulta
+    estadisticas = _estadisticas_actuales.get()
+    if estadisticas is not None:
+        estadisticas.consultas += 1
+        estadisticas.duracion_db += duracion
+    if consultas_lentas.es_lenta(duracion):
+        consultas_lentas.registrar(conn, statement, parameters, executemany, duracion)
+
+
+def instrumentar_engine(engine: Engine) -> Engine:
+    """
+    Registra la instrumentación de consultas en un engine.
+
+    Args:
+        engine: Engine a instrumentar
+
+    Returns:
+        El mismo engine
+    """
+    if not event.contains(engine, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+    return engine
+
+
+class MiddlewareServerTiming:
+    """
+    Middleware ASGI que mide las consultas SQL de cada petición.
+
+    Añade la cabecera `Server-Timing` con el tiempo de base de datos (`db`),
+    el tiempo total de la aplicación hasta la respuesta (`app`) y el número de
+    consultas (`queries`). Registra un aviso si la petición supera el
+    presupuesto de consultas.
+    """
+
+    def __init__(self, app, presupuesto_consultas: Optional[int] = None):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            presupuesto_consultas: Número máximo de consultas por petición antes
+                de registrar un aviso (None para no avisar)
+        """
+        self.app = app
+        self.presupuesto_consultas = presupuesto_consultas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        with medir_consultas() as estadisticas:
+            async def enviar(mensaje):
+                if mensaje["type"] == "http.response.start":
+                    duracion_app = time.perf_counter() - inicio
+                    cabecera = (
+                        f"db;dur={estadisticas.duracion_db * 1000:.2f}, "
+                        f"app;dur={duracion_app * 1000:.2f}, "
+                        f'queries;desc="{estadisticas.consultas}"'
+                    )
+                    mensaje = {**mensaje, "headers": [*mensaje.get("headers", []),
+                                                      (b"server-timing", cabecera.encode("latin-1"))]}
+                    self._comprobar_presupuesto(scope, estadisticas)
+                await send(mensaje)
+
+            await self.app(scope, receive, enviar)
+
+    def _comprobar_presupuesto(self, scope, estadisticas: EstadisticasConsultas) -> None:
+        """Registra un aviso si la petición ha superado el presupuesto de consultas."""
+        if self.presupuesto_consultas is None or estadisticas.consultas <= self.presupuesto_consultas:
+            return
+        ruta = getattr(scope.get("route"), "path", scope["path"])
+        logger.warning(
+            f"{scope['method']} {ruta} ejecutó {estadisticas.consultas} consultas SQL "
+            f"(presupuesto: {self.presupuesto_consultas}, db: {estadisticas.duracion_db * 1000:.1f} ms)"
+        )
@@ -1,16 +1,49 @@
 """
 Aplicación FastAPI para el sistema de gestión de salón de peluquería.
 """
+import time
+
+_INICIO_IMPORTACION = time.perf_counter()
+
+import functools
+import hmac
 import logging
+from contextlib import asynccontextmanager
 from datetime import date
-from fastapi import FastAPI, Request
+from typing import Iterator, List, Optional, Literal
+from fastapi import FastAPI, APIRouter, Request, Header, Depends, HTTPException, Query, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
 from sqlalchemy.exc import SQLAlchemyError
 
-from app.repository import SQLAlchemyRepository
+from app.compresion import MiddlewareCompresion
+from app.config import Settings
+from app.database import es_error_de_bloqueo
 from app.manager import SalonManager
+from app.eventos import flujo_eventos, formatear_evento
+from app.instrumentacion_sql import MiddlewareServerTiming, consultas_lentas
+from app.metricas import REGISTRO, POOL_CONEXIONES, MiddlewareMetricas, estadisticas_pool
+from app.perfilado import MiddlewarePerfilado, Perfilador, RutaPerfilada
+from app.registro_accesos import MiddlewareAccesos, RegistroAccesos
+from app.memoria import MARCOS_POR_DEFECTO, monitor_memoria
+from app.models import TipoServicio
+from app.tenancy import cerrar_manager, crear_manager, crear_registry
+from app.validators import Validator
+from app.result import Ok, Err
 from app.errors import ValidationError, NotFoundError, DuplicateError, PersistenceError
+from app.schemas import (
+    EmpleadoCreate, EmpleadoUpdate, EmpleadoResponse,
+    IngresosResponse, BeneficiosResponse, DesglosePagoResponse,
+    SerieTemporalResponse, PuntoSerieResponse,
+    RankingResponse, PosicionRankingResponse,
+    TipoServicioCreate, TipoServicioUpdate, TipoServicioResponse,
+    RecalculoComisionesRequest, RecalculoComisionesResponse,
+    ServicioCreate, ServicioResponse,
+    CambioResponse, CambiosResponse,
+    PerfiladoConfig
+)
 
 # Configurar logging
 logging.basicConfig(
@@ -19,40 +52,180 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Crear aplicación FastAPI
-app = FastAPI(
-    title="Sistema de Gestión de Salón de Peluquería",
-    description="API REST para gestión de empleados, servicios y comisiones",
-    version="1.0.0"
-)
 
-# Configurar middleware CORS para permitir acceso desde frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",  # Desarrollo
-        "https://stephany-mondragon-frontend.onrender.com",  # Producción
-        "*"  # Permitir todos los orígenes temporalmente
-    ],  # URL del frontend en desarrollo
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# ============================================================================
+# RECURSOS DE LA APLICACIÓN
+# ============================================================================
+#
+# `repository`, `salon_manager` y `salon_registry` se guardan en `app.state`.
+# No se crean al importar el módulo sino en el arranque de la aplicación
+# (lifespan): así la importación no abre la base de datos y cada worker crea
+# su propio engine después del fork.
+
+
+def _inicializar_recursos(aplicacion: FastAPI) -> None:
+    """Crea el repositorio, el gestor y el registro de salones de la aplicación."""
+    settings: Settings = aplicacion.state.settings
+    consultas_lentas.configurar(settings.umbral_consulta_lenta_ms)
+    # El esquema de la base de datos por defecto lo migra el despliegue
+    manager = crear_manager(settings, settings.database_url)
+    aplicacion.state.repository = manager.repository
+    aplicacion.state.salon_manager = manager
+    aplicacion.state.salon_registry = crear_registry(settings)
+
+
+def _cerrar_recursos(aplicacion: FastAPI) -> None:
+    """Confirma las escrituras pendientes y cierra los engines de la aplicación."""
+    cerrar_manager(aplicacion.state.salon_manager)
+    if aplicacion.state.salon_registry is not None:
+        aplicacion.state.salon_registry.cerrar_todos()
 
-# Crear instancias de repositorio y manager
-# Determinar ruta de base de datos según entorno
-import os
-db_path = os.getenv("DATABASE_PATH", "salon.db")
-repository = SQLAlchemyRepository(f"sqlite:///{db_path}")
-salon_manager = SalonManager(repository)
 
+def _recolectar_metricas_pool(aplicacion: FastAPI) -> None:
+    """Actualiza las métricas de los pools de conexiones del repositorio por defecto."""
+    POOL_CONEXIONES.reiniciar()
+    repositorio = getattr(aplicacion.state, "repository", None)
+    if repositorio is None:
+        return
+    engines = {"escritura": repositorio.engine}
+    if repositorio.read_engine is not repositorio.engine:
+        engines["lectura"] = repositorio.read_engine
+    for nombre, engine in engines.items():
+        estadisticas = estadisticas_pool(engine)
+        for estado, valor in (estadisticas or {}).items():
+            POOL_CONEXIONES.serie(nombre, estado).fijar(valor)
 
-# Exception Handlers Globales
 
-@app.exception_handler(SQLAlchemyError)
+def obtener_manager(
+    request: Request,
+    x_salon_id: Optional[str] = Header(None, description="Identificador del salón (modo multi-salón)")
+) -> Iterator[SalonManager]:
+    """
+    Resuelve el gestor del salón de la petición.
+    
+    Sin cabecera `X-Salon-Id` se usa la base de datos por defecto; con ella,
+    el gestor del salón se obtiene del registro de salones y se libera al
+    terminar la petición (el registro no cierra un salón en uso).
+    
+    Raises:
+        HTTPException 400: Si el identificador es inválido o el modo multi-salón está deshabilitado
+        HTTPException 404: Si el salón no existe
+    """
+    if x_salon_id is None:
+        yield request.app.state.salon_manager
+        return
+    
+    salon_registry = request.app.state.salon_registry
+    if salon_registry is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "validation_error",
+                "message": "El modo multi-salón no está habilitado"
+            }
+        )
+    
+    match salon_registry.obtener(x_salon_id):
+        case Ok(manager):
+            try:
+                yield manager
+            finally:
+                salon_registry.liberar(manager)
+        case Err(NotFoundError(entity, identifier)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "not_found",
+                    "message": f"{entity} con identificador '{identifier}' no encontrado"
+                }
+            )
+        case Err(ValidationError(message, field)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "validation_error",
+                    "message": message,
+                    "field": field
+                }
+            )
+
+
+def requerir_admin(
+    request: Request,
+    x_admin_token: Optional[str] = Header(None, description="Token de administración")
+) -> None:
+    """
+    Exige el token de administración en la cabecera `X-Admin-Token`.
+    
+    Raises:
+        HTTPException 404: Si no hay token de administración configurado
+        HTTPException 403: Si el token falta o no coincide
+    """
+    token = request.app.state.settings.token_admin
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "not_found",
+                "message": "Las operaciones de administración no están habilitadas"
+            }
+        )
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "error": "forbidden",
+                "message": "Token de administración inválido"
+            }
+        )
+
+
+def campos_proyeccion(fields: Optional[str], modelo: type[BaseModel]) -> Optional[List[str]]:
+    """
+    Valida los campos de `?fields=` contra el schema de respuesta de un listado.
+    
+    Args:
+        fields: Campos separados por comas (None si no se pidió proyección)
+        modelo: Schema de respuesta de los elementos del listado
+    
+    Returns:
+        Campos pedidos, sin repetir y en el orden indicado; None sin proyección
+    
+    Raises:
+        HTTPException 400: Si no se indica ningún campo o alguno no existe
+    """
+    if fields is None:
+        return None
+    campos = list(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+    desconocidos = [campo for campo in campos if campo not in modelo.model_fields]
+    if not campos or desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "validation_error",
+                "message": f"Campos no válidos: {', '.join(desconocidos) or fields!r}. "
+                           f"Disponibles: {', '.join(modelo.model_fields)}",
+                "field": "fields"
+            }
+        )
+    return campos
+
+
+# Exception Handlers Globales y middleware
+
 async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     """Maneja errores de SQLAlchemy."""
     logger.error(f"Database error: {exc}")
+    if es_error_de_bloqueo(exc):
+        # El bloqueo persistió tras agotar los reintentos del repositorio
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content={
+                "error": "database_busy",
+                "message": "La base de datos está ocupada, intente de nuevo"
+            }
+        )
     return JSONResponse(
         status_code=500,
         content={
@@ -62,7 +235,6 @@ async def sqlalchemy_exception_handler(request: Request, exc: SQLAlchemyError):
     )
 
 
-@app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Maneja excepciones no capturadas."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
@@ -75,18 +247,16 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 
-# Middleware para logging de peticiones
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Registra todas las peticiones HTTP."""
-    logger.info(f"{request.method} {request.url.path}")
-    response = await call_next(request)
-    logger.info(f"Status: {response.status_code}")
-    return response
+# Rutas de la API; se registran en la aplicación en create_app.
+# Los endpoints que escriben son síncronos (FastAPI los ejecuta en el pool de
+# hilos): ante un bloqueo de SQLite el repositorio reintenta durmiendo el hilo
+# (ver app.database.ejecutar_con_reintentos), lo que no debe ocurrir en el
+# bucle de eventos. RutaPerfilada perfila esos hilos (ver app.perfilado).
+router = APIRouter(route_class=RutaPerfilada)
 
 
 # Health check endpoint
-@app.get("/")
+@router.get("/")
 async def root():
     """Endpoint raíz para verificar que la API está funcionando."""
     return {
@@ -96,7 +266,13 @@ async def root():
     }
 
 
-@app.get("/health")
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metricas():
+    """Métricas de la aplicación en formato de texto de Prometheus."""
+    return PlainTextResponse(REGISTRO.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/health")
 async def health_check():
     """Endpoint de health check."""
     return {"status": "healthy"}
@@ -106,29 +282,57 @@ async def health_check():
 # ENDPOINTS DE EMPLEADOS
 # ============================================================================
 
-from fastapi import HTTPException, status, Query
-from typing import List, Optional
-from app.schemas import (
-    EmpleadoCreate, EmpleadoUpdate, EmpleadoResponse,
-    IngresosResponse, BeneficiosResponse, DesglosePagoResponse
-)
-from app.result import Ok, Err
-
 
-@app.get("/api/empleados", response_model=List[EmpleadoResponse])
-async def listar_empleados():
+@router.get("/api/empleados", response_model=List[EmpleadoResponse])
+async def listar_empleados(
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas"),
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Lista todos los empleados registrados.
     
+    Args:
+        fields: Devolver solo estos campos (opcional)
+    
     Returns:
         Lista de empleados
+    
+    Raises:
+        HTTPException 400: Si algún campo no existe
+    """
+    campos = campos_proyeccion(fields, EmpleadoResponse)
+    if campos is not None:
+        return JSONResponse(to_jsonable_python(manager.proyectar_empleados(campos)))
+    
+    empleados = manager.listar_empleados()
+    return [EmpleadoResponse(id=emp.id, nombre=emp.nombre) for emp in empleados]
+
+
+# Antes de /api/empleados/{id}, que también casaría con "buscar"
+@router.get("/api/empleados/buscar", response_model=List[EmpleadoResponse])
+async def buscar_empleados(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto a buscar"),
+    limite: int = Query(10, ge=1, le=50, description="Número máximo de resultados"),
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Busca empleados por prefijos de las palabras de su nombre o ID.
+    
+    No distingue mayúsculas ni tildes; los resultados se ordenan por relevancia.
+    
+    Args:
+        q: Texto a buscar
+        limite: Número máximo de resultados
+    
+    Returns:
+        Empleados encontrados
     """
-    empleados = salon_manager.listar_empleados()
+    empleados = manager.buscar_empleados(q, limite)
     return [EmpleadoResponse(id=emp.id, nombre=emp.nombre) for emp in empleados]
 
 
-@app.get("/api/empleados/{id}", response_model=EmpleadoResponse)
-async def obtener_empleado(id: str):
+@router.get("/api/empleados/{id}", response_model=EmpleadoResponse)
+async def obtener_empleado(id: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Obtiene un empleado por su ID.
     
@@ -141,7 +345,7 @@ async def obtener_empleado(id: str):
     Raises:
         HTTPException 404: Si el empleado no existe
     """
-    empleado = salon_manager.obtener_empleado(id)
+    empleado = manager.obtener_empleado(id)
     
     if empleado is None:
         raise HTTPException(
@@ -155,8 +359,11 @@ async def obtener_empleado(id: str):
     return EmpleadoResponse(id=empleado.id, nombre=empleado.nombre)
 
 
-@app.post("/api/empleados", response_model=EmpleadoResponse, status_code=status.HTTP_201_CREATED)
-async def crear_empleado(empleado: EmpleadoCreate):
+@router.post("/api/empleados", response_model=EmpleadoResponse, status_code=status.HTTP_201_CREATED)
+def crear_empleado(
+    empleado: EmpleadoCreate,
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Crea un nuevo empleado.
     
@@ -169,7 +376,7 @@ async def crear_empleado(empleado: EmpleadoCreate):
     Raises:
         HTTPException 409: Si el ID del empleado ya existe
     """
-    resultado = salon_manager.crear_empleado(empleado.id, empleado.nombre)
+    resultado = manager.crear_empleado(empleado.id, empleado.nombre)
     
     match resultado:
         case Ok(emp):
@@ -193,8 +400,12 @@ async def crear_empleado(empleado: EmpleadoCreate):
             )
 
 
-@app.put("/api/empleados/{id}", response_model=EmpleadoResponse)
-async def actualizar_empleado(id: str, empleado: EmpleadoUpdate):
+@router.put("/api/empleados/{id}", response_model=EmpleadoResponse)
+def actualizar_empleado(
+    id: str,
+    empleado: EmpleadoUpdate,
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Actualiza un empleado existente.
     
@@ -208,7 +419,7 @@ async def actualizar_empleado(id: str, empleado: EmpleadoUpdate):
     Raises:
         HTTPException 404: Si el empleado no existe
     """
-    resultado = salon_manager.actualizar_empleado(id, empleado.nombre)
+    resultado = manager.actualizar_empleado(id, empleado.nombre)
     
     match resultado:
         case Ok(emp):
@@ -232,8 +443,8 @@ async def actualizar_empleado(id: str, empleado: EmpleadoUpdate):
             )
 
 
-@app.delete("/api/empleados/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def eliminar_empleado(id: str):
+@router.delete("/api/empleados/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_empleado(id: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Elimina un empleado.
     
@@ -244,7 +455,7 @@ async def eliminar_empleado(id: str):
         HTTPException 404: Si el empleado no existe
     """
     # Verificar que el empleado existe
-    empleado = salon_manager.obtener_empleado(id)
+    empleado = manager.obtener_empleado(id)
     
     if empleado is None:
         raise HTTPException(
@@ -256,7 +467,7 @@ async def eliminar_empleado(id: str):
         )
     
     # Eliminar el empleado
-    salon_manager.repository.eliminar_empleado(id)
+    manager.repository.eliminar_empleado(id)
     
     return None
 
@@ -265,18 +476,29 @@ async def eliminar_empleado(id: str):
 # ENDPOINTS DE TIPOS DE SERVICIOS
 # ============================================================================
 
-from app.schemas import TipoServicioCreate, TipoServicioUpdate, TipoServicioResponse
-
 
-@app.get("/api/tipos-servicios", response_model=List[TipoServicioResponse])
-async def listar_tipos_servicios():
+@router.get("/api/tipos-servicios", response_model=List[TipoServicioResponse])
+async def listar_tipos_servicios(
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas"),
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Lista todos los tipos de servicios registrados.
     
+    Args:
+        fields: Devolver solo estos campos (opcional)
+    
     Returns:
         Lista de tipos de servicios
+    
+    Raises:
+        HTTPException 400: Si algún campo no existe
     """
-    tipos = salon_manager.listar_tipos_servicios()
+    campos = campos_proyeccion(fields, TipoServicioResponse)
+    if campos is not None:
+        return JSONResponse(to_jsonable_python(manager.proyectar_tipos_servicios(campos)))
+    
+    tipos = manager.listar_tipos_servicios()
     return [
         TipoServicioResponse(
             nombre=tipo.nombre,
@@ -288,8 +510,39 @@ async def listar_tipos_servicios():
     ]
 
 
-@app.get("/api/tipos-servicios/{nombre}", response_model=TipoServicioResponse)
-async def obtener_tipo_servicio(nombre: str):
+# Antes de /api/tipos-servicios/{nombre}, que también casaría con "buscar"
+@router.get("/api/tipos-servicios/buscar", response_model=List[TipoServicioResponse])
+async def buscar_tipos_servicios(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto a buscar"),
+    limite: int = Query(10, ge=1, le=50, description="Número máximo de resultados"),
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Busca tipos de servicio por prefijos de las palabras de su nombre o descripción.
+    
+    No distingue mayúsculas ni tildes; los resultados se ordenan por relevancia.
+    
+    Args:
+        q: Texto a buscar
+        limite: Número máximo de resultados
+    
+    Returns:
+        Tipos de servicio encontrados
+    """
+    tipos = manager.buscar_tipos_servicios(q, limite)
+    return [
+        TipoServicioResponse(
+            nombre=tipo.nombre,
+            descripcion=tipo.descripcion,
+            porcentaje_comision=tipo.porcentaje_comision,
+            precio_por_defecto=tipo.precio_por_defecto
+        )
+        for tipo in tipos
+    ]
+
+
+@router.get("/api/tipos-servicios/{nombre}", response_model=TipoServicioResponse)
+async def obtener_tipo_servicio(nombre: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Obtiene un tipo de servicio por su nombre.
     
@@ -302,7 +555,7 @@ async def obtener_tipo_servicio(nombre: str):
     Raises:
         HTTPException 404: Si el tipo de servicio no existe
     """
-    tipo = salon_manager.obtener_tipo_servicio(nombre)
+    tipo = manager.obtener_tipo_servicio(nombre)
     
     if tipo is None:
         raise HTTPException(
@@ -321,8 +574,11 @@ async def obtener_tipo_servicio(nombre: str):
     )
 
 
-@app.post("/api/tipos-servicios", response_model=TipoServicioResponse, status_code=status.HTTP_201_CREATED)
-async def crear_tipo_servicio(tipo: TipoServicioCreate):
+@router.post("/api/tipos-servicios", response_model=TipoServicioResponse, status_code=status.HTTP_201_CREATED)
+def crear_tipo_servicio(
+    tipo: TipoServicioCreate,
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Crea un nuevo tipo de servicio.
     
@@ -336,7 +592,7 @@ async def crear_tipo_servicio(tipo: TipoServicioCreate):
         HTTPException 400: Si el porcentaje de comisión es inválido
         HTTPException 409: Si el nombre del tipo de servicio ya existe
     """
-    resultado = salon_manager.crear_tipo_servicio(
+    resultado = manager.crear_tipo_servicio(
         tipo.nombre,
         tipo.descripcion,
         tipo.porcentaje_comision,
@@ -379,8 +635,12 @@ async def crear_tipo_servicio(tipo: TipoServicioCreate):
             )
 
 
-@app.put("/api/tipos-servicios/{nombre}", response_model=TipoServicioResponse)
-async def actualizar_tipo_servicio(nombre: str, tipo: TipoServicioUpdate):
+@router.put("/api/tipos-servicios/{nombre}", response_model=TipoServicioResponse)
+def actualizar_tipo_servicio(
+    nombre: str,
+    tipo: TipoServicioUpdate,
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Actualiza un tipo de servicio existente.
     
@@ -396,7 +656,7 @@ async def actualizar_tipo_servicio(nombre: str, tipo: TipoServicioUpdate):
         HTTPException 404: Si el tipo de servicio no existe
     """
     # Obtener el tipo de servicio existente
-    tipo_existente = salon_manager.obtener_tipo_servicio(nombre)
+    tipo_existente = manager.obtener_tipo_servicio(nombre)
     
     if tipo_existente is None:
         raise HTTPException(
@@ -413,20 +673,19 @@ async def actualizar_tipo_servicio(nombre: str, tipo: TipoServicioUpdate):
     nuevo_precio = tipo.precio_por_defecto if tipo.precio_por_defecto is not None else tipo_existente.precio_por_defecto
     
     # Actualizar el tipo de servicio
-    resultado = salon_manager.actualizar_tipo_servicio(nombre, nuevo_porcentaje, nuevo_precio)
+    resultado = manager.actualizar_tipo_servicio(nombre, nuevo_porcentaje, nuevo_precio)
     
     match resultado:
         case Ok(tipo_actualizado):
             # Si se proporcionó una nueva descripción o precio, actualizarlos también
             if tipo.descripcion is not None or tipo.precio_por_defecto is not None:
-                from app.models import TipoServicio
                 tipo_completo = TipoServicio(
                     nombre=nombre,
                     descripcion=nueva_descripcion,
                     porcentaje_comision=nuevo_porcentaje,
                     precio_por_defecto=nuevo_precio
                 )
-                salon_manager.repository.guardar_tipo_servicio(tipo_completo)
+                manager.repository.guardar_tipo_servicio(tipo_completo)
                 tipo_actualizado = tipo_completo
             
             return TipoServicioResponse(
@@ -463,8 +722,8 @@ async def actualizar_tipo_servicio(nombre: str, tipo: TipoServicioUpdate):
             )
 
 
-@app.delete("/api/tipos-servicios/{nombre}", status_code=status.HTTP_204_NO_CONTENT)
-async def eliminar_tipo_servicio(nombre: str):
+@router.delete("/api/tipos-servicios/{nombre}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_tipo_servicio(nombre: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Elimina un tipo de servicio.
     
@@ -475,7 +734,7 @@ async def eliminar_tipo_servicio(nombre: str):
         HTTPException 404: Si el tipo de servicio no existe
     """
     # Verificar que el tipo de servicio existe
-    tipo = salon_manager.obtener_tipo_servicio(nombre)
+    tipo = manager.obtener_tipo_servicio(nombre)
     
     if tipo is None:
         raise HTTPException(
@@ -487,42 +746,109 @@ async def eliminar_tipo_servicio(nombre: str):
         )
     
     # Eliminar el tipo de servicio
-    salon_manager.repository.eliminar_tipo_servicio(nombre)
+    manager.repository.eliminar_tipo_servicio(nombre)
     
     return None
 
 
+@router.post("/api/tipos-servicios/{nombre}/recalcular-comisiones", response_model=RecalculoComisionesResponse)
+def recalcular_comisiones(
+    nombre: str,
+    recalculo: RecalculoComisionesRequest,
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Recalcula las comisiones de los servicios de un tipo en un rango de fechas.
+    
+    Aplica con efecto retroactivo el porcentaje indicado (o el actual del tipo)
+    con un único UPDATE en una transacción. Con `simular` solo devuelve la
+    diferencia de pago por empleado.
+    
+    Args:
+        nombre: Nombre del tipo de servicio
+        recalculo: Rango de fechas, porcentaje opcional y modo simulación
+        
+    Returns:
+        Desglose por empleado de las comisiones anteriores y nuevas
+        
+    Raises:
+        HTTPException 400: Si el rango de fechas es inválido
+        HTTPException 404: Si el tipo de servicio no existe
+    """
+    resultado = manager.recalcular_comisiones(
+        nombre,
+        recalculo.fecha_inicio,
+        recalculo.fecha_fin,
+        recalculo.porcentaje_comision,
+        recalculo.simular
+    )
+    
+    match resultado:
+        case Ok(recalculo_comisiones):
+            return RecalculoComisionesResponse.model_validate(recalculo_comisiones)
+        case Err(NotFoundError(entity, identifier)):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error": "not_found",
+                    "message": f"{entity} con identificador '{identifier}' no encontrado"
+                }
+            )
+        case Err(ValidationError(message, field)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "validation_error",
+                    "message": message,
+                    "field": field
+                }
+            )
+        case Err(error):
+            # Caso genérico para otros errores
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "validation_error",
+                    "message": str(error)
+                }
+            )
+
+
 # ============================================================================
 # ENDPOINTS DE SERVICIOS
 # ============================================================================
 
-from typing import Optional
-from app.schemas import ServicioCreate, ServicioResponse
-
 
-@app.get("/api/servicios", response_model=List[ServicioResponse])
+@router.get("/api/servicios", response_model=List[ServicioResponse])
 async def listar_servicios(
     empleado_id: Optional[str] = None,
     fecha_inicio: Optional[date] = None,
-    fecha_fin: Optional[date] = None
+    fecha_fin: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas"),
+    manager: SalonManager = Depends(obtener_manager)
 ):
     """
     Lista servicios con filtros opcionales.
     
+    Con `fields` solo se leen y devuelven esas columnas; las proyecciones
+    estrechas (p. ej. `fecha,precio`) se resuelven desde índices cubrientes.
+    
     Args:
         empleado_id: Filtrar por ID de empleado (opcional)
         fecha_inicio: Filtrar desde esta fecha (opcional)
         fecha_fin: Filtrar hasta esta fecha (opcional)
+        fields: Devolver solo estos campos (opcional)
         
     Returns:
         Lista de servicios filtrados, ordenados por fecha descendente
         
     Raises:
-        HTTPException 400: Si el rango de fechas es inválido
+        HTTPException 400: Si el rango de fechas es inválido o algún campo no existe
     """
+    campos = campos_proyeccion(fields, ServicioResponse)
+    
     # Validar rango de fechas si ambas están presentes
     if fecha_inicio is not None and fecha_fin is not None:
-        from app.validators import Validator
         validacion_fechas = Validator.validar_rango_fechas(fecha_inicio, fecha_fin)
         if isinstance(validacion_fechas, Err):
             raise HTTPException(
@@ -533,8 +859,13 @@ async def listar_servicios(
                 }
             )
     
+    if campos is not None:
+        return JSONResponse(to_jsonable_python(manager.proyectar_servicios(
+            campos, empleado_id=empleado_id, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin
+        )))
+    
     # Obtener servicios filtrados
-    servicios = salon_manager.obtener_servicios(
+    servicios = manager.obtener_servicios(
         empleado_id=empleado_id,
         fecha_inicio=fecha_inicio,
         fecha_fin=fecha_fin
@@ -553,8 +884,8 @@ async def listar_servicios(
     ]
 
 
-@app.get("/api/servicios/{id}", response_model=ServicioResponse)
-async def obtener_servicio(id: str):
+@router.get("/api/servicios/{id}", response_model=ServicioResponse)
+async def obtener_servicio(id: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Obtiene un servicio por su ID.
     
@@ -568,7 +899,7 @@ async def obtener_servicio(id: str):
         HTTPException 404: Si el servicio no existe
     """
     # Buscar el servicio en la lista de todos los servicios
-    servicios = salon_manager.obtener_servicios()
+    servicios = manager.obtener_servicios()
     servicio = next((s for s in servicios if s.id == id), None)
     
     if servicio is None:
@@ -590,13 +921,18 @@ async def obtener_servicio(id: str):
     )
 
 
-@app.post("/api/servicios", response_model=ServicioResponse, status_code=status.HTTP_201_CREATED)
-async def registrar_servicio(servicio: ServicioCreate):
+@router.post("/api/servicios", response_model=ServicioResponse, status_code=status.HTTP_201_CREATED)
+def registrar_servicio(
+    servicio: ServicioCreate,
+    manager: SalonManager = Depends(obtener_manager)
+):
     """
     Registra un nuevo servicio.
     
     La comisión se calcula automáticamente basándose en el porcentaje
-    del tipo de servicio asociado.
+    del tipo de servicio asociado. Es síncrono (se ejecuta en el pool de
+    hilos) porque en modo de escritura agrupada espera a que se confirme
+    el lote del servicio.
     
     Args:
         servicio: Datos del servicio a registrar
@@ -608,7 +944,7 @@ async def registrar_servicio(servicio: ServicioCreate):
         HTTPException 400: Si los datos son inválidos
         HTTPException 404: Si el empleado o tipo de servicio no existen
     """
-    resultado = salon_manager.registrar_servicio(
+    resultado = manager.registrar_servicio(
         fecha=servicio.fecha,
         empleado_id=servicio.empleado_id,
         tipo_servicio=servicio.tipo_servicio,
@@ -653,8 +989,8 @@ async def registrar_servicio(servicio: ServicioCreate):
             )
 
 
-@app.delete("/api/servicios/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def eliminar_servicio(id: str):
+@router.delete("/api/servicios/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def eliminar_servicio(id: str, manager: SalonManager = Depends(obtener_manager)):
     """
     Elimina un servicio.
     
@@ -665,7 +1001,7 @@ async def eliminar_servicio(id: str):
         HTTPException 404: Si el servicio no existe
     """
     # Verificar que el servicio existe
-    servicios = salon_manager.obtener_servicios()
+    servicios = manager.obtener_servicios()
     servicio = next((s for s in servicios if s.id == id), None)
     
     if servicio is None:
@@ -678,20 +1014,152 @@ async def eliminar_servicio(id: str):
         )
     
     # Eliminar el servicio
-    salon_manager.repository.eliminar_servicio(id)
+    manager.eliminar_servicio(id)
     
     return None
 
 
+@router.get("/api/eventos", response_class=StreamingResponse)
+async def eventos_servicios(manager: SalonManager = Depends(obtener_manager)):
+    """
+    Flujo Server-Sent Events de los servicios registrados y eliminados.
+    
+    Al conectar se envía un evento `totales` con los totales de hoy; después,
+    un evento `servicio_registrado` o `servicio_eliminado` por cada servicio
+    confirmado, con los totales de hoy actualizados. Un cliente que no
+    consume los eventos a tiempo se desconecta y debe reconectarse.
+    
+    Returns:
+        Respuesta `text/event-stream`
+    """
+    # Suscribir antes de leer los totales: ningún servicio queda sin notificar.
+    # Con X-Salon-Id el salón se libera antes de enviar el cuerpo y puede
+    # desalojarse; el difusor es del registro y sigue siendo el del salón.
+    suscripcion = manager.eventos.suscribir()
+    try:
+        inicial = formatear_evento("totales", {"totales_hoy": manager.totales_hoy().to_dict()})
+    except BaseException:
+        suscripcion.cancelar()
+        raise
+    return StreamingResponse(
+        flujo_eventos(suscripcion, inicial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/api/estadisticas/escritura-agrupada", dependencies=[Depends(requerir_admin)])
+async def estadisticas_escritura_agrupada(manager: SalonManager = Depends(obtener_manager)):
+    """
+    Obtiene los histogramas de la escritura agrupada de servicios.
+    
+    Requiere el token de administración.
+    
+    Returns:
+        Tamaño de los lotes confirmados y latencia hasta la confirmación (ms)
+        
+    Raises:
+        HTTPException 403: Si el token de administración no es válido
+        HTTPException 404: Si la escritura agrupada o la administración no están habilitadas
+    """
+    if manager.escritura_agrupada is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "not_found",
+                "message": "La escritura agrupada no está habilitada"
+            }
+        )
+    return manager.escritura_agrupada.estadisticas()
+
+
+@router.get("/api/estadisticas/consultas-lentas", dependencies=[Depends(requerir_admin)])
+async def listar_consultas_lentas():
+    """
+    Lista las sentencias SQL recientes que superaron el umbral de consulta lenta.
+    
+    Requiere el token de administración: las consultas incluyen el SQL completo.
+    
+    Returns:
+        Umbral configurado y consultas lentas (SQL, forma de los parámetros,
+        duración, método del repositorio y plan de ejecución)
+    
+    Raises:
+        HTTPException 403/404: Si el token de administración no es válido o no está configurado
+    """
+    return {
+        "umbral_ms": consultas_lentas.umbral_ms,
+        "consultas": [consulta.to_dict() for consulta in reversed(consultas_lentas.recientes())]
+    }
+
+
+# ============================================================================
+# ENDPOINTS DEL LOG DE CAMBIOS
+# ============================================================================
+
+# Schema de los datos de cada tabla del log de cambios
+RESPUESTAS_CAMBIOS = {
+    "empleados": EmpleadoResponse,
+    "tipos_servicios": TipoServicioResponse,
+    "servicios": ServicioResponse,
+}
+
+
+@router.get("/api/cambios", response_model=CambiosResponse)
+async def listar_cambios(
+    desde: int = Query(0, ge=0, description="Última secuencia aplicada (0 para empezar)"),
+    limite: int = Query(500, ge=1, le=1000, description="Número máximo de entradas del log"),
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Lista los cambios de empleados, tipos de servicio y servicios posteriores a `desde`.
+    
+    De cada fila se devuelve su último cambio con los datos actuales, en
+    orden de secuencia. El cliente aplica los cambios y repite la petición
+    con `desde=hasta` (inmediatamente si `mas` es true).
+    
+    Si `resincronizar` es true el log ya no tiene todos los cambios
+    necesarios: el cliente debe volver a cargar las colecciones completas y
+    continuar con `desde=hasta`.
+    
+    Args:
+        desde: Última secuencia aplicada por el cliente
+        limite: Número máximo de entradas del log leídas
+    
+    Returns:
+        Página de cambios
+    """
+    pagina = manager.listar_cambios(desde, limite)
+    return CambiosResponse(
+        desde=pagina.desde,
+        hasta=pagina.hasta,
+        ultimo=pagina.ultimo,
+        resincronizar=pagina.resincronizar,
+        mas=pagina.mas,
+        cambios=[
+            CambioResponse(
+                seq=cambio.seq,
+                tabla=cambio.tabla,
+                clave=cambio.clave,
+                operacion=cambio.operacion,
+                datos=None if cambio.datos is None else RESPUESTAS_CAMBIOS[cambio.tabla].model_validate(
+                    cambio.datos, from_attributes=True
+                )
+            )
+            for cambio in pagina.cambios
+        ]
+    )
+
 
 # ============================================================================
 # ENDPOINTS DE REPORTES
 # ============================================================================
 
-@app.get("/api/reportes/ingresos", response_model=IngresosResponse)
+@router.get("/api/reportes/ingresos", response_model=IngresosResponse)
 async def calcular_ingresos(
     fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio del período (opcional)"),
-    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)")
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)"),
+    manager: SalonManager = Depends(obtener_manager)
 ):
     """
     Calcula los ingresos totales con filtros opcionales por fecha.
@@ -717,7 +1185,7 @@ async def calcular_ingresos(
         )
     
     # Calcular ingresos
-    total = salon_manager.calcular_ingresos_totales(fecha_inicio, fecha_fin)
+    total = manager.calcular_ingresos_totales(fecha_inicio, fecha_fin)
     
     return IngresosResponse(
         total=total,
@@ -726,10 +1194,11 @@ async def calcular_ingresos(
     )
 
 
-@app.get("/api/reportes/beneficios", response_model=BeneficiosResponse)
+@router.get("/api/reportes/beneficios", response_model=BeneficiosResponse)
 async def calcular_beneficios(
     fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio del período (opcional)"),
-    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)")
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)"),
+    manager: SalonManager = Depends(obtener_manager)
 ):
     """
     Calcula los beneficios (ingresos - comisiones) con filtros opcionales por fecha.
@@ -754,18 +1223,8 @@ async def calcular_beneficios(
             }
         )
     
-    # Obtener servicios filtrados para calcular ingresos y comisiones
-    from decimal import Decimal
-    servicios = salon_manager.obtener_servicios(
-        empleado_id=None,
-        fecha_inicio=fecha_inicio,
-        fecha_fin=fecha_fin
-    )
-    
-    # Calcular ingresos y comisiones
-    ingresos = sum((s.precio for s in servicios), Decimal("0"))
-    comisiones = sum((s.comision_calculada for s in servicios), Decimal("0"))
-    beneficios = ingresos - comisiones
+    # Ingresos y comisiones se calculan a partir de la misma instantánea
+    ingresos, comisiones, beneficios = manager.calcular_desglose_beneficios(fecha_inicio, fecha_fin)
     
     return BeneficiosResponse(
         ingresos=ingresos,
@@ -776,11 +1235,113 @@ async def calcular_beneficios(
     )
 
 
-@app.get("/api/empleados/{id}/pago", response_model=DesglosePagoResponse)
+@router.get("/api/reportes/serie", response_model=SerieTemporalResponse)
+async def calcular_serie_temporal(
+    granularidad: Literal["dia", "semana", "mes"] = Query("dia", description="Agrupación de los períodos"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio del período (opcional)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)"),
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Calcula ingresos, comisiones, beneficios y cantidad de servicios por período.
+    
+    Todos los períodos se obtienen con una única consulta agregada; los
+    períodos sin servicios aparecen con valores en cero.
+    
+    Args:
+        granularidad: 'dia', 'semana' (lunes a domingo) o 'mes'
+        fecha_inicio: Filtrar desde esta fecha (opcional)
+        fecha_fin: Filtrar hasta esta fecha (opcional)
+        
+    Returns:
+        Serie de puntos consecutivos ordenados por período ascendente
+        
+    Raises:
+        HTTPException 400: Si el rango de fechas es inválido o abarca demasiados períodos
+    """
+    # Validar rango de fechas
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "validation_error",
+                "message": "La fecha de inicio no puede ser posterior a la fecha de fin"
+            }
+        )
+    
+    resultado = manager.calcular_serie_temporal(granularidad, fecha_inicio, fecha_fin)
+    
+    match resultado:
+        case Ok(puntos):
+            return SerieTemporalResponse(
+                granularidad=granularidad,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                puntos=[PuntoSerieResponse.model_validate(punto) for punto in puntos]
+            )
+        case Err(ValidationError(message, field)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "validation_error",
+                    "message": message,
+                    "field": field
+                }
+            )
+
+
+@router.get("/api/reportes/ranking", response_model=RankingResponse)
+async def calcular_ranking(
+    por: Literal["empleado", "tipo_servicio"] = Query("empleado", description="Agrupación del ranking"),
+    metrica: Literal["ingresos", "comision", "cantidad"] = Query("ingresos", description="Métrica de ordenación"),
+    n: int = Query(10, ge=1, le=100, description="Número máximo de posiciones"),
+    fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio del período (opcional)"),
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)"),
+    manager: SalonManager = Depends(obtener_manager)
+):
+    """
+    Calcula el ranking de empleados o tipos de servicio según una métrica.
+    
+    Args:
+        por: 'empleado' o 'tipo_servicio'
+        metrica: 'ingresos', 'comision' o 'cantidad'
+        n: Número máximo de posiciones (1-100)
+        fecha_inicio: Filtrar desde esta fecha (opcional)
+        fecha_fin: Filtrar hasta esta fecha (opcional)
+        
+    Returns:
+        Posiciones ordenadas por la métrica descendente
+        
+    Raises:
+        HTTPException 400: Si el rango de fechas es inválido
+    """
+    # Validar rango de fechas
+    if fecha_inicio and fecha_fin and fecha_inicio > fecha_fin:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": "validation_error",
+                "message": "La fecha de inicio no puede ser posterior a la fecha de fin"
+            }
+        )
+    
+    posiciones = manager.calcular_ranking(por, metrica, n, fecha_inicio, fecha_fin)
+    
+    return RankingResponse(
+        por=por,
+        metrica=metrica,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        posiciones=[PosicionRankingResponse.model_validate(posicion) for posicion in posiciones]
+    )
+
+
+@router.get("/api/empleados/{id}/pago", response_model=DesglosePagoResponse)
 async def calcular_pago_empleado(
     id: str,
     fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio del período (opcional)"),
-    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)")
+    fecha_fin: Optional[date] = Query(None, description="Fecha de fin del período (opcional)"),
+    manager: SalonManager = Depends(obtener_manager)
 ):
     """
     Calcula el pago de un empleado con filtros opcionales por fecha.
@@ -798,7 +1359,7 @@ async def calcular_pago_empleado(
         HTTPException 400: Si el rango de fechas es inválido
     """
     # Verificar que el empleado existe
-    empleado = salon_manager.obtener_empleado(id)
+    empleado = manager.obtener_empleado(id)
     if empleado is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -819,7 +1380,7 @@ async def calcular_pago_empleado(
         )
     
     # Calcular pago del empleado
-    desglose = salon_manager.calcular_pago_empleado(id, fecha_inicio, fecha_fin)
+    desglose = manager.calcular_pago_empleado(id, fecha_inicio, fecha_fin)
     
     return DesglosePagoResponse(
         empleado_id=desglose.empleado_id,
@@ -827,3 +1388,277 @@ async def calcular_pago_empleado(
         servicios=desglose.servicios,
         total=desglose.total
     )
+
+
+# ============================================================================
+# ENDPOINTS DE ADMINISTRACIÓN
+# ============================================================================
+
+@router.get("/api/admin/perfiles", dependencies=[Depends(requerir_admin)])
+async def listar_perfiles(request: Request):
+    """
+    Lista los perfiles de peticiones guardados, del más reciente al más antiguo.
+    
+    Returns:
+        Configuración del perfilado y perfiles (nombre, tamaño y fecha)
+    """
+    perfilador = request.app.state.perfilador
+    return {
+        "formato": perfilador.formato,
+        "muestreo": perfilador.muestreo,
+        "perfiles": [perfil.to_dict() for perfil in perfilador.listar()]
+    }
+
+
+@router.get("/api/admin/perfiles/{nombre}", dependencies=[Depends(requerir_admin)])
+async def descargar_perfil(nombre: str, request: Request):
+    """
+    Descarga un perfil guardado.
+    
+    Args:
+        nombre: Nombre del fichero de perfil
+        
+    Raises:
+        HTTPException 404: Si el perfil no existe
+    """
+    ruta = request.app.state.perfilador.ruta(nombre)
+    if ruta is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "not_found",
+                "message": f"Perfil con identificador '{nombre}' no encontrado"
+            }
+        )
+    return FileResponse(ruta, media_type="application/octet-stream", filename=nombre)
+
+
+@router.put("/api/admin/perfilado", dependencies=[Depends(requerir_admin)])
+async def configurar_perfilado(configuracion: PerfiladoConfig, request: Request):
+    """
+    Activa o desactiva el muestreo de peticiones a perfilar.
+    
+    Args:
+        configuracion: Perfilar 1 de cada `muestreo` peticiones (null lo desactiva)
+        
+    Returns:
+        Configuración del perfilado resultante
+    """
+    perfilador = request.app.state.perfilador
+    perfilador.configurar_muestreo(configuracion.muestreo)
+    if configuracion.formato is not None:
+        perfilador.formato = configuracion.formato
+    return {"formato": perfilador.formato, "muestreo": perfilador.muestreo}
+
+
+def _instantanea_o_404(id: int):
+    """Obtiene una instantánea de memoria o lanza 404 si no existe."""
+    instantanea = monitor_memoria.obtener(id)
+    if instantanea is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error": "not_found",
+                "message": f"Instantánea con identificador '{id}' no encontrada"
+            }
+        )
+    return instantanea
+
+
+@router.get("/api/admin/memoria", dependencies=[Depends(requerir_admin)])
+async def estado_memoria():
+    """
+    Obtiene el estado de tracemalloc y las instantáneas conservadas.
+    
+    Returns:
+        Memoria trazada actual y máxima (bytes) e instantáneas tomadas
+    """
+    return {
+        **monitor_memoria.estado(),
+        "instantaneas": [instantanea.to_dict() for instantanea in monitor_memoria.listar()]
+    }
+
+
+@router.post("/api/admin/memoria/iniciar", dependencies=[Depends(requerir_admin)])
+async def iniciar_trazado_memoria(
+    marcos: int = Query(MARCOS_POR_DEFECTO, ge=1, le=100, description="Marcos de pila por asignación")
+):
+    """
+    Empieza a trazar las asignaciones de memoria con tracemalloc.
+    
+    Solo se trazan las asignaciones posteriores; mientras está activo, las
+    asignaciones son más lentas y tracemalloc consume memoria adicional.
+    """
+    monitor_memoria.iniciar(marcos)
+    return monitor_memoria.estado()
+
+
+@router.post("/api/admin/memoria/detener", dependencies=[Depends(requerir_admin)])
+async def detener_trazado_memoria():
+    """Deja de trazar las asignaciones de memoria (las instantáneas se conservan)."""
+    monitor_memoria.detener()
+    return monitor_memoria.estado()
+
+
+@router.post("/api/admin/memoria/instantaneas", status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(requerir_admin)])
+def tomar_instantanea_memoria(
+    limite: int = Query(20, ge=1, le=500, description="Número de sitios de asignación")
+):
+    """
+    Toma una instantánea de la memoria trazada.
+    
+    Returns:
+        Resumen de la instantánea y los sitios de la aplicación con más memoria
+        
+    Raises:
+        HTTPException 409: Si tracemalloc no está activo
+    """
+    instantanea = monitor_memoria.tomar_instantanea()
+    if instantanea is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "error": "conflict",
+                "message": "El trazado de memoria no está iniciado"
+            }
+        )
+    return {**instantanea.to_dict(), "sitios": monitor_memoria.principales(instantanea, limite)}
+
+
+@router.get("/api/admin/memoria/instantaneas/{id}", dependencies=[Depends(requerir_admin)])
+async def obtener_instantanea_memoria(
+    id: int,
+    limite: int = Query(20, ge=1, le=500, description="Número de sitios de asignación")
+):
+    """
+    Obtiene los sitios de la aplicación con más memoria en una instantánea.
+    
+    Raises:
+        HTTPException 404: Si la instantánea no existe
+    """
+    instantanea = _instantanea_o_404(id)
+    return {**instantanea.to_dict(), "sitios": monitor_memoria.principales(instantanea, limite)}
+
+
+@router.get("/api/admin/memoria/diferencia", dependencies=[Depends(requerir_admin)])
+async def diferencia_memoria(
+    desde: int = Query(..., description="Instantánea inicial"),
+    hasta: int = Query(..., description="Instantánea final"),
+    limite: int = Query(20, ge=1, le=500, description="Número de sitios de asignación")
+):
+    """
+    Compara dos instantáneas por módulo `app.*` y línea.
+    
+    Returns:
+        Diferencia total y sitios ordenados por el mayor cambio de memoria
+        
+    Raises:
+        HTTPException 404: Si alguna de las instantáneas no existe
+    """
+    inicial = _instantanea_o_404(desde)
+    final = _instantanea_o_404(hasta)
+    return {
+        "desde": inicial.to_dict(),
+        "hasta": final.to_dict(),
+        "diferencia_tamano": final.tamano - inicial.tamano,
+        "diferencia_fuera_de_app": final.fuera_de_app[0] - inicial.fuera_de_app[0],
+        "sitios": monitor_memoria.diferencia(inicial, final, limite)
+    }
+
+
+# ============================================================================
+# FACTORÍA DE LA APLICACIÓN
+# ============================================================================
+
+@asynccontextmanager
+async def _ciclo_de_vida(aplicacion: FastAPI):
+    """Crea los recursos del proceso al arrancar y los cierra al apagar."""
+    inicio = time.perf_counter()
+    aplicacion.state.registro_accesos.iniciar()
+    _inicializar_recursos(aplicacion)
+    recolector = functools.partial(_recolectar_metricas_pool, aplicacion)
+    REGISTRO.agregar_recolector(recolector)
+    aplicacion.state.tiempo_arranque_ms = (time.perf_counter() - inicio) * 1000
+    logger.info(
+        "Aplicación iniciada: importación %.1f ms, arranque %.1f ms",
+        TIEMPO_IMPORTACION_MS, aplicacion.state.tiempo_arranque_ms
+    )
+    try:
+        yield
+    finally:
+        REGISTRO.quitar_recolector(recolector)
+        _cerrar_recursos(aplicacion)
+        aplicacion.state.registro_accesos.detener()
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Crea la aplicación FastAPI.
+    
+    No abre la base de datos: el engine, el repositorio y el registro de
+    salones se crean en el arranque (lifespan), de modo que es seguro
+    importar la aplicación antes de hacer fork de varios workers.
+    
+    Args:
+        settings: Configuración de la aplicación (por defecto, la del entorno)
+    
+    Returns:
+        Aplicación FastAPI configurada
+    """
+    aplicacion = FastAPI(
+        title="Sistema de Gestión de Salón de Peluquería",
+        description="API REST para gestión de empleados, servicios y comisiones",
+        version="1.0.0",
+        lifespan=_ciclo_de_vida
+    )
+    aplicacion.state.settings = settings = settings or Settings.desde_entorno()
+    aplicacion.state.perfilador = Perfilador(
+        settings.perfilado_dir,
+        formato=settings.perfilado_formato,
+        muestreo=settings.perfilado_muestreo,
+        max_perfiles=settings.perfilado_max
+    )
+    aplicacion.state.registro_accesos = RegistroAccesos(muestreo=settings.log_accesos_muestreo)
+    
+    # Configurar middleware CORS para permitir acceso desde frontend
+    aplicacion.add_middleware(
+        CORSMiddleware,
+        allow_origins=[
+            "http://localhost:5173",  # Desarrollo
+            "https://stephany-mondragon-frontend.onrender.com",  # Producción
+            "*"  # Permitir todos los orígenes temporalmente
+        ],  # URL del frontend en desarrollo
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Justo fuera de CORS: el perfil cubre la aplicación, no el resto de middleware
+    aplicacion.add_middleware(
+        MiddlewarePerfilado,
+        perfilador=aplicacion.state.perfilador,
+        token=settings.token_admin
+    )
+    aplicacion.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
+    aplicacion.add_exception_handler(Exception, global_exception_handler)
+    # Dentro de Server-Timing: el log de accesos incluye las consultas SQL de la petición
+    if settings.log_accesos:
+        aplicacion.add_middleware(MiddlewareAccesos, registro=aplicacion.state.registro_accesos)
+    aplicacion.add_middleware(
+        MiddlewareServerTiming,
+        presupuesto_consultas=settings.presupuesto_consultas
+    )
+    # Fuera de los middleware que añaden cabeceras, para comprimir la respuesta final
+    if settings.compresion:
+        aplicacion.add_middleware(MiddlewareCompresion, tamano_minimo=settings.compresion_tamano_minimo)
+    # Último en añadirse: envuelve a los demás y mide la petición completa
+    aplicacion.add_middleware(MiddlewareMetricas)
+    aplicacion.include_router(router)
+    return aplicacion
+
+
+app = create_app()
+
+# Tiempo de importación de este módulo (FastAPI, SQLAlchemy y la aplicación)
+TIEMPO_IMPORTACION_MS = (time.perf_counter() - _INICIO_IMPORTACION) * 1000
@@ -1,29 +1,47 @@
 """
 Lógica de negocio para el sistema de gestión de salón de peluquería.
 """
-from typing import Optional, List
-from datetime import date
+from typing import Dict, Optional, List, Sequence, Tuple
+from datetime import date, datetime, timedelta, timezone
 from decimal import Decimal
+import logging
 import uuid
 
-from app.models import Empleado, TipoServicio, ServicioRegistrado, DesglosePago
+from app.models import (
+    Empleado, TipoServicio, ServicioRegistrado, DesglosePago, PuntoSerie, PosicionRanking,
+    RecalculoComisiones, PaginaCambios
+)
 from app.repository import DataRepository
+from app.escritura_agrupada import EscrituraAgrupada
+from app.eventos import DifusorEventos
 from app.validators import Validator
 from app.result import Result, Ok, Err
 from app.errors import ValidationError, NotFoundError, DuplicateError
 
+logger = logging.getLogger(__name__)
+
+# Máximo de períodos de una serie temporal (unos diez años de días)
+MAX_PERIODOS_SERIE = 3660
+
 
 class SalonManager:
     """Gestor principal de la lógica de negocio del salón."""
     
-    def __init__(self, data_repository: DataRepository):
+    def __init__(self, data_repository: DataRepository,
+                 escritura_agrupada: Optional[EscrituraAgrupada] = None,
+                 eventos: Optional[DifusorEventos] = None):
         """
         Inicializa el gestor con un repositorio de datos.
         
         Args:
             data_repository: Repositorio para acceso a datos
+            escritura_agrupada: Si se indica, los servicios registrados se
+                confirman por lotes a través de ella (group commit)
+            eventos: Difusor de los eventos de servicios (por defecto, uno propio)
         """
         self.repository = data_repository
+        self.escritura_agrupada = escritura_agrupada
+        self.eventos = eventos or DifusorEventos()
     
     # Gestión de Empleados
     
@@ -76,6 +94,31 @@ class SalonManager:
         """
         return self.repository.listar_empleados()
     
+    def proyectar_empleados(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los empleados con solo los campos indicados.
+        
+        Args:
+            campos: Nombres de los campos
+        
+        Returns:
+            Un diccionario por empleado
+        """
+        return self.repository.proyectar_empleados(campos)
+    
+    def buscar_empleados(self, texto: str, limite: int = 10) -> List[Empleado]:
+        """
+        Busca empleados por prefijos de las palabras de su nombre o ID.
+        
+        Args:
+            texto: Texto de búsqueda (sin distinguir mayúsculas ni tildes)
+            limite: Número máximo de resultados
+        
+        Returns:
+            Empleados encontrados, de más a menos relevante
+        """
+        return self.repository.buscar_empleados(texto, limite)
+    
     def actualizar_empleado(self, id: str, nombre: str) -> Result[Empleado, NotFoundError]:
         """
         Actualiza la información de un empleado existente, preservando su ID.
@@ -166,6 +209,31 @@ class SalonManager:
         """
         return self.repository.listar_tipos_servicios()
 
+    def proyectar_tipos_servicios(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los tipos de servicio con solo los campos indicados.
+
+        Args:
+            campos: Nombres de los campos
+
+        Returns:
+            Un diccionario por tipo de servicio
+        """
+        return self.repository.proyectar_tipos_servicios(campos)
+
+    def buscar_tipos_servicios(self, texto: str, limite: int = 10) -> List[TipoServicio]:
+        """
+        Busca tipos de servicio por prefijos de las palabras de su nombre o descripción.
+
+        Args:
+            texto: Texto de búsqueda (sin distinguir mayúsculas ni tildes)
+            limite: Número máximo de resultados
+
+        Returns:
+            Tipos de servicio encontrados, de más a menos relevante
+        """
+        return self.repository.buscar_tipos_servicios(texto, limite)
+
     def actualizar_tipo_servicio(self, nombre: str,
                                  porcentaje_comision: float, precio_por_defecto: Optional[Decimal] = None) -> Result[TipoServicio, ValidationError | NotFoundError]:
         """
@@ -205,8 +273,72 @@ class SalonManager:
 
         return Ok(tipo_actualizado)
 
+    def recalcular_comisiones(self, tipo_servicio: str, fecha_inicio: date, fecha_fin: date,
+                              porcentaje_comision: Optional[float] = None,
+                              simular: bool = False) -> Result[RecalculoComisiones, ValidationError | NotFoundError]:
+        """
+        Recalcula la comisión de los servicios ya registrados de un tipo en un rango de fechas.
+
+        Permite aplicar con efecto retroactivo una corrección del porcentaje de
+        comisión. Todas las filas se actualizan en una sola transacción.
+
+        Args:
+            tipo_servicio: Nombre del tipo de servicio
+            fecha_inicio: Recalcular desde esta fecha (inclusive)
+            fecha_fin: Recalcular hasta esta fecha (inclusive)
+            porcentaje_comision: Porcentaje a aplicar (por defecto, el actual del tipo)
+            simular: Si es True solo devuelve las diferencias por empleado sin modificar datos
+
+        Returns:
+            Ok(RecalculoComisiones) con el desglose por empleado, Err(error) si falla
+        """
+        validacion_fechas = Validator.validar_rango_fechas(fecha_inicio, fecha_fin)
+        if isinstance(validacion_fechas, Err):
+            return validacion_fechas
+
+        tipo = self.repository.obtener_tipo_servicio(tipo_servicio)
+        if tipo is None:
+            return Err(NotFoundError(
+                entity="TipoServicio",
+                identifier=tipo_servicio
+            ))
+
+        porcentaje = porcentaje_comision if porcentaje_comision is not None else tipo.porcentaje_comision
+        validacion_porcentaje = Validator.validar_porcentaje_comision(porcentaje)
+        if isinstance(validacion_porcentaje, Err):
+            return validacion_porcentaje
+
+        ajustes = self.repository.recalcular_comisiones(
+            tipo_servicio, porcentaje, fecha_inicio, fecha_fin, simular
+        )
+
+        return Ok(RecalculoComisiones(
+            tipo_servicio=tipo_servicio,
+            porcentaje_comision=porcentaje,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            simulado=simular,
+            ajustes=ajustes
+        ))
+
     # Registro de Servicios
 
+    @staticmethod
+    def calcular_comision(precio: Decimal, porcentaje_comision: float) -> Decimal:
+        """
+        Calcula la comisión de un servicio.
+
+        Args:
+            precio: Precio del servicio
+            porcentaje_comision: Porcentaje de comisión del tipo de servicio (0-100)
+
+        Returns:
+            precio * porcentaje / 100, redondeado a 2 decimales para coincidir
+            con la precisión de la base de datos
+        """
+        comision = precio * Decimal(str(porcentaje_comision)) / Decimal("100")
+        return comision.quantize(Decimal("0.01"))
+
     def registrar_servicio(self, fecha: date, empleado_id: str,
                           tipo_servicio: str, precio: Decimal) -> Result[ServicioRegistrado, ValidationError | NotFoundError]:
         """
@@ -243,9 +375,7 @@ class SalonManager:
             ))
 
         # Calcular comisión usando el porcentaje del tipo de servicio
-        comision_calculada = precio * Decimal(str(tipo.porcentaje_comision)) / Decimal("100")
-        # Redondear a 2 decimales para coincidir con la precisión de la base de datos
-        comision_calculada = comision_calculada.quantize(Decimal("0.01"))
+        comision_calculada = self.calcular_comision(precio, tipo.porcentaje_comision)
 
         # Generar ID único
         servicio_id = str(uuid.uuid4())
@@ -260,11 +390,58 @@ class SalonManager:
             comision_calculada=comision_calculada
         )
 
-        # Persistir servicio
-        self.repository.guardar_servicio(servicio)
+        # Persistir servicio (esperando a que su lote se confirme en modo agrupado)
+        if self.escritura_agrupada is not None:
+            self.escritura_agrupada.guardar(servicio)
+        else:
+            self.repository.guardar_servicio(servicio)
 
+        self._publicar_evento("servicio_registrado", {"servicio": servicio.to_dict()})
         return Ok(servicio)
 
+    def eliminar_servicio(self, id: str) -> None:
+        """
+        Elimina un servicio y lo notifica a los clientes de eventos.
+
+        Args:
+            id: ID del servicio a eliminar
+        """
+        self.repository.eliminar_servicio(id)
+        self._publicar_evento("servicio_eliminado", {"id": id})
+
+    # Eventos de servicios
+
+    def totales_hoy(self) -> PuntoSerie:
+        """
+        Calcula los ingresos, comisiones, beneficios y número de servicios de hoy.
+
+        Returns:
+            Totales del día (a cero si no hay servicios)
+        """
+        hoy = date.today()
+        puntos = self.repository.agregar_servicios_por_periodo("dia", hoy, hoy)
+        return puntos[0] if puntos else PuntoSerie(
+            periodo=hoy,
+            ingresos=Decimal("0"),
+            comisiones=Decimal("0"),
+            beneficios=Decimal("0"),
+            cantidad=0
+        )
+
+    def _publicar_evento(self, tipo: str, datos: dict) -> None:
+        """
+        Publica un evento de servicio con los totales de hoy si hay clientes suscritos.
+
+        El cambio ya está confirmado: un error al publicar se registra y no
+        se propaga.
+        """
+        if self.eventos.suscriptores == 0:
+            return
+        try:
+            self.eventos.publicar(tipo, {**datos, "totales_hoy": self.totales_hoy().to_dict()})
+        except Exception as e:
+            logger.warning(f"No se pudo publicar el evento {tipo}: {e}")
+
     # Consultas de Servicios
 
     def obtener_servicios(self, empleado_id: Optional[str] = None,
@@ -281,26 +458,34 @@ class SalonManager:
         Returns:
             Lista de servicios filtrados, ordenados por fecha descendente
         """
-        # Obtener todos los servicios
-        servicios = self.repository.listar_servicios()
-
-        # Filtrar por empleado_id si se proporciona
-        if empleado_id is not None:
-            servicios = [s for s in servicios if s.empleado_id == empleado_id]
-
-        # Filtrar por fecha_inicio si se proporciona
-        if fecha_inicio is not None:
-            servicios = [s for s in servicios if s.fecha >= fecha_inicio]
-
-        # Filtrar por fecha_fin si se proporciona
-        if fecha_fin is not None:
-            servicios = [s for s in servicios if s.fecha <= fecha_fin]
+        # Los filtros se aplican en el repositorio (solo lee las particiones del rango)
+        servicios = self.repository.listar_servicios(empleado_id, fecha_inicio, fecha_fin)
 
         # Ordenar por fecha descendente (más recientes primero)
         servicios.sort(key=lambda s: s.fecha, reverse=True)
 
         return servicios
 
+    def proyectar_servicios(self, campos: Sequence[str], empleado_id: Optional[str] = None,
+                            fecha_inicio: Optional[date] = None,
+                            fecha_fin: Optional[date] = None) -> List[dict]:
+        """
+        Obtiene servicios con filtros opcionales y solo los campos indicados.
+
+        A diferencia de obtener_servicios, los filtros se aplican en el
+        repositorio y solo se leen las columnas pedidas.
+
+        Args:
+            campos: Nombres de los campos
+            empleado_id: Filtrar por ID de empleado (opcional)
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+
+        Returns:
+            Un diccionario por servicio, ordenados por fecha descendente
+        """
+        return self.repository.proyectar_servicios(campos, empleado_id, fecha_inicio, fecha_fin)
+
     # Cálculos Financieros
 
     def calcular_ingresos_totales(self, fecha_inicio: Optional[date] = None,
@@ -339,12 +524,29 @@ class SalonManager:
         Returns:
             Ingresos totales menos suma de comisiones
         """
-        # Obtener servicios filtrados
-        servicios = self.obtener_servicios(
-            empleado_id=None,
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin
-        )
+        _, _, beneficios = self.calcular_desglose_beneficios(fecha_inicio, fecha_fin)
+
+        return beneficios
+
+    def calcular_desglose_beneficios(self, fecha_inicio: Optional[date] = None,
+                                     fecha_fin: Optional[date] = None) -> Tuple[Decimal, Decimal, Decimal]:
+        """
+        Calcula ingresos, comisiones y beneficios a partir de la misma instantánea.
+
+        Args:
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+
+        Returns:
+            Tupla (ingresos, comisiones, beneficios)
+        """
+        # Obtener servicios filtrados en una única transacción de lectura
+        with self.repository.lectura():
+            servicios = self.obtener_servicios(
+                empleado_id=None,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin
+            )
 
         # Calcular ingresos y comisiones
         ingresos = sum((s.precio for s in servicios), Decimal("0"))
@@ -353,7 +555,7 @@ class SalonManager:
         # Beneficios = ingresos - comisiones
         beneficios = ingresos - comisiones
 
-        return beneficios
+        return ingresos, comisiones, beneficios
 
     # Cálculo de Pagos a Empleados
 
@@ -371,16 +573,18 @@ class SalonManager:
         Returns:
             DesglosePago con lista de servicios y total a pagar
         """
-        # Obtener empleado
-        empleado = self.repository.obtener_empleado(empleado_id)
-        empleado_nombre = empleado.nombre if empleado else ""
-
-        # Obtener servicios del empleado filtrados por fechas
-        servicios = self.obtener_servicios(
-            empleado_id=empleado_id,
-            fecha_inicio=fecha_inicio,
-            fecha_fin=fecha_fin
-        )
+        # Empleado y servicios se leen de la misma instantánea
+        with self.repository.lectura():
+            # Obtener empleado
+            empleado = self.repository.obtener_empleado(empleado_id)
+            empleado_nombre = empleado.nombre if empleado else ""
+
+            # Obtener servicios del empleado filtrados por fechas
+            servicios = self.obtener_servicios(
+                empleado_id=empleado_id,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin
+            )
 
         # Crear lista de ServicioDetalle
         from app.models import ServicioDetalle
@@ -405,3 +609,156 @@ class SalonManager:
             total=total
         )
 
+    # Series Temporales
+
+    @staticmethod
+    def _inicio_periodo(fecha: date, granularidad: str) -> date:
+        """Normaliza una fecha al primer día de su período (lunes para semanas)."""
+        if granularidad == "semana":
+            return fecha - timedelta(days=fecha.weekday())
+        if granularidad == "mes":
+            return fecha.replace(day=1)
+        return fecha
+
+    @staticmethod
+    def _siguiente_periodo(periodo: date, granularidad: str) -> date:
+        """Devuelve el inicio del período siguiente."""
+        if granularidad == "semana":
+            return periodo + timedelta(days=7)
+        if granularidad == "mes":
+            if periodo.month == 12:
+                return periodo.replace(year=periodo.year + 1, month=1)
+            return periodo.replace(month=periodo.month + 1)
+        return periodo + timedelta(days=1)
+
+    @staticmethod
+    def _numero_periodos(desde: date, hasta: date, granularidad: str) -> int:
+        """Cuenta los períodos entre dos inicios de período, ambos incluidos."""
+        if granularidad == "semana":
+            return (hasta - desde).days // 7 + 1
+        if granularidad == "mes":
+            return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+        return (hasta - desde).days + 1
+
+    def calcular_serie_temporal(self, granularidad: str,
+                                fecha_inicio: Optional[date] = None,
+                                fecha_fin: Optional[date] = None) -> Result[List[PuntoSerie], ValidationError]:
+        """
+        Calcula ingresos, comisiones, beneficios y cantidad de servicios por período.
+
+        La agregación se hace en la base de datos con una sola consulta; los
+        períodos sin servicios se rellenan con ceros, hasta MAX_PERIODOS_SERIE.
+
+        Args:
+            granularidad: 'dia', 'semana' o 'mes'
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+
+        Returns:
+            Result con la lista de puntos consecutivos ordenados por período
+            ascendente, o ValidationError si la serie tendría demasiados períodos
+        """
+        puntos = self.repository.agregar_servicios_por_periodo(granularidad, fecha_inicio, fecha_fin)
+
+        # Un extremo abierto se acota con el primer o último período con servicios
+        if not puntos and (fecha_inicio is None or fecha_fin is None):
+            return Ok([])
+        desde = self._inicio_periodo(fecha_inicio, granularidad) if fecha_inicio else puntos[0].periodo
+        hasta = self._inicio_periodo(fecha_fin, granularidad) if fecha_fin else puntos[-1].periodo
+
+        periodos = self._numero_periodos(desde, hasta, granularidad)
+        if periodos > MAX_PERIODOS_SERIE:
+            return Err(ValidationError(
+                message=f"La serie tendría {periodos} períodos (máximo {MAX_PERIODOS_SERIE}); "
+                        "acote el rango de fechas o use una granularidad mayor",
+                field="fecha_inicio" if fecha_inicio else "fecha_fin"
+            ))
+
+        por_periodo = {punto.periodo: punto for punto in puntos}
+        serie = []
+        periodo = desde
+        while periodo <= hasta:
+            serie.append(por_periodo.get(periodo) or PuntoSerie(
+                periodo=periodo,
+                ingresos=Decimal("0"),
+                comisiones=Decimal("0"),
+                beneficios=Decimal("0"),
+                cantidad=0
+            ))
+            periodo = self._siguiente_periodo(periodo, granularidad)
+
+        return Ok(serie)
+
+    # Rankings
+
+    def calcular_ranking(self, por: str, metrica: str, limite: int = 10,
+                         fecha_inicio: Optional[date] = None,
+                         fecha_fin: Optional[date] = None) -> List[PosicionRanking]:
+        """
+        Calcula los primeros empleados o tipos de servicio según una métrica.
+
+        Args:
+            por: 'empleado' o 'tipo_servicio'
+            metrica: 'ingresos', 'comision' o 'cantidad'
+            limite: Número máximo de posiciones (por defecto 10)
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+
+        Returns:
+            Lista de posiciones ordenadas por la métrica descendente
+        """
+        return self.repository.ranking_servicios(por, metrica, limite, fecha_inicio, fecha_fin)
+
+    # Log de cambios
+
+    def listar_cambios(self, desde: int, limite: int = 500) -> PaginaCambios:
+        """
+        Obtiene los cambios posteriores a una secuencia del log de cambios.
+
+        Args:
+            desde: Última secuencia aplicada por el cliente (0 si no tiene ninguna)
+            limite: Número máximo de entradas del log leídas
+
+        Returns:
+            Página de cambios, con el último cambio de cada fila; si el log ya
+            no tiene todos los cambios posteriores a `desde`, indica que se
+            debe resincronizar
+        """
+        return self.repository.listar_cambios(desde, limite)
+
+    def compactar_cambios(self, dias: int) -> int:
+        """
+        Elimina del log de cambios las entradas de más de `dias` días.
+
+        Los clientes que no se sincronizaron en ese tiempo recibirán la
+        indicación de resincronizar.
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        return self.repository.compactar_cambios(
+            datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=dias)
+        )
+
+    # Archivo de servicios
+
+    def archivar_servicios(self, hasta_anio: Optional[int] = None) -> Result[Dict[int, int], ValidationError]:
+        """
+        Mueve los servicios de los años cerrados a sus particiones anuales.
+
+        Args:
+            hasta_anio: Último año que se archiva (por defecto, el año pasado);
+                debe ser anterior al año en curso
+
+        Returns:
+            Result con los servicios movidos por año, o ValidationError si el año no está cerrado
+        """
+        anio_actual = date.today().year
+        if hasta_anio is None:
+            hasta_anio = anio_actual - 1
+        if hasta_anio >= anio_actual:
+            return Err(ValidationError(
+                message=f"Solo se pueden archivar años cerrados (anteriores a {anio_actual})",
+                field="hasta_anio"
+            ))
+        return Ok(self.repository.archivar_servicios(hasta_anio))
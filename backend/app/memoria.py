@@ -0,0 +1,206 @@
+"""
+Instantáneas de memoria con tracemalloc.
+
+Cada asignación trazada se atribuye al marco más interno de su traza que
+pertenece a un módulo `app.*` (el código de la aplicación que la provocó,
+aunque la reserva la haga SQLAlchemy o pydantic), agrupada por módulo y
+línea. Las asignaciones sin ningún marco de la aplicación se acumulan aparte.
+
+Las instantáneas se guardan ya agregadas, no como `tracemalloc.Snapshot`,
+para que conservarlas no sea a su vez una fuente de crecimiento de memoria.
+"""
+import os
+import threading
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Directorio del paquete `app` (las trazas se atribuyen a sus ficheros)
+DIRECTORIO_APP = os.path.dirname(os.path.abspath(__file__))
+
+# Marcos de pila que se guardan por asignación
+MARCOS_POR_DEFECTO = 25
+
+# Clave de agrupación: (módulo, línea)
+SitioAsignacion = Tuple[str, int]
+
+
+def modulo_de_fichero(nombre_fichero: str) -> Optional[str]:
+    """
+    Nombre de módulo `app.*` de un fichero de la aplicación.
+
+    Returns:
+        Por ejemplo "app.repository", o None si el fichero no es de la aplicación
+    """
+    ruta = os.path.abspath(nombre_fichero)
+    if not ruta.startswith(DIRECTORIO_APP + os.sep) or not ruta.endswith(".py"):
+        return None
+    relativa = os.path.relpath(ruta, DIRECTORIO_APP)[:-3]
+    partes = relativa.split(os.sep)
+    if partes[-1] == "__init__":
+        partes.pop()
+    return ".".join(["app", *partes])
+
+
+@dataclass
+class InstantaneaMemoria:
+    """Memoria trazada en un momento, agregada por sitio de asignación de la aplicación."""
+    id: int
+    momento: datetime
+    tamano: int
+    bloques: int
+    fuera_de_app: Tuple[int, int]
+    sitios: Dict[SitioAsignacion, Tuple[int, int]] = field(repr=False)
+
+    def to_dict(self) -> dict:
+        """Convierte el resumen de la instantánea a diccionario (sin los sitios)."""
+        return {
+            "id": self.id,
+            "momento": self.momento.isoformat(),
+            "tamano": self.tamano,
+            "bloques": self.bloques,
+            "tamano_fuera_de_app": self.fuera_de_app[0],
+        }
+
+
+def agregar_instantanea(instantanea: tracemalloc.Snapshot) -> Tuple[Dict[SitioAsignacion, Tuple[int, int]], Tuple[int, int]]:
+    """
+    Agrupa las trazas de una instantánea por el marco más interno de la aplicación.
+
+    Parte de `Snapshot.statistics("traceback")`, que ya agrupa las trazas con
+    la misma pila, así que el sitio se resuelve una vez por pila y no por
+    asignación.
+
+    Returns:
+        Tamaño y bloques por (módulo, línea), y tamaño y bloques sin marco de la aplicación
+    """
+    sitios: Dict[SitioAsignacion, List[int]] = {}
+    fuera = [0, 0]
+    modulos: Dict[str, Optional[str]] = {}
+    for estadistica in instantanea.statistics("traceback"):
+        sitio = None
+        # La traza va del marco más antiguo al más reciente
+        for marco in reversed(estadistica.traceback):
+            if marco.filename not in modulos:
+                modulos[marco.filename] = modulo_de_fichero(marco.filename)
+            if modulos[marco.filename] is not None:
+                sitio = (modulos[marco.filename], marco.lineno)
+                break
+        acumulado = fuera if sitio is None else sitios.setdefault(sitio, [0, 0])
+        acumulado[0] += estadistica.size
+        acumulado[1] += estadistica.count
+    return {sitio: (tamano, bloques) for sitio, (tamano, bloques) in sitios.items()}, (fuera[0], fuera[1])
+
+
+class MonitorMemoria:
+    """Arranca tracemalloc, toma instantáneas y compara entre ellas."""
+
+    def __init__(self, max_instantaneas: int = 10):
+        """
+        Args:
+            max_instantaneas: Número de instantáneas que se conservan; se descartan las más antiguas
+        """
+        self.max_instantaneas = max_instantaneas
+        self._instantaneas: Dict[int, InstantaneaMemoria] = {}
+        self._siguiente_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def activo(self) -> bool:
+        """Indica si tracemalloc está trazando asignaciones."""
+        return tracemalloc.is_tracing()
+
+    def iniciar(self, marcos: int = MARCOS_POR_DEFECTO) -> None:
+        """Empieza a trazar asignaciones guardando `marcos` marcos de pila por asignación."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(marcos)
+
+    def detener(self) -> None:
+        """Deja de trazar asignaciones (las instantáneas tomadas se conservan)."""
+        tracemalloc.stop()
+
+    def estado(self) -> dict:
+        """Estado de tracemalloc y memoria trazada actual y máxima."""
+        actual, maxima = tracemalloc.get_traced_memory()
+        return {
+            "activo": self.activo,
+            "marcos": tracemalloc.get_traceback_limit(),
+            "memoria_trazada": actual,
+            "memoria_trazada_maxima": maxima,
+            "sobrecoste_tracemalloc": tracemalloc.get_tracemalloc_memory(),
+        }
+
+    def tomar_instantanea(self) -> Optional[InstantaneaMemoria]:
+        """
+        Toma y agrega una instantánea de la memoria trazada.
+
+        Returns:
+            La instantánea, o None si tracemalloc no está activo
+        """
+        if not tracemalloc.is_tracing():
+            return None
+        instantanea = tracemalloc.take_snapshot()
+        sitios, fuera = agregar_instantanea(instantanea)
+        del instantanea
+        with self._lock:
+            agregada = InstantaneaMemoria(
+                id=self._siguiente_id,
+                momento=datetime.now(),
+                tamano=sum(tamano for tamano, _ in sitios.values()) + fuera[0],
+                bloques=sum(bloques for _, bloques in sitios.values()) + fuera[1],
+                fuera_de_app=fuera,
+                sitios=sitios
+            )
+            self._siguiente_id += 1
+            self._instantaneas[agregada.id] = agregada
+            while len(self._instantaneas) > self.max_instantaneas:
+                del self._instantaneas[min(self._instantaneas)]
+        return agregada
+
+    def listar(self) -> List[InstantaneaMemoria]:
+        """Instantáneas conservadas, de la más antigua a la más reciente."""
+        with self._lock:
+            return [self._instantaneas[clave] for clave in sorted(self._instantaneas)]
+
+    def obtener(self, id: int) -> Optional[InstantaneaMemoria]:
+        """Instantánea por id, o None si no existe o ya se descartó."""
+        with self._lock:
+            return self._instantaneas.get(id)
+
+    @staticmethod
+    def principales(instantanea: InstantaneaMemoria, limite: int = 20) -> List[dict]:
+        """Sitios de la aplicación con más memoria en la instantánea."""
+        sitios = sorted(instantanea.sitios.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            {"modulo": modulo, "linea": linea, "tamano": tamano, "bloques": bloques}
+            for (modulo, linea), (tamano, bloques) in sitios[:limite]
+        ]
+
+    @staticmethod
+    def diferencia(desde: InstantaneaMemoria, hasta: InstantaneaMemoria, limite: int = 20) -> List[dict]:
+        """
+        Sitios de la aplicación cuya memoria más ha cambiado entre dos instantáneas.
+
+        Returns:
+            Sitios ordenados por el valor absoluto de la diferencia de tamaño
+        """
+        cambios = []
+        for sitio in desde.sitios.keys() | hasta.sitios.keys():
+            tamano_antes, bloques_antes = desde.sitios.get(sitio, (0, 0))
+            tamano, bloques = hasta.sitios.get(sitio, (0, 0))
+            if tamano != tamano_antes or bloques != bloques_antes:
+                cambios.append({
+                    "modulo": sitio[0],
+                    "linea": sitio[1],
+                    "diferencia_tamano": tamano - tamano_antes,
+                    "diferencia_bloques": bloques - bloques_antes,
+                    "tamano": tamano,
+                    "bloques": bloques,
+                })
+        cambios.sort(key=lambda cambio: (-abs(cambio["diferencia_tamano"]), cambio["modulo"], cambio["linea"]))
+        return cambios[:limite]
+
+
+# Monitor de memoria del proceso
+monitor_memoria = MonitorMemoria()
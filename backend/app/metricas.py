@@ -0,0 +1,395 @@
+"""
+Métricas internas de la aplicación en formato de exposición de Prometheus.
+
+Las métricas se agrupan en familias con etiquetas. Cada combinación de
+etiquetas es una serie con su propio lock, de modo que registrar una
+observación solo bloquea esa serie durante unas pocas operaciones y el coste
+es despreciable incluso con las métricas siempre activas.
+"""
+import bisect
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Límites por defecto de los histogramas de duración (segundos)
+LIMITES_DURACION = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _formatear_numero(valor: float) -> str:
+    """Formatea un número como lo espera Prometheus."""
+    if valor == float("inf"):
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+def _escapar(valor: str) -> str:
+    """Escapa un valor de etiqueta (barra invertida, comillas y saltos de línea)."""
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(etiquetas: Iterable[Tuple[str, str]]) -> str:
+    """Formatea las etiquetas de una serie: {clave="valor",...}."""
+    partes = [f'{clave}="{_escapar(str(valor))}"' for clave, valor in etiquetas]
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Histograma:
+    """
+    Histograma de buckets fijos, seguro entre hilos.
+
+    Cada observación se cuenta en el primer bucket cuyo límite superior es
+    mayor o igual que el valor; las que superan el último límite van al
+    bucket `+Inf`.
+    """
+
+    def __init__(self, limites: Sequence[float]):
+        """
+        Inicializa el histograma.
+
+        Args:
+            limites: Límites superiores de los buckets, en orden creciente
+        """
+        self.limites = tuple(limites)
+        self._conteos = [0] * (len(self.limites) + 1)
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float) -> None:
+        """Registra una observación."""
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += valor
+            self._total += 1
+
+    @property
+    def total(self) -> int:
+        """Número de observaciones."""
+        return self._total
+
+    def instantanea(self) -> Tuple[List[int], float, int]:
+        """Devuelve una copia coherente de (conteos por bucket, suma, total)."""
+        with self._lock:
+            return list(self._conteos), self._suma, self._total
+
+    def to_dict(self) -> dict:
+        """Convierte el histograma a diccionario (conteos por bucket, total y media)."""
+        conteos, suma, total = self.instantanea()
+        etiquetas = [f"{limite:g}" for limite in self.limites] + ["+Inf"]
+        return {
+            "buckets": dict(zip(etiquetas, conteos)),
+            "total": total,
+            "suma": suma,
+            "media": suma / total if total else 0.0,
+        }
+
+
+class Contador:
+    """Contador monótono, seguro entre hilos."""
+
+    def __init__(self):
+        self._valor = 0.0
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad: float = 1) -> None:
+        with self._lock:
+            self._valor += cantidad
+
+    @property
+    def valor(self) -> float:
+        return self._valor
+
+
+class Indicador:
+    """Valor que puede subir y bajar (gauge), seguro entre hilos."""
+
+    def __init__(self):
+        self._valor = 0.0
+        self._lock = threading.Lock()
+
+    def incrementar(self, cantidad: float = 1) -> None:
+        with self._lock:
+            self._valor += cantidad
+
+    def decrementar(self, cantidad: float = 1) -> None:
+        with self._lock:
+            self._valor -= cantidad
+
+    def fijar(self, valor: float) -> None:
+        self._valor = valor
+
+    @property
+    def valor(self) -> float:
+        return self._valor
+
+
+class Familia(ABC):
+    """
+    Conjunto de series de una métrica, una por combinación de etiquetas.
+
+    El lock de la familia solo se toma al crear una serie nueva; las
+    observaciones posteriores usan el lock de la propia serie.
+    """
+
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _crear_serie(self):
+        """Crea una serie vacía del tipo de la familia."""
+        pass
+
+    def serie(self, *valores: str):
+        """Obtiene (creándola si no existe) la serie con los valores de etiqueta dados."""
+        clave = tuple(str(valor) for valor in valores)
+        serie = self._series.get(clave)
+        if serie is None:
+            if len(clave) != len(self.etiquetas):
+                raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+            with self._lock:
+                serie = self._series.setdefault(clave, self._crear_serie())
+        return serie
+
+    def series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        """Lista las series existentes ordenadas por etiquetas."""
+        with self._lock:
+            return sorted(self._series.items())
+
+    def _lineas_serie(self, etiquetas: List[Tuple[str, str]], serie) -> List[str]:
+        return [f"{self.nombre}{_formatear_etiquetas(etiquetas)} {_formatear_numero(serie.valor)}"]
+
+    def exponer(self) -> List[str]:
+        """Líneas de la familia en formato de texto de Prometheus."""
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        for valores, serie in self.series():
+            lineas.extend(self._lineas_serie(list(zip(self.etiquetas, valores)), serie))
+        return lineas
+
+
+class FamiliaContadores(Familia):
+    """Familia de contadores."""
+
+    tipo = "counter"
+
+    def _crear_serie(self):
+        return Contador()
+
+
+class FamiliaIndicadores(Familia):
+    """Familia de indicadores (gauges)."""
+
+    tipo = "gauge"
+
+    def _crear_serie(self):
+        return Indicador()
+
+    def reiniciar(self) -> None:
+        """Elimina todas las series (para indicadores recalculados en cada lectura)."""
+        with self._lock:
+            self._series.clear()
+
+
+class FamiliaHistogramas(Familia):
+    """Familia de histogramas con los mismos límites en todas sus series."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Sequence[str] = (),
+                 limites: Sequence[float] = LIMITES_DURACION):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.limites = tuple(limites)
+
+    def _crear_serie(self):
+        return Histograma(self.limites)
+
+    def _lineas_serie(self, etiquetas: List[Tuple[str, str]], serie: Histograma) -> List[str]:
+        conteos, suma, total = serie.instantanea()
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.limites + (float("inf"),), conteos):
+            acumulado += conteo
+            le = etiquetas + [("le", _formatear_numero(float(limite)))]
+            lineas.append(f"{self.nombre}_bucket{_formatear_etiquetas(le)} {acumulado}")
+        lineas.append(f"{self.nombre}_sum{_formatear_etiquetas(etiquetas)} {_formatear_numero(suma)}")
+        lineas.append(f"{self.nombre}_count{_formatear_etiquetas(etiquetas)} {total}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Registro de familias de métricas con recolectores ejecutados al exponer."""
+
+    def __init__(self):
+        self._familias: List[Familia] = []
+        self._recolectores: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def registrar(self, familia: Familia) -> Familia:
+        """Añade una familia al registro y la devuelve."""
+        with self._lock:
+            self._familias.append(familia)
+        return familia
+
+    def agregar_recolector(self, recolector: Callable[[], None]) -> None:
+        """Añade una función que actualiza indicadores justo antes de exponer."""
+        with self._lock:
+            self._recolectores.append(recolector)
+
+    def quitar_recolector(self, recolector: Callable[[], None]) -> None:
+        """Quita un recolector añadido con `agregar_recolector`."""
+        with self._lock:
+            self._recolectores.remove(recolector)
+
+    def exponer(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            familias = list(self._familias)
+            recolectores = list(self._recolectores)
+        for recolector in recolectores:
+            recolector()
+        lineas = []
+        for familia in familias:
+            lineas.extend(familia.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+# Registro global del proceso
+REGISTRO = RegistroMetricas()
+
+PETICIONES_HTTP = REGISTRO.registrar(FamiliaContadores(
+    "salon_http_peticiones_total", "Peticiones HTTP por método, ruta y código de estado",
+    ("metodo", "ruta", "estado")
+))
+DURACION_HTTP = REGISTRO.registrar(FamiliaHistogramas(
+    "salon_http_duracion_segundos", "Duración de las peticiones HTTP por método, ruta y código de estado",
+    ("metodo", "ruta", "estado")
+))
+PETICIONES_EN_CURSO = REGISTRO.registrar(FamiliaIndicadores(
+    "salon_http_peticiones_en_curso", "Peticiones HTTP en curso"
+))
+DURACION_REPOSITORIO = REGISTRO.registrar(FamiliaHistogramas(
+    "salon_repositorio_duracion_segundos", "Duración de los métodos del repositorio",
+    ("metodo",)
+))
+ERRORES_REPOSITORIO = REGISTRO.registrar(FamiliaContadores(
+    "salon_repositorio_errores_total", "Excepciones lanzadas por los métodos del repositorio",
+    ("metodo",)
+))
+POOL_CONEXIONES = REGISTRO.registrar(FamiliaIndicadores(
+    "salon_pool_conexiones", "Conexiones de los pools de SQLAlchemy por engine y estado",
+    ("engine", "estado")
+))
+
+# Ruta usada en las etiquetas cuando la petición no corresponde a ninguna ruta
+RUTA_DESCONOCIDA = "sin_ruta"
+
+
+# Método del repositorio en ejecución (lo usa el registro de consultas lentas)
+metodo_repositorio_actual: ContextVar[Optional[str]] = ContextVar("metodo_repositorio_actual", default=None)
+
+
+def medir(nombre: str, metodo: Callable) -> Callable:
+    """
+    Envuelve un método para registrar su duración y sus errores en las métricas del repositorio.
+
+    Mientras se ejecuta, `metodo_repositorio_actual` contiene el nombre del método.
+    """
+    histograma = DURACION_REPOSITORIO.serie(nombre)
+
+    @functools.wraps(metodo)
+    def envoltura(*args, **kwargs):
+        token = metodo_repositorio_actual.set(nombre)
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        except BaseException:
+            ERRORES_REPOSITORIO.serie(nombre).incrementar()
+            raise
+        finally:
+            histograma.observar(time.perf_counter() - inicio)
+            metodo_repositorio_actual.reset(token)
+    return envoltura
+
+
+def medir_metodos(excluir: Sequence[str] = ()):
+    """
+    Decorador de clase que mide con `medir` los métodos públicos definidos en la clase.
+
+    Args:
+        excluir: Métodos públicos que no se miden
+    """
+    def decorar(cls):
+        for nombre, atributo in list(vars(cls).items()):
+            if nombre.startswith("_") or nombre in excluir or not callable(atributo):
+                continue
+            setattr(cls, nombre, medir(nombre, atributo))
+        return cls
+    return decorar
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mide las peticiones HTTP.
+
+    Etiqueta cada petición con la plantilla de la ruta (p. ej.
+    `/api/empleados/{id}`), no con la URL concreta, para que el número de
+    series no crezca con los identificadores.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = {"codigo": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        en_curso = PETICIONES_EN_CURSO.serie()
+        en_curso.incrementar()
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            en_curso.decrementar()
+            ruta = scope.get("route")
+            etiquetas = (scope["method"], getattr(ruta, "path", RUTA_DESCONOCIDA), str(estado["codigo"]))
+            PETICIONES_HTTP.serie(*etiquetas).incrementar()
+            DURACION_HTTP.serie(*etiquetas).observar(duracion)
+
+
+def estadisticas_pool(engine) -> Optional[Dict[str, int]]:
+    """
+    Estadísticas del pool de conexiones de un engine.
+
+    Returns:
+        Diccionario con tamano, en_uso, libres y desbordamiento, o None si
+        el pool no lleva la cuenta (p. ej. StaticPool)
+    """
+    pool = engine.pool
+    if not all(hasattr(pool, atributo) for atributo in ("size", "checkedout", "checkedin", "overflow")):
+        return None
+    return {
+        "tamano": pool.size(),
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "desbordamiento": pool.overflow(),
+    }
@@ -125,3 +125,128 @@ class DesglosePago:
             "servicios": [s.to_dict() for s in self.servicios],
             "total": str(self.total)
         }
+
+
+@dataclass
+class PuntoSerie:
+    """Totales agregados de un período (día, semana o mes) de la serie temporal."""
+    periodo: date
+    ingresos: Decimal
+    comisiones: Decimal
+    beneficios: Decimal
+    cantidad: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el punto de la serie a diccionario."""
+        return {
+            "periodo": self.periodo.isoformat(),
+            "ingresos": str(self.ingresos),
+            "comisiones": str(self.comisiones),
+            "beneficios": str(self.beneficios),
+            "cantidad": self.cantidad
+        }
+
+
+@dataclass
+class PosicionRanking:
+    """Totales agregados de un empleado o tipo de servicio dentro de un ranking."""
+    clave: str
+    nombre: str
+    ingresos: Decimal
+    comisiones: Decimal
+    cantidad: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa la posición del ranking a diccionario."""
+        return {
+            "clave": self.clave,
+            "nombre": self.nombre,
+            "ingresos": str(self.ingresos),
+            "comisiones": str(self.comisiones),
+            "cantidad": self.cantidad
+        }
+
+
+@dataclass
+class AjusteComision:
+    """Variación de comisiones de un empleado tras recalcular un tipo de servicio."""
+    empleado_id: str
+    servicios: int
+    comision_anterior: Decimal
+    comision_nueva: Decimal
+    
+    @property
+    def diferencia(self) -> Decimal:
+        """Diferencia a pagar (positiva) o descontar (negativa) al empleado."""
+        return self.comision_nueva - self.comision_anterior
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el ajuste a diccionario."""
+        return {
+            "empleado_id": self.empleado_id,
+            "servicios": self.servicios,
+            "comision_anterior": str(self.comision_anterior),
+            "comision_nueva": str(self.comision_nueva),
+            "diferencia": str(self.diferencia)
+        }
+
+
+@dataclass
+class RecalculoComisiones:
+    """Resultado de recalcular las comisiones de un tipo de servicio en un rango de fechas."""
+    tipo_servicio: str
+    porcentaje_comision: float
+    fecha_inicio: date
+    fecha_fin: date
+    simulado: bool
+    ajustes: List[AjusteComision]
+    
+    @property
+    def servicios_actualizados(self) -> int:
+        """Número de servicios cuya comisión cambia."""
+        return sum(ajuste.servicios for ajuste in self.ajustes)
+    
+    @property
+    def diferencia_total(self) -> Decimal:
+        """Suma de las diferencias de todos los empleados."""
+        return sum((ajuste.diferencia for ajuste in self.ajustes), Decimal("0"))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa el recálculo a diccionario."""
+        return {
+            "tipo_servicio": self.tipo_servicio,
+            "porcentaje_comision": self.porcentaje_comision,
+            "fecha_inicio": self.fecha_inicio.isoformat(),
+            "fecha_fin": self.fecha_fin.isoformat(),
+            "simulado": self.simulado,
+            "servicios_actualizados": self.servicios_actualizados,
+            "ajustes": [a.to_dict() for a in self.ajustes],
+            "diferencia_total": str(self.diferencia_total)
+        }
+
+
+@dataclass
+class Cambio:
+    """Último cambio de una fila dentro de una página del log de cambios."""
+    seq: int
+    tabla: str
+    clave: str
+    operacion: str
+    # Estado actual de la fila (Empleado, TipoServicio o ServicioRegistrado);
+    # None si se eliminó (el borrado llega en esta página o en una posterior)
+    datos: Optional[Any] = None
+
+
+@dataclass
+class PaginaCambios:
+    """Cambios del log posteriores a una secuencia."""
+    desde: int
+    hasta: int
+    ultimo: int
+    resincronizar: bool
+    cambios: List[Cambio]
+    
+    @property
+    def mas(self) -> bool:
+        """Indica si quedan cambios posteriores a esta página."""
+        return not self.resincronizar and self.hasta < self.ultimo
@@ -1,7 +1,7 @@
 """
 Modelos ORM de SQLAlchemy para el sistema de gestión de salón de peluquería.
 """
-from sqlalchemy import Column, String, Float, Date, Numeric, CheckConstraint, Index
+from sqlalchemy import Column, String, Float, Date, DateTime, Integer, Numeric, CheckConstraint, Index
 from sqlalchemy.orm import declarative_base
 
 
@@ -48,17 +48,37 @@ class ServicioORM(Base):
     __tablename__ = 'servicios'
     
     id = Column(String(50), primary_key=True)
-    fecha = Column(Date, nullable=False, index=True)
-    empleado_id = Column(String(50), nullable=False, index=True)
+    fecha = Column(Date, nullable=False)
+    empleado_id = Column(String(50), nullable=False)
     tipo_servicio = Column(String(50), nullable=False)
     precio = Column(Numeric(10, 2), nullable=False)
     comision_calculada = Column(Numeric(10, 2), nullable=False)
     
+    # Los índices por fecha y por empleado son cubrientes: incluyen las columnas
+    # que leen los reportes y el pago de empleados, que se resuelven sin leer la tabla
     __table_args__ = (
         CheckConstraint('precio > 0', name='check_precio_positive'),
-        Index('idx_servicios_empleado_fecha', 'empleado_id', 'fecha'),
-        Index('idx_servicios_fecha', 'fecha'),
+        Index('idx_servicios_empleado_fecha', 'empleado_id', 'fecha', 'tipo_servicio', 'precio', 'comision_calculada'),
+        Index('idx_servicios_fecha', 'fecha', 'precio', 'comision_calculada'),
+        Index('idx_servicios_tipo_fecha', 'tipo_servicio', 'fecha'),
     )
     
     def __repr__(self):
         return f"<Servicio(id='{self.id}', empleado='{self.empleado_id}', fecha={self.fecha})>"
+
+
+class CambioORM(Base):
+    """Modelo ORM para la tabla cambios (log de cambios, ver app.cambios)."""
+    __tablename__ = 'cambios'
+    
+    # AUTOINCREMENT: las secuencias no se reutilizan tras compactar el log
+    seq = Column(Integer, primary_key=True)
+    tabla = Column(String(30), nullable=False)
+    clave = Column(String(50), nullable=False)
+    operacion = Column(String(10), nullable=False)
+    momento = Column(DateTime, nullable=False)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
+    
+    def __repr__(self):
+        return f"<Cambio(seq={self.seq}, {self.operacion} {self.tabla}.{self.clave})>"
@@ -0,0 +1,162 @@
+"""
+Particiones anuales de los servicios archivados.
+
+La tabla `servicios` guarda los servicios de los años sin archivar. Archivar
+un año cerrado mueve sus servicios a su propia tabla, `servicios_<año>`, con
+las mismas columnas e índices y en el mismo fichero SQLite. La tabla
+principal y sus índices, que son los que tocan el registro de servicios y
+los reportes del período actual, dejan de crecer con el histórico y caben
+en la caché de páginas.
+
+Los servicios de un año archivado están solo en su partición: el
+repositorio inserta en ella los servicios con fecha de ese año. Así, una
+consulta por rango de fechas lee únicamente las tablas que se solapan con
+el rango (con `UNION ALL` si son varias), y la tabla principal solo si el
+rango incluye algún año sin archivar.
+
+Se usan tablas del mismo fichero y no bases de datos adjuntas (ATTACH): en
+modo WAL una transacción que escribe en varias bases de datos adjuntas no
+es atómica, y el log de cambios y las instantáneas de lectura tendrían que
+abarcar varios ficheros.
+
+Cada repositorio conserva los años archivados que leyó de `sqlite_master`
+(`AniosArchivados`) junto con el `PRAGMA schema_version` de ese momento. En
+cada transacción compara esa versión, que se lee de la cabecera del
+fichero, y vuelve a leer los años si el esquema cambió: una partición
+creada por otro proceso (p. ej. `python -m app.cli archivar-servicios`) se
+ve en la siguiente transacción, y los servicios de ese año se insertan
+desde entonces en su partición. Una escritura que leyó los años antes de
+que otro proceso archivara no llega a confirmarse: en modo WAL SQLite no
+deja escribir desde una instantánea antigua y el repositorio la reintenta.
+"""
+import re
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import MetaData, Table
+
+from app.orm_models import ServicioORM
+
+# Tabla principal de servicios (años sin archivar)
+TABLA_SERVICIOS: Table = ServicioORM.__table__
+
+# Tablas de las particiones anuales en sqlite_master
+CONSULTA_PARTICIONES = (
+    "SELECT name FROM sqlite_master WHERE type = 'table' "
+    "AND name GLOB 'servicios_[0-9][0-9][0-9][0-9]'"
+)
+
+# Versión del esquema; SQLite la incrementa con cada cambio de esquema (CREATE TABLE...)
+CONSULTA_VERSION_ESQUEMA = "PRAGMA schema_version"
+
+_PARTICION = re.compile(r"^servicios_(\d{4})$")
+
+# Tablas de SQLAlchemy de las particiones, creadas bajo demanda
+_METADATA_PARTICIONES = MetaData()
+_tablas: Dict[int, Table] = {}
+
+
+def nombre_particion(anio: int) -> str:
+    """Nombre de la tabla de la partición de un año."""
+    return f"servicios_{anio:04d}"
+
+
+def es_particion(nombre: str) -> bool:
+    """Indica si una tabla es una partición de servicios (no está en los modelos ORM)."""
+    return _PARTICION.match(nombre) is not None
+
+
+def tabla_particion(anio: int) -> Table:
+    """
+    Tabla de SQLAlchemy de la partición de un año.
+
+    Copia las columnas, restricciones e índices de `servicios`; los índices
+    llevan el año en el nombre (los nombres de índice son únicos en SQLite).
+    """
+    tabla = _tablas.get(anio)
+    if tabla is None:
+        nombre = nombre_particion(anio)
+        tabla = TABLA_SERVICIOS.to_metadata(_METADATA_PARTICIONES, name=nombre)
+        for indice in tabla.indexes:
+            indice.name = indice.name.replace("idx_servicios_", f"idx_{nombre}_", 1)
+        tabla = _tablas.setdefault(anio, tabla)
+    return tabla
+
+
+def anios_archivados(session) -> List[int]:
+    """
+    Años con partición, de más reciente a más antiguo.
+
+    Args:
+        session: Sesión de SQLAlchemy; en una transacción de lectura, las
+            particiones de su instantánea
+    """
+    nombres = session.connection().exec_driver_sql(CONSULTA_PARTICIONES).scalars()
+    return sorted((int(_PARTICION.match(nombre).group(1)) for nombre in nombres), reverse=True)
+
+
+class AniosArchivados:
+    """
+    Caché de los años archivados de una base de datos, por versión del esquema.
+
+    Cada consulta lee `PRAGMA schema_version` y solo vuelve a leer
+    `sqlite_master` si la versión no es la de los años en caché, así que
+    también ve las particiones creadas por otros procesos. La versión y los
+    años se guardan juntos: una carga concurrente con otra versión como
+    mucho provoca una recarga más.
+    """
+
+    def __init__(self):
+        self._cache: Optional[Tuple[int, List[int]]] = None
+
+    def obtener(self, session) -> List[int]:
+        """
+        Años con partición, de más reciente a más antiguo.
+
+        Args:
+            session: Sesión de SQLAlchemy; en una transacción, los de su instantánea
+        """
+        version = session.connection().exec_driver_sql(CONSULTA_VERSION_ESQUEMA).scalar()
+        cache = self._cache
+        if cache is not None and cache[0] == version:
+            return cache[1]
+        anios = anios_archivados(session)
+        self._cache = (version, anios)
+        return anios
+
+
+def tablas_para_rango(archivados: Iterable[int], fecha_inicio: Optional[date] = None,
+                      fecha_fin: Optional[date] = None) -> List[Table]:
+    """
+    Tablas que pueden tener servicios de un rango de fechas (poda de particiones).
+
+    La tabla principal se incluye si el rango abarca algún año sin archivar
+    (siempre que un extremo queda abierto); las particiones, si su año se
+    solapa con el rango. Nunca devuelve una lista vacía.
+
+    Args:
+        archivados: Años con partición
+        fecha_inicio: Inicio del rango (inclusive, opcional)
+        fecha_fin: Fin del rango (inclusive, opcional)
+
+    Returns:
+        La tabla principal (si hace falta) seguida de las particiones, de más reciente a más antigua
+    """
+    if fecha_inicio is not None and fecha_fin is not None and fecha_inicio > fecha_fin:
+        return [TABLA_SERVICIOS]
+    archivados = set(archivados)
+    anios = [
+        anio for anio in sorted(archivados, reverse=True)
+        if (fecha_inicio is None or anio >= fecha_inicio.year)
+        and (fecha_fin is None or anio <= fecha_fin.year)
+    ]
+    principal = (
+        fecha_inicio is None or fecha_fin is None
+        or any(anio not in archivados for anio in range(fecha_inicio.year, fecha_fin.year + 1))
+    )
+    return ([TABLA_SERVICIOS] if principal else []) + [tabla_particion(anio) for anio in anios]
+
+
+def tabla_para_fecha(archivados: Iterable[int], fecha: date) -> Table:
+    """Tabla en la que se guarda un servicio: la partición de su año si está archivado."""
+    return tabla_particion(fecha.year) if fecha.year in set(archivados) else TABLA_SERVICIOS
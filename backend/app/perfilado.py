@@ -0,0 +1,342 @@
+"""
+Perfilado bajo demanda de peticiones HTTP.
+
+Una petición se perfila si trae la cabecera `X-Perfilar` con el token de
+administración, o si el muestreo está activado (1 de cada N peticiones). El
+perfil se guarda en el directorio de perfiles en uno de dos formatos:
+
+- `pstats`: perfil determinista de cProfile, para `python -m pstats` o snakeviz.
+- `collapsed`: pilas muestreadas cada milisegundo en formato "collapsed stack"
+  (`marco;marco;marco cuenta`), listo para flamegraph.pl o speedscope.
+
+Se perfila el hilo del bucle de eventos mientras dura la petición y, si el
+handler es síncrono (`def`), también el hilo del pool que lo ejecuta
+(`RutaPerfilada`); un perfil `pstats` reúne el de cada hilo. El bucle de
+eventos atiende a la vez otras peticiones: el perfil del bucle incluye las
+corrutinas de las peticiones concurrentes que se ejecutan mientras la
+perfilada espera, así que los perfiles de handlers `async` son fiables con
+poca concurrencia. Como mucho se perfila una petición a la vez: mientras hay
+una en curso, el resto se atiende sin perfilar.
+"""
+import asyncio
+import cProfile
+import functools
+import hmac
+import itertools
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Set
+
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_PERFIL = {"pstats": ".pstats", "collapsed": ".collapsed"}
+
+# Nombres de fichero de perfil válidos (evita rutas fuera del directorio)
+PATRON_NOMBRE_PERFIL = re.compile(r"^[\w.-]+\.(pstats|collapsed)$")
+
+
+@dataclass
+class Perfil:
+    """Fichero de perfil guardado."""
+    nombre: str
+    tamano: int
+    fecha: datetime
+
+    def to_dict(self) -> dict:
+        """Convierte el perfil a diccionario."""
+        return {"nombre": self.nombre, "tamano": self.tamano, "fecha": self.fecha.isoformat()}
+
+
+class _Muestreador:
+    """Muestreador de las pilas de uno o varios hilos a intervalos fijos."""
+
+    def __init__(self, intervalo: float = 0.001):
+        self.intervalo = intervalo
+        self.pilas: Counter = Counter()
+        self._hilos: Set[int] = set()
+        self._lock = threading.Lock()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name="muestreador-perfil", daemon=True)
+
+    def vigilar(self, hilo_id: int) -> None:
+        with self._lock:
+            self._hilos.add(hilo_id)
+
+    def olvidar(self, hilo_id: int) -> None:
+        with self._lock:
+            self._hilos.discard(hilo_id)
+
+    def iniciar(self) -> None:
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._fin.set()
+        self._hilo.join()
+
+    def _bucle(self) -> None:
+        while not self._fin.wait(self.intervalo):
+            with self._lock:
+                hilos = list(self._hilos)
+            marcos = sys._current_frames()
+            for hilo_id in hilos:
+                marco = marcos.get(hilo_id)
+                pila = []
+                while marco is not None:
+                    codigo = marco.f_code
+                    pila.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    marco = marco.f_back
+                if pila:
+                    self.pilas[";".join(reversed(pila))] += 1
+
+    def escribir(self, ruta: str) -> None:
+        with open(ruta, "w", encoding="utf-8") as fichero:
+            for pila, cuenta in self.pilas.most_common():
+                fichero.write(f"{pila} {cuenta}\n")
+
+
+class _PerfilPeticion:
+    """
+    Perfil de una petición repartida entre hilos.
+
+    Cada hilo que entra se perfila por separado (cProfile solo ve el hilo en
+    el que se activa); al guardar se reúnen los perfiles de todos los hilos.
+    """
+
+    def __init__(self, formato: str):
+        self.formato = formato
+        self._perfiles: List[cProfile.Profile] = []
+        self._muestreador = _Muestreador() if formato == "collapsed" else None
+        if self._muestreador is not None:
+            self._muestreador.iniciar()
+        # El hilo que crea el perfil (el del bucle de eventos) se perfila hasta `detener`
+        self._entrada = self.entrar()
+
+    def entrar(self):
+        """Empieza a perfilar el hilo actual; devuelve el objeto a pasar a `salir`."""
+        if self._muestreador is not None:
+            hilo_id = threading.get_ident()
+            self._muestreador.vigilar(hilo_id)
+            return hilo_id
+        perfil = cProfile.Profile()
+        self._perfiles.append(perfil)
+        perfil.enable()
+        return perfil
+
+    def salir(self, entrada) -> None:
+        """Deja de perfilar el hilo actual."""
+        if self._muestreador is not None:
+            self._muestreador.olvidar(entrada)
+        else:
+            entrada.disable()
+
+    def detener(self) -> None:
+        """Deja de perfilar; se llama desde el hilo que creó el perfil."""
+        self.salir(self._entrada)
+        if self._muestreador is not None:
+            self._muestreador.detener()
+
+    def escribir(self, ruta: str) -> None:
+        """Escribe en `ruta` el perfil de todos los hilos."""
+        if self._muestreador is not None:
+            self._muestreador.escribir(ruta)
+        else:
+            pstats.Stats(*self._perfiles).dump_stats(ruta)
+
+
+# Perfil de la petición en curso en este contexto (lo heredan los hilos del pool)
+_perfil_peticion: ContextVar[Optional[_PerfilPeticion]] = ContextVar("perfil_peticion", default=None)
+
+
+def perfilar_en_hilo(funcion):
+    """Envuelve un handler síncrono para perfilar el hilo que lo ejecuta si su petición se perfila."""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        perfil = _perfil_peticion.get()
+        if perfil is None:
+            return funcion(*args, **kwargs)
+        entrada = perfil.entrar()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            perfil.salir(entrada)
+    return envoltura
+
+
+class RutaPerfilada(APIRoute):
+    """
+    Ruta de FastAPI cuyos handlers síncronos se perfilan en el hilo del pool.
+
+    FastAPI ejecuta los handlers `def` en el pool de hilos, fuera del hilo
+    del bucle de eventos que perfila `MiddlewarePerfilado`.
+    """
+
+    def get_route_handler(self):
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = perfilar_en_hilo(self.dependant.call)
+        return super().get_route_handler()
+
+
+class Perfilador:
+    """Decide qué peticiones se perfilan y gestiona los ficheros de perfil."""
+
+    def __init__(self, directorio: str, formato: str = "pstats", muestreo: Optional[int] = None,
+                 max_perfiles: int = 50):
+        """
+        Args:
+            directorio: Directorio donde se guardan los perfiles
+            formato: Formato por defecto ("pstats" o "collapsed")
+            muestreo: Perfilar 1 de cada N peticiones (None para solo bajo demanda)
+            max_perfiles: Número de perfiles que se conservan; se borran los más antiguos
+        """
+        if formato not in FORMATOS_PERFIL:
+            raise ValueError(f"Formato de perfil desconocido: {formato}")
+        self.directorio = directorio
+        self.formato = formato
+        self.muestreo = muestreo
+        self.max_perfiles = max_perfiles
+        self._contador = itertools.count(1)
+        self._en_curso = threading.Lock()
+
+    def configurar_muestreo(self, muestreo: Optional[int]) -> None:
+        """Activa el muestreo de 1 de cada `muestreo` peticiones, o lo desactiva con None."""
+        self.muestreo = muestreo
+        self._contador = itertools.count(1)
+
+    def toca_muestreo(self) -> bool:
+        """Indica si la petición actual cae en el muestreo."""
+        muestreo = self.muestreo
+        return muestreo is not None and next(self._contador) % muestreo == 0
+
+    def nombre_perfil(self, metodo: str, ruta: str, formato: str) -> str:
+        """Construye el nombre de fichero de un perfil: fecha, método y ruta."""
+        ruta_segura = re.sub(r"[^\w-]+", "_", ruta).strip("_") or "raiz"
+        momento = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        return f"{momento}_{metodo}_{ruta_segura}{FORMATOS_PERFIL[formato]}"
+
+    def iniciar(self, formato: str) -> Optional[_PerfilPeticion]:
+        """
+        Empieza a perfilar el hilo actual.
+
+        Otros hilos se añaden al perfil con `_PerfilPeticion.entrar` (ver
+        `perfilar_en_hilo`).
+
+        Returns:
+            Perfil a pasar a `terminar`, o None si ya hay otra petición perfilándose
+        """
+        if not self._en_curso.acquire(blocking=False):
+            return None
+        return _PerfilPeticion(formato)
+
+    def terminar(self, perfil: _PerfilPeticion, nombre: str) -> None:
+        """Detiene el perfil, lo guarda como `nombre` y elimina los perfiles sobrantes."""
+        try:
+            perfil.detener()
+            os.makedirs(self.directorio, exist_ok=True)
+            perfil.escribir(os.path.join(self.directorio, nombre))
+        finally:
+            self._en_curso.release()
+        self._limpiar()
+
+    def _limpiar(self) -> None:
+        """Borra los perfiles más antiguos por encima de max_perfiles."""
+        for perfil in self.listar()[self.max_perfiles:]:
+            try:
+                os.remove(os.path.join(self.directorio, perfil.nombre))
+            except OSError:
+                pass
+
+    def listar(self) -> List[Perfil]:
+        """Lista los perfiles guardados, del más reciente al más antiguo."""
+        if not os.path.isdir(self.directorio):
+            return []
+        perfiles = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.is_file() and PATRON_NOMBRE_PERFIL.match(entrada.name):
+                estado = entrada.stat()
+                perfiles.append(Perfil(
+                    nombre=entrada.name,
+                    tamano=estado.st_size,
+                    fecha=datetime.fromtimestamp(estado.st_mtime)
+                ))
+        return sorted(perfiles, key=lambda perfil: perfil.nombre, reverse=True)
+
+    def ruta(self, nombre: str) -> Optional[str]:
+        """Ruta de un perfil guardado, o None si el nombre no es válido o no existe."""
+        if not PATRON_NOMBRE_PERFIL.match(nombre):
+            return None
+        ruta = os.path.join(self.directorio, nombre)
+        return ruta if os.path.isfile(ruta) else None
+
+
+class MiddlewarePerfilado:
+    """
+    Middleware ASGI que perfila las peticiones seleccionadas.
+
+    La cabecera `X-Perfilar` debe contener el token de administración; con
+    `X-Perfilar-Formato` se puede elegir el formato. La respuesta perfilada
+    incluye la cabecera `X-Perfil` con el nombre del fichero generado.
+
+    Perfila el hilo del bucle de eventos; los handlers síncronos solo se
+    perfilan si su ruta es una `RutaPerfilada`.
+    """
+
+    def __init__(self, app, perfilador: Perfilador, token: Optional[str] = None):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            perfilador: Perfilador que decide y guarda los perfiles
+            token: Token de administración que autoriza la cabecera `X-Perfilar`
+        """
+        self.app = app
+        self.perfilador = perfilador
+        self.token = token
+
+    def _formato_solicitado(self, scope) -> Optional[str]:
+        """Formato del perfil si la petición debe perfilarse, None si no."""
+        cabeceras = dict(scope.get("headers", []))
+        solicitado = cabeceras.get(b"x-perfilar")
+        if solicitado is not None and self.token and hmac.compare_digest(solicitado, self.token.encode()):
+            formato = cabeceras.get(b"x-perfilar-formato", b"").decode("latin-1")
+            return formato if formato in FORMATOS_PERFIL else self.perfilador.formato
+        if self.perfilador.toca_muestreo():
+            return self.perfilador.formato
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        formato = self._formato_solicitado(scope)
+        perfil = self.perfilador.iniciar(formato) if formato else None
+        if perfil is None:
+            await self.app(scope, receive, send)
+            return
+
+        nombre = self.perfilador.nombre_perfil(scope["method"], scope["path"], formato)
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                mensaje = {**mensaje, "headers": [*mensaje.get("headers", []),
+                                                  (b"x-perfil", nombre.encode("latin-1"))]}
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        contexto = _perfil_peticion.set(perfil)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _perfil_peticion.reset(contexto)
+            self.perfilador.terminar(perfil, nombre)
+            logger.info(f"Perfil guardado: {nombre} ({(time.perf_counter() - inicio) * 1000:.1f} ms)")
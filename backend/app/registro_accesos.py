@@ -0,0 +1,189 @@
+"""
+Log de accesos HTTP estructurado y sin bloquear el bucle de eventos.
+
+Cada petición produce una línea JSON con el método, la plantilla de la ruta
+(p. ej. `/api/empleados/{id}`), el código de estado, la latencia y las
+consultas SQL ejecutadas. El middleware solo construye el registro y lo
+encola; un `QueueListener` en un hilo propio lo formatea y lo escribe. La
+cola es acotada: si el escritor no da abasto, los registros se descartan y
+se cuentan en lugar de frenar las peticiones.
+
+Las peticiones con éxito (código < 400) se pueden muestrear; los errores se
+registran siempre.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.instrumentacion_sql import estadisticas_actuales
+
+# Nombre del logger de accesos (también el campo "logger" de cada línea)
+NOMBRE_LOGGER = "app.accesos"
+
+# Registros que caben en la cola antes de empezar a descartar
+TAMANO_COLA = 10_000
+
+
+class FormateadorJSON(logging.Formatter):
+    """
+    Formatea cada registro como un objeto JSON en una línea.
+
+    Si el mensaje del registro es un diccionario, sus claves se incluyen como
+    campos; si no, el texto va en el campo `mensaje`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+        }
+        if isinstance(record.msg, dict):
+            datos.update(record.msg)
+        else:
+            datos["mensaje"] = record.getMessage()
+        if record.exc_info:
+            datos["excepcion"] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class _ManejadorCola(QueueHandler):
+    """
+    QueueHandler que encola el registro tal cual y descarta si la cola está llena.
+
+    El QueueHandler estándar formatea el mensaje antes de encolarlo (en el
+    hilo de la petición) y, con la cola llena, informa del error por stderr.
+    """
+
+    def __init__(self, cola: queue.Queue):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class RegistroAccesos:
+    """
+    Escritor en segundo plano de las líneas del log de accesos.
+
+    El hilo escritor se inicia en el arranque de la aplicación, o en el primer
+    registro si la aplicación se usa sin lifespan, y se detiene vaciando la
+    cola al apagarla.
+    """
+
+    def __init__(self, muestreo: float = 1.0, manejador: Optional[logging.Handler] = None,
+                 tamano_cola: int = TAMANO_COLA):
+        """
+        Args:
+            muestreo: Fracción de peticiones con éxito que se registran (0 a 1)
+            manejador: Destino de las líneas (por defecto, stderr); se le asigna el formato JSON
+            tamano_cola: Registros pendientes de escribir a partir de los que se descarta
+
+        Raises:
+            ValueError: Si el muestreo no está entre 0 y 1
+        """
+        if not 0 <= muestreo <= 1:
+            raise ValueError(f"El muestreo debe estar entre 0 y 1: {muestreo}")
+        self.muestreo = muestreo
+        self.manejador = manejador or logging.StreamHandler(sys.stderr)
+        self.manejador.setFormatter(FormateadorJSON())
+        self._cola: queue.Queue = queue.Queue(tamano_cola)
+        self._manejador_cola = _ManejadorCola(self._cola)
+        # Logger propio, fuera de la jerarquía: cada aplicación escribe en su destino
+        self._logger = logging.Logger(NOMBRE_LOGGER, logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(self._manejador_cola)
+        self._listener: Optional[QueueListener] = None
+        self._lock = threading.Lock()
+
+    @property
+    def descartados(self) -> int:
+        """Registros descartados por tener la cola llena."""
+        return self._manejador_cola.descartados
+
+    def iniciar(self) -> None:
+        """Inicia el hilo escritor si no está en marcha."""
+        with self._lock:
+            if self._listener is None:
+                self._listener = QueueListener(self._cola, self.manejador)
+                self._listener.start()
+
+    def detener(self) -> None:
+        """Escribe los registros pendientes y detiene el hilo escritor."""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+        self.manejador.flush()
+
+    def debe_registrar(self, estado: int) -> bool:
+        """Indica si se registra una petición con este código de estado según el muestreo."""
+        return estado >= 400 or self.muestreo >= 1 or random.random() < self.muestreo
+
+    def registrar(self, datos: dict) -> None:
+        """Encola una línea del log de accesos."""
+        if self._listener is None:
+            self.iniciar()
+        self._logger.info(datos)
+
+
+class MiddlewareAccesos:
+    """
+    Middleware ASGI que escribe una línea en el log de accesos por petición.
+
+    Debe quedar dentro de `MiddlewareServerTiming` para conocer el número de
+    consultas SQL de la petición.
+    """
+
+    def __init__(self, app, registro: RegistroAccesos):
+        """
+        Args:
+            app: Aplicación ASGI envuelta
+            registro: Escritor del log de accesos
+        """
+        self.app = app
+        self.registro = registro
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = {"codigo": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["codigo"] = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if self.registro.debe_registrar(estado["codigo"]):
+                duracion = time.perf_counter() - inicio
+                estadisticas = estadisticas_actuales()
+                self.registro.registrar({
+                    "metodo": scope["method"],
+                    "ruta": getattr(scope.get("route"), "path", None),
+                    "path": scope["path"],
+                    "estado": estado["codigo"],
+                    "duracion_ms": round(duracion * 1000, 2),
+                    "consultas": estadisticas.consultas if estadisticas else None,
+                    "db_ms": round(estadisticas.duracion_db * 1000, 2) if estadisticas else None,
+                    "muestreo": 1.0 if estado["codigo"] >= 400 else self.registro.muestreo,
+                })
@@ -1,20 +1,50 @@
 """
 Capa de acceso a datos para el sistema de gestión de salón de peluquería.
 """
+import re
+import unicodedata
 from abc import ABC, abstractmethod
-from typing import Optional, List
-from sqlalchemy import create_engine
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, Optional, List, Iterator, Sequence, Tuple
+from sqlalchemy import (
+    func, Date, Integer, Table, cast, case, delete, insert, select, text, union_all, update
+)
+from sqlalchemy.sql import FromClause
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
-from app.models import Empleado, TipoServicio, ServicioRegistrado
-from app.orm_models import Base, EmpleadoORM, TipoServicioORM, ServicioORM
+from app.models import (
+    Empleado, TipoServicio, ServicioRegistrado, PuntoSerie, PosicionRanking, AjusteComision,
+    Cambio, PaginaCambios
+)
+from app.orm_models import Base, EmpleadoORM, TipoServicioORM, ServicioORM, CambioORM
+from app.busqueda import crear_indices_busqueda, expresion_busqueda, reconstruir_indices_busqueda
+from app.cambios import crear_registro_cambios, crear_registro_cambios_particion, sin_registro_cambios
+from app.database import (
+    crear_engine, crear_engine_lectura, ConfiguracionSQLite, PoliticaReintentos, es_error_de_bloqueo,
+    reintentar_si_bloqueada
+)
 from app.errors import PersistenceError
+from app.metricas import medir_metodos
+from app.particiones import (
+    TABLA_SERVICIOS, AniosArchivados, nombre_particion, tabla_para_fecha, tabla_particion, tablas_para_rango
+)
 
 
 class DataRepository(ABC):
     """Interfaz abstracta para el repositorio de datos."""
     
+    def lectura(self):
+        """
+        Agrupa varias lecturas en una misma instantánea de los datos.
+        
+        Las implementaciones sin transacciones de lectura no necesitan redefinirlo.
+        """
+        return nullcontext()
+    
     @abstractmethod
     def guardar_empleado(self, empleado: Empleado) -> None:
         """Guarda un empleado en el repositorio."""
@@ -60,30 +90,259 @@ class DataRepository(ABC):
         """Guarda un servicio registrado en el repositorio."""
         pass
     
+    def guardar_servicios(self, servicios: List[ServicioRegistrado]) -> None:
+        """
+        Guarda varios servicios nuevos.
+        
+        Las implementaciones transaccionales deben guardarlos en una única
+        transacción (todos o ninguno).
+        """
+        for servicio in servicios:
+            self.guardar_servicio(servicio)
+    
     @abstractmethod
-    def listar_servicios(self) -> List[ServicioRegistrado]:
-        """Lista todos los servicios registrados."""
+    def listar_servicios(self, empleado_id: Optional[str] = None,
+                         fecha_inicio: Optional[date] = None,
+                         fecha_fin: Optional[date] = None) -> List[ServicioRegistrado]:
+        """Lista los servicios registrados, con filtros opcionales por empleado y fechas."""
         pass
     
     @abstractmethod
     def eliminar_servicio(self, id: str) -> None:
         """Elimina un servicio del repositorio."""
         pass
+    
+    def proyectar_empleados(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los empleados con solo los campos indicados.
+        
+        Las implementaciones con SQL deben leer solo esas columnas.
+        """
+        return [{campo: getattr(empleado, campo) for campo in campos} for empleado in self.listar_empleados()]
+    
+    def proyectar_tipos_servicios(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los tipos de servicio con solo los campos indicados.
+        
+        Las implementaciones con SQL deben leer solo esas columnas.
+        """
+        return [{campo: getattr(tipo, campo) for campo in campos} for tipo in self.listar_tipos_servicios()]
+    
+    def buscar_empleados(self, texto: str, limite: int) -> List[Empleado]:
+        """
+        Busca empleados cuyo nombre o ID contenga palabras que empiecen por las del texto.
+        
+        Las implementaciones con SQL deben usar un índice de texto completo.
+        """
+        return [
+            empleado for empleado in self.listar_empleados()
+            if coincide_prefijos(texto, empleado.nombre, empleado.id)
+        ][:limite]
+    
+    def buscar_tipos_servicios(self, texto: str, limite: int) -> List[TipoServicio]:
+        """
+        Busca tipos de servicio cuyo nombre o descripción contenga palabras que empiecen por las del texto.
+        
+        Las implementaciones con SQL deben usar un índice de texto completo.
+        """
+        return [
+            tipo for tipo in self.listar_tipos_servicios()
+            if coincide_prefijos(texto, tipo.nombre, tipo.descripcion)
+        ][:limite]
+    
+    def proyectar_servicios(self, campos: Sequence[str], empleado_id: Optional[str] = None,
+                            fecha_inicio: Optional[date] = None,
+                            fecha_fin: Optional[date] = None) -> List[dict]:
+        """
+        Lista los servicios filtrados con solo los campos indicados, por fecha descendente.
+        
+        Las implementaciones con SQL deben leer solo esas columnas.
+        """
+        servicios = self.listar_servicios(empleado_id, fecha_inicio, fecha_fin)
+        servicios.sort(key=lambda servicio: servicio.fecha, reverse=True)
+        return [{campo: getattr(servicio, campo) for campo in campos} for servicio in servicios]
+    
+    @abstractmethod
+    def agregar_servicios_por_periodo(self, granularidad: str,
+                                      fecha_inicio: Optional[date] = None,
+                                      fecha_fin: Optional[date] = None) -> List[PuntoSerie]:
+        """Agrega ingresos, comisiones y cantidad de servicios por período."""
+        pass
+    
+    @abstractmethod
+    def ranking_servicios(self, por: str, metrica: str, limite: int,
+                          fecha_inicio: Optional[date] = None,
+                          fecha_fin: Optional[date] = None) -> List[PosicionRanking]:
+        """Obtiene los primeros empleados o tipos de servicio según una métrica."""
+        pass
+    
+    @abstractmethod
+    def recalcular_comisiones(self, tipo_servicio: str, porcentaje_comision: float,
+                              fecha_inicio: date, fecha_fin: date,
+                              simular: bool = False) -> List[AjusteComision]:
+        """Recalcula la comisión de los servicios de un tipo en un rango de fechas."""
+        pass
+    
+    @abstractmethod
+    def listar_cambios(self, desde: int, limite: int) -> PaginaCambios:
+        """Obtiene los cambios del log posteriores a una secuencia."""
+        pass
+    
+    @abstractmethod
+    def compactar_cambios(self, antes: datetime) -> int:
+        """Elimina las entradas del log de cambios anteriores a un momento (UTC)."""
+        pass
+    
+    @abstractmethod
+    def archivar_servicios(self, hasta_anio: int) -> Dict[int, int]:
+        """Mueve los servicios de los años hasta `hasta_anio` (inclusive) a sus particiones anuales."""
+        pass
+
+
+def _palabras_normalizadas(texto: str) -> List[str]:
+    """Palabras de un texto en minúsculas y sin tildes."""
+    sin_tildes = "".join(
+        caracter for caracter in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(caracter)
+    )
+    return re.findall(r"\w+", sin_tildes.lower())
+
+
+def coincide_prefijos(texto: str, *campos: str) -> bool:
+    """
+    Indica si cada palabra del texto es prefijo de alguna palabra de los campos.
+    
+    Misma semántica que la búsqueda FTS5 (ver app.busqueda), sin índice.
+    """
+    palabras_campos = [palabra for campo in campos for palabra in _palabras_normalizadas(campo)]
+    palabras = _palabras_normalizadas(texto)
+    return bool(palabras) and all(
+        any(candidata.startswith(palabra) for candidata in palabras_campos) for palabra in palabras
+    )
+
+
+# Expresiones SQL que normalizan la fecha de un servicio al inicio de su período.
+# Las semanas empiezan en lunes: 'weekday 0' avanza al domingo y se retroceden 6 días.
+PERIODOS_SERIE = {
+    "dia": lambda fecha: fecha,
+    "semana": lambda fecha: func.date(fecha, "weekday 0", "-6 days", type_=Date),
+    "mes": lambda fecha: func.date(fecha, "start of month", type_=Date),
+}
+
+# Tablas del log de cambios: modelo ORM, clave primaria y modelo de dominio
+MODELOS_CAMBIOS = {
+    "empleados": (EmpleadoORM, EmpleadoORM.id, Empleado),
+    "tipos_servicios": (TipoServicioORM, TipoServicioORM.nombre, TipoServicio),
+    "servicios": (ServicioORM, ServicioORM.id, ServicioRegistrado),
+}
+
+# Búsquedas FTS5: bm25 con más peso para el nombre; a igual relevancia, por nombre
+BUSQUEDA_EMPLEADOS = """
+    SELECT empleados.* FROM empleados_fts
+    JOIN empleados ON empleados.rowid = empleados_fts.rowid
+    WHERE empleados_fts MATCH :expresion
+    ORDER BY bm25(empleados_fts, 1.0, 10.0), empleados.nombre
+    LIMIT :limite
+"""
+BUSQUEDA_TIPOS_SERVICIOS = """
+    SELECT tipos_servicios.* FROM tipos_servicios_fts
+    JOIN tipos_servicios ON tipos_servicios.rowid = tipos_servicios_fts.rowid
+    WHERE tipos_servicios_fts MATCH :expresion
+    ORDER BY bm25(tipos_servicios_fts, 10.0, 1.0), tipos_servicios.nombre
+    LIMIT :limite
+"""
+
+# Columnas que se pueden proyectar en los listados (`?fields=`), por modelo.
+COLUMNAS_PROYECTABLES = {
+    modelo: {columna.key: getattr(modelo, columna.key) for columna in modelo.__table__.columns}
+    for modelo in (EmpleadoORM, TipoServicioORM, ServicioORM)
+}
+
+# Columnas de servicios por las que se puede agrupar un ranking.
+AGRUPACIONES_RANKING = {
+    "empleado": "empleado_id",
+    "tipo_servicio": "tipo_servicio",
+}
+
+
+
+def comision_en_centimos(precio_en_centimos, porcentaje_comision: float):
+    """
+    Construye la expresión SQL de la comisión en céntimos para un porcentaje.
+    
+    Reproduce en aritmética entera el cálculo de SalonManager.registrar_servicio
+    (precio * porcentaje / 100 redondeado a 2 decimales con redondeo bancario),
+    de modo que el resultado coincide exactamente con el calculado en Python.
+    
+    Args:
+        precio_en_centimos: Expresión SQL entera con el precio en céntimos
+        porcentaje_comision: Porcentaje de comisión (0-100)
+        
+    Returns:
+        Expresión SQL entera con la comisión en céntimos
+    """
+    porcentaje = Decimal(str(porcentaje_comision))
+    decimales = max(0, -porcentaje.as_tuple().exponent)
+    factor = int(porcentaje.scaleb(decimales))
+    divisor = 100 * 10 ** decimales
+    
+    producto = precio_en_centimos * factor
+    cociente = producto // divisor
+    resto = producto % divisor
+    return cociente + case(
+        (resto * 2 > divisor, 1),
+        (resto * 2 == divisor, cociente % 2),
+        else_=0
+    )
+
+
+def filtro_empleado(empleado_id: Optional[str]) -> Callable[[Table], Sequence]:
+    """Condiciones de SQLAlchemyRepository._servicios para filtrar por empleado (ninguna si es None)."""
+    return lambda tabla: () if empleado_id is None else (tabla.c.empleado_id == empleado_id,)
 
 
+# Sesión de lectura activa del bloque `lectura()` en curso, junto a su repositorio
+_lectura_actual: ContextVar[Optional[Tuple["SQLAlchemyRepository", Session]]] = ContextVar(
+    "lectura_actual", default=None
+)
+
+
+@medir_metodos(excluir=("get_session", "get_read_session", "lectura", "cerrar"))
 class SQLAlchemyRepository(DataRepository):
-    """Implementación del repositorio usando SQLAlchemy."""
+    """
+    Implementación del repositorio usando SQLAlchemy.
+    
+    La duración y los errores de cada método de acceso a datos se registran
+    en las métricas `salon_repositorio_*` (ver app.metricas).
+    """
     
-    def __init__(self, database_url: str = "sqlite:///salon.db"):
+    def __init__(self, database_url: str = "sqlite:///salon.db", crear_esquema: bool = True,
+                 reintentos: PoliticaReintentos = PoliticaReintentos(),
+                 configuracion_sqlite: ConfiguracionSQLite = ConfiguracionSQLite()):
         """
         Inicializa el repositorio con la URL de la base de datos.
         
         Args:
             database_url: URL de conexión a la base de datos
+            crear_esquema: Si es True crea las tablas que falten con `create_all`,
+                los índices de búsqueda y los triggers del log de cambios;
+                False cuando el esquema lo gestionan las migraciones de Alembic
+            reintentos: Política de reintentos de las escrituras ante bloqueos de SQLite
+            configuracion_sqlite: Modo de diario y de sincronización de SQLite
         """
-        self.engine = create_engine(database_url)
-        Base.metadata.create_all(self.engine)
+        self.reintentos = reintentos
+        self.engine = crear_engine(database_url, configuracion_sqlite)
+        if crear_esquema:
+            Base.metadata.create_all(self.engine)
+            if self.engine.dialect.name == "sqlite":
+                with self.engine.begin() as conexion:
+                    crear_indices_busqueda(conexion)
+                    crear_registro_cambios(conexion)
         self.SessionLocal = sessionmaker(bind=self.engine)
+        # Engine de solo lectura con su propio pool para reportes y listados
+        self.read_engine = crear_engine_lectura(database_url, self.engine)
+        self.SessionLectura = sessionmaker(bind=self.read_engine)
+        # Años con partición de servicios (ver app.particiones)
+        self.archivados = AniosArchivados()
     
     def get_session(self) -> Session:
         """
@@ -94,6 +353,80 @@ class SQLAlchemyRepository(DataRepository):
         """
         return self.SessionLocal()
     
+    def get_read_session(self) -> Session:
+        """
+        Obtiene una sesión del engine de solo lectura.
+        
+        Dentro de un bloque `lectura()` devuelve la sesión de ese bloque, de
+        modo que todas las consultas leen la misma instantánea.
+        
+        Returns:
+            Session: Sesión de SQLAlchemy de solo lectura
+        """
+        actual = _lectura_actual.get()
+        if actual is not None and actual[0] is self:
+            return actual[1]
+        return self.SessionLectura()
+    
+    def _cerrar_sesion_lectura(self, session: Session) -> None:
+        """Cierra una sesión de lectura salvo que pertenezca a un bloque `lectura()` activo."""
+        actual = _lectura_actual.get()
+        if actual is None or actual[1] is not session:
+            session.close()
+    
+    @contextmanager
+    def lectura(self) -> Iterator[None]:
+        """
+        Ejecuta las lecturas del bloque en una única transacción de solo lectura.
+        
+        Todas las cifras de un reporte calculadas dentro del bloque provienen
+        de la misma instantánea, aunque se registren servicios entre consultas.
+        Los bloques anidados reutilizan la transacción exterior.
+        """
+        actual = _lectura_actual.get()
+        if actual is not None and actual[0] is self:
+            yield
+            return
+        
+        session = self.SessionLectura()
+        token = _lectura_actual.set((self, session))
+        try:
+            yield
+        finally:
+            _lectura_actual.reset(token)
+            session.close()
+    
+    def vacuum(self) -> None:
+        """
+        Reconstruye el fichero de la base de datos (VACUUM) y después los índices de búsqueda.
+        
+        VACUUM puede renumerar los rowid de empleados y tipos_servicios, a
+        los que apuntan los índices FTS5 de contenido externo (ver
+        app.busqueda); hasta que termina la reconstrucción, las búsquedas
+        pueden no encontrar algunas filas.
+        
+        Raises:
+            PersistenceError: Si ocurre un error al compactar o reconstruir
+        """
+        try:
+            # VACUUM no se puede ejecutar dentro de una transacción
+            with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+                conexion.exec_driver_sql("VACUUM")
+            with self.engine.begin() as conexion:
+                reconstruir_indices_busqueda(conexion)
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al compactar la base de datos: {str(e)}",
+                context="vacuum"
+            )
+    
+    def cerrar(self) -> None:
+        """Cierra todas las conexiones de los pools de los engines."""
+        self.engine.dispose()
+        if self.read_engine is not self.engine:
+            self.read_engine.dispose()
+    
+    @reintentar_si_bloqueada
     def guardar_empleado(self, empleado: Empleado) -> None:
         """
         Guarda un empleado en la base de datos.
@@ -123,6 +456,8 @@ class SQLAlchemyRepository(DataRepository):
             session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al guardar empleado: {str(e)}",
                 context="guardar_empleado"
@@ -143,7 +478,7 @@ class SQLAlchemyRepository(DataRepository):
         Raises:
             PersistenceError: Si ocurre un error al consultar
         """
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             orm_empleado = session.query(EmpleadoORM).filter_by(id=id).first()
             
@@ -156,7 +491,7 @@ class SQLAlchemyRepository(DataRepository):
                 context="obtener_empleado"
             )
         finally:
-            session.close()
+            self._cerrar_sesion_lectura(session)
     
     def listar_empleados(self) -> List[Empleado]:
         """
@@ -168,7 +503,7 @@ class SQLAlchemyRepository(DataRepository):
         Raises:
             PersistenceError: Si ocurre un error al consultar
         """
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             orm_empleados = session.query(EmpleadoORM).all()
             return [Empleado.from_orm(orm_emp) for orm_emp in orm_empleados]
@@ -178,8 +513,9 @@ class SQLAlchemyRepository(DataRepository):
                 context="listar_empleados"
             )
         finally:
-            session.close()
+            self._cerrar_sesion_lectura(session)
     
+    @reintentar_si_bloqueada
     def eliminar_empleado(self, id: str) -> None:
         """
         Elimina un empleado de la base de datos.
@@ -199,6 +535,8 @@ class SQLAlchemyRepository(DataRepository):
                 session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al eliminar empleado: {str(e)}",
                 context="eliminar_empleado"
@@ -206,6 +544,7 @@ class SQLAlchemyRepository(DataRepository):
         finally:
             session.close()
     
+    @reintentar_si_bloqueada
     def guardar_tipo_servicio(self, tipo: TipoServicio) -> None:
         """
         Guarda un tipo de servicio en la base de datos.
@@ -225,18 +564,22 @@ class SQLAlchemyRepository(DataRepository):
                 # Actualizar
                 existing.descripcion = tipo.descripcion
                 existing.porcentaje_comision = tipo.porcentaje_comision
+                existing.precio_por_defecto = tipo.precio_por_defecto
             else:
                 # Crear nuevo
                 orm_tipo = TipoServicioORM(
                     nombre=tipo.nombre,
                     descripcion=tipo.descripcion,
-                    porcentaje_comision=tipo.porcentaje_comision
+                    porcentaje_comision=tipo.porcentaje_comision,
+                    precio_por_defecto=tipo.precio_por_defecto
                 )
                 session.add(orm_tipo)
             
             session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al guardar tipo de servicio: {str(e)}",
                 context="guardar_tipo_servicio"
@@ -257,7 +600,7 @@ class SQLAlchemyRepository(DataRepository):
         Raises:
             PersistenceError: Si ocurre un error al consultar
         """
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             orm_tipo = session.query(TipoServicioORM).filter_by(nombre=nombre).first()
             
@@ -270,7 +613,7 @@ class SQLAlchemyRepository(DataRepository):
                 context="obtener_tipo_servicio"
             )
         finally:
-            session.close()
+            self._cerrar_sesion_lectura(session)
     
     def listar_tipos_servicios(self) -> List[TipoServicio]:
         """
@@ -282,7 +625,7 @@ class SQLAlchemyRepository(DataRepository):
         Raises:
             PersistenceError: Si ocurre un error al consultar
         """
-        session = self.get_session()
+        session = self.get_read_session()
         try:
             orm_tipos = session.query(TipoServicioORM).all()
             return [TipoServicio.from_orm(orm_tipo) for orm_tipo in orm_tipos]
@@ -292,8 +635,9 @@ class SQLAlchemyRepository(DataRepository):
                 context="listar_tipos_servicios"
             )
         finally:
-            session.close()
+            self._cerrar_sesion_lectura(session)
     
+    @reintentar_si_bloqueada
     def eliminar_tipo_servicio(self, nombre: str) -> None:
         """
         Elimina un tipo de servicio de la base de datos.
@@ -313,6 +657,8 @@ class SQLAlchemyRepository(DataRepository):
                 session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al eliminar tipo de servicio: {str(e)}",
                 context="eliminar_tipo_servicio"
@@ -320,10 +666,61 @@ class SQLAlchemyRepository(DataRepository):
         finally:
             session.close()
     
+    def _servicios(self, session: Session, fecha_inicio: Optional[date] = None,
+                   fecha_fin: Optional[date] = None,
+                   condiciones: Callable[[Table], Sequence] = lambda tabla: ()) -> Tuple[FromClause, list]:
+        """
+        Origen de una consulta de servicios: solo las tablas que se solapan con el rango.
+        
+        Con una sola tabla (el caso del período actual) se consulta
+        directamente, con los mismos planes que sin particiones. Con varias,
+        se unen con UNION ALL aplicando los filtros dentro de cada rama, de
+        modo que cada tabla usa sus propios índices.
+        
+        Args:
+            session: Sesión en la que se consulta (las particiones de su instantánea)
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+            condiciones: Filtros adicionales sobre las columnas de una tabla de servicios
+            
+        Returns:
+            Tupla (origen, filtros) con el FROM de la consulta y los filtros a aplicar sobre él
+        """
+        def filtros(tabla: Table) -> list:
+            resultado = list(condiciones(tabla))
+            if fecha_inicio is not None:
+                resultado.append(tabla.c.fecha >= fecha_inicio)
+            if fecha_fin is not None:
+                resultado.append(tabla.c.fecha <= fecha_fin)
+            return resultado
+        
+        tablas = tablas_para_rango(self.archivados.obtener(session), fecha_inicio, fecha_fin)
+        if len(tablas) == 1:
+            return tablas[0], filtros(tablas[0])
+        ramas = [select(*tabla.c).where(*filtros(tabla)) for tabla in tablas]
+        return union_all(*ramas).subquery("servicios_particiones"), []
+    
+    @staticmethod
+    def _valores_servicio(servicio: ServicioRegistrado) -> dict:
+        """Columnas de un servicio para INSERT/UPDATE."""
+        return {
+            "id": servicio.id,
+            "fecha": servicio.fecha,
+            "empleado_id": servicio.empleado_id,
+            "tipo_servicio": servicio.tipo_servicio,
+            "precio": servicio.precio,
+            "comision_calculada": servicio.comision_calculada,
+        }
+    
+    @reintentar_si_bloqueada
     def guardar_servicio(self, servicio: ServicioRegistrado) -> None:
         """
         Guarda un servicio registrado en la base de datos.
         
+        Se guarda en la partición de su año si está archivado, y en la tabla
+        principal si no. Si ya existía en otra tabla (cambió de año), se
+        elimina de ella.
+        
         Args:
             servicio: Servicio a guardar
             
@@ -332,31 +729,32 @@ class SQLAlchemyRepository(DataRepository):
         """
         session = self.get_session()
         try:
-            # Verificar si ya existe
-            existing = session.query(ServicioORM).filter_by(id=servicio.id).first()
+            archivados = self.archivados.obtener(session)
+            destino = tabla_para_fecha(archivados, servicio.fecha)
+            valores = self._valores_servicio(servicio)
             
-            if existing:
-                # Actualizar
-                existing.fecha = servicio.fecha
-                existing.empleado_id = servicio.empleado_id
-                existing.tipo_servicio = servicio.tipo_servicio
-                existing.precio = servicio.precio
-                existing.comision_calculada = servicio.comision_calculada
-            else:
-                # Crear nuevo
-                orm_servicio = ServicioORM(
-                    id=servicio.id,
-                    fecha=servicio.fecha,
-                    empleado_id=servicio.empleado_id,
-                    tipo_servicio=servicio.tipo_servicio,
-                    precio=servicio.precio,
-                    comision_calculada=servicio.comision_calculada
-                )
-                session.add(orm_servicio)
+            # Actualizar si ya existe; si no, crear nuevo
+            actualizado = session.execute(
+                update(destino).where(destino.c.id == servicio.id).values(**valores)
+            ).rowcount
+            if not actualizado:
+                otras = [tabla for tabla in tablas_para_rango(archivados) if tabla is not destino]
+                if otras:
+                    # Una sola consulta para saber si estaba en otra tabla (cambió de año)
+                    anteriores = session.connection().exec_driver_sql(
+                        " UNION ALL ".join(f"SELECT '{tabla.name}' FROM {tabla.name} WHERE id = ?" for tabla in otras),
+                        (servicio.id,) * len(otras)
+                    ).scalars().all()
+                    for tabla in otras:
+                        if tabla.name in anteriores:
+                            session.execute(delete(tabla).where(tabla.c.id == servicio.id))
+                session.execute(insert(destino).values(**valores))
             
             session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al guardar servicio: {str(e)}",
                 context="guardar_servicio"
@@ -364,31 +762,231 @@ class SQLAlchemyRepository(DataRepository):
         finally:
             session.close()
     
-    def listar_servicios(self) -> List[ServicioRegistrado]:
+    @reintentar_si_bloqueada
+    def guardar_servicios(self, servicios: List[ServicioRegistrado]) -> None:
+        """
+        Inserta varios servicios nuevos en una única transacción.
+        
+        Usado por la escritura agrupada: un solo commit (y un solo fsync)
+        para todo el lote. Los servicios de años archivados van a su partición.
+        
+        Args:
+            servicios: Servicios a insertar (con IDs nuevos)
+            
+        Raises:
+            PersistenceError: Si ocurre un error al guardar; no se guarda ninguno
+        """
+        session = self.get_session()
+        try:
+            archivados = self.archivados.obtener(session)
+            por_tabla: Dict[Table, List[dict]] = {}
+            for servicio in servicios:
+                por_tabla.setdefault(tabla_para_fecha(archivados, servicio.fecha), []).append(
+                    self._valores_servicio(servicio)
+                )
+            for tabla, valores in por_tabla.items():
+                session.execute(insert(tabla), valores)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
+            raise PersistenceError(
+                message=f"Error al guardar servicios: {str(e)}",
+                context="guardar_servicios"
+            )
+        finally:
+            session.close()
+    
+    def listar_servicios(self, empleado_id: Optional[str] = None,
+                         fecha_inicio: Optional[date] = None,
+                         fecha_fin: Optional[date] = None) -> List[ServicioRegistrado]:
         """
-        Lista todos los servicios registrados.
+        Lista los servicios registrados, con filtros opcionales.
         
+        Los filtros se resuelven en SQL y solo se leen las particiones que
+        se solapan con el rango de fechas.
+        
+        Args:
+            empleado_id: Filtrar por ID de empleado (opcional)
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+            
         Returns:
             Lista de servicios registrados
             
         Raises:
             PersistenceError: Si ocurre un error al consultar
         """
-        session = self.get_session()
+        session = self.get_read_session()
         try:
-            orm_servicios = session.query(ServicioORM).all()
-            return [ServicioRegistrado.from_orm(orm_serv) for orm_serv in orm_servicios]
+            origen, filtros = self._servicios(session, fecha_inicio, fecha_fin, filtro_empleado(empleado_id))
+            filas = session.execute(select(origen).where(*filtros)).all()
+            return [ServicioRegistrado.from_orm(fila) for fila in filas]
         except SQLAlchemyError as e:
             raise PersistenceError(
                 message=f"Error al listar servicios: {str(e)}",
                 context="listar_servicios"
             )
         finally:
-            session.close()
+            self._cerrar_sesion_lectura(session)
     
+    def _buscar(self, modelo, consulta: str, texto: str, limite: int, contexto: str) -> list:
+        """
+        Ejecuta una búsqueda FTS5 que devuelve filas de un modelo ORM.
+        
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        expresion = expresion_busqueda(texto)
+        if expresion is None:
+            return []
+        session = self.get_read_session()
+        try:
+            return session.query(modelo).from_statement(text(consulta)).params(
+                expresion=expresion, limite=limite
+            ).all()
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al buscar en {modelo.__tablename__}: {str(e)}",
+                context=contexto
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    def buscar_empleados(self, texto: str, limite: int) -> List[Empleado]:
+        """
+        Busca empleados por prefijos de las palabras de su nombre o ID.
+        
+        Usa el índice FTS5 `empleados_fts`: no distingue mayúsculas ni tildes
+        y ordena por relevancia, pesando más el nombre que el ID.
+        
+        Args:
+            texto: Texto de búsqueda; todas sus palabras deben aparecer como prefijo
+            limite: Número máximo de resultados
+            
+        Returns:
+            Empleados encontrados, de más a menos relevante
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        filas = self._buscar(EmpleadoORM, BUSQUEDA_EMPLEADOS, texto, limite, "buscar_empleados")
+        return [Empleado.from_orm(fila) for fila in filas]
+    
+    def buscar_tipos_servicios(self, texto: str, limite: int) -> List[TipoServicio]:
+        """
+        Busca tipos de servicio por prefijos de las palabras de su nombre o descripción.
+        
+        Usa el índice FTS5 `tipos_servicios_fts`: no distingue mayúsculas ni
+        tildes y ordena por relevancia, pesando más el nombre que la descripción.
+        
+        Args:
+            texto: Texto de búsqueda; todas sus palabras deben aparecer como prefijo
+            limite: Número máximo de resultados
+            
+        Returns:
+            Tipos de servicio encontrados, de más a menos relevante
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        filas = self._buscar(TipoServicioORM, BUSQUEDA_TIPOS_SERVICIOS, texto, limite, "buscar_tipos_servicios")
+        return [TipoServicio.from_orm(fila) for fila in filas]
+    
+    def _proyectar(self, modelo, campos: Sequence[str], contexto: str,
+                   filtros: Sequence = (), orden: Sequence = ()) -> List[dict]:
+        """
+        Ejecuta un SELECT de solo las columnas indicadas de un modelo.
+        
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        columnas = [COLUMNAS_PROYECTABLES[modelo][campo] for campo in campos]
+        session = self.get_read_session()
+        try:
+            filas = session.query(*columnas).filter(*filtros).order_by(*orden).all()
+            return [dict(zip(campos, fila)) for fila in filas]
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al proyectar {modelo.__tablename__}: {str(e)}",
+                context=contexto
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    def proyectar_empleados(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los empleados leyendo solo las columnas indicadas.
+        
+        Args:
+            campos: Nombres de las columnas
+            
+        Returns:
+            Un diccionario por empleado con los campos indicados
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        return self._proyectar(EmpleadoORM, campos, "proyectar_empleados")
+    
+    def proyectar_tipos_servicios(self, campos: Sequence[str]) -> List[dict]:
+        """
+        Lista los tipos de servicio leyendo solo las columnas indicadas.
+        
+        Args:
+            campos: Nombres de las columnas
+            
+        Returns:
+            Un diccionario por tipo de servicio con los campos indicados
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        return self._proyectar(TipoServicioORM, campos, "proyectar_tipos_servicios")
+    
+    def proyectar_servicios(self, campos: Sequence[str], empleado_id: Optional[str] = None,
+                            fecha_inicio: Optional[date] = None,
+                            fecha_fin: Optional[date] = None) -> List[dict]:
+        """
+        Lista los servicios filtrados leyendo solo las columnas indicadas.
+        
+        Los filtros y el orden se resuelven en SQL, leyendo solo las
+        particiones que se solapan con el rango de fechas. Si las columnas
+        pedidas y las filtradas están en un índice cubriente (p. ej. fecha y
+        precio filtrando por empleado), la consulta no lee la tabla.
+        
+        Args:
+            campos: Nombres de las columnas
+            empleado_id: Filtrar por ID de empleado (opcional)
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+            
+        Returns:
+            Un diccionario por servicio con los campos indicados, por fecha descendente
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        session = self.get_read_session()
+        try:
+            origen, filtros = self._servicios(session, fecha_inicio, fecha_fin, filtro_empleado(empleado_id))
+            filas = session.execute(
+                select(*(origen.c[campo] for campo in campos)).where(*filtros).order_by(origen.c.fecha.desc())
+            ).all()
+            return [dict(zip(campos, fila)) for fila in filas]
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al proyectar servicios: {str(e)}",
+                context="proyectar_servicios"
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    @reintentar_si_bloqueada
     def eliminar_servicio(self, id: str) -> None:
         """
-        Elimina un servicio de la base de datos.
+        Elimina un servicio de la base de datos, esté en la tabla principal o archivado.
         
         Args:
             id: ID del servicio a eliminar
@@ -398,16 +996,417 @@ class SQLAlchemyRepository(DataRepository):
         """
         session = self.get_session()
         try:
-            orm_servicio = session.query(ServicioORM).filter_by(id=id).first()
-            
-            if orm_servicio:
-                session.delete(orm_servicio)
-                session.commit()
+            for tabla in tablas_para_rango(self.archivados.obtener(session)):
+                session.execute(delete(tabla).where(tabla.c.id == id))
+            session.commit()
         except SQLAlchemyError as e:
             session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
             raise PersistenceError(
                 message=f"Error al eliminar servicio: {str(e)}",
                 context="eliminar_servicio"
             )
         finally:
             session.close()
+    
+    def agregar_servicios_por_periodo(self, granularidad: str,
+                                      fecha_inicio: Optional[date] = None,
+                                      fecha_fin: Optional[date] = None) -> List[PuntoSerie]:
+        """
+        Agrega los servicios por período con un único GROUP BY sobre el índice de fecha.
+        
+        Solo se leen las particiones que se solapan con el rango. Solo se
+        devuelven los períodos con servicios; el relleno de huecos lo
+        realiza SalonManager.
+        
+        Args:
+            granularidad: 'dia', 'semana' o 'mes'
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+            
+        Returns:
+            Lista de puntos ordenados por período ascendente
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        session = self.get_read_session()
+        try:
+            origen, filtros = self._servicios(session, fecha_inicio, fecha_fin)
+            periodo = PERIODOS_SERIE[granularidad](origen.c.fecha).label("periodo")
+            filas = session.query(
+                periodo,
+                func.sum(origen.c.precio).label("ingresos"),
+                func.sum(origen.c.comision_calculada).label("comisiones"),
+                func.count(origen.c.id).label("cantidad")
+            ).select_from(origen).filter(*filtros).group_by(periodo).order_by(periodo).all()
+            
+            puntos = []
+            for fila in filas:
+                ingresos = fila.ingresos or Decimal("0")
+                comisiones = fila.comisiones or Decimal("0")
+                puntos.append(PuntoSerie(
+                    periodo=fila.periodo,
+                    ingresos=ingresos,
+                    comisiones=comisiones,
+                    beneficios=ingresos - comisiones,
+                    cantidad=fila.cantidad
+                ))
+            return puntos
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al agregar servicios por período: {str(e)}",
+                context="agregar_servicios_por_periodo"
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    def ranking_servicios(self, por: str, metrica: str, limite: int,
+                          fecha_inicio: Optional[date] = None,
+                          fecha_fin: Optional[date] = None) -> List[PosicionRanking]:
+        """
+        Obtiene los primeros empleados o tipos de servicio según una métrica.
+        
+        La agregación, el orden y el límite se resuelven en SQL, por lo que
+        solo se leen de la base de datos las filas del ranking (y solo de
+        las particiones que se solapan con el rango).
+        
+        Args:
+            por: 'empleado' o 'tipo_servicio'
+            metrica: 'ingresos', 'comision' o 'cantidad'
+            limite: Número máximo de posiciones
+            fecha_inicio: Filtrar desde esta fecha (opcional)
+            fecha_fin: Filtrar hasta esta fecha (opcional)
+            
+        Returns:
+            Lista de posiciones ordenadas por la métrica descendente
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        session = self.get_read_session()
+        try:
+            origen, filtros = self._servicios(session, fecha_inicio, fecha_fin)
+            columna = origen.c[AGRUPACIONES_RANKING[por]]
+            clave = columna.label("clave")
+            ingresos = func.sum(origen.c.precio).label("ingresos")
+            comisiones = func.sum(origen.c.comision_calculada).label("comisiones")
+            cantidad = func.count(origen.c.id).label("cantidad")
+            orden = {"ingresos": ingresos, "comision": comisiones, "cantidad": cantidad}[metrica]
+            
+            if por == "empleado":
+                # El nombre se resuelve en la misma consulta; los empleados
+                # eliminados conservan sus servicios y se muestran por su ID
+                nombre = func.coalesce(EmpleadoORM.nombre, columna).label("nombre")
+                query = session.query(clave, nombre, ingresos, comisiones, cantidad).select_from(origen).outerjoin(
+                    EmpleadoORM, EmpleadoORM.id == columna
+                )
+                agrupacion = (columna, EmpleadoORM.nombre)
+            else:
+                nombre = columna.label("nombre")
+                query = session.query(clave, nombre, ingresos, comisiones, cantidad).select_from(origen)
+                agrupacion = (columna,)
+            
+            filas = query.filter(*filtros).group_by(*agrupacion).order_by(orden.desc(), clave).limit(limite).all()
+            
+            return [
+                PosicionRanking(
+                    clave=fila.clave,
+                    nombre=fila.nombre,
+                    ingresos=fila.ingresos or Decimal("0"),
+                    comisiones=fila.comisiones or Decimal("0"),
+                    cantidad=fila.cantidad
+                )
+                for fila in filas
+            ]
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al calcular ranking de servicios: {str(e)}",
+                context="ranking_servicios"
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    @reintentar_si_bloqueada
+    def recalcular_comisiones(self, tipo_servicio: str, porcentaje_comision: float,
+                              fecha_inicio: date, fecha_fin: date,
+                              simular: bool = False) -> List[AjusteComision]:
+        """
+        Recalcula la comisión de los servicios de un tipo en un rango de fechas.
+        
+        El desglose por empleado y la actualización se ejecutan en una única
+        transacción: una consulta agregada calcula las diferencias y un solo
+        UPDATE por tabla (la principal o las particiones archivadas que se
+        solapan con el rango) modifica todas las filas afectadas. En modo
+        simulación no se modifica ninguna fila.
+        
+        Args:
+            tipo_servicio: Nombre del tipo de servicio
+            porcentaje_comision: Porcentaje de comisión a aplicar (0-100)
+            fecha_inicio: Recalcular desde esta fecha (inclusive)
+            fecha_fin: Recalcular hasta esta fecha (inclusive)
+            simular: Si es True solo calcula las diferencias sin actualizar
+            
+        Returns:
+            Lista de ajustes por empleado con servicios cuya comisión cambia
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar o actualizar
+        """
+        def comisiones(tabla) -> tuple:
+            """Comisión actual y recalculada en céntimos de las filas de una tabla."""
+            return (
+                cast(func.round(tabla.c.comision_calculada * 100), Integer),
+                comision_en_centimos(cast(func.round(tabla.c.precio * 100), Integer), porcentaje_comision),
+            )
+        
+        def condiciones(tabla: Table) -> tuple:
+            """Filas del tipo de servicio cuya comisión cambia."""
+            comision_actual, comision_nueva = comisiones(tabla)
+            return (tabla.c.tipo_servicio == tipo_servicio, comision_actual != comision_nueva)
+        
+        session = self.get_session()
+        try:
+            origen, filtros = self._servicios(session, fecha_inicio, fecha_fin, condiciones)
+            comision_actual, comision_nueva = comisiones(origen)
+            filas = session.query(
+                origen.c.empleado_id,
+                func.count(origen.c.id).label("servicios"),
+                func.sum(comision_actual).label("anterior"),
+                func.sum(comision_nueva).label("nueva")
+            ).select_from(origen).filter(*filtros).group_by(origen.c.empleado_id).order_by(origen.c.empleado_id).all()
+            
+            ajustes = [
+                AjusteComision(
+                    empleado_id=fila.empleado_id,
+                    servicios=fila.servicios,
+                    comision_anterior=Decimal(fila.anterior).scaleb(-2),
+                    comision_nueva=Decimal(fila.nueva).scaleb(-2)
+                )
+                for fila in filas
+            ]
+            
+            if not simular and ajustes:
+                for tabla in tablas_para_rango(self.archivados.obtener(session), fecha_inicio, fecha_fin):
+                    session.execute(
+                        update(tabla)
+                        .where(*condiciones(tabla), tabla.c.fecha >= fecha_inicio, tabla.c.fecha <= fecha_fin)
+                        .values(comision_calculada=comisiones(tabla)[1] / 100.0)
+                    )
+                session.commit()
+            
+            return ajustes
+        except SQLAlchemyError as e:
+            session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
+            raise PersistenceError(
+                message=f"Error al recalcular comisiones: {str(e)}",
+                context="recalcular_comisiones"
+            )
+        finally:
+            session.close()
+    
+    def listar_cambios(self, desde: int, limite: int) -> PaginaCambios:
+        """
+        Obtiene los cambios del log posteriores a una secuencia.
+        
+        El log, sus límites y el estado actual de las filas se leen en la
+        misma instantánea. De cada fila se devuelve solo su último cambio de
+        la página, con los datos actuales (None si ya no existe).
+        
+        Hay que resincronizar si el log ya no tiene todos los cambios
+        posteriores a `desde` (se compactaron) o si `desde` es posterior al
+        último cambio (p. ej. la base de datos se reemplazó).
+        
+        Args:
+            desde: Última secuencia aplicada por el cliente
+            limite: Número máximo de entradas del log leídas
+            
+        Returns:
+            Página de cambios
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar
+        """
+        session = self.get_read_session()
+        try:
+            ultimo = session.execute(
+                text("SELECT seq FROM sqlite_sequence WHERE name = 'cambios'")
+            ).scalar() or 0
+            primero = session.query(func.min(CambioORM.seq)).scalar()
+            # Secuencia hasta la que se compactó el log
+            horizonte = primero - 1 if primero is not None else ultimo
+            if desde < horizonte or desde > ultimo:
+                return PaginaCambios(desde=desde, hasta=ultimo, ultimo=ultimo, resincronizar=True, cambios=[])
+            
+            filas = session.query(
+                CambioORM.seq, CambioORM.tabla, CambioORM.clave, CambioORM.operacion
+            ).filter(CambioORM.seq > desde).order_by(CambioORM.seq).limit(limite).all()
+            
+            # Último cambio de cada fila, en orden de secuencia
+            ultimos = {}
+            for fila in filas:
+                ultimos.pop((fila.tabla, fila.clave), None)
+                ultimos[(fila.tabla, fila.clave)] = fila
+            
+            datos = {}
+            for tabla, (modelo, columna, dominio) in MODELOS_CAMBIOS.items():
+                claves = [
+                    clave for (tabla_cambio, clave), fila in ultimos.items()
+                    if tabla_cambio == tabla and fila.operacion != "eliminar"
+                ]
+                if not claves:
+                    continue
+                if tabla == "servicios":
+                    # Los servicios pueden estar en la tabla principal o archivados
+                    origen, filtros = self._servicios(session, condiciones=lambda t: (t.c.id.in_(claves),))
+                    filas_datos = session.execute(select(origen).where(*filtros))
+                else:
+                    filas_datos = session.query(modelo).filter(columna.in_(claves))
+                for fila_datos in filas_datos:
+                    datos[(tabla, getattr(fila_datos, columna.key))] = dominio.from_orm(fila_datos)
+            
+            return PaginaCambios(
+                desde=desde,
+                hasta=filas[-1].seq if filas else desde,
+                ultimo=ultimo,
+                resincronizar=False,
+                cambios=[
+                    Cambio(
+                        seq=fila.seq,
+                        tabla=fila.tabla,
+                        clave=fila.clave,
+                        operacion=fila.operacion,
+                        datos=datos.get((fila.tabla, fila.clave))
+                    )
+                    for fila in ultimos.values()
+                ]
+            )
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al listar cambios: {str(e)}",
+                context="listar_cambios"
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+    
+    @reintentar_si_bloqueada
+    def compactar_cambios(self, antes: datetime) -> int:
+        """
+        Elimina las entradas del log de cambios anteriores a un momento.
+        
+        Se elimina siempre un prefijo del log (hasta la última entrada
+        anterior a `antes`), de modo que la primera secuencia que queda marca
+        desde dónde el log está completo.
+        
+        Args:
+            antes: Momento en UTC (sin zona horaria)
+            
+        Returns:
+            Número de entradas eliminadas
+            
+        Raises:
+            PersistenceError: Si ocurre un error al eliminar
+        """
+        session = self.get_session()
+        try:
+            corte = session.query(func.max(CambioORM.seq)).filter(CambioORM.momento < antes).scalar()
+            eliminadas = 0
+            if corte is not None:
+                eliminadas = session.query(CambioORM).filter(
+                    CambioORM.seq <= corte
+                ).delete(synchronize_session=False)
+                session.commit()
+            return eliminadas
+        except SQLAlchemyError as e:
+            session.rollback()
+            if es_error_de_bloqueo(e):
+                raise
+            raise PersistenceError(
+                message=f"Error al compactar el log de cambios: {str(e)}",
+                context="compactar_cambios"
+            )
+        finally:
+            session.close()
+    
+    def archivar_servicios(self, hasta_anio: int) -> Dict[int, int]:
+        """
+        Mueve los servicios de los años hasta `hasta_anio` (inclusive) a sus particiones anuales.
+        
+        Cada año se archiva en su propia transacción (ver `_archivar_anio`),
+        desde el del servicio más antiguo de la tabla principal.
+        
+        Args:
+            hasta_anio: Último año que se archiva
+            
+        Returns:
+            Servicios movidos por año, solo de los años que tenían servicios en la tabla principal
+            
+        Raises:
+            PersistenceError: Si ocurre un error al consultar o mover los servicios
+        """
+        session = self.get_read_session()
+        try:
+            primera_fecha = session.execute(select(func.min(TABLA_SERVICIOS.c.fecha))).scalar()
+        except SQLAlchemyError as e:
+            raise PersistenceError(
+                message=f"Error al archivar servicios: {str(e)}",
+                context="archivar_servicios"
+            )
+        finally:
+            self._cerrar_sesion_lectura(session)
+        
+        movidos = {}
+        if primera_fecha is not None:
+            for anio in range(primera_fecha.year, hasta_anio + 1):
+                cantidad = self._archivar_anio(anio)
+                if cantidad:
+                    movidos[anio] = cantidad
+        return movidos
+    
+    @reintentar_si_bloqueada
+    def _archivar_anio(self, anio: int) -> int:
+        """
+        Mueve los servicios de un año de la tabla principal a su partición.
+        
+        En una única transacción crea la partición (si no existe), copia los
+        servicios ordenados por fecha, los elimina de la tabla principal y
+        crea los triggers del log de cambios de la partición. El movimiento
+        no se registra en el log: para los clientes los servicios no cambian.
+        Si el año no tiene servicios en la tabla principal no se crea nada.
+        
+        Returns:
+            Número de servicios movidos
+        """
+        nombre = nombre_particion(anio)
+        particion = tabla_particion(anio)
+        en_anio = (TABLA_SERVICIOS.c.fecha >= date(anio, 1, 1), TABLA_SERVICIOS.c.fecha <= date(anio, 12, 31))
+        with self.engine.connect() as conexion:
+            try:
+                # BEGIN explícito: el driver no abre la transacción antes de las sentencias DDL
+                conexion.exec_driver_sql("BEGIN IMMEDIATE")
+                particion.create(conexion, checkfirst=True)
+                with sin_registro_cambios(conexion, TABLA_SERVICIOS.name, nombre):
+                    movidos = conexion.execute(
+                        insert(particion).from_select(
+                            [columna.name for columna in TABLA_SERVICIOS.c],
+                            select(*TABLA_SERVICIOS.c).where(*en_anio).order_by(TABLA_SERVICIOS.c.fecha)
+                        )
+                    ).rowcount
+                    conexion.execute(delete(TABLA_SERVICIOS).where(*en_anio))
+                if not movidos:
+                    conexion.rollback()
+                    return 0
+                crear_registro_cambios_particion(conexion, nombre)
+                conexion.commit()
+                return movidos
+            except SQLAlchemyError as e:
+                conexion.rollback()
+                if es_error_de_bloqueo(e):
+                    raise
+                raise PersistenceError(
+                    message=f"Error al archivar los servicios de {anio}: {str(e)}",
+                    context="archivar_servicios"
+                )
@@ -2,7 +2,7 @@
 Modelos Pydantic para validación de request/response en la API REST.
 """
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Literal, Union
 from datetime import date
 from decimal import Decimal
 
@@ -113,6 +113,41 @@ class TipoServicioUpdate(BaseModel):
         return v
 
 
+class RecalculoComisionesRequest(BaseModel):
+    """Schema para recalcular las comisiones de un tipo de servicio en un rango de fechas."""
+    fecha_inicio: date = Field(..., description="Recalcular desde esta fecha (inclusive)")
+    fecha_fin: date = Field(..., description="Recalcular hasta esta fecha (inclusive)")
+    porcentaje_comision: Optional[float] = Field(
+        None, ge=0, le=100, description="Porcentaje a aplicar (por defecto, el actual del tipo)"
+    )
+    simular: bool = Field(False, description="Solo calcular las diferencias sin modificar datos")
+
+
+class AjusteComisionResponse(BaseModel):
+    """Schema para la diferencia de comisiones de un empleado."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    empleado_id: str
+    servicios: int
+    comision_anterior: Decimal
+    comision_nueva: Decimal
+    diferencia: Decimal
+
+
+class RecalculoComisionesResponse(BaseModel):
+    """Schema para respuesta del recálculo de comisiones."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    tipo_servicio: str
+    porcentaje_comision: float
+    fecha_inicio: date
+    fecha_fin: date
+    simulado: bool
+    servicios_actualizados: int
+    diferencia_total: Decimal
+    ajustes: List[AjusteComisionResponse]
+
+
 class TipoServicioResponse(BaseModel):
     """Schema para respuesta de tipo de servicio."""
     model_config = ConfigDict(from_attributes=True)
@@ -171,6 +206,31 @@ class ServicioResponse(BaseModel):
     comision_calculada: Decimal
 
 
+# ============================================================================
+# LOG DE CAMBIOS
+# ============================================================================
+
+class CambioResponse(BaseModel):
+    """Schema para el último cambio de una fila en el log de cambios."""
+    seq: int = Field(..., description="Secuencia del cambio")
+    tabla: Literal["empleados", "tipos_servicios", "servicios"] = Field(..., description="Colección modificada")
+    clave: str = Field(..., description="ID del empleado o del servicio, o nombre del tipo de servicio")
+    operacion: Literal["insertar", "actualizar", "eliminar"] = Field(..., description="Operación")
+    datos: Optional[Union[EmpleadoResponse, TipoServicioResponse, ServicioResponse]] = Field(
+        None, description="Estado actual de la fila; null si ya no existe"
+    )
+
+
+class CambiosResponse(BaseModel):
+    """Schema para respuesta del log de cambios."""
+    desde: int = Field(..., description="Secuencia pedida")
+    hasta: int = Field(..., description="Secuencia a usar como `desde` en la siguiente petición")
+    ultimo: int = Field(..., description="Última secuencia del log")
+    resincronizar: bool = Field(..., description="Si es true hay que volver a cargar las colecciones completas")
+    mas: bool = Field(..., description="Si es true quedan cambios posteriores a `hasta`")
+    cambios: List[CambioResponse]
+
+
 # ============================================================================
 # REPORTES
 # ============================================================================
@@ -209,3 +269,48 @@ class DesglosePagoResponse(BaseModel):
     empleado_nombre: str
     servicios: List[ServicioDetalle]
     total: Decimal
+
+
+class PuntoSerieResponse(BaseModel):
+    """Schema para un período de la serie temporal de ingresos."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    periodo: date = Field(..., description="Primer día del período")
+    ingresos: Decimal = Field(..., description="Total de ingresos del período")
+    comisiones: Decimal = Field(..., description="Total de comisiones del período")
+    beneficios: Decimal = Field(..., description="Beneficios del período (ingresos - comisiones)")
+    cantidad: int = Field(..., description="Número de servicios del período")
+
+
+class SerieTemporalResponse(BaseModel):
+    """Schema para respuesta de la serie temporal de ingresos."""
+    granularidad: str = Field(..., description="Granularidad de los períodos (dia, semana o mes)")
+    fecha_inicio: Optional[date] = Field(None, description="Fecha de inicio del período")
+    fecha_fin: Optional[date] = Field(None, description="Fecha de fin del período")
+    puntos: List[PuntoSerieResponse]
+
+
+class PosicionRankingResponse(BaseModel):
+    """Schema para una posición del ranking."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    clave: str = Field(..., description="ID del empleado o nombre del tipo de servicio")
+    nombre: str = Field(..., description="Nombre para mostrar")
+    ingresos: Decimal = Field(..., description="Total de ingresos")
+    comisiones: Decimal = Field(..., description="Total de comisiones")
+    cantidad: int = Field(..., description="Número de servicios")
+
+
+class RankingResponse(BaseModel):
+    """Schema para respuesta del ranking de empleados o tipos de servicio."""
+    por: str = Field(..., description="Agrupación del ranking (empleado o tipo_servicio)")
+    metrica: str = Field(..., description="Métrica de ordenación (ingresos, comision o cantidad)")
+    fecha_inicio: Optional[date] = Field(None, description="Fecha de inicio del período")
+    fecha_fin: Optional[date] = Field(None, description="Fecha de fin del período")
+    posiciones: List[PosicionRankingResponse]
+
+
+class PerfiladoConfig(BaseModel):
+    """Schema para configurar el perfilado de peticiones."""
+    muestreo: Optional[int] = Field(None, ge=1, description="Perfilar 1 de cada N peticiones (null lo desactiva)")
+    formato: Optional[Literal["pstats", "collapsed"]] = Field(None, description="Formato de perfil por defecto")
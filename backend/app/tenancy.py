@@ -0,0 +1,312 @@
+"""
+Enrutamiento multi-salón: un fichero SQLite por salón con caché LRU de repositorios.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from app.config import Settings
+from app.database import ConfiguracionSQLite, PoliticaReintentos, aplicar_migraciones
+from app.escritura_agrupada import EscrituraAgrupada
+from app.eventos import DifusorEventos
+from app.repository import SQLAlchemyRepository
+from app.manager import SalonManager
+from app.result import Result, Ok, Err
+from app.errors import ValidationError, NotFoundError
+
+
+# Identificadores de salón válidos: se usan como nombre de fichero
+PATRON_SALON_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,49}$")
+
+
+def crear_manager(settings: Settings, database_url: str, migrar: bool = False,
+                  eventos: Optional[DifusorEventos] = None) -> SalonManager:
+    """
+    Crea el repositorio y el gestor de una base de datos según la configuración.
+
+    Aplica el modo de diario y de sincronización de SQLite, el plazo de los
+    reintentos y la escritura agrupada de `settings`. Con `usar_migraciones`
+    no se ejecuta `create_all`: el esquema lo crea Alembic.
+
+    Args:
+        settings: Configuración de la aplicación
+        database_url: URL de la base de datos
+        migrar: Si es True y el esquema lo gestiona Alembic, aplica las
+            migraciones pendientes (las bases de datos de los salones no
+            las migra el despliegue)
+        eventos: Difusor de eventos del gestor (por defecto, uno propio)
+
+    Returns:
+        Gestor con la escritura agrupada ya iniciada si está habilitada
+    """
+    repositorio = SQLAlchemyRepository(
+        database_url,
+        crear_esquema=not settings.usar_migraciones,
+        reintentos=PoliticaReintentos(plazo=settings.plazo_reintentos),
+        configuracion_sqlite=ConfiguracionSQLite(settings.sqlite_journal_mode, settings.sqlite_synchronous)
+    )
+    if migrar and settings.usar_migraciones:
+        aplicar_migraciones(repositorio.engine)
+    escritura_agrupada = None
+    if settings.escritura_agrupada:
+        escritura_agrupada = EscrituraAgrupada(
+            repositorio,
+            intervalo=settings.escritura_agrupada_intervalo_ms / 1000,
+            tamano_lote=settings.escritura_agrupada_lote
+        )
+        escritura_agrupada.iniciar()
+    return SalonManager(repositorio, escritura_agrupada, eventos)
+
+
+def cerrar_manager(manager: SalonManager) -> None:
+    """Confirma las escrituras agrupadas pendientes y cierra los engines de un gestor."""
+    if manager.escritura_agrupada is not None:
+        manager.escritura_agrupada.detener()
+    manager.repository.cerrar()
+
+
+@dataclass
+class _SalonAbierto:
+    """Gestor de un salón con su último instante de uso y las peticiones que lo usan."""
+    manager: SalonManager
+    ultimo_uso: float
+    usos: int = 0
+    desalojado: bool = False
+
+
+class SalonRegistry:
+    """
+    Caché LRU acotada de gestores por salón.
+
+    Cada salón tiene su propio fichero SQLite dentro de `directorio`, de modo
+    que los datos e índices de cada salón se mantienen pequeños y las
+    escrituras de salones distintos no compiten por el mismo bloqueo de
+    escritura de SQLite. Los repositorios se abren de forma perezosa en el
+    primer acceso y se desalojan al superar `max_abiertos` o tras
+    `max_inactividad` segundos sin uso.
+
+    Cada `obtener` correcto debe ir seguido de `liberar` al terminar de usar
+    el gestor: un salón desalojado mientras alguna petición lo usa se cierra
+    cuando lo libera la última.
+
+    El difusor de eventos de cada salón es del registro y no del gestor: los
+    clientes de `GET /api/eventos` siguen suscritos aunque el salón se
+    desaloje, y reciben los servicios que confirme el gestor que lo reabre.
+    """
+
+    def __init__(self, directorio: str, max_abiertos: int = 8, max_inactividad: float = 300.0,
+                 settings: Settings = Settings(),
+                 reloj: Callable[[], float] = time.monotonic):
+        """
+        Inicializa el registro de salones.
+
+        Args:
+            directorio: Directorio con un fichero `<salon_id>.db` por salón
+            max_abiertos: Número máximo de salones con el repositorio abierto
+            max_inactividad: Segundos sin uso tras los que se cierra un salón
+            settings: Configuración con la que se abren las bases de datos de los salones
+            reloj: Fuente de tiempo (inyectable para pruebas)
+        """
+        self.directorio = directorio
+        self.max_abiertos = max_abiertos
+        self.max_inactividad = max_inactividad
+        self.settings = settings
+        self._reloj = reloj
+        self._abiertos: "OrderedDict[str, _SalonAbierto]" = OrderedDict()
+        # Salones desalojados que aún usa alguna petición
+        self._desalojados: List[_SalonAbierto] = []
+        # Difusores de eventos por salón; sobreviven al desalojo de su gestor
+        self._difusores: Dict[str, DifusorEventos] = {}
+        self._lock = threading.Lock()
+
+    def ruta_salon(self, salon_id: str) -> str:
+        """Devuelve la ruta del fichero SQLite de un salón."""
+        return os.path.join(self.directorio, f"{salon_id}.db")
+
+    @staticmethod
+    def validar_salon_id(salon_id: str) -> Result[str, ValidationError]:
+        """
+        Valida que el identificador de salón sea seguro como nombre de fichero.
+
+        Args:
+            salon_id: Identificador a validar
+
+        Returns:
+            Ok(salon_id) si es válido, Err(ValidationError) si no
+        """
+        if not PATRON_SALON_ID.match(salon_id):
+            return Err(ValidationError(
+                message=f"Identificador de salón inválido: '{salon_id}'",
+                field="salon_id"
+            ))
+        return Ok(salon_id)
+
+    def crear_salon(self, salon_id: str) -> Result[str, ValidationError]:
+        """
+        Crea (si no existe) la base de datos de un salón.
+
+        Args:
+            salon_id: Identificador del salón
+
+        Returns:
+            Ok(ruta) con la ruta del fichero, Err(ValidationError) si el ID es inválido
+        """
+        validacion = self.validar_salon_id(salon_id)
+        if isinstance(validacion, Err):
+            return validacion
+
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self.ruta_salon(salon_id)
+        cerrar_manager(self._abrir(ruta))
+        return Ok(ruta)
+
+    def _abrir(self, ruta: str, eventos: Optional[DifusorEventos] = None) -> SalonManager:
+        """Abre (creando o migrando el esquema si hace falta) la base de datos de un salón."""
+        return crear_manager(self.settings, f"sqlite:///{ruta}", migrar=True, eventos=eventos)
+
+    def _difusor(self, salon_id: str) -> DifusorEventos:
+        """Difusor de eventos de un salón, creado en su primera apertura."""
+        with self._lock:
+            return self._difusores.setdefault(salon_id, DifusorEventos())
+
+    def obtener(self, salon_id: str) -> Result[SalonManager, ValidationError | NotFoundError]:
+        """
+        Obtiene el gestor de un salón, abriendo su base de datos si hace falta.
+
+        El gestor queda en uso hasta que se llama a `liberar`.
+
+        Args:
+            salon_id: Identificador del salón
+
+        Returns:
+            Ok(SalonManager) si el salón existe, Err(error) si el ID es inválido o no existe
+        """
+        validacion = self.validar_salon_id(salon_id)
+        if isinstance(validacion, Err):
+            return validacion
+
+        manager = self._reservar(salon_id)
+        if manager is None:
+            ruta = self.ruta_salon(salon_id)
+            if not os.path.exists(ruta):
+                return Err(NotFoundError(entity="Salon", identifier=salon_id))
+
+            # Abrir fuera del lock: crear el engine y el esquema o migrar puede tardar
+            abierto = self._abrir(ruta, self._difusor(salon_id))
+            manager = self._reservar(salon_id, abierto)
+            if manager is not abierto:
+                # Otra petición abrió el mismo salón a la vez; se usa el suyo
+                cerrar_manager(abierto)
+
+        return Ok(manager)
+
+    def _reservar(self, salon_id: str, nuevo: Optional[SalonManager] = None) -> Optional[SalonManager]:
+        """
+        Marca en uso el gestor en caché de un salón, guardando antes `nuevo` si no hay ninguno.
+
+        Desaloja los salones inactivos y los que superan `max_abiertos`.
+
+        Returns:
+            El gestor en uso, o None si el salón no está en caché y no se indicó `nuevo`
+        """
+        ahora = self._reloj()
+        with self._lock:
+            desalojados = self._desalojar_inactivos(ahora)
+            abierto = self._abiertos.get(salon_id)
+            if abierto is None and nuevo is not None:
+                abierto = self._abiertos[salon_id] = _SalonAbierto(manager=nuevo, ultimo_uso=ahora)
+                while len(self._abiertos) > self.max_abiertos:
+                    desalojados.append(self._abiertos.popitem(last=False)[1])
+            if abierto is not None:
+                abierto.ultimo_uso = ahora
+                abierto.usos += 1
+                self._abiertos.move_to_end(salon_id)
+            cerrar = self._retirar(desalojados)
+
+        # Cerrar fuera del lock: dispose() puede esperar a conexiones del pool
+        for salon in cerrar:
+            cerrar_manager(salon.manager)
+
+        return abierto.manager if abierto is not None else None
+
+    def liberar(self, manager: SalonManager) -> None:
+        """
+        Indica que una petición terminó de usar un gestor obtenido con `obtener`.
+
+        Si el salón fue desalojado y era su último uso, lo cierra.
+        """
+        with self._lock:
+            salon = next(
+                (abierto for abierto in (*self._abiertos.values(), *self._desalojados) if abierto.manager is manager),
+                None
+            )
+            if salon is None:
+                return
+            salon.usos -= 1
+            cerrar = salon.desalojado and salon.usos == 0
+            if cerrar:
+                self._desalojados.remove(salon)
+        if cerrar:
+            cerrar_manager(salon.manager)
+
+    def _desalojar_inactivos(self, ahora: float) -> List[_SalonAbierto]:
+        """Retira de la caché los salones sin usar durante más de max_inactividad."""
+        inactivos = [
+            salon_id for salon_id, abierto in self._abiertos.items()
+            if not abierto.usos and ahora - abierto.ultimo_uso > self.max_inactividad
+        ]
+        return [self._abiertos.pop(salon_id) for salon_id in inactivos]
+
+    def _retirar(self, desalojados: List[_SalonAbierto]) -> List[_SalonAbierto]:
+        """
+        Marca como desalojados salones retirados de la caché.
+
+        Returns:
+            Los que ninguna petición está usando, que ya se pueden cerrar
+        """
+        cerrar = []
+        for salon in desalojados:
+            salon.desalojado = True
+            if salon.usos:
+                self._desalojados.append(salon)
+            else:
+                cerrar.append(salon)
+        return cerrar
+
+    def abiertos(self) -> list:
+        """Lista los identificadores de salones abiertos, del menos al más reciente."""
+        with self._lock:
+            return list(self._abiertos)
+
+    def cerrar_todos(self) -> None:
+        """Cierra todos los repositorios abiertos, también los que siguen en uso."""
+        with self._lock:
+            cerrar = [*self._abiertos.values(), *self._desalojados]
+            self._abiertos.clear()
+            self._desalojados.clear()
+        for salon in cerrar:
+            cerrar_manager(salon.manager)
+
+
+def crear_registry(settings: Settings) -> Optional[SalonRegistry]:
+    """
+    Crea el registro de salones según la configuración.
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        SalonRegistry si `salones_dir` está definido, None si el modo multi-salón está deshabilitado
+    """
+    if not settings.salones_dir:
+        return None
+    return SalonRegistry(
+        settings.salones_dir,
+        max_abiertos=settings.salones_max_abiertos,
+        max_inactividad=settings.salones_max_inactividad,
+        settings=settings
+    )
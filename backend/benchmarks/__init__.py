@@ -0,0 +1,6 @@
+"""
+Benchmarks de las rutas críticas del gestor y del repositorio.
+
+Uso:
+    python -m benchmarks.suite --tamanos 10000 100000 1000000 --salida resultados.json
+"""
@@ -0,0 +1,293 @@
+"""
+Prueba de carga HTTP con usuarios virtuales concurrentes.
+
+Cada usuario virtual simula una tableta de recepción: en bucle elige una
+operación según la mezcla configurada (sobre todo registrar servicios y
+consultar la página de servicios de un día, más algún reporte), la envía y
+registra su latencia. Al terminar se informa del rendimiento total y, por
+ruta, de las peticiones por segundo, la latencia p50/p95/p99 y la tasa de
+errores.
+
+Por defecto la aplicación se ejecuta en el mismo proceso a través del
+transporte ASGI de httpx, sobre una copia de una base de datos poblada por la
+suite de benchmarks; con `--url` se ataca un servidor ya arrancado (p. ej.
+uvicorn con varios workers).
+
+Uso:
+    python -m benchmarks.carga --usuarios 20 --duracion 30 --servicios 100000
+    python -m benchmarks.carga --url http://localhost:8000 --mezcla registrar=70,listar=30
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.config import Settings
+from benchmarks.suite import preparar_base_datos
+
+MEZCLA_POR_DEFECTO = "registrar=60,listar=25,ingresos=5,beneficios=5,pago=5"
+
+
+@dataclass
+class Contexto:
+    """Datos del salón con los que se construyen las peticiones."""
+    empleados: List[str]
+    tipos_servicio: List[str]
+    hoy: date
+
+
+# Petición: (método, URL, cuerpo JSON)
+Peticion = Tuple[str, str, Optional[dict]]
+
+
+def _registrar(contexto: Contexto, aleatorio: random.Random) -> Peticion:
+    return "POST", "/api/servicios", {
+        "fecha": contexto.hoy.isoformat(),
+        "empleado_id": aleatorio.choice(contexto.empleados),
+        "tipo_servicio": aleatorio.choice(contexto.tipos_servicio),
+        "precio": aleatorio.choice(("15.00", "25.00", "30.00", "45.50", "60.00")),
+    }
+
+
+def _listar(contexto: Contexto, aleatorio: random.Random) -> Peticion:
+    # Una "página" de la tableta: los servicios de uno de los últimos 7 días
+    dia = contexto.hoy - timedelta(days=aleatorio.randrange(7))
+    return "GET", f"/api/servicios?fecha_inicio={dia}&fecha_fin={dia}", None
+
+
+def _periodo_mes(contexto: Contexto) -> str:
+    return f"fecha_inicio={contexto.hoy.replace(day=1)}&fecha_fin={contexto.hoy}"
+
+
+def _ingresos(contexto: Contexto, aleatorio: random.Random) -> Peticion:
+    return "GET", f"/api/reportes/ingresos?{_periodo_mes(contexto)}", None
+
+
+def _beneficios(contexto: Contexto, aleatorio: random.Random) -> Peticion:
+    return "GET", f"/api/reportes/beneficios?{_periodo_mes(contexto)}", None
+
+
+def _pago(contexto: Contexto, aleatorio: random.Random) -> Peticion:
+    empleado = aleatorio.choice(contexto.empleados)
+    return "GET", f"/api/empleados/{empleado}/pago?{_periodo_mes(contexto)}", None
+
+
+# Operaciones disponibles en la mezcla: nombre -> (ruta del informe, constructor de la petición)
+OPERACIONES: Dict[str, Tuple[str, Callable[[Contexto, random.Random], Peticion]]] = {
+    "registrar": ("POST /api/servicios", _registrar),
+    "listar": ("GET /api/servicios", _listar),
+    "ingresos": ("GET /api/reportes/ingresos", _ingresos),
+    "beneficios": ("GET /api/reportes/beneficios", _beneficios),
+    "pago": ("GET /api/empleados/{id}/pago", _pago),
+}
+
+
+def parsear_mezcla(texto: str) -> Dict[str, float]:
+    """
+    Parsea una mezcla de operaciones "registrar=60,listar=40".
+
+    Raises:
+        ValueError: Si una operación es desconocida o ningún peso es positivo
+    """
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise ValueError(f"Operación desconocida: {nombre} (disponibles: {', '.join(OPERACIONES)})")
+        mezcla[nombre] = float(peso or 1)
+    if not any(peso > 0 for peso in mezcla.values()):
+        raise ValueError("La mezcla debe tener al menos un peso positivo")
+    return mezcla
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil `p` (0-100) por rango más cercano de una lista ordenada."""
+    if not ordenadas:
+        return 0.0
+    return ordenadas[max(0, math.ceil(p / 100 * len(ordenadas)) - 1)]
+
+
+@dataclass
+class EstadisticasRuta:
+    """Latencias (ms) y errores de una ruta."""
+    latencias: List[float] = field(default_factory=list)
+    errores: int = 0
+
+    def to_dict(self, duracion: float) -> dict:
+        """Resumen de la ruta para una prueba de `duracion` segundos."""
+        ordenadas = sorted(self.latencias)
+        return {
+            "peticiones": len(ordenadas),
+            "rps": round(len(ordenadas) / duracion, 2),
+            "p50_ms": round(percentil(ordenadas, 50), 2),
+            "p95_ms": round(percentil(ordenadas, 95), 2),
+            "p99_ms": round(percentil(ordenadas, 99), 2),
+            "errores": self.errores,
+            "tasa_error": round(self.errores / len(ordenadas), 4) if ordenadas else 0.0,
+        }
+
+
+async def _usuario_virtual(cliente: httpx.AsyncClient, contexto: Contexto, mezcla: Dict[str, float],
+                           fin: float, pausa: float, aleatorio: random.Random,
+                           rutas: Dict[str, EstadisticasRuta]) -> None:
+    """Envía peticiones de la mezcla hasta el instante `fin`."""
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    while time.perf_counter() < fin:
+        ruta, construir = OPERACIONES[aleatorio.choices(nombres, pesos)[0]]
+        metodo, url, cuerpo = construir(contexto, aleatorio)
+        inicio = time.perf_counter()
+        try:
+            respuesta = await cliente.request(metodo, url, json=cuerpo)
+            error = respuesta.status_code >= 400
+        except httpx.HTTPError:
+            error = True
+        estadisticas = rutas.setdefault(ruta, EstadisticasRuta())
+        estadisticas.latencias.append((time.perf_counter() - inicio) * 1000)
+        estadisticas.errores += error
+        if pausa:
+            # Tiempo de "pensar" exponencial alrededor de la pausa media
+            await asyncio.sleep(aleatorio.expovariate(1 / pausa))
+
+
+async def _obtener_contexto(cliente: httpx.AsyncClient) -> Contexto:
+    """Lee los empleados y tipos de servicio del salón atacado."""
+    empleados = (await cliente.get("/api/empleados")).raise_for_status().json()
+    tipos = (await cliente.get("/api/tipos-servicios")).raise_for_status().json()
+    if not empleados or not tipos:
+        raise RuntimeError("El salón necesita al menos un empleado y un tipo de servicio")
+    return Contexto(
+        empleados=[empleado["id"] for empleado in empleados],
+        tipos_servicio=[tipo["nombre"] for tipo in tipos],
+        hoy=date.today()
+    )
+
+
+async def ejecutar_carga(cliente: httpx.AsyncClient, mezcla: Dict[str, float], usuarios: int,
+                         duracion: float, pausa: float = 0.0, semilla: int = 0) -> dict:
+    """
+    Ejecuta la prueba de carga con `usuarios` usuarios virtuales durante `duracion` segundos.
+
+    Args:
+        cliente: Cliente httpx con la URL base de la aplicación
+        mezcla: Peso de cada operación
+        usuarios: Número de usuarios virtuales concurrentes
+        duracion: Segundos de prueba
+        pausa: Segundos medios de espera entre peticiones de un usuario
+        semilla: Semilla de los generadores aleatorios
+
+    Returns:
+        Informe con rendimiento total, tasa de error y estadísticas por ruta
+    """
+    contexto = await _obtener_contexto(cliente)
+    rutas: Dict[str, EstadisticasRuta] = {}
+    inicio = time.perf_counter()
+    fin = inicio + duracion
+    await asyncio.gather(*(
+        _usuario_virtual(cliente, contexto, mezcla, fin, pausa, random.Random(semilla + indice), rutas)
+        for indice in range(usuarios)
+    ))
+    transcurrido = time.perf_counter() - inicio
+
+    peticiones = sum(len(estadisticas.latencias) for estadisticas in rutas.values())
+    errores = sum(estadisticas.errores for estadisticas in rutas.values())
+    return {
+        "usuarios": usuarios,
+        "duracion_s": round(transcurrido, 2),
+        "peticiones": peticiones,
+        "rps": round(peticiones / transcurrido, 2),
+        "tasa_error": round(errores / peticiones, 4) if peticiones else 0.0,
+        "rutas": {ruta: rutas[ruta].to_dict(transcurrido) for ruta in sorted(rutas)},
+    }
+
+
+async def ejecutar_en_proceso(ruta_base_datos: str, **opciones) -> dict:
+    """Ejecuta la prueba de carga contra la aplicación en este proceso (transporte ASGI)."""
+    # Importación diferida: app.main crea la aplicación por defecto al importarse
+    from app.main import create_app
+
+    aplicacion = create_app(Settings(
+        database_path=ruta_base_datos, presupuesto_consultas=None, umbral_consulta_lenta_ms=None,
+        log_accesos=False
+    ))
+    async with aplicacion.router.lifespan_context(aplicacion):
+        transporte = httpx.ASGITransport(app=aplicacion)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://carga") as cliente:
+            return await ejecutar_carga(cliente, **opciones)
+
+
+def imprimir_informe(informe: dict) -> None:
+    """Muestra el informe como tabla."""
+    print(f"{informe['usuarios']} usuarios, {informe['duracion_s']} s: {informe['peticiones']} peticiones, "
+          f"{informe['rps']} peticiones/s, tasa de error {informe['tasa_error']:.2%}")
+    print(f"{'Ruta':<32} {'Peticiones':>10} {'Pet/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Errores':>8}")
+    for ruta, datos in informe["rutas"].items():
+        print(f"{ruta:<32} {datos['peticiones']:>10} {datos['rps']:>8.2f} {datos['p50_ms']:>9.2f} "
+              f"{datos['p95_ms']:>9.2f} {datos['p99_ms']:>9.2f} {datos['errores']:>8}")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Crea el parser de argumentos de la prueba de carga."""
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP con usuarios virtuales")
+    parser.add_argument("--usuarios", type=int, default=10, help="Usuarios virtuales concurrentes")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de prueba")
+    parser.add_argument("--mezcla", default=MEZCLA_POR_DEFECTO,
+                        help=f"Peso de cada operación ({', '.join(OPERACIONES)})")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="Segundos medios de espera entre peticiones de cada usuario")
+    parser.add_argument("--url", help="URL de un servidor ya arrancado (por defecto, la aplicación en proceso)")
+    parser.add_argument("--servicios", type=int, default=10_000,
+                        help="Servicios de la base de datos de la aplicación en proceso")
+    parser.add_argument("--directorio", default=".benchmarks",
+                        help="Directorio de las bases de datos pobladas")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla de los generadores aleatorios")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar el informe")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la prueba de carga."""
+    args = crear_parser().parse_args(argv)
+    for nombre in ("app", "httpx"):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+    opciones = dict(
+        mezcla=parsear_mezcla(args.mezcla),
+        usuarios=args.usuarios,
+        duracion=args.duracion,
+        pausa=args.pausa,
+        semilla=args.semilla,
+    )
+
+    if args.url:
+        async def contra_servidor():
+            async with httpx.AsyncClient(base_url=args.url, timeout=60) as cliente:
+                return await ejecutar_carga(cliente, **opciones)
+        informe = asyncio.run(contra_servidor())
+    else:
+        # Copia de la base de datos poblada: los servicios registrados no la alteran
+        with tempfile.TemporaryDirectory() as temporal:
+            ruta = os.path.join(temporal, "carga.db")
+            shutil.copyfile(preparar_base_datos(args.directorio, args.servicios), ruta)
+            informe = asyncio.run(ejecutar_en_proceso(ruta, **opciones))
+
+    imprimir_informe(informe)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fichero:
+            json.dump(informe, fichero, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
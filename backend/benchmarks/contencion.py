@@ -0,0 +1,255 @@
+"""
+Prueba de estrés de contención de escritura entre procesos.
+
+Lanza varios procesos con varios hilos cada uno que registran servicios con
+`SalonManager.registrar_servicio` sobre el mismo fichero SQLite, como harían
+varios workers de uvicorn. Para cada combinación de `journal_mode` y
+`synchronous` se mide:
+
+- commits por segundo sostenidos;
+- errores por bloqueo que agotaron los reintentos y número de reintentos;
+- latencia p50/p95/p99 y máxima de `registrar_servicio`.
+
+Al terminar cada combinación se verifica la base de datos: cada servicio
+confirmado a su llamador debe estar exactamente una vez, no debe haber filas
+que nadie vio confirmadas y `PRAGMA integrity_check` debe ser correcto.
+
+Uso:
+    python -m benchmarks.contencion --procesos 4 --hilos 2 --duracion 10
+    python -m benchmarks.contencion --modos wal,delete --sincronizacion normal,full --salida contencion.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from typing import List, Optional
+
+from app.database import ConfiguracionSQLite, PoliticaReintentos, contador_reintentos, es_error_de_bloqueo
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+from app.result import Ok, Err
+from benchmarks.carga import percentil
+from benchmarks.generador import crear_catalogo, empleado_id, generar
+
+NUMERO_EMPLEADOS = 10
+NUMERO_TIPOS = 6
+
+
+def _trabajador(ruta: str, configuracion: ConfiguracionSQLite, hilos: int, duracion: float,
+                plazo_reintentos: float, barrera, resultados) -> None:
+    """Proceso trabajador: `hilos` hilos registrando servicios durante `duracion` segundos."""
+    logging.getLogger("app").setLevel(logging.CRITICAL)
+    repository = SQLAlchemyRepository(
+        f"sqlite:///{ruta}",
+        crear_esquema=False,
+        reintentos=PoliticaReintentos(plazo=plazo_reintentos),
+        configuracion_sqlite=configuracion
+    )
+    manager = SalonManager(repository)
+    tipos = [tipo.nombre for tipo in crear_catalogo(NUMERO_TIPOS)]
+    confirmados: List[str] = []
+    latencias: List[float] = []
+    errores = {"bloqueo": 0, "otros": 0}
+    lock = threading.Lock()
+
+    def registrar(semilla: int) -> None:
+        aleatorio = random.Random(semilla)
+        barrera.wait()
+        fin = time.perf_counter() + duracion
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                resultado = manager.registrar_servicio(
+                    date.today(),
+                    empleado_id(aleatorio.randint(1, NUMERO_EMPLEADOS)),
+                    aleatorio.choice(tipos),
+                    Decimal(aleatorio.randint(1000, 9000)) / 100
+                )
+            except Exception as e:
+                with lock:
+                    errores["bloqueo" if es_error_de_bloqueo(e) else "otros"] += 1
+                continue
+            latencia = (time.perf_counter() - inicio) * 1000
+            with lock:
+                match resultado:
+                    case Ok(servicio):
+                        confirmados.append(servicio.id)
+                        latencias.append(latencia)
+                    case Err(_):
+                        errores["otros"] += 1
+
+    hilos_registro = [
+        threading.Thread(target=registrar, args=(os.getpid() * 1000 + indice,)) for indice in range(hilos)
+    ]
+    for hilo in hilos_registro:
+        hilo.start()
+    for hilo in hilos_registro:
+        hilo.join()
+    repository.cerrar()
+    resultados.put({
+        "confirmados": confirmados,
+        "latencias": latencias,
+        "errores_bloqueo": errores["bloqueo"],
+        "otros_errores": errores["otros"],
+        "reintentos": contador_reintentos.reintentos,
+        "agotados": contador_reintentos.agotados,
+    })
+
+
+def verificar(ruta: str, confirmados: List[str]) -> dict:
+    """
+    Comprueba que cada servicio confirmado está exactamente una vez en la base de datos.
+
+    Returns:
+        Filas en la base de datos, servicios perdidos, duplicados e inesperados
+        (filas que ningún llamador vio confirmadas) e integridad
+    """
+    with sqlite3.connect(ruta) as conexion:
+        ids = [fila[0] for fila in conexion.execute("SELECT id FROM servicios")]
+        integridad = conexion.execute("PRAGMA integrity_check").fetchone()[0]
+    en_base_datos = set(ids)
+    esperados = set(confirmados)
+    return {
+        "filas": len(ids),
+        "perdidos": len(esperados - en_base_datos),
+        "duplicados": len(ids) - len(en_base_datos) + len(confirmados) - len(esperados),
+        "inesperados": len(en_base_datos - esperados),
+        "integridad": integridad,
+    }
+
+
+def ejecutar_configuracion(directorio: str, configuracion: ConfiguracionSQLite, procesos: int, hilos: int,
+                           duracion: float, plazo_reintentos: float = 10.0) -> dict:
+    """
+    Ejecuta la prueba con una configuración de SQLite sobre una base de datos nueva.
+
+    Returns:
+        Rendimiento, errores, latencias y resultado de la verificación
+    """
+    ruta = os.path.join(
+        directorio, f"contencion_{configuracion.journal_mode}_{configuracion.synchronous or 'defecto'}.db".lower()
+    )
+    for sufijo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+    generar(ruta, empleados=NUMERO_EMPLEADOS, tipos=NUMERO_TIPOS, servicios=0)
+    # El modo WAL es persistente: fijar el modo antes de que se conecten los trabajadores
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute(f"PRAGMA journal_mode={configuracion.journal_mode}")
+
+    contexto = multiprocessing.get_context("spawn")
+    barrera = contexto.Barrier(procesos * hilos + 1)
+    resultados = contexto.Queue()
+    trabajadores = [
+        contexto.Process(target=_trabajador, args=(
+            ruta, configuracion, hilos, duracion, plazo_reintentos, barrera, resultados
+        ))
+        for _ in range(procesos)
+    ]
+    for trabajador in trabajadores:
+        trabajador.start()
+    barrera.wait()
+    inicio = time.perf_counter()
+    parciales = [resultados.get() for _ in trabajadores]
+    transcurrido = time.perf_counter() - inicio
+    for trabajador in trabajadores:
+        trabajador.join()
+
+    confirmados = [servicio_id for parcial in parciales for servicio_id in parcial["confirmados"]]
+    latencias = sorted(latencia for parcial in parciales for latencia in parcial["latencias"])
+    return {
+        "journal_mode": configuracion.journal_mode,
+        "synchronous": configuracion.synchronous,
+        "procesos": procesos,
+        "hilos": hilos,
+        "duracion_s": round(transcurrido, 2),
+        "commits": len(confirmados),
+        "commits_por_segundo": round(len(confirmados) / transcurrido, 1),
+        "errores_bloqueo": sum(parcial["errores_bloqueo"] for parcial in parciales),
+        "otros_errores": sum(parcial["otros_errores"] for parcial in parciales),
+        "reintentos": sum(parcial["reintentos"] for parcial in parciales),
+        "reintentos_agotados": sum(parcial["agotados"] for parcial in parciales),
+        "p50_ms": round(percentil(latencias, 50), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+        "max_ms": round(latencias[-1], 2) if latencias else 0.0,
+        "verificacion": verificar(ruta, confirmados),
+    }
+
+
+def es_correcta(resultado: dict) -> bool:
+    """Indica si la verificación de una configuración no encontró pérdidas, duplicados ni corrupción."""
+    verificacion = resultado["verificacion"]
+    return (verificacion["perdidos"] == 0 and verificacion["duplicados"] == 0
+            and verificacion["inesperados"] == 0 and verificacion["integridad"] == "ok")
+
+
+def imprimir_resultados(resultados: List[dict]) -> None:
+    """Muestra los resultados como tabla."""
+    print(f"{'journal':<9} {'synchronous':<12} {'commits/s':>10} {'bloqueos':>9} {'reintentos':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>9}  verificación")
+    for r in resultados:
+        v = r["verificacion"]
+        estado = "ok" if es_correcta(r) else (
+            f"perdidos={v['perdidos']} duplicados={v['duplicados']} "
+            f"inesperados={v['inesperados']} integridad={v['integridad']}"
+        )
+        print(f"{r['journal_mode']:<9} {r['synchronous'] or 'defecto':<12} {r['commits_por_segundo']:>10.1f} "
+              f"{r['errores_bloqueo']:>9} {r['reintentos']:>11} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['max_ms']:>9.2f}  {estado}")
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Crea el parser de argumentos de la prueba de contención."""
+    parser = argparse.ArgumentParser(description="Prueba de estrés de contención de escritura")
+    parser.add_argument("--procesos", type=int, default=4, help="Procesos escritores")
+    parser.add_argument("--hilos", type=int, default=2, help="Hilos escritores por proceso")
+    parser.add_argument("--duracion", type=float, default=10.0, help="Segundos por configuración")
+    parser.add_argument("--modos", default="wal,delete", help="Valores de journal_mode separados por comas")
+    parser.add_argument("--sincronizacion", default="normal,full",
+                        help="Valores de synchronous separados por comas")
+    parser.add_argument("--plazo-reintentos", type=float, default=10.0,
+                        help="Segundos máximos reintentando una escritura bloqueada")
+    parser.add_argument("--directorio", help="Directorio de las bases de datos (por defecto, uno temporal)")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar los resultados")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada; retorna 1 si alguna verificación falla."""
+    args = crear_parser().parse_args(argv)
+    configuraciones = [
+        ConfiguracionSQLite(modo.strip().upper(), sincronizacion.strip().upper())
+        for modo in args.modos.split(",")
+        for sincronizacion in args.sincronizacion.split(",")
+    ]
+
+    with tempfile.TemporaryDirectory() as temporal:
+        directorio = args.directorio or temporal
+        os.makedirs(directorio, exist_ok=True)
+        resultados = []
+        for configuracion in configuraciones:
+            print(f"journal_mode={configuracion.journal_mode} synchronous={configuracion.synchronous}: "
+                  f"{args.procesos} procesos x {args.hilos} hilos, {args.duracion} s", flush=True)
+            resultados.append(ejecutar_configuracion(
+                directorio, configuracion, args.procesos, args.hilos, args.duracion, args.plazo_reintentos
+            ))
+
+    imprimir_resultados(resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fichero:
+            json.dump(resultados, fichero, indent=2, ensure_ascii=False)
+    return 0 if all(es_correcta(resultado) for resultado in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
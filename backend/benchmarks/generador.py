@@ -0,0 +1,286 @@
+"""
+Generador de salones sintéticos a gran escala.
+
+Crea una base de datos SQLite con empleados, un catálogo de tipos de servicio
+con porcentajes de comisión y precios por defecto realistas, y millones de
+servicios:
+
+- Fechas con patrón estacional (diciembre y junio altos, agosto bajo) y
+  semanal (viernes y sábado altos, domingo cerrado).
+- Precios con sesgo por tipo: lognormal alrededor del precio por defecto,
+  redondeados a 50 céntimos, con más dispersión en servicios como mechas o
+  alisados que en un corte.
+- Comisiones calculadas con `SalonManager.calcular_comision`, igual que
+  `registrar_servicio`.
+
+Los servicios se insertan con `executemany` en transacciones grandes, sin
+los índices secundarios de `servicios` (se recrean al final) y sin
+registrarlos en el log de cambios.
+
+Uso:
+    python -m benchmarks.generador salon_grande.db --servicios 10000000
+    python -m benchmarks.generador salon.db --empleados 8 --tipos 6 --servicios 50000 --desde 2024-01-01
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.manager import SalonManager
+from app.models import Empleado, TipoServicio
+from app.repository import SQLAlchemyRepository
+
+
+@dataclass(frozen=True)
+class TipoCatalogo:
+    """Tipo de servicio del catálogo con su distribución de precios y popularidad."""
+    nombre: str
+    porcentaje_comision: float
+    precio_por_defecto: Decimal
+    dispersion: float
+    popularidad: float
+
+
+CATALOGO = (
+    TipoCatalogo("Corte", 40.0, Decimal("25.00"), 0.15, 30),
+    TipoCatalogo("Corte caballero", 40.0, Decimal("15.00"), 0.10, 20),
+    TipoCatalogo("Tinte", 35.0, Decimal("55.00"), 0.25, 12),
+    TipoCatalogo("Peinado", 45.0, Decimal("30.00"), 0.20, 10),
+    TipoCatalogo("Mechas", 30.0, Decimal("85.00"), 0.30, 8),
+    TipoCatalogo("Manicura", 50.0, Decimal("20.00"), 0.15, 8),
+    TipoCatalogo("Barba", 40.0, Decimal("10.00"), 0.10, 6),
+    TipoCatalogo("Pedicura", 50.0, Decimal("28.00"), 0.15, 4),
+    TipoCatalogo("Tratamiento capilar", 25.0, Decimal("45.00"), 0.30, 4),
+    TipoCatalogo("Maquillaje", 45.0, Decimal("40.00"), 0.25, 3),
+    TipoCatalogo("Recogido", 45.0, Decimal("50.00"), 0.30, 2),
+    TipoCatalogo("Alisado", 30.0, Decimal("120.00"), 0.35, 2),
+)
+
+NOMBRES = ("Ana", "Lucía", "Carmen", "Marta", "Laura", "Sofía", "Elena", "Paula", "Javier",
+           "David", "Carlos", "Pablo", "Sara", "Irene", "Raúl", "Nuria", "Alba", "Diego")
+APELLIDOS = ("García", "Martínez", "López", "Sánchez", "Pérez", "Gómez", "Martín", "Jiménez",
+             "Ruiz", "Hernández", "Díaz", "Moreno", "Álvarez", "Romero", "Navarro", "Torres")
+
+# Peso relativo de cada mes (enero a diciembre) y de cada día de la semana (lunes a domingo)
+PESOS_MES = (0.85, 0.85, 0.95, 1.0, 1.05, 1.15, 1.1, 0.7, 1.0, 1.0, 1.05, 1.3)
+PESOS_DIA_SEMANA = (0.6, 0.9, 1.0, 1.1, 1.4, 1.5, 0.0)
+
+TAMANO_LOTE = 100_000
+
+
+def empleado_id(indice: int) -> str:
+    """Identificador del empleado `indice` (desde 1): E001, E002..."""
+    return f"E{indice:03d}"
+
+
+def crear_catalogo(numero: int) -> List[TipoCatalogo]:
+    """Los `numero` primeros tipos del catálogo; si hay más, variantes numeradas."""
+    tipos = []
+    for indice in range(numero):
+        base = CATALOGO[indice % len(CATALOGO)]
+        ronda = indice // len(CATALOGO)
+        tipos.append(base if ronda == 0 else TipoCatalogo(
+            f"{base.nombre} {ronda + 1}", base.porcentaje_comision, base.precio_por_defecto,
+            base.dispersion, base.popularidad / (ronda + 1)
+        ))
+    return tipos
+
+
+def pesos_fechas(desde: date, hasta: date) -> Tuple[List[str], List[float]]:
+    """Fechas ISO del rango con su peso acumulado por estacionalidad y día de la semana."""
+    fechas, acumulados, total = [], [], 0.0
+    dia = desde
+    while dia <= hasta:
+        peso = PESOS_MES[dia.month - 1] * PESOS_DIA_SEMANA[dia.weekday()]
+        if peso > 0:
+            total += peso
+            fechas.append(dia.isoformat())
+            acumulados.append(total)
+        dia += timedelta(days=1)
+    if not fechas:
+        raise ValueError("El rango de fechas no contiene días laborables")
+    return fechas, acumulados
+
+
+class GeneradorServicios:
+    """Genera filas de servicios por lotes."""
+
+    def __init__(self, tipos: List[TipoCatalogo], empleados: int, desde: date, hasta: date, semilla: int = 0):
+        self.tipos = tipos
+        self.aleatorio = random.Random(semilla)
+        self.fechas, self.acumulado_fechas = pesos_fechas(desde, hasta)
+        self.empleados = [empleado_id(indice) for indice in range(1, empleados + 1)]
+        # Unos empleados atienden más que otros
+        self.acumulado_empleados = list(itertools.accumulate(
+            self.aleatorio.uniform(0.5, 1.5) for _ in self.empleados
+        ))
+        self.acumulado_tipos = list(itertools.accumulate(tipo.popularidad for tipo in tipos))
+        self.centimos_base = [int(tipo.precio_por_defecto * 100) for tipo in tipos]
+        # Comisión (float) por (tipo, precio en céntimos): pocos precios distintos por tipo
+        self._comisiones: Dict[Tuple[int, int], float] = {}
+
+    def _comision(self, tipo: int, centimos: int) -> float:
+        clave = (tipo, centimos)
+        comision = self._comisiones.get(clave)
+        if comision is None:
+            comision = float(SalonManager.calcular_comision(
+                Decimal(centimos).scaleb(-2), self.tipos[tipo].porcentaje_comision
+            ))
+            self._comisiones[clave] = comision
+        return comision
+
+    def lote(self, cantidad: int) -> List[tuple]:
+        """Genera `cantidad` filas (id, fecha, empleado_id, tipo_servicio, precio, comision_calculada)."""
+        aleatorio = self.aleatorio
+        fechas = aleatorio.choices(self.fechas, cum_weights=self.acumulado_fechas, k=cantidad)
+        empleados = aleatorio.choices(self.empleados, cum_weights=self.acumulado_empleados, k=cantidad)
+        tipos = aleatorio.choices(range(len(self.tipos)), cum_weights=self.acumulado_tipos, k=cantidad)
+        filas = []
+        for fecha, empleado, tipo in zip(fechas, empleados, tipos):
+            base = self.centimos_base[tipo]
+            factor = aleatorio.lognormvariate(0.0, self.tipos[tipo].dispersion)
+            centimos = max(100, round(base * factor / 50) * 50)
+            filas.append((
+                str(uuid.UUID(int=aleatorio.getrandbits(128), version=4)),
+                fecha,
+                empleado,
+                self.tipos[tipo].nombre,
+                centimos / 100,
+                self._comision(tipo, centimos),
+            ))
+        return filas
+
+    def lotes(self, total: int, tamano_lote: int = TAMANO_LOTE) -> Iterator[List[tuple]]:
+        """Genera `total` filas en lotes de `tamano_lote`."""
+        for inicio in range(0, total, tamano_lote):
+            yield self.lote(min(tamano_lote, total - inicio))
+
+
+def generar(ruta: str, empleados: int = 20, tipos: int = len(CATALOGO), servicios: int = 100_000,
+            desde: Optional[date] = None, hasta: Optional[date] = None, semilla: int = 0,
+            tamano_lote: int = TAMANO_LOTE, progreso: Optional[Callable[[int], None]] = None) -> float:
+    """
+    Crea una base de datos con un salón sintético.
+
+    Args:
+        ruta: Fichero SQLite a crear (no debe existir)
+        empleados: Número de empleados
+        tipos: Número de tipos de servicio
+        servicios: Número de servicios
+        desde: Primera fecha de los servicios (por defecto, tres años antes de `hasta`)
+        hasta: Última fecha de los servicios (por defecto, hoy)
+        semilla: Semilla del generador aleatorio
+        tamano_lote: Filas por transacción
+        progreso: Función a la que se pasa el número de filas insertadas tras cada lote
+
+    Returns:
+        Segundos empleados
+    """
+    if os.path.exists(ruta):
+        raise FileExistsError(f"La base de datos ya existe: {ruta}")
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=3 * 365)
+    inicio = time.perf_counter()
+    catalogo = crear_catalogo(tipos)
+
+    # Esquema, empleados y tipos de servicio a través del repositorio
+    repository = SQLAlchemyRepository(f"sqlite:///{ruta}")
+    aleatorio = random.Random(semilla)
+    for indice in range(1, empleados + 1):
+        nombre = f"{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)}"
+        repository.guardar_empleado(Empleado(id=empleado_id(indice), nombre=nombre))
+    for tipo in catalogo:
+        repository.guardar_tipo_servicio(TipoServicio(
+            nombre=tipo.nombre,
+            descripcion=tipo.nombre,
+            porcentaje_comision=tipo.porcentaje_comision,
+            precio_por_defecto=tipo.precio_por_defecto
+        ))
+    repository.cerrar()
+
+    generador = GeneradorServicios(catalogo, empleados, desde, hasta, semilla)
+    conexion = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        conexion.execute("PRAGMA synchronous=OFF")
+        conexion.execute("PRAGMA cache_size=-262144")
+        # Sin índices secundarios ni triggers del log de cambios durante la carga:
+        # los servicios generados son historia anterior al log
+        indices = conexion.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'servicios' AND sql IS NOT NULL"
+        ).fetchall()
+        triggers = conexion.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'servicios'"
+        ).fetchall()
+        for nombre, _ in indices:
+            conexion.execute(f'DROP INDEX "{nombre}"')
+        for nombre, _ in triggers:
+            conexion.execute(f'DROP TRIGGER "{nombre}"')
+
+        insertadas = 0
+        for filas in generador.lotes(servicios, tamano_lote):
+            conexion.execute("BEGIN")
+            conexion.executemany(
+                "INSERT INTO servicios (id, fecha, empleado_id, tipo_servicio, precio, comision_calculada) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                filas
+            )
+            conexion.execute("COMMIT")
+            insertadas += len(filas)
+            if progreso is not None:
+                progreso(insertadas)
+
+        for _, sql in indices + triggers:
+            conexion.execute(sql)
+        conexion.execute("ANALYZE")
+    finally:
+        conexion.close()
+    return time.perf_counter() - inicio
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Crea el parser de argumentos del generador."""
+    parser = argparse.ArgumentParser(description="Generador de salones sintéticos")
+    parser.add_argument("database", help="Fichero SQLite a crear")
+    parser.add_argument("--empleados", type=int, default=20, help="Número de empleados")
+    parser.add_argument("--tipos", type=int, default=len(CATALOGO), help="Número de tipos de servicio")
+    parser.add_argument("--servicios", type=int, default=100_000, help="Número de servicios")
+    parser.add_argument("--desde", type=date.fromisoformat, help="Primera fecha (YYYY-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, help="Última fecha (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument("--semilla", type=int, default=0, help="Semilla del generador aleatorio")
+    parser.add_argument("--lote", type=int, default=TAMANO_LOTE, help="Filas por transacción")
+    parser.add_argument("--sobrescribir", action="store_true", help="Reemplaza la base de datos si existe")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada del generador."""
+    args = crear_parser().parse_args(argv)
+    if args.sobrescribir:
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(args.database + sufijo):
+                os.remove(args.database + sufijo)
+
+    def progreso(insertadas: int) -> None:
+        print(f"\r{insertadas}/{args.servicios} servicios", end="", flush=True)
+
+    try:
+        segundos = generar(args.database, args.empleados, args.tipos, args.servicios,
+                           args.desde, args.hasta, args.semilla, args.lote, progreso)
+    except (FileExistsError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"\n{args.servicios} servicios generados en {segundos:.1f} s "
+          f"({args.servicios / segundos:,.0f} filas/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
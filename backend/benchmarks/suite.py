@@ -0,0 +1,297 @@
+"""
+Suite de benchmarks a escala realista.
+
+Para cada tamaño (número de servicios) se puebla una base de datos SQLite,
+se arranca la aplicación sobre ella y se miden las operaciones críticas:
+registrar servicios, consultarlos con cada combinación de filtros, los
+cálculos de ingresos, beneficios y pago de empleados, y los endpoints de
+obtener y eliminar un servicio. Los resultados se guardan en JSON y se
+comparan con una línea base guardada.
+
+Uso:
+    python -m benchmarks.suite --tamanos 10000 100000 --salida resultados.json
+    python -m benchmarks.suite --linea-base linea_base.json --umbral 0.25
+    python -m benchmarks.suite --tamanos 10000 --guardar-linea-base linea_base.json
+
+Las bases de datos pobladas se conservan en `--directorio` y se reutilizan
+en ejecuciones posteriores.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.result import Ok, Err
+from benchmarks.generador import empleado_id, generar
+
+TAMANOS_POR_DEFECTO = (10_000, 100_000, 1_000_000)
+
+# Salón de las bases de datos pobladas (fechas fijas para que los resultados sean comparables)
+NUMERO_EMPLEADOS = 20
+FECHA_INICIAL = date(2022, 1, 1)
+FECHA_FINAL = date(2024, 12, 31)
+
+# Período de un mes usado en las operaciones con filtro de fechas
+FILTRO_INICIO = date(2023, 6, 1)
+FILTRO_FIN = date(2023, 6, 30)
+
+
+def poblar_base_datos(ruta: str, tamano: int, semilla: int = 0) -> None:
+    """
+    Crea una base de datos con un salón sintético de `tamano` servicios.
+
+    Args:
+        ruta: Fichero SQLite a crear
+        tamano: Número de servicios
+        semilla: Semilla del generador aleatorio
+    """
+    generar(ruta, empleados=NUMERO_EMPLEADOS, servicios=tamano,
+            desde=FECHA_INICIAL, hasta=FECHA_FINAL, semilla=semilla)
+
+
+def preparar_base_datos(directorio: str, tamano: int) -> str:
+    """
+    Devuelve la ruta de una base de datos poblada con `tamano` servicios, creándola si no existe.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"servicios_{tamano}.db")
+    if os.path.exists(ruta):
+        with sqlite3.connect(ruta) as conexion:
+            if conexion.execute("SELECT COUNT(*) FROM servicios").fetchone()[0] >= tamano:
+                return ruta
+        os.remove(ruta)
+    inicio = time.perf_counter()
+    poblar_base_datos(ruta, tamano)
+    print(f"Base de datos de {tamano} servicios poblada en {time.perf_counter() - inicio:.1f} s")
+    return ruta
+
+
+@dataclass
+class Medicion:
+    """Duraciones de una operación en ms."""
+    muestras: List[float]
+
+    def to_dict(self) -> dict:
+        """Convierte la medición a diccionario con mediana, mínimo y p95."""
+        ordenadas = sorted(self.muestras)
+        return {
+            "mediana_ms": round(statistics.median(ordenadas), 3),
+            "minimo_ms": round(ordenadas[0], 3),
+            "p95_ms": round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))], 3),
+            "muestras": len(ordenadas),
+        }
+
+
+def medir(operacion: Callable[[], object], repeticiones: int, presupuesto: float) -> Medicion:
+    """
+    Ejecuta una operación hasta `repeticiones` veces o hasta agotar `presupuesto` segundos.
+
+    Siempre se toma al menos una muestra, por lenta que sea la operación.
+    """
+    muestras = []
+    limite = time.perf_counter() + presupuesto
+    while len(muestras) < repeticiones and (not muestras or time.perf_counter() < limite):
+        inicio = time.perf_counter()
+        operacion()
+        muestras.append((time.perf_counter() - inicio) * 1000)
+    return Medicion(muestras)
+
+
+def _combinaciones_filtros() -> List[Tuple[str, dict]]:
+    """Las ocho combinaciones de filtros de obtener_servicios, con su nombre."""
+    combinaciones = []
+    for empleado in (False, True):
+        for inicio in (False, True):
+            for fin in (False, True):
+                filtros = {}
+                if empleado:
+                    filtros["empleado_id"] = empleado_id(1)
+                if inicio:
+                    filtros["fecha_inicio"] = FILTRO_INICIO
+                if fin:
+                    filtros["fecha_fin"] = FILTRO_FIN
+                nombre = "+".join(
+                    clave for clave, activo in (("empleado", empleado), ("inicio", inicio), ("fin", fin)) if activo
+                ) or "sin_filtros"
+                combinaciones.append((f"obtener_servicios[{nombre}]", filtros))
+    return combinaciones
+
+
+def ejecutar_tamano(ruta: str, repeticiones: int, presupuesto: float) -> Dict[str, dict]:
+    """
+    Mide todas las operaciones sobre una base de datos poblada.
+
+    Returns:
+        Medición de cada operación, por nombre
+    """
+    # Importación diferida: app.main crea la aplicación por defecto al importarse
+    from app.main import create_app
+
+    settings = Settings(
+        database_path=ruta, presupuesto_consultas=None, umbral_consulta_lenta_ms=None, log_accesos=False
+    )
+    resultados: Dict[str, dict] = {}
+    aplicacion = create_app(settings)
+    with TestClient(aplicacion) as client:
+        manager = aplicacion.state.salon_manager
+        registrados: List[str] = []
+
+        def registrar():
+            match manager.registrar_servicio(date(2024, 1, 15), empleado_id(1), "Corte", Decimal("25.00")):
+                case Ok(servicio):
+                    registrados.append(servicio.id)
+                case Err(error):
+                    raise RuntimeError(f"No se pudo registrar el servicio: {error}")
+
+        operaciones: List[Tuple[str, Callable[[], object]]] = [("registrar_servicio", registrar)]
+        operaciones += [
+            (nombre, lambda filtros=filtros: manager.obtener_servicios(**filtros))
+            for nombre, filtros in _combinaciones_filtros()
+        ]
+        operaciones += [
+            ("calcular_ingresos_totales", manager.calcular_ingresos_totales),
+            ("calcular_beneficios", manager.calcular_beneficios),
+            ("calcular_pago_empleado", lambda: manager.calcular_pago_empleado(empleado_id(1), FILTRO_INICIO, FILTRO_FIN)),
+            ("GET /api/servicios/{id}", lambda: client.get(f"/api/servicios/{registrados[0]}").raise_for_status()),
+            ("DELETE /api/servicios/{id}", lambda: client.delete(f"/api/servicios/{registrados.pop()}").raise_for_status()),
+        ]
+        for nombre, operacion in operaciones:
+            # Se eliminan servicios registrados por la suite, conservando el del GET
+            limite = len(registrados) - 1 if nombre.startswith("DELETE") else repeticiones
+            resultados[nombre] = medir(operacion, min(repeticiones, limite), presupuesto).to_dict()
+            print(f"  {nombre}: {resultados[nombre]['mediana_ms']:.2f} ms "
+                  f"({resultados[nombre]['muestras']} muestras)")
+
+        # Dejar la base de datos con los servicios poblados
+        for servicio_id in registrados:
+            manager.repository.eliminar_servicio(servicio_id)
+    return resultados
+
+
+def ejecutar(tamanos: List[int], directorio: str, repeticiones: int = 20, presupuesto: float = 5.0) -> dict:
+    """
+    Ejecuta la suite para cada tamaño.
+
+    Returns:
+        Resultados con el entorno de ejecución y las mediciones por tamaño
+    """
+    resultados = {}
+    for tamano in tamanos:
+        ruta = preparar_base_datos(directorio, tamano)
+        print(f"{tamano} servicios:")
+        resultados[str(tamano)] = ejecutar_tamano(ruta, repeticiones, presupuesto)
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "plataforma": platform.platform(),
+        },
+        "resultados": resultados,
+    }
+
+
+@dataclass
+class Comparacion:
+    """Cambio de la mediana de una operación respecto a la línea base."""
+    tamano: str
+    operacion: str
+    base_ms: float
+    actual_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.actual_ms / self.base_ms if self.base_ms else float("inf")
+
+
+def comparar(actual: dict, linea_base: dict, umbral: float = 0.25,
+             minimo_ms: float = 0.5) -> Tuple[List[Comparacion], List[Comparacion]]:
+    """
+    Compara las medianas de dos ejecuciones.
+
+    Args:
+        actual: Resultados de la ejecución actual
+        linea_base: Resultados de referencia
+        umbral: Aumento relativo de la mediana que se considera regresión (0.25 = 25%)
+        minimo_ms: Diferencia absoluta mínima para no confundir ruido con regresión
+
+    Returns:
+        Tupla (regresiones, mejoras) de las operaciones presentes en ambas
+    """
+    regresiones, mejoras = [], []
+    for tamano, operaciones in actual["resultados"].items():
+        base_tamano = linea_base["resultados"].get(tamano, {})
+        for operacion, medicion in operaciones.items():
+            if operacion not in base_tamano:
+                continue
+            comparacion = Comparacion(tamano, operacion, base_tamano[operacion]["mediana_ms"], medicion["mediana_ms"])
+            if abs(comparacion.actual_ms - comparacion.base_ms) < minimo_ms:
+                continue
+            if comparacion.ratio > 1 + umbral:
+                regresiones.append(comparacion)
+            elif comparacion.ratio < 1 / (1 + umbral):
+                mejoras.append(comparacion)
+    return regresiones, mejoras
+
+
+def crear_parser() -> argparse.ArgumentParser:
+    """Crea el parser de argumentos de la suite."""
+    parser = argparse.ArgumentParser(description="Benchmarks del gestor y del repositorio")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS_POR_DEFECTO),
+                        help="Números de servicios de las bases de datos")
+    parser.add_argument("--directorio", default=".benchmarks",
+                        help="Directorio de las bases de datos pobladas")
+    parser.add_argument("--repeticiones", type=int, default=20,
+                        help="Muestras máximas por operación")
+    parser.add_argument("--presupuesto", type=float, default=5.0,
+                        help="Segundos máximos por operación (siempre se toma al menos una muestra)")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar los resultados")
+    parser.add_argument("--linea-base", help="Fichero JSON de resultados de referencia")
+    parser.add_argument("--guardar-linea-base", help="Guarda los resultados como línea base en este fichero")
+    parser.add_argument("--umbral", type=float, default=0.25,
+                        help="Aumento relativo de la mediana que se considera regresión")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada; retorna 1 si hay regresiones respecto a la línea base."""
+    args = crear_parser().parse_args(argv)
+    for nombre in ("app", "httpx"):
+        logging.getLogger(nombre).setLevel(logging.WARNING)
+
+    resultados = ejecutar(args.tamanos, args.directorio, args.repeticiones, args.presupuesto)
+    for destino in (args.salida, args.guardar_linea_base):
+        if destino:
+            with open(destino, "w", encoding="utf-8") as fichero:
+                json.dump(resultados, fichero, indent=2, ensure_ascii=False)
+
+    if not args.linea_base:
+        return 0
+    with open(args.linea_base, encoding="utf-8") as fichero:
+        linea_base = json.load(fichero)
+    regresiones, mejoras = comparar(resultados, linea_base, args.umbral)
+    for titulo, comparaciones in (("Mejoras", mejoras), ("Regresiones", regresiones)):
+        if comparaciones:
+            print(f"{titulo}:")
+            for c in comparaciones:
+                print(f"  [{c.tamano}] {c.operacion}: {c.base_ms:.2f} -> {c.actual_ms:.2f} ms (x{c.ratio:.2f})")
+    if regresiones:
+        print(f"{len(regresiones)} regresiones por encima del {args.umbral:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
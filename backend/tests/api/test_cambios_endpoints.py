@@ -0,0 +1,67 @@
+"""
+Tests para el endpoint del log de cambios de la API REST.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente de prueba sobre una base de datos en memoria nueva."""
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    monkeypatch.setattr(app.state, "repository", repository, raising=False)
+    monkeypatch.setattr(app.state, "salon_manager", SalonManager(repository), raising=False)
+    return TestClient(app)
+
+
+class TestListarCambios:
+    """Tests para el endpoint GET /api/cambios."""
+    
+    def test_cambios_con_datos_actuales(self, client):
+        """Verifica que se devuelve el último cambio de cada fila con sus datos actuales."""
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Juan Pérez"})
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Corte", "descripcion": "Corte de cabello", "porcentaje_comision": 40.0
+        })
+        servicio = client.post("/api/servicios", json={
+            "fecha": "2024-01-15", "empleado_id": "E001", "tipo_servicio": "Corte", "precio": "25.00"
+        }).json()
+        client.put("/api/empleados/E001", json={"nombre": "Juan P."})
+        
+        response = client.get("/api/cambios", params={"desde": 0})
+        
+        assert response.status_code == 200
+        datos = response.json()
+        assert (datos["hasta"], datos["ultimo"], datos["resincronizar"], datos["mas"]) == (4, 4, False, False)
+        assert [(c["tabla"], c["operacion"]) for c in datos["cambios"]] == [
+            ("tipos_servicios", "insertar"), ("servicios", "insertar"), ("empleados", "actualizar")
+        ]
+        assert datos["cambios"][1]["datos"] == servicio
+        assert datos["cambios"][2]["datos"] == {"id": "E001", "nombre": "Juan P."}
+    
+    def test_eliminacion_sin_datos(self, client):
+        """Verifica que una fila eliminada se devuelve sin datos."""
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Juan Pérez"})
+        client.delete("/api/empleados/E001")
+        
+        cambios = client.get("/api/cambios", params={"desde": 1}).json()["cambios"]
+        
+        assert cambios == [{"seq": 2, "tabla": "empleados", "clave": "E001", "operacion": "eliminar", "datos": None}]
+    
+    def test_desde_desconocido_pide_resincronizar(self, client):
+        """Verifica que una secuencia posterior a la última pide una carga completa."""
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Juan Pérez"})
+        
+        datos = client.get("/api/cambios", params={"desde": 50}).json()
+        
+        assert datos["resincronizar"] is True
+        assert datos["hasta"] == 1
+        assert datos["cambios"] == []
+    
+    def test_desde_negativo_retorna_422(self, client):
+        """Verifica que la secuencia no puede ser negativa."""
+        assert client.get("/api/cambios", params={"desde": -1}).status_code == 422
@@ -3,18 +3,20 @@ Tests para los endpoints de empleados de la API REST.
 """
 import pytest
 from fastapi.testclient import TestClient
-from app.main import app, salon_manager
+from app.main import app
 
 
 @pytest.fixture
 def client():
-    """Fixture que proporciona un cliente de prueba."""
-    return TestClient(app)
+    """Fixture que proporciona un cliente de prueba (con el arranque de la aplicación)."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture(autouse=True)
-def limpiar_base_datos():
+def limpiar_base_datos(client):
     """Limpia la base de datos antes de cada test."""
+    salon_manager = app.state.salon_manager
     # Limpiar todos los empleados antes de cada test
     empleados = salon_manager.listar_empleados()
     for empleado in empleados:
@@ -48,6 +50,44 @@ class TestListarEmpleados:
         ids = [emp["id"] for emp in empleados]
         assert "E001" in ids
         assert "E002" in ids
+    
+    def test_listar_empleados_con_proyeccion(self, client):
+        """Verifica que con fields solo se devuelven los campos pedidos."""
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Juan Pérez"})
+        
+        response = client.get("/api/empleados", params={"fields": "nombre"})
+        
+        assert response.status_code == 200
+        assert response.json() == [{"nombre": "Juan Pérez"}]
+
+
+class TestBuscarEmpleados:
+    """Tests para el endpoint GET /api/empleados/buscar."""
+    
+    def test_buscar_empleados_sin_tildes_por_prefijo(self, client):
+        """Verifica que la búsqueda ignora tildes y encuentra prefijos de cada palabra."""
+        client.post("/api/empleados", json={"id": "E001", "nombre": "José Pérez"})
+        client.post("/api/empleados", json={"id": "E002", "nombre": "María García"})
+        
+        response = client.get("/api/empleados/buscar", params={"q": "mar gar"})
+        
+        assert response.status_code == 200
+        assert response.json() == [{"id": "E002", "nombre": "María García"}]
+    
+    def test_buscar_empleados_respeta_el_limite(self, client):
+        """Verifica que no se devuelven más resultados que el límite."""
+        for i in range(3):
+            client.post("/api/empleados", json={"id": f"E00{i}", "nombre": f"Marta {i}"})
+        
+        response = client.get("/api/empleados/buscar", params={"q": "marta", "limite": 2})
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+    
+    def test_buscar_empleados_sin_texto_retorna_422(self, client):
+        """Verifica que el texto de búsqueda es obligatorio."""
+        response = client.get("/api/empleados/buscar", params={"q": ""})
+        assert response.status_code == 422
 
 
 class TestObtenerEmpleado:
@@ -0,0 +1,130 @@
+"""
+Tests para el endpoint de eventos (Server-Sent Events) de la API REST.
+
+TestClient acumula las respuestas en streaming, así que la aplicación se
+invoca directamente como aplicación ASGI.
+"""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.main import app
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """Gestor sobre una base de datos en memoria nueva, con un empleado y un tipo de servicio."""
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    manager = SalonManager(repository)
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    monkeypatch.setattr(app.state, "repository", repository, raising=False)
+    monkeypatch.setattr(app.state, "salon_manager", manager, raising=False)
+    return manager
+
+
+async def _leer_eventos(accion, eventos_esperados: int, cabeceras=()):
+    """Conecta a /api/eventos, ejecuta `accion` tras el evento inicial y desconecta."""
+    desconectar = asyncio.Event()
+    inicio = {}
+    trozos = []
+    
+    async def receive():
+        await desconectar.wait()
+        return {"type": "http.disconnect"}
+    
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            inicio.update(mensaje)
+        elif mensaje.get("body"):
+            trozos.append(mensaje["body"].decode())
+    
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/eventos", "raw_path": b"/api/eventos", "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"testserver"), *cabeceras], "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    tarea = asyncio.create_task(app(scope, receive, send))
+    
+    async def esperar_eventos(cantidad):
+        while sum(trozo.count("event:") for trozo in trozos) < cantidad:
+            await asyncio.sleep(0.01)
+    
+    await asyncio.wait_for(esperar_eventos(1), 5)
+    await asyncio.to_thread(accion)
+    await asyncio.wait_for(esperar_eventos(1 + eventos_esperados), 5)
+    desconectar.set()
+    await asyncio.wait_for(tarea, 5)
+    return inicio, "".join(trozos)
+
+
+class TestEventos:
+    """Tests para el endpoint GET /api/eventos."""
+    
+    def test_totales_al_conectar_y_evento_por_servicio(self, manager):
+        """Verifica el evento inicial y el evento de un servicio registrado con los totales de hoy."""
+        inicio, cuerpo = asyncio.run(_leer_eventos(
+            lambda: manager.registrar_servicio(date.today(), "E001", "Corte", Decimal("25.00")), 1
+        ))
+        
+        cabeceras = {clave.decode(): valor.decode() for clave, valor in inicio["headers"]}
+        assert inicio["status"] == 200
+        assert cabeceras["content-type"].startswith("text/event-stream")
+        assert cabeceras["cache-control"] == "no-cache"
+        assert 'event: totales\ndata: {"totales_hoy":' in cuerpo
+        assert "event: servicio_registrado" in cuerpo
+        assert '"ingresos":"25.00"' in cuerpo
+    
+    def test_eliminar_por_api_publica_evento(self, manager):
+        """Verifica que DELETE /api/servicios/{id} publica servicio_eliminado."""
+        servicio = manager.registrar_servicio(date.today(), "E001", "Corte", Decimal("25.00")).value
+        
+        def eliminar():
+            from fastapi.testclient import TestClient
+            assert TestClient(app).delete(f"/api/servicios/{servicio.id}").status_code == 204
+        
+        _, cuerpo = asyncio.run(_leer_eventos(eliminar, 1))
+        
+        assert f'event: servicio_eliminado\ndata: {{"id":"{servicio.id}"' in cuerpo
+        assert '"cantidad":0' in cuerpo
+    
+    def test_desconectar_cancela_la_suscripcion(self, manager):
+        """Verifica que al cerrar la conexión el cliente deja de estar suscrito."""
+        asyncio.run(_leer_eventos(
+            lambda: manager.registrar_servicio(date.today(), "E001", "Corte", Decimal("25.00")), 1
+        ))
+        
+        assert manager.eventos.suscriptores == 0
+    
+    def test_salon_desalojado_sigue_difundiendo(self, tmp_path, monkeypatch):
+        """Verifica que un cliente suscrito a un salón recibe los servicios tras desalojarse y reabrirse."""
+        from app.tenancy import SalonRegistry
+        registry = SalonRegistry(str(tmp_path), max_abiertos=1)
+        for salon_id in ("centro", "norte"):
+            registry.crear_salon(salon_id)
+        centro = registry.obtener("centro").value
+        centro.crear_empleado("E001", "Juan Pérez")
+        centro.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+        registry.liberar(centro)
+        monkeypatch.setattr(app.state, "salon_registry", registry, raising=False)
+        
+        def desalojar_y_registrar():
+            registry.liberar(registry.obtener("norte").value)
+            assert registry.abiertos() == ["norte"]
+            reabierto = registry.obtener("centro").value
+            assert reabierto is not centro
+            reabierto.registrar_servicio(date.today(), "E001", "Corte", Decimal("25.00"))
+            registry.liberar(reabierto)
+        
+        try:
+            _, cuerpo = asyncio.run(_leer_eventos(desalojar_y_registrar, 1, [(b"x-salon-id", b"centro")]))
+        finally:
+            registry.cerrar_todos()
+        
+        assert "event: servicio_registrado" in cuerpo
+        assert '"ingresos":"25.00"' in cuerpo
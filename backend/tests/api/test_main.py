@@ -8,8 +8,9 @@ from app.main import app
 
 @pytest.fixture
 def client():
-    """Fixture que proporciona un cliente de prueba."""
-    return TestClient(app)
+    """Fixture que proporciona un cliente de prueba (con el arranque de la aplicación)."""
+    with TestClient(app) as client:
+        yield client
 
 
 class TestFastAPIConfiguration:
@@ -59,15 +60,15 @@ class TestFastAPIConfiguration:
         data = response.json()
         assert data["status"] == "healthy"
     
-    def test_salon_manager_esta_inicializado(self):
+    def test_salon_manager_esta_inicializado(self, client):
         """Verifica que el SalonManager está inicializado."""
-        from app.main import salon_manager
+        salon_manager = app.state.salon_manager
         assert salon_manager is not None
         assert hasattr(salon_manager, 'repository')
     
-    def test_repository_esta_inicializado(self):
+    def test_repository_esta_inicializado(self, client):
         """Verifica que el repositorio está inicializado."""
-        from app.main import repository
+        repository = app.state.repository
         assert repository is not None
         assert hasattr(repository, 'engine')
         assert hasattr(repository, 'SessionLocal')
@@ -98,3 +99,476 @@ class TestLogging:
         
         # El middleware debería haber registrado la petición
         # (esto se verifica en los logs, aquí solo verificamos que no hay errores)
+    
+    def test_log_de_accesos_en_json(self, tmp_path, capsys):
+        """Verifica que cada petición escribe una línea JSON con ruta, estado, latencia y consultas."""
+        import json
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), log_accesos_muestreo=0.0))
+        
+        with TestClient(aplicacion) as client:
+            client.get("/api/empleados")
+            client.get("/api/empleados/E999")
+        
+        lineas = [json.loads(linea) for linea in capsys.readouterr().err.splitlines() if linea.startswith("{")]
+        # Con muestreo 0 solo se registran los errores
+        assert len(lineas) == 1
+        assert lineas[0]["logger"] == "app.accesos"
+        assert lineas[0]["ruta"] == "/api/empleados/{id}"
+        assert lineas[0]["path"] == "/api/empleados/E999"
+        assert lineas[0]["estado"] == 404
+        assert lineas[0]["consultas"] >= 1
+        assert lineas[0]["duracion_ms"] >= 0
+
+
+class TestMultiSalon:
+    """Tests para el enrutamiento por cabecera X-Salon-Id."""
+    
+    @pytest.fixture
+    def registry(self, tmp_path, monkeypatch):
+        """Habilita el modo multi-salón con dos salones en un directorio temporal."""
+        from app.tenancy import SalonRegistry
+        registry = SalonRegistry(str(tmp_path))
+        registry.crear_salon("centro")
+        registry.crear_salon("norte")
+        monkeypatch.setattr(app.state, "salon_registry", registry)
+        yield registry
+        registry.cerrar_todos()
+    
+    def test_cabecera_enruta_al_salon(self, client, registry):
+        """Verifica que cada salón ve solo sus propios datos."""
+        response = client.post(
+            "/api/empleados", json={"id": "E001", "nombre": "Ana"}, headers={"X-Salon-Id": "centro"}
+        )
+        assert response.status_code == 201
+        
+        centro = client.get("/api/empleados", headers={"X-Salon-Id": "centro"}).json()
+        norte = client.get("/api/empleados", headers={"X-Salon-Id": "norte"}).json()
+        assert [e["id"] for e in centro] == ["E001"]
+        assert norte == []
+    
+    def test_peticion_libera_el_salon(self, client, registry):
+        """Verifica que el salón deja de estar en uso al terminar la petición."""
+        client.get("/api/empleados", headers={"X-Salon-Id": "centro"})
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Ana"}, headers={"X-Salon-Id": "centro"})
+        
+        assert [salon.usos for salon in registry._abiertos.values()] == [0]
+    
+    def test_salon_inexistente_retorna_404(self, client, registry):
+        """Verifica que un salón sin base de datos retorna 404."""
+        response = client.get("/api/empleados", headers={"X-Salon-Id": "oeste"})
+        assert response.status_code == 404
+    
+    def test_salon_invalido_retorna_400(self, client, registry):
+        """Verifica que un identificador de salón inválido retorna 400."""
+        response = client.get("/api/empleados", headers={"X-Salon-Id": "../salon"})
+        assert response.status_code == 400
+    
+    def test_cabecera_sin_modo_multi_salon_retorna_400(self, client, monkeypatch):
+        """Verifica que la cabecera se rechaza si el modo multi-salón está deshabilitado."""
+        monkeypatch.setattr(app.state, "salon_registry", None)
+        response = client.get("/api/empleados", headers={"X-Salon-Id": "centro"})
+        assert response.status_code == 400
+
+
+class TestCreateApp:
+    """Tests para la factoría create_app y el arranque perezoso."""
+    
+    def test_recursos_se_crean_en_el_arranque(self, tmp_path):
+        """Verifica que la base de datos se abre al arrancar y se cierra al apagar."""
+        from app.config import Settings
+        from app.main import create_app
+        ruta = tmp_path / "salon.db"
+        aplicacion = create_app(Settings(database_path=str(ruta)))
+        
+        assert not hasattr(aplicacion.state, "repository")
+        assert not ruta.exists()
+        
+        with TestClient(aplicacion) as client:
+            response = client.post("/api/empleados", json={"id": "E001", "nombre": "Ana"})
+            assert response.status_code == 201
+            assert ruta.exists()
+            assert aplicacion.state.tiempo_arranque_ms >= 0
+    
+    def test_migraciones_omiten_create_all(self, tmp_path):
+        """Verifica que con migraciones el arranque no crea las tablas."""
+        from sqlalchemy import inspect
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), usar_migraciones=True))
+        
+        with TestClient(aplicacion):
+            assert inspect(aplicacion.state.repository.engine).get_table_names() == []
+
+    
+    def test_escritura_agrupada(self, tmp_path):
+        """Verifica el registro de servicios con escritura agrupada y sus estadísticas."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(
+            database_path=str(tmp_path / "salon.db"), escritura_agrupada=True, token_admin="secreto"
+        ))
+        
+        with TestClient(aplicacion) as client:
+            client.post("/api/empleados", json={"id": "E001", "nombre": "Ana"})
+            client.post("/api/tipos-servicios", json={
+                "nombre": "Corte", "descripcion": "Corte de cabello", "porcentaje_comision": 40.0
+            })
+            response = client.post("/api/servicios", json={
+                "fecha": "2024-01-15", "empleado_id": "E001", "tipo_servicio": "Corte", "precio": 25.0
+            })
+            assert response.status_code == 201
+            assert len(client.get("/api/servicios").json()) == 1
+            
+            assert client.get("/api/estadisticas/escritura-agrupada").status_code == 403
+            estadisticas = client.get("/api/estadisticas/escritura-agrupada",
+                                      headers={"X-Admin-Token": "secreto"}).json()
+            assert estadisticas["activa"] is True
+            assert estadisticas["lotes"]["total"] == 1
+    
+    def test_estadisticas_sin_escritura_agrupada_retorna_404(self, tmp_path):
+        """Verifica que las estadísticas no existen si la escritura agrupada está deshabilitada."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), token_admin="secreto"))
+        
+        with TestClient(aplicacion, headers={"X-Admin-Token": "secreto"}) as client:
+            assert client.get("/api/estadisticas/escritura-agrupada").status_code == 404
+
+    
+    def test_aviso_al_superar_presupuesto_de_consultas(self, tmp_path, caplog):
+        """Verifica que se registra un aviso si una petición supera el presupuesto de consultas."""
+        import logging
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), presupuesto_consultas=1))
+        
+        with TestClient(aplicacion) as client, caplog.at_level(logging.WARNING, logger="app.instrumentacion_sql"):
+            client.post("/api/empleados", json={"id": "E001", "nombre": "Ana"})
+        
+        assert any("POST /api/empleados" in registro.message and "presupuesto: 1" in registro.message
+                   for registro in caplog.records)
+
+
+class TestServerTiming:
+    """Tests para la cabecera Server-Timing."""
+    
+    def test_cabecera_server_timing(self, client):
+        """Verifica que las respuestas incluyen tiempos de base de datos, aplicación y número de consultas."""
+        response = client.get("/api/empleados")
+        
+        metricas = dict(
+            parte.strip().split(";", 1) for parte in response.headers["server-timing"].split(",")
+        )
+        assert metricas["db"].startswith("dur=")
+        assert metricas["app"].startswith("dur=")
+        assert int(metricas["queries"].split('"')[1]) >= 1
+
+
+class TestCompresion:
+    """Tests para la compresión de respuestas en la aplicación."""
+    
+    def test_listado_comprimido_conserva_cabeceras(self, tmp_path):
+        """Verifica que los listados se comprimen con gzip y mantienen Server-Timing."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), compresion_tamano_minimo=100))
+        
+        with TestClient(aplicacion) as client:
+            for indice in range(10):
+                client.post("/api/empleados", json={"id": f"E{indice:03d}", "nombre": f"Empleado {indice}"})
+            response = client.get("/api/empleados", headers={"Accept-Encoding": "gzip"})
+            pequena = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert "server-timing" in response.headers
+        assert len(response.json()) == 10
+        assert "content-encoding" not in pequena.headers
+
+
+class TestSettings:
+    """Tests para la configuración desde variables de entorno."""
+    
+    def test_desde_entorno(self, monkeypatch):
+        """Verifica que las variables de entorno se aplican a la configuración."""
+        from app.config import Settings
+        monkeypatch.setenv("DATABASE_PATH", "/data/salon.db")
+        monkeypatch.setenv("USAR_MIGRACIONES", "true")
+        monkeypatch.setenv("SALONES_DIR", "/data/salones")
+        monkeypatch.setenv("SALONES_MAX_ABIERTOS", "3")
+        
+        settings = Settings.desde_entorno()
+        
+        assert settings.database_url == "sqlite:////data/salon.db"
+        assert settings.usar_migraciones is True
+        assert settings.salones_dir == "/data/salones"
+        assert settings.salones_max_abiertos == 3
+    
+    def test_valores_por_defecto(self, monkeypatch):
+        """Verifica los valores por defecto sin variables de entorno."""
+        from app.config import Settings
+        for variable in ("DATABASE_PATH", "USAR_MIGRACIONES", "SALONES_DIR"):
+            monkeypatch.delenv(variable, raising=False)
+        
+        settings = Settings.desde_entorno()
+        
+        assert settings.database_path == "salon.db"
+        assert settings.usar_migraciones is False
+        assert settings.salones_dir is None
+
+
+class TestBloqueoBaseDatos:
+    """Tests para la respuesta ante bloqueos persistentes de SQLite."""
+    
+    def test_bloqueo_persistente_retorna_503(self, client, monkeypatch):
+        """Verifica que un bloqueo tras agotar los reintentos retorna 503 con Retry-After."""
+        import sqlite3
+        from sqlalchemy.exc import OperationalError
+        
+        def listar_bloqueado():
+            raise OperationalError("SELECT", {}, sqlite3.OperationalError("database is locked"))
+        
+        monkeypatch.setattr(app.state.salon_manager, "listar_empleados", listar_bloqueado)
+        response = TestClient(app, raise_server_exceptions=False).get("/api/empleados")
+        
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert response.json()["error"] == "database_busy"
+    
+    def test_bucle_de_eventos_responde_durante_reintentos(self, tmp_path, monkeypatch):
+        """Verifica que una escritura que reintenta ante un bloqueo no detiene el bucle de eventos."""
+        import asyncio
+        import sqlite3
+        import threading
+        import httpx
+        from sqlalchemy.exc import OperationalError
+        from sqlalchemy.orm import Session
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), plazo_reintentos=5.0))
+        commit_original = Session.commit
+        reintentando = threading.Event()
+        desbloquear = threading.Event()
+        
+        def commit_bloqueado(session):
+            if not desbloquear.is_set():
+                reintentando.set()
+                raise OperationalError("COMMIT", {}, sqlite3.OperationalError("database is locked"))
+            commit_original(session)
+        
+        async def escenario():
+            async with aplicacion.router.lifespan_context(aplicacion):
+                monkeypatch.setattr(Session, "commit", commit_bloqueado)
+                transporte = httpx.ASGITransport(app=aplicacion)
+                async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+                    escritura = asyncio.create_task(
+                        cliente.post("/api/empleados", json={"id": "E001", "nombre": "Ana"})
+                    )
+                    while not reintentando.is_set():
+                        await asyncio.sleep(0.01)
+                    salud = await asyncio.wait_for(cliente.get("/health"), timeout=1)
+                    pendiente = not escritura.done()
+                    desbloquear.set()
+                    return salud.status_code, pendiente, (await escritura).status_code
+        
+        assert asyncio.run(escenario()) == (200, True, 201)
+
+
+class TestMetricas:
+    """Tests para el endpoint /metrics."""
+    
+    def test_metricas_por_plantilla_de_ruta(self, client):
+        """Verifica que las peticiones se agrupan por plantilla de ruta y estado."""
+        client.get("/api/empleados/NO-EXISTE")
+        
+        response = client.get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        texto = response.text
+        assert 'salon_http_peticiones_total{metodo="GET",ruta="/api/empleados/{id}",estado="404"}' in texto
+        assert "NO-EXISTE" not in texto
+        assert 'salon_repositorio_duracion_segundos_count{metodo="obtener_empleado"}' in texto
+        assert "# TYPE salon_http_peticiones_en_curso gauge" in texto
+    
+    def test_metricas_de_pool(self, tmp_path):
+        """Verifica que se exponen las conexiones de los pools del repositorio."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db")))
+        
+        with TestClient(aplicacion) as client:
+            texto = client.get("/metrics").text
+        
+        assert 'salon_pool_conexiones{engine="escritura",estado="tamano"} 5' in texto
+        assert 'salon_pool_conexiones{engine="lectura",estado="en_uso"}' in texto
+
+
+class TestConsultasLentas:
+    """Tests para el endpoint de consultas lentas."""
+    
+    def test_lista_consultas_lentas_con_plan(self, tmp_path):
+        """Verifica que se listan las consultas lentas con su plan de ejecución."""
+        from app.config import Settings
+        from app.instrumentacion_sql import consultas_lentas
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), token_admin="secreto"))
+        
+        with TestClient(aplicacion) as client:
+            consultas_lentas.configurar(0)
+            try:
+                client.get("/api/servicios")
+                data = client.get("/api/estadisticas/consultas-lentas",
+                                  headers={"X-Admin-Token": "secreto"}).json()
+            finally:
+                consultas_lentas.configurar(None)
+        
+        assert data["umbral_ms"] == 0
+        consulta = next(c for c in data["consultas"] if c["metodo"] == "listar_servicios")
+        assert consulta["recorre_servicios"] is True
+        assert consulta["plan"] == ["SCAN servicios"]
+    
+    def test_requiere_token_de_administracion(self, tmp_path):
+        """Verifica que el SQL de las consultas lentas solo se expone con el token de administración."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), token_admin="secreto"))
+        
+        with TestClient(aplicacion) as client:
+            assert client.get("/api/estadisticas/consultas-lentas").status_code == 403
+        assert TestClient(app).get("/api/estadisticas/consultas-lentas").status_code == 404
+
+
+class TestPerfilado:
+    """Tests para el perfilado bajo demanda y los endpoints de administración."""
+    
+    @pytest.fixture
+    def aplicacion(self, tmp_path):
+        """Aplicación con token de administración y perfiles en un directorio temporal."""
+        from app.config import Settings
+        from app.main import create_app
+        return create_app(Settings(
+            database_path=str(tmp_path / "salon.db"),
+            token_admin="secreto",
+            perfilado_dir=str(tmp_path / "perfiles")
+        ))
+    
+    def test_cabecera_perfilar_guarda_perfil(self, aplicacion):
+        """Verifica que una petición con el token se perfila y el perfil se puede descargar."""
+        import pstats
+        import tempfile
+        with TestClient(aplicacion) as client:
+            response = client.get("/api/empleados", headers={"X-Perfilar": "secreto"})
+            nombre = response.headers["x-perfil"]
+            assert nombre.endswith("_GET_api_empleados.pstats")
+            
+            listado = client.get("/api/admin/perfiles", headers={"X-Admin-Token": "secreto"}).json()
+            assert [perfil["nombre"] for perfil in listado["perfiles"]] == [nombre]
+            
+            descarga = client.get(f"/api/admin/perfiles/{nombre}", headers={"X-Admin-Token": "secreto"})
+            assert descarga.status_code == 200
+        
+        with tempfile.NamedTemporaryFile(suffix=".pstats") as fichero:
+            fichero.write(descarga.content)
+            fichero.flush()
+            assert pstats.Stats(fichero.name).total_calls > 0
+    
+    def test_perfila_el_hilo_de_los_handlers_sincronos(self, aplicacion, tmp_path):
+        """Verifica que el perfil incluye los handlers `def`, que se ejecutan en el pool de hilos."""
+        import pstats
+        with TestClient(aplicacion) as client:
+            response = client.post("/api/empleados", json={"id": "E001", "nombre": "Ana"},
+                                   headers={"X-Perfilar": "secreto"})
+            assert response.status_code == 201
+            nombre = response.headers["x-perfil"]
+        
+        funciones = {funcion for _, _, funcion in pstats.Stats(str(tmp_path / "perfiles" / nombre)).stats}
+        assert {"crear_empleado", "guardar_empleado"} <= funciones
+    
+    def test_token_incorrecto_no_perfila(self, aplicacion):
+        """Verifica que sin el token correcto no se perfila ni se accede a los perfiles."""
+        with TestClient(aplicacion) as client:
+            response = client.get("/api/empleados", headers={"X-Perfilar": "otro"})
+            assert "x-perfil" not in response.headers
+            
+            response = client.get("/api/admin/perfiles", headers={"X-Admin-Token": "otro"})
+            assert response.status_code == 403
+            assert response.json()["detail"]["error"] == "forbidden"
+    
+    def test_muestreo_en_formato_collapsed(self, aplicacion):
+        """Verifica que el muestreo configurado perfila 1 de cada N peticiones."""
+        with TestClient(aplicacion) as client:
+            response = client.put("/api/admin/perfilado", headers={"X-Admin-Token": "secreto"},
+                                  json={"muestreo": 2, "formato": "collapsed"})
+            assert response.json() == {"formato": "collapsed", "muestreo": 2}
+            
+            perfiles = [client.get("/health").headers.get("x-perfil") for _ in range(4)]
+            assert [perfil is not None for perfil in perfiles] == [False, True, False, True]
+            assert perfiles[1].endswith("_GET_health.collapsed")
+    
+    def test_perfil_inexistente_retorna_404(self, aplicacion):
+        """Verifica que un nombre de perfil desconocido o inválido retorna 404."""
+        with TestClient(aplicacion) as client:
+            for nombre in ("no-existe.pstats", "..%2Fsalon.db"):
+                response = client.get(f"/api/admin/perfiles/{nombre}", headers={"X-Admin-Token": "secreto"})
+                assert response.status_code == 404
+    
+    def test_sin_token_configurado_retorna_404(self, tmp_path):
+        """Verifica que los endpoints de administración no existen sin token configurado."""
+        from app.config import Settings
+        from app.main import create_app
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db")))
+        
+        response = TestClient(aplicacion).get("/api/admin/perfiles", headers={"X-Admin-Token": "x"})
+        assert response.status_code == 404
+
+
+class TestMemoria:
+    """Tests para los endpoints de instantáneas de memoria."""
+    
+    @pytest.fixture
+    def client_admin(self, tmp_path):
+        """Cliente de una aplicación con token de administración; detiene tracemalloc al terminar."""
+        from app.config import Settings
+        from app.main import create_app
+        from app.memoria import monitor_memoria
+        aplicacion = create_app(Settings(database_path=str(tmp_path / "salon.db"), token_admin="secreto"))
+        with TestClient(aplicacion, headers={"X-Admin-Token": "secreto"}) as client:
+            yield client
+        monitor_memoria.detener()
+    
+    def test_instantaneas_y_diferencia(self, client_admin):
+        """Verifica el flujo iniciar, instantánea, carga y diferencia por módulo y línea."""
+        client_admin.post("/api/empleados", json={"id": "E001", "nombre": "Ana"})
+        assert client_admin.post("/api/admin/memoria/iniciar").json()["activo"] is True
+        
+        desde = client_admin.post("/api/admin/memoria/instantaneas").json()
+        for i in range(20):
+            client_admin.post("/api/empleados", json={"id": f"E1{i:02d}", "nombre": f"Empleado {i}"})
+        hasta = client_admin.post("/api/admin/memoria/instantaneas?limite=5").json()
+        
+        assert hasta["id"] == desde["id"] + 1
+        assert len(hasta["sitios"]) <= 5
+        
+        response = client_admin.get(f"/api/admin/memoria/diferencia?desde={desde['id']}&hasta={hasta['id']}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["sitios"]
+        assert all(sitio["modulo"].startswith("app") for sitio in data["sitios"])
+        
+        estado = client_admin.get("/api/admin/memoria").json()
+        assert hasta["id"] in [instantanea["id"] for instantanea in estado["instantaneas"]]
+    
+    def test_instantanea_sin_iniciar_retorna_409(self, client_admin):
+        """Verifica que no se toma una instantánea sin tracemalloc activo."""
+        client_admin.post("/api/admin/memoria/detener")
+        response = client_admin.post("/api/admin/memoria/instantaneas")
+        
+        assert response.status_code == 409
+        assert response.json()["detail"]["error"] == "conflict"
+    
+    def test_instantanea_inexistente_retorna_404(self, client_admin):
+        """Verifica que una instantánea desconocida retorna 404."""
+        assert client_admin.get("/api/admin/memoria/instantaneas/99999").status_code == 404
+        assert client_admin.get("/api/admin/memoria/diferencia?desde=99998&hasta=99999").status_code == 404
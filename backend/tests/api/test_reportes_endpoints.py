@@ -4,18 +4,20 @@ Tests para los endpoints de reportes de la API REST.
 import pytest
 from decimal import Decimal
 from fastapi.testclient import TestClient
-from app.main import app, salon_manager
+from app.main import app
 
 
 @pytest.fixture
 def client():
-    """Fixture que proporciona un cliente de prueba."""
-    return TestClient(app)
+    """Fixture que proporciona un cliente de prueba (con el arranque de la aplicación)."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture(autouse=True)
-def limpiar_base_datos():
+def limpiar_base_datos(client):
     """Limpia la base de datos antes de cada test."""
+    salon_manager = app.state.salon_manager
     # Limpiar servicios
     servicios = salon_manager.obtener_servicios()
     for servicio in servicios:
@@ -431,3 +433,100 @@ class TestFormatoMonetario:
         for servicio in data["servicios"]:
             assert isinstance(servicio["precio"], (str, int, float))
             assert isinstance(servicio["comision"], (str, int, float))
+
+
+class TestSerieTemporal:
+    """Tests para el endpoint GET /api/reportes/serie."""
+    
+    def test_serie_mensual_con_huecos(self, client, setup_datos_basicos):
+        """Verifica que la serie agrupa por mes y rellena meses vacíos."""
+        for fecha, precio in [("2024-01-10", 100.00), ("2024-01-20", 50.00), ("2024-03-05", 25.00)]:
+            client.post("/api/servicios", json={
+                "fecha": fecha,
+                "empleado_id": "E001",
+                "tipo_servicio": "Corte",
+                "precio": precio
+            })
+        
+        response = client.get("/api/reportes/serie?granularidad=mes&fecha_inicio=2024-01-01&fecha_fin=2024-03-31")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["granularidad"] == "mes"
+        assert [p["periodo"] for p in data["puntos"]] == ["2024-01-01", "2024-02-01", "2024-03-01"]
+        enero, febrero, marzo = data["puntos"]
+        assert Decimal(enero["ingresos"]) == Decimal("150.00")
+        assert Decimal(enero["comisiones"]) == Decimal("60.00")
+        assert Decimal(enero["beneficios"]) == Decimal("90.00")
+        assert enero["cantidad"] == 2
+        assert febrero["cantidad"] == 0
+        assert Decimal(marzo["ingresos"]) == Decimal("25.00")
+    
+    def test_serie_granularidad_invalida_retorna_422(self, client):
+        """Verifica que una granularidad desconocida es rechazada."""
+        response = client.get("/api/reportes/serie?granularidad=hora")
+        assert response.status_code == 422
+    
+    def test_serie_rango_fechas_invalido_retorna_400(self, client):
+        """Verifica que un rango de fechas inválido retorna 400."""
+        response = client.get("/api/reportes/serie?fecha_inicio=2024-01-20&fecha_fin=2024-01-10")
+        assert response.status_code == 400
+        assert response.json()["detail"]["error"] == "validation_error"
+    
+    def test_serie_con_demasiados_periodos_retorna_400(self, client):
+        """Verifica que un rango que generaría demasiados períodos es rechazado."""
+        response = client.get("/api/reportes/serie?granularidad=dia&fecha_inicio=0001-01-01&fecha_fin=9999-12-31")
+        assert response.status_code == 400
+        assert response.json()["detail"]["field"] == "fecha_inicio"
+
+
+class TestRanking:
+    """Tests para el endpoint GET /api/reportes/ranking."""
+    
+    def test_ranking_tipos_servicio_por_cantidad(self, client, setup_datos_basicos):
+        """Verifica el ranking de tipos de servicio por número de servicios."""
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Tinte",
+            "descripcion": "Tinte completo",
+            "porcentaje_comision": 30.0
+        })
+        for tipo in ["Corte", "Corte", "Tinte"]:
+            client.post("/api/servicios", json={
+                "fecha": "2024-01-15",
+                "empleado_id": "E001",
+                "tipo_servicio": tipo,
+                "precio": 20.00
+            })
+        
+        response = client.get("/api/reportes/ranking?por=tipo_servicio&metrica=cantidad&n=1")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["por"] == "tipo_servicio"
+        assert data["metrica"] == "cantidad"
+        assert len(data["posiciones"]) == 1
+        assert data["posiciones"][0]["clave"] == "Corte"
+        assert data["posiciones"][0]["cantidad"] == 2
+    
+    def test_ranking_empleados_incluye_nombre(self, client, setup_datos_basicos):
+        """Verifica que el ranking por empleado incluye el nombre del empleado."""
+        client.post("/api/servicios", json={
+            "fecha": "2024-01-15",
+            "empleado_id": "E001",
+            "tipo_servicio": "Corte",
+            "precio": 50.00
+        })
+        
+        response = client.get("/api/reportes/ranking?por=empleado&metrica=comision")
+        assert response.status_code == 200
+        
+        posicion = response.json()["posiciones"][0]
+        assert posicion["clave"] == "E001"
+        assert posicion["nombre"] == "Juan Pérez"
+        assert Decimal(posicion["comisiones"]) == Decimal("20.00")
+    
+    def test_ranking_parametros_invalidos_retorna_422(self, client):
+        """Verifica que agrupaciones, métricas o límites inválidos son rechazados."""
+        assert client.get("/api/reportes/ranking?por=salon").status_code == 422
+        assert client.get("/api/reportes/ranking?metrica=propinas").status_code == 422
+        assert client.get("/api/reportes/ranking?n=0").status_code == 422
@@ -6,7 +6,8 @@ from fastapi.testclient import TestClient
 from datetime import date
 from decimal import Decimal
 
-from app.main import app, salon_manager
+from app.main import app
+from app.manager import SalonManager
 from app.repository import SQLAlchemyRepository
 
 
@@ -14,13 +15,8 @@ from app.repository import SQLAlchemyRepository
 def reset_database():
     """Fixture que reinicia la base de datos antes de cada test."""
     # Crear una nueva instancia del repositorio con base de datos en memoria
-    import app.main as main_module
-    main_module.repository = SQLAlchemyRepository("sqlite:///:memory:")
-    main_module.salon_manager = main_module.SalonManager(main_module.repository)
-    
-    # Actualizar la referencia global
-    global salon_manager
-    salon_manager = main_module.salon_manager
+    app.state.repository = SQLAlchemyRepository("sqlite:///:memory:")
+    app.state.salon_manager = SalonManager(app.state.repository)
     
     yield
     
@@ -216,6 +212,33 @@ class TestListarServicios:
         assert servicios[0]["fecha"] == "2024-01-20"
         assert servicios[1]["fecha"] == "2024-01-15"
         assert servicios[2]["fecha"] == "2024-01-10"
+    
+    def test_listar_servicios_con_proyeccion(self, client, setup_data):
+        """Debe devolver solo los campos pedidos, con el mismo formato y orden que el listado completo."""
+        for fecha, precio in (("2024-01-10", 20.00), ("2024-01-20", 30.00), ("2024-01-15", 25.50)):
+            client.post("/api/servicios", json={
+                "fecha": fecha, "empleado_id": "E001", "tipo_servicio": "Corte", "precio": precio
+            })
+        
+        completos = client.get("/api/servicios", params={"fecha_inicio": "2024-01-12"}).json()
+        response = client.get("/api/servicios", params={
+            "fecha_inicio": "2024-01-12", "fields": "fecha, precio,comision_calculada,fecha"
+        })
+        
+        assert response.status_code == 200
+        assert response.json() == [
+            {"fecha": s["fecha"], "precio": s["precio"], "comision_calculada": s["comision_calculada"]}
+            for s in completos
+        ]
+        assert [s["fecha"] for s in response.json()] == ["2024-01-20", "2024-01-15"]
+    
+    @pytest.mark.parametrize("fields", ["", "fecha,cliente"])
+    def test_listar_servicios_con_campos_invalidos_retorna_400(self, client, fields):
+        """Debe rechazar proyecciones vacías o con campos inexistentes."""
+        response = client.get("/api/servicios", params={"fields": fields})
+        
+        assert response.status_code == 400
+        assert response.json()["detail"]["field"] == "fields"
 
 
 class TestObtenerServicio:
@@ -8,14 +8,15 @@ from app.main import app
 
 @pytest.fixture
 def client():
-    """Fixture que proporciona un cliente de prueba."""
-    return TestClient(app)
+    """Fixture que proporciona un cliente de prueba (con el arranque de la aplicación)."""
+    with TestClient(app) as client:
+        yield client
 
 
 @pytest.fixture(autouse=True)
-def limpiar_base_datos():
+def limpiar_base_datos(client):
     """Limpia la base de datos antes de cada test."""
-    from app.main import salon_manager
+    salon_manager = app.state.salon_manager
     
     # Limpiar servicios
     servicios = salon_manager.repository.listar_servicios()
@@ -72,6 +73,44 @@ class TestListarTiposServicios:
         assert len(data) == 2
         assert any(t["nombre"] == "Corte Básico" for t in data)
         assert any(t["nombre"] == "Tinte Completo" for t in data)
+    
+    def test_listar_tipos_servicios_con_proyeccion(self, client):
+        """Debe devolver solo los campos pedidos."""
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Corte Básico",
+            "descripcion": "Corte de cabello básico",
+            "porcentaje_comision": 40.0
+        })
+        
+        response = client.get("/api/tipos-servicios", params={"fields": "porcentaje_comision,nombre"})
+        
+        assert response.status_code == 200
+        assert response.json() == [{"porcentaje_comision": 40.0, "nombre": "Corte Básico"}]
+
+
+class TestBuscarTiposServicios:
+    """Tests para el endpoint GET /api/tipos-servicios/buscar."""
+    
+    def test_buscar_tipos_servicios_en_nombre_y_descripcion(self, client):
+        """Verifica que se busca en nombre y descripción, pesando más el nombre."""
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Peinado", "descripcion": "Peinado con corte de puntas", "porcentaje_comision": 30.0
+        })
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Corte", "descripcion": "Corte de cabello", "porcentaje_comision": 40.0
+        })
+        
+        response = client.get("/api/tipos-servicios/buscar", params={"q": "cort"})
+        
+        assert response.status_code == 200
+        assert [tipo["nombre"] for tipo in response.json()] == ["Corte", "Peinado"]
+    
+    def test_buscar_no_se_confunde_con_un_tipo_llamado_buscar(self, client):
+        """Verifica que /buscar es la búsqueda y no la obtención de un tipo."""
+        response = client.get("/api/tipos-servicios/buscar", params={"q": "nada"})
+        
+        assert response.status_code == 200
+        assert response.json() == []
 
 
 class TestObtenerTipoServicio:
@@ -336,3 +375,57 @@ class TestIntegracionTiposServicios:
         response = client.get("/api/tipos-servicios")
         assert len(response.json()) == 2
         assert not any(t["nombre"] == "Tinte Completo" for t in response.json())
+
+
+class TestRecalcularComisiones:
+    """Pruebas para el endpoint POST /api/tipos-servicios/{nombre}/recalcular-comisiones"""
+    
+    def _crear_datos(self, client):
+        client.post("/api/empleados", json={"id": "E001", "nombre": "Juan Pérez"})
+        client.post("/api/tipos-servicios", json={
+            "nombre": "Corte",
+            "descripcion": "Corte de cabello",
+            "porcentaje_comision": 40.0
+        })
+        client.post("/api/servicios", json={
+            "fecha": "2024-01-15",
+            "empleado_id": "E001",
+            "tipo_servicio": "Corte",
+            "precio": 100.00
+        })
+    
+    def test_simular_y_aplicar_recalculo(self, client):
+        """Debe devolver la diferencia por empleado y aplicarla solo sin simulación."""
+        self._crear_datos(client)
+        cuerpo = {"fecha_inicio": "2024-01-01", "fecha_fin": "2024-01-31", "porcentaje_comision": 45.0}
+        
+        response = client.post("/api/tipos-servicios/Corte/recalcular-comisiones", json={**cuerpo, "simular": True})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["simulado"] is True
+        assert data["servicios_actualizados"] == 1
+        assert data["ajustes"][0]["empleado_id"] == "E001"
+        assert float(data["ajustes"][0]["diferencia"]) == 5.0
+        assert float(client.get("/api/servicios").json()[0]["comision_calculada"]) == 40.0
+        
+        response = client.post("/api/tipos-servicios/Corte/recalcular-comisiones", json=cuerpo)
+        assert response.status_code == 200
+        assert response.json()["simulado"] is False
+        assert float(client.get("/api/servicios").json()[0]["comision_calculada"]) == 45.0
+    
+    def test_recalcular_tipo_inexistente_retorna_404(self, client):
+        """Debe retornar 404 si el tipo de servicio no existe."""
+        response = client.post("/api/tipos-servicios/NoExiste/recalcular-comisiones", json={
+            "fecha_inicio": "2024-01-01",
+            "fecha_fin": "2024-01-31"
+        })
+        assert response.status_code == 404
+    
+    def test_recalcular_rango_invertido_retorna_400(self, client):
+        """Debe retornar 400 si la fecha de inicio es posterior a la de fin."""
+        self._crear_datos(client)
+        response = client.post("/api/tipos-servicios/Corte/recalcular-comisiones", json={
+            "fecha_inicio": "2024-02-01",
+            "fecha_fin": "2024-01-01"
+        })
+        assert response.status_code == 400
@@ -27,9 +27,8 @@ def setup_test_db():
     temp_db.close()
     
     # Reemplazar el repositorio y manager con uno que use la BD temporal
-    from app import main
-    main.repository = SQLAlchemyRepository(f"sqlite:///{temp_db.name}")
-    main.salon_manager = SalonManager(main.repository)
+    app.state.repository = SQLAlchemyRepository(f"sqlite:///{temp_db.name}")
+    app.state.salon_manager = SalonManager(app.state.repository)
     
     yield
     
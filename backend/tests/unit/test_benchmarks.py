@@ -0,0 +1,64 @@
+"""
+Tests unitarios para la suite de benchmarks.
+"""
+import sqlite3
+
+import pytest
+
+from benchmarks.suite import Medicion, comparar, ejecutar, medir, preparar_base_datos
+
+
+def _resultados(**medianas):
+    return {"resultados": {"1000": {op: {"mediana_ms": ms} for op, ms in medianas.items()}}}
+
+
+class TestMedir:
+    """Tests para medir y Medicion."""
+    
+    def test_toma_al_menos_una_muestra(self):
+        """Verifica que se toma una muestra aunque el presupuesto esté agotado."""
+        assert len(medir(lambda: None, repeticiones=5, presupuesto=0).muestras) == 1
+    
+    def test_resumen(self):
+        """Verifica la mediana, el mínimo y el p95 de las muestras."""
+        resumen = Medicion([float(i) for i in range(1, 101)]).to_dict()
+        
+        assert resumen["mediana_ms"] == 50.5
+        assert resumen["minimo_ms"] == 1.0
+        assert resumen["p95_ms"] == 96.0
+        assert resumen["muestras"] == 100
+
+
+class TestComparar:
+    """Tests para comparar con la línea base."""
+    
+    def test_regresiones_y_mejoras(self):
+        """Verifica que se detectan regresiones y mejoras por encima del umbral."""
+        base = _resultados(lenta=100.0, rapida=100.0, igual=100.0)
+        actual = _resultados(lenta=130.0, rapida=50.0, igual=110.0, nueva=5.0)
+        
+        regresiones, mejoras = comparar(actual, base, umbral=0.25)
+        
+        assert [c.operacion for c in regresiones] == ["lenta"]
+        assert regresiones[0].ratio == pytest.approx(1.3)
+        assert [c.operacion for c in mejoras] == ["rapida"]
+    
+    def test_ignora_diferencias_absolutas_pequenas(self):
+        """Verifica que el ruido en operaciones muy rápidas no cuenta como regresión."""
+        regresiones, _ = comparar(_resultados(op=0.4), _resultados(op=0.1), umbral=0.25, minimo_ms=0.5)
+        
+        assert regresiones == []
+
+
+class TestSuite:
+    """Tests de ejecución de la suite a escala reducida."""
+    
+    def test_ejecuta_todas_las_operaciones(self, tmp_path):
+        """Verifica que la suite puebla la base de datos y mide todas las operaciones."""
+        resultado = ejecutar([200], str(tmp_path), repeticiones=2, presupuesto=0.1)
+        
+        operaciones = resultado["resultados"]["200"]
+        assert len([op for op in operaciones if op.startswith("obtener_servicios[")]) == 8
+        assert {"registrar_servicio", "calcular_pago_empleado", "DELETE /api/servicios/{id}"} <= operaciones.keys()
+        with sqlite3.connect(preparar_base_datos(str(tmp_path), 200)) as conexion:
+            assert conexion.execute("SELECT COUNT(*) FROM servicios").fetchone()[0] == 200
@@ -0,0 +1,142 @@
+"""
+Tests para la búsqueda de texto completo de empleados y tipos de servicio.
+"""
+import sqlite3
+
+import pytest
+
+from app.busqueda import expresion_busqueda
+from app.models import Empleado, TipoServicio
+from app.repository import SQLAlchemyRepository, coincide_prefijos
+from app.instrumentacion_sql import consultas_lentas
+
+
+@pytest.fixture
+def repository():
+    """Repositorio en memoria con algunos empleados y tipos de servicio."""
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    for id, nombre in (("E001", "José Pérez"), ("E002", "María García"),
+                       ("E003", "Ana Marín"), ("E004", "Mario Gómez")):
+        repository.guardar_empleado(Empleado(id=id, nombre=nombre))
+    for nombre, descripcion in (("Corte", "Corte de cabello con lavado"),
+                                ("Tinte", "Coloración completa"),
+                                ("Peinado", "Recogido o peinado con corte de puntas")):
+        repository.guardar_tipo_servicio(TipoServicio(nombre=nombre, descripcion=descripcion, porcentaje_comision=40.0))
+    return repository
+
+
+class TestExpresionBusqueda:
+    """Tests para la conversión del texto del usuario en una consulta MATCH."""
+
+    def test_cada_palabra_es_un_prefijo_entrecomillado(self):
+        assert expresion_busqueda("mar gar") == '"mar"* "gar"*'
+
+    def test_los_operadores_de_fts5_no_se_interpretan(self):
+        assert expresion_busqueda('NEAR(a, b) OR -"c') == '"NEAR"* "a"* "b"* "OR"* "c"*'
+
+    def test_texto_sin_palabras_retorna_none(self):
+        assert expresion_busqueda(' *"- ') is None
+
+
+class TestBuscarEmpleados:
+    """Tests para SQLAlchemyRepository.buscar_empleados."""
+
+    def test_no_distingue_tildes_ni_mayusculas(self, repository):
+        assert [e.id for e in repository.buscar_empleados("JOSE", 10)] == ["E001"]
+
+    def test_busca_por_prefijo_de_cada_palabra(self, repository):
+        assert [e.id for e in repository.buscar_empleados("mar gar", 10)] == ["E002"]
+
+    def test_busca_por_id(self, repository):
+        assert [e.id for e in repository.buscar_empleados("e003", 10)] == ["E003"]
+
+    def test_respeta_el_limite(self, repository):
+        assert len(repository.buscar_empleados("ma", 2)) == 2
+
+    def test_texto_sin_palabras_no_encuentra_nada(self, repository):
+        assert repository.buscar_empleados('"*', 10) == []
+
+    def test_el_indice_sigue_las_actualizaciones_y_eliminaciones(self, repository):
+        repository.guardar_empleado(Empleado(id="E001", nombre="Josefa Ruiz"))
+        repository.eliminar_empleado("E002")
+
+        assert [e.nombre for e in repository.buscar_empleados("ruiz", 10)] == ["Josefa Ruiz"]
+        assert repository.buscar_empleados("perez", 10) == []
+        assert repository.buscar_empleados("garcia", 10) == []
+
+    def test_usa_el_indice_de_busqueda(self, repository):
+        consultas_lentas.configurar(0)
+        try:
+            repository.buscar_empleados("mar", 10)
+            plan = consultas_lentas.recientes()[-1].plan
+        finally:
+            consultas_lentas.configurar(None)
+
+        assert any("VIRTUAL TABLE INDEX" in paso for paso in plan)
+        assert "SCAN empleados" not in plan
+
+
+class TestBuscarTiposServicios:
+    """Tests para SQLAlchemyRepository.buscar_tipos_servicios."""
+
+    def test_busca_en_nombre_y_descripcion(self, repository):
+        assert [t.nombre for t in repository.buscar_tipos_servicios("color", 10)] == ["Tinte"]
+
+    def test_el_nombre_pesa_mas_que_la_descripcion(self, repository):
+        assert [t.nombre for t in repository.buscar_tipos_servicios("corte", 10)] == ["Corte", "Peinado"]
+
+    def test_el_indice_sigue_las_eliminaciones(self, repository):
+        repository.eliminar_tipo_servicio("Tinte")
+
+        assert repository.buscar_tipos_servicios("tinte", 10) == []
+
+
+def test_base_de_datos_anterior_se_indexa_al_abrirla(tmp_path):
+    """Los índices de una base de datos creada sin búsqueda se rellenan al abrir el repositorio."""
+    ruta = tmp_path / "salon.db"
+    SQLAlchemyRepository(f"sqlite:///{ruta}").cerrar()
+    with sqlite3.connect(ruta) as conexion:
+        for tabla in ("empleados_fts", "tipos_servicios_fts"):
+            for accion in ("insertar", "actualizar", "eliminar"):
+                conexion.execute(f"DROP TRIGGER {tabla}_{accion}")
+            conexion.execute(f"DROP TABLE {tabla}")
+        conexion.execute("INSERT INTO empleados (id, nombre) VALUES ('E001', 'José Pérez')")
+
+    repository = SQLAlchemyRepository(f"sqlite:///{ruta}")
+
+    assert [e.id for e in repository.buscar_empleados("jose", 10)] == ["E001"]
+    repository.cerrar()
+
+
+
+def test_indice_anterior_con_copia_de_las_filas_se_convierte(tmp_path):
+    """Un índice de la versión sin `content=` se vuelve a crear de contenido externo al abrir el repositorio."""
+    ruta = tmp_path / "salon.db"
+    SQLAlchemyRepository(f"sqlite:///{ruta}").cerrar()
+    with sqlite3.connect(ruta) as conexion:
+        for accion in ("insertar", "actualizar", "eliminar"):
+            conexion.execute(f"DROP TRIGGER empleados_fts_{accion}")
+        conexion.execute("DROP TABLE empleados_fts")
+        conexion.execute("CREATE VIRTUAL TABLE empleados_fts USING fts5(id, nombre)")
+        conexion.execute("INSERT INTO empleados (id, nombre) VALUES ('E001', 'José Pérez')")
+        conexion.execute("INSERT INTO empleados_fts (id, nombre) VALUES ('E001', 'José Pérez')")
+
+    repository = SQLAlchemyRepository(f"sqlite:///{ruta}")
+    repository.guardar_empleado(Empleado(id="E001", nombre="Josefa Ruiz"))
+
+    with repository.engine.connect() as conexion:
+        tablas = set(conexion.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE name LIKE 'empleados_fts%'"
+        ).scalars())
+        conexion.exec_driver_sql("INSERT INTO empleados_fts (empleados_fts, rank) VALUES ('integrity-check', 1)")
+    assert "empleados_fts_content" not in tablas
+    assert [e.nombre for e in repository.buscar_empleados("josefa", 10)] == ["Josefa Ruiz"]
+    assert repository.buscar_empleados("jose perez", 10) == []
+    repository.cerrar()
+
+def test_coincide_prefijos_equivale_a_la_busqueda_fts():
+    """La búsqueda en Python de los repositorios sin FTS5 sigue las mismas reglas."""
+    assert coincide_prefijos("mar gar", "María García")
+    assert coincide_prefijos("JOSE", "E001", "José Pérez")
+    assert not coincide_prefijos("mar ruiz", "María García")
+    assert not coincide_prefijos("", "María García")
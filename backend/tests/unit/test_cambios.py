@@ -0,0 +1,133 @@
+"""
+Tests para el log de cambios (sincronización incremental).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models import Empleado, ServicioRegistrado, TipoServicio
+from app.repository import SQLAlchemyRepository
+
+
+def _servicio(id: str, precio: str = "25.00") -> ServicioRegistrado:
+    return ServicioRegistrado(
+        id=id, fecha=date(2024, 1, 15), empleado_id="E001", tipo_servicio="Corte",
+        precio=Decimal(precio), comision_calculada=Decimal(precio) * Decimal("0.4")
+    )
+
+
+@pytest.fixture
+def repository():
+    """Repositorio en memoria con un empleado y un tipo de servicio (cambios 1 y 2)."""
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    repository.guardar_empleado(Empleado(id="E001", nombre="Juan Pérez"))
+    repository.guardar_tipo_servicio(TipoServicio(nombre="Corte", descripcion="Corte", porcentaje_comision=40.0))
+    return repository
+
+
+def _entradas(repository):
+    with repository.engine.connect() as conexion:
+        return conexion.exec_driver_sql("SELECT seq, tabla, clave, operacion FROM cambios ORDER BY seq").all()
+
+
+class TestRegistroDeCambios:
+    """Tests para los triggers que escriben el log."""
+
+    def test_cada_escritura_registra_un_cambio(self, repository):
+        repository.guardar_servicio(_servicio("S1"))
+        repository.guardar_empleado(Empleado(id="E001", nombre="Juan P."))
+        repository.eliminar_servicio("S1")
+
+        assert _entradas(repository) == [
+            (1, "empleados", "E001", "insertar"),
+            (2, "tipos_servicios", "Corte", "insertar"),
+            (3, "servicios", "S1", "insertar"),
+            (4, "empleados", "E001", "actualizar"),
+            (5, "servicios", "S1", "eliminar"),
+        ]
+
+    def test_una_escritura_fallida_no_deja_cambios(self, repository):
+        repository.guardar_servicio(_servicio("S1"))
+
+        with pytest.raises(Exception):
+            repository.guardar_servicios([_servicio("S2"), _servicio("S1")])
+
+        assert [entrada.clave for entrada in _entradas(repository)] == ["E001", "Corte", "S1"]
+
+    def test_recalcular_comisiones_registra_cada_servicio(self, repository):
+        repository.guardar_servicios([_servicio("S1"), _servicio("S2")])
+
+        repository.recalcular_comisiones("Corte", 50.0, date(2024, 1, 1), date(2024, 1, 31))
+
+        assert [(e.clave, e.operacion) for e in _entradas(repository)[-2:]] == [
+            ("S1", "actualizar"), ("S2", "actualizar")
+        ]
+
+
+class TestListarCambios:
+    """Tests para SQLAlchemyRepository.listar_cambios."""
+
+    def test_ultimo_cambio_de_cada_fila_con_datos_actuales(self, repository):
+        repository.guardar_servicio(_servicio("S1"))
+        repository.guardar_empleado(Empleado(id="E001", nombre="Juan P."))
+        repository.guardar_servicio(_servicio("S2"))
+        repository.eliminar_servicio("S2")
+
+        pagina = repository.listar_cambios(0, 100)
+
+        assert [(c.seq, c.clave, c.operacion) for c in pagina.cambios] == [
+            (2, "Corte", "insertar"), (3, "S1", "insertar"), (4, "E001", "actualizar"), (6, "S2", "eliminar")
+        ]
+        assert pagina.cambios[2].datos == Empleado(id="E001", nombre="Juan P.")
+        assert pagina.cambios[1].datos.precio == Decimal("25.00")
+        assert pagina.cambios[3].datos is None
+        assert (pagina.hasta, pagina.ultimo, pagina.mas, pagina.resincronizar) == (6, 6, False, False)
+
+    def test_paginacion(self, repository):
+        repository.guardar_servicios([_servicio(f"S{i}") for i in range(5)])
+
+        primera = repository.listar_cambios(0, 4)
+        segunda = repository.listar_cambios(primera.hasta, 4)
+
+        assert (primera.hasta, primera.mas) == (4, True)
+        assert [c.clave for c in segunda.cambios] == ["S2", "S3", "S4"]
+        assert (segunda.hasta, segunda.mas) == (7, False)
+
+    def test_al_dia_no_devuelve_cambios(self, repository):
+        pagina = repository.listar_cambios(2, 100)
+
+        assert pagina.cambios == []
+        assert (pagina.hasta, pagina.resincronizar) == (2, False)
+
+    def test_desde_posterior_al_ultimo_pide_resincronizar(self, repository):
+        pagina = repository.listar_cambios(10, 100)
+
+        assert pagina.resincronizar
+        assert pagina.hasta == 2
+
+
+class TestCompactarCambios:
+    """Tests para SQLAlchemyRepository.compactar_cambios."""
+
+    def test_clientes_atrasados_deben_resincronizar(self, repository):
+        repository.guardar_servicio(_servicio("S1"))
+
+        assert repository.compactar_cambios(datetime(2100, 1, 1)) == 3
+
+        assert repository.listar_cambios(0, 100).resincronizar
+        assert repository.listar_cambios(2, 100).resincronizar
+        assert not repository.listar_cambios(3, 100).resincronizar
+
+    def test_las_secuencias_no_se_reutilizan(self, repository):
+        repository.compactar_cambios(datetime(2100, 1, 1))
+        repository.guardar_servicio(_servicio("S1"))
+
+        pagina = repository.listar_cambios(2, 100)
+
+        assert [(c.seq, c.clave) for c in pagina.cambios] == [(3, "S1")]
+        assert repository.listar_cambios(0, 100).resincronizar
+
+    def test_no_elimina_cambios_recientes(self, repository):
+        assert repository.compactar_cambios(datetime(2000, 1, 1)) == 0
+        assert not repository.listar_cambios(0, 100).resincronizar
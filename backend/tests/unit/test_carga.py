@@ -0,0 +1,58 @@
+"""
+Tests unitarios para la prueba de carga HTTP.
+"""
+import asyncio
+
+import pytest
+
+from benchmarks.carga import ejecutar_en_proceso, parsear_mezcla, percentil
+from benchmarks.suite import preparar_base_datos
+
+
+class TestParsearMezcla:
+    """Tests para parsear_mezcla."""
+    
+    def test_pesos(self):
+        """Verifica que se leen las operaciones y sus pesos."""
+        assert parsear_mezcla("registrar=70, listar=30") == {"registrar": 70.0, "listar": 30.0}
+    
+    def test_operacion_desconocida(self):
+        """Verifica que se rechazan operaciones desconocidas."""
+        with pytest.raises(ValueError):
+            parsear_mezcla("registrar=50,borrar_todo=50")
+    
+    def test_sin_pesos_positivos(self):
+        """Verifica que se rechaza una mezcla sin pesos positivos."""
+        with pytest.raises(ValueError):
+            parsear_mezcla("registrar=0")
+
+
+class TestPercentil:
+    """Tests para percentil."""
+    
+    def test_rango_mas_cercano(self):
+        """Verifica los percentiles por rango más cercano."""
+        valores = [float(i) for i in range(1, 101)]
+        
+        assert percentil(valores, 50) == 50.0
+        assert percentil(valores, 99) == 99.0
+        assert percentil(valores, 100) == 100.0
+        assert percentil([], 95) == 0.0
+
+
+class TestEjecutarEnProceso:
+    """Tests de la prueba de carga contra la aplicación en proceso."""
+    
+    def test_informe_por_ruta(self, tmp_path):
+        """Verifica que los usuarios virtuales generan peticiones sin errores y se informa por ruta."""
+        ruta = preparar_base_datos(str(tmp_path), 100)
+        
+        informe = asyncio.run(ejecutar_en_proceso(
+            ruta, mezcla={"registrar": 1, "listar": 1}, usuarios=3, duracion=0.5
+        ))
+        
+        assert informe["peticiones"] > 0
+        assert informe["tasa_error"] == 0.0
+        assert set(informe["rutas"]) <= {"POST /api/servicios", "GET /api/servicios"}
+        for datos in informe["rutas"].values():
+            assert datos["p50_ms"] <= datos["p95_ms"] <= datos["p99_ms"]
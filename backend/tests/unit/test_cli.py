@@ -0,0 +1,139 @@
+"""
+Pruebas unitarias para los comandos de administración (app.cli).
+"""
+import sqlite3
+from datetime import date
+from decimal import Decimal
+
+from app.cli import main
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+
+
+def _crear_base_datos(ruta):
+    """Crea una base de datos con un servicio de 'Corte' al 40%."""
+    manager = SalonManager(SQLAlchemyRepository(f"sqlite:///{ruta}"))
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    manager.registrar_servicio(date(2024, 1, 15), "E001", "Corte", Decimal("100.00"))
+    return manager
+
+
+def test_recalcular_comisiones_simulado(tmp_path, capsys):
+    """Probar que --simular muestra la diferencia sin modificar la base de datos."""
+    ruta = tmp_path / "salon.db"
+    manager = _crear_base_datos(ruta)
+    
+    codigo = main([
+        "--database", str(ruta), "recalcular-comisiones", "Corte", "2024-01-01", "2024-01-31",
+        "--porcentaje", "50", "--simular"
+    ])
+    
+    assert codigo == 0
+    salida = capsys.readouterr().out
+    assert "Simulación" in salida
+    assert "E001: 1 servicios, 40.00 -> 50.00 (+10.00)" in salida
+    assert manager.obtener_servicios()[0].comision_calculada == Decimal("40.00")
+
+
+def test_recalcular_comisiones_aplica_cambios(tmp_path):
+    """Probar que sin --simular se actualizan las comisiones."""
+    ruta = tmp_path / "salon.db"
+    manager = _crear_base_datos(ruta)
+    
+    codigo = main([
+        "--database", str(ruta), "recalcular-comisiones", "Corte", "2024-01-01", "2024-01-31",
+        "--porcentaje", "50"
+    ])
+    
+    assert codigo == 0
+    assert manager.obtener_servicios()[0].comision_calculada == Decimal("50.00")
+
+
+def test_recalcular_comisiones_tipo_inexistente(tmp_path, capsys):
+    """Probar que un tipo inexistente termina con código de error."""
+    ruta = tmp_path / "salon.db"
+    _crear_base_datos(ruta)
+    
+    codigo = main(["--database", str(ruta), "recalcular-comisiones", "Tinte", "2024-01-01", "2024-01-31"])
+    
+    assert codigo == 1
+    assert "Error" in capsys.readouterr().err
+
+
+def test_crear_salon(tmp_path, capsys):
+    """Probar que crear-salon crea la base de datos del salón."""
+    codigo = main(["crear-salon", "centro", "--directorio", str(tmp_path)])
+    
+    assert codigo == 0
+    assert (tmp_path / "centro.db").exists()
+    assert "centro" in capsys.readouterr().out
+
+
+def test_crear_salon_identificador_invalido(tmp_path):
+    """Probar que un identificador inválido termina con código de error."""
+    assert main(["crear-salon", "../fuera", "--directorio", str(tmp_path)]) == 1
+
+
+def test_compactar_cambios(tmp_path, capsys):
+    """Probar que compactar-cambios elimina las entradas antiguas y los clientes atrasados se resincronizan."""
+    ruta = tmp_path / "salon.db"
+    manager = _crear_base_datos(ruta)
+    with manager.repository.engine.begin() as conexion:
+        conexion.exec_driver_sql("UPDATE cambios SET momento = '2020-01-01 00:00:00.000' WHERE seq <= 2")
+    
+    codigo = main(["--database", str(ruta), "compactar-cambios", "--dias", "30"])
+    
+    assert codigo == 0
+    assert "eliminadas: 2" in capsys.readouterr().out
+    assert manager.listar_cambios(0).resincronizar
+    assert [cambio.seq for cambio in manager.listar_cambios(2).cambios] == [3]
+
+
+def test_archivar_servicios(tmp_path, capsys):
+    """Probar que archivar-servicios mueve los años cerrados y rechaza el año en curso."""
+    ruta = tmp_path / "salon.db"
+    manager = _crear_base_datos(ruta)
+    
+    codigo = main(["--database", str(ruta), "archivar-servicios", "--hasta", "2024"])
+    
+    assert codigo == 0
+    assert "2024: 1 servicios" in capsys.readouterr().out
+    # El repositorio abierto antes de archivar ve la partición nueva sin reiniciarse
+    assert len(manager.obtener_servicios(fecha_inicio=date(2024, 1, 1), fecha_fin=date(2024, 12, 31))) == 1
+    manager.registrar_servicio(date(2024, 6, 1), "E001", "Corte", Decimal("50.00"))
+    with manager.repository.engine.connect() as conexion:
+        assert conexion.exec_driver_sql("SELECT count(*) FROM servicios_2024").scalar() == 2
+    assert main(["--database", str(ruta), "archivar-servicios", "--hasta", str(date.today().year)]) == 1
+
+
+def test_vacuum_reconstruye_los_indices_de_busqueda(tmp_path, capsys):
+    """Probar que vacuum vuelve a enlazar los índices de búsqueda con los rowid de las tablas."""
+    ruta = tmp_path / "salon.db"
+    _crear_base_datos(ruta).repository.cerrar()
+    # Renumerar los rowid como puede hacerlo VACUUM, sin que el trigger actualice el índice
+    with sqlite3.connect(ruta) as conexion:
+        trigger = conexion.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'empleados_fts_actualizar'"
+        ).fetchone()[0]
+        conexion.execute("DROP TRIGGER empleados_fts_actualizar")
+        conexion.execute("UPDATE empleados SET rowid = rowid + 100")
+        conexion.execute(trigger)
+    manager = SalonManager(SQLAlchemyRepository(f"sqlite:///{ruta}"))
+    assert manager.repository.buscar_empleados("juan", 10) == []
+    
+    assert main(["--database", str(ruta), "vacuum"]) == 0
+    
+    assert "reconstruidos" in capsys.readouterr().out
+    assert [e.id for e in manager.repository.buscar_empleados("juan", 10)] == ["E001"]
+
+
+def test_usa_la_configuracion_del_entorno(tmp_path, monkeypatch, capsys):
+    """Probar que los comandos abren la base de datos con la configuración del servidor."""
+    ruta = tmp_path / "salon.db"
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "DELETE")
+    
+    assert main(["--database", str(ruta), "compactar-cambios"]) == 0
+    
+    with sqlite3.connect(ruta) as conexion:
+        assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
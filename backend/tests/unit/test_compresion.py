@@ -0,0 +1,123 @@
+"""
+Tests unitarios para el middleware de compresión de respuestas.
+"""
+import asyncio
+import zlib
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compresion import MiddlewareCompresion, es_comprimible, negociar_codificacion
+
+GRANDE = [{"empleado_id": "E001", "tipo_servicio": "Corte", "precio": 25.0}] * 200
+
+
+@pytest.fixture
+def client():
+    """Aplicación mínima con respuestas grandes, pequeñas, en streaming y sin cuerpo."""
+    aplicacion = FastAPI()
+    
+    @aplicacion.get("/grande")
+    def grande():
+        return GRANDE
+    
+    @aplicacion.get("/pequena")
+    def pequena():
+        return {"ok": True}
+    
+    @aplicacion.get("/no-modificado")
+    def no_modificado():
+        return Response(status_code=304)
+    
+    @aplicacion.get("/binario")
+    def binario():
+        return Response(b"\x00" * 5000, media_type="application/octet-stream")
+    
+    @aplicacion.get("/streaming")
+    def streaming():
+        return StreamingResponse((f"linea {i}\n".encode() for i in range(100)), media_type="text/plain")
+    
+    aplicacion.add_middleware(MiddlewareCompresion, tamano_minimo=500)
+    return TestClient(aplicacion)
+
+
+class TestNegociarCodificacion:
+    """Tests para negociar_codificacion."""
+    
+    @pytest.mark.parametrize("cabecera, esperada", [
+        ("gzip, deflate", "gzip"),
+        ("br;q=1.0, gzip;q=0.8", "br"),
+        ("br;q=0.5, gzip;q=0.8", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "br"),
+        ("identity", None),
+        ("", None),
+    ])
+    def test_respeta_calidades_y_preferencia(self, cabecera, esperada):
+        """Verifica la elección según q y el orden de preferencia br > gzip."""
+        assert negociar_codificacion(cabecera, ("br", "gzip")) == esperada
+    
+    def test_sin_brotli_disponible(self):
+        """Verifica que sin brotli se usa gzip aunque el cliente prefiera br."""
+        assert negociar_codificacion("br, gzip;q=0.1", ("gzip",)) == "gzip"
+    
+    def test_tipos_comprimibles(self):
+        """Verifica qué tipos de contenido se comprimen."""
+        assert es_comprimible("application/json")
+        assert es_comprimible("text/csv; charset=utf-8")
+        assert not es_comprimible("application/octet-stream")
+        assert not es_comprimible("")
+
+
+class TestMiddlewareCompresion:
+    """Tests para MiddlewareCompresion."""
+    
+    def test_respuesta_grande_con_gzip(self, client):
+        """Verifica que una respuesta por encima del umbral se comprime con gzip."""
+        response = client.get("/grande", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-encoding" in response.headers["vary"].lower()
+        assert int(response.headers["content-length"]) < len(response.content) / 10
+        assert response.json() == GRANDE
+    
+    def test_sin_accept_encoding_no_comprime(self, client):
+        """Verifica que no se comprime si el cliente no lo acepta."""
+        response = client.get("/grande", headers={"Accept-Encoding": "identity"})
+        
+        assert "content-encoding" not in response.headers
+        assert response.json() == GRANDE
+    
+    @pytest.mark.parametrize("ruta", ["/pequena", "/no-modificado", "/binario"])
+    def test_respuestas_que_no_se_comprimen(self, client, ruta):
+        """Verifica que las respuestas pequeñas, 304 y binarias se envían sin comprimir."""
+        response = client.get(ruta, headers={"Accept-Encoding": "gzip"})
+        
+        assert "content-encoding" not in response.headers
+    
+    def test_streaming_por_fragmentos(self):
+        """Verifica que cada fragmento en streaming se envía comprimido y descomprimible al momento."""
+        async def aplicacion(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/event-stream")]})
+            for i in range(3):
+                await send({"type": "http.response.body", "body": f"data: {i}\n\n".encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        
+        enviados = []
+        
+        async def send(mensaje):
+            enviados.append(mensaje)
+        
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(MiddlewareCompresion(aplicacion, tamano_minimo=500)(scope, None, send))
+        
+        cabeceras = dict(enviados[0]["headers"])
+        assert cabeceras[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in cabeceras
+        descompresor = zlib.decompressobj(31)
+        fragmentos = [descompresor.decompress(mensaje["body"]) for mensaje in enviados[1:]]
+        assert fragmentos == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n", b""]
+        assert descompresor.eof
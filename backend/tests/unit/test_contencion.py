@@ -0,0 +1,69 @@
+"""
+Tests unitarios para la prueba de contención de escritura y la configuración de SQLite.
+"""
+import sqlite3
+
+import pytest
+
+from app.database import ConfiguracionSQLite
+from app.repository import SQLAlchemyRepository
+from benchmarks.contencion import ejecutar_configuracion, es_correcta, verificar
+
+
+class TestConfiguracionSQLite:
+    """Tests para ConfiguracionSQLite."""
+    
+    @pytest.mark.parametrize("journal_mode, synchronous", [("SIN_DIARIO", None), ("WAL", "RAPIDO")])
+    def test_valores_no_validos(self, journal_mode, synchronous):
+        """Verifica que se rechazan modos que SQLite no admite."""
+        with pytest.raises(ValueError):
+            ConfiguracionSQLite(journal_mode, synchronous)
+    
+    def test_repositorio_aplica_pragmas(self, tmp_path):
+        """Verifica que las conexiones del repositorio usan el modo de diario y la sincronización indicados."""
+        ruta = tmp_path / "salon.db"
+        repository = SQLAlchemyRepository(
+            f"sqlite:///{ruta}", configuracion_sqlite=ConfiguracionSQLite("delete", "normal")
+        )
+        with repository.engine.connect() as conexion:
+            journal_mode = conexion.exec_driver_sql("PRAGMA journal_mode").scalar()
+            synchronous = conexion.exec_driver_sql("PRAGMA synchronous").scalar()
+        repository.cerrar()
+        
+        assert journal_mode == "delete"
+        assert synchronous == 1
+
+
+class TestVerificar:
+    """Tests para verificar."""
+    
+    def test_detecta_perdidos_duplicados_e_inesperados(self, tmp_path):
+        """Verifica que se cuentan confirmados ausentes, repetidos y filas no confirmadas."""
+        ruta = str(tmp_path / "salon.db")
+        with sqlite3.connect(ruta) as conexion:
+            conexion.execute("CREATE TABLE servicios (id TEXT)")
+            conexion.executemany("INSERT INTO servicios VALUES (?)", [("a",), ("b",), ("x",)])
+        
+        verificacion = verificar(ruta, ["a", "b", "b", "c"])
+        
+        assert verificacion["filas"] == 3
+        assert verificacion["perdidos"] == 1
+        assert verificacion["duplicados"] == 1
+        assert verificacion["inesperados"] == 1
+        assert verificacion["integridad"] == "ok"
+
+
+class TestEjecutarConfiguracion:
+    """Tests para ejecutar_configuracion."""
+    
+    def test_varios_procesos_sin_perdidas(self, tmp_path):
+        """Verifica que con dos procesos escritores no se pierden ni duplican servicios."""
+        resultado = ejecutar_configuracion(
+            str(tmp_path), ConfiguracionSQLite("WAL", "NORMAL"), procesos=2, hilos=2, duracion=1.0
+        )
+        
+        assert resultado["commits"] > 0
+        assert resultado["verificacion"]["filas"] == resultado["commits"]
+        assert resultado["otros_errores"] == 0
+        assert es_correcta(resultado)
+        assert resultado["p50_ms"] <= resultado["p99_ms"] <= resultado["max_ms"]
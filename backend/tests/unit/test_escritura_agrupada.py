@@ -0,0 +1,120 @@
+"""
+Pruebas unitarias para la escritura agrupada (group commit) de servicios.
+"""
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.escritura_agrupada import EscrituraAgrupada
+from app.manager import SalonManager
+from app.models import Empleado, TipoServicio, ServicioRegistrado
+from app.repository import SQLAlchemyRepository
+
+
+def _servicio(precio: str = "10.00") -> ServicioRegistrado:
+    return ServicioRegistrado(
+        id=str(uuid.uuid4()),
+        fecha=date(2024, 1, 15),
+        empleado_id="E001",
+        tipo_servicio="Corte",
+        precio=Decimal(precio),
+        comision_calculada=Decimal("4.00")
+    )
+
+
+class RepositorioQueFalla(SQLAlchemyRepository):
+    """Repositorio en memoria que rechaza los lotes con un precio concreto."""
+    
+    def __init__(self):
+        super().__init__("sqlite:///:memory:")
+        self.lotes = []
+    
+    def guardar_servicios(self, servicios):
+        self.lotes.append(len(servicios))
+        if any(servicio.precio == Decimal("666.00") for servicio in servicios):
+            raise ValueError("servicio rechazado")
+        super().guardar_servicios(servicios)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    repository = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'salon.db'}")
+    yield repository
+    repository.cerrar()
+
+
+@pytest.fixture
+def escritura(repository):
+    escritura = EscrituraAgrupada(repository, intervalo=0.05, tamano_lote=8)
+    escritura.iniciar()
+    yield escritura
+    escritura.detener()
+
+
+def test_guardado_concurrente_se_agrupa_en_lotes(repository, escritura):
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(lambda _: escritura.guardar(_servicio()), range(40)))
+    
+    assert len(repository.listar_servicios()) == 40
+    lotes = escritura.histograma_lotes.to_dict()
+    assert lotes["suma"] == 40
+    assert lotes["total"] < 40
+    # Ningún lote supera tamano_lote (8 cae en el bucket "10")
+    assert lotes["buckets"]["20"] == lotes["buckets"]["50"] == lotes["buckets"]["+Inf"] == 0
+    assert escritura.histograma_latencias_ms.total == 40
+
+
+def test_guardar_retorna_tras_confirmar(repository, escritura):
+    servicio = _servicio()
+    escritura.guardar(servicio)
+    
+    assert [s.id for s in repository.listar_servicios()] == [servicio.id]
+
+
+def test_servicio_erroneo_no_arrastra_al_resto_del_lote():
+    repository = RepositorioQueFalla()
+    escritura = EscrituraAgrupada(repository, intervalo=0.2, tamano_lote=50)
+    escritura.iniciar()
+    precios = ["10.00"] * 5 + ["666.00"] + ["12.00"] * 5
+    
+    def guardar(precio):
+        try:
+            escritura.guardar(_servicio(precio))
+            return "ok"
+        except ValueError:
+            return "error"
+    
+    with ThreadPoolExecutor(max_workers=len(precios)) as executor:
+        resultados = list(executor.map(guardar, precios))
+    escritura.detener()
+    
+    assert resultados.count("error") == 1
+    assert resultados[5] == "error"
+    assert len(repository.listar_servicios()) == 10
+
+
+def test_detener_confirma_pendientes_y_rechaza_nuevos(repository):
+    escritura = EscrituraAgrupada(repository, intervalo=0.01, tamano_lote=4)
+    escritura.iniciar()
+    escritura.guardar(_servicio())
+    escritura.detener()
+    
+    assert not escritura.activa
+    with pytest.raises(RuntimeError):
+        escritura.guardar(_servicio())
+    assert len(repository.listar_servicios()) == 1
+
+
+def test_manager_registra_servicios_por_lotes(repository, escritura):
+    manager = SalonManager(repository, escritura)
+    manager.crear_empleado("E001", "Juan")
+    manager.crear_tipo_servicio("Corte", "Corte de cabello", 40.0)
+    
+    resultado = manager.registrar_servicio(date(2024, 1, 15), "E001", "Corte", Decimal("25.00"))
+    
+    assert resultado.value.comision_calculada == Decimal("10.00")
+    assert repository.listar_servicios()[0].id == resultado.value.id
+    assert escritura.histograma_lotes.total == 1
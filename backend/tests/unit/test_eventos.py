@@ -0,0 +1,95 @@
+"""
+Tests para el difusor de eventos de servicios (Server-Sent Events).
+"""
+import asyncio
+import threading
+from datetime import date
+from decimal import Decimal
+
+from app.eventos import DifusorEventos, flujo_eventos, formatear_evento
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+
+
+def test_formatear_evento():
+    assert formatear_evento("totales", {"cantidad": 1}, id=7) == 'id: 7\nevent: totales\ndata: {"cantidad":1}\n\n'
+    assert formatear_evento("totales", {"nombre": "José"}) == 'event: totales\ndata: {"nombre":"José"}\n\n'
+
+
+def test_entrega_en_orden_desde_otro_hilo():
+    """Los eventos publicados desde otros hilos llegan en orden a cada suscripción."""
+    async def escenario():
+        difusor = DifusorEventos()
+        primera, segunda = difusor.suscribir(), difusor.suscribir()
+        hilo = threading.Thread(target=lambda: [difusor.publicar("n", {"i": i}) for i in range(5)])
+        hilo.start()
+        hilo.join()
+        return [
+            [(await suscripcion.siguiente(1)).datos["i"] for _ in range(5)]
+            for suscripcion in (primera, segunda)
+        ]
+    
+    assert asyncio.run(escenario()) == [[0, 1, 2, 3, 4]] * 2
+
+
+def test_cliente_lento_se_descarta_sin_afectar_a_los_demas():
+    """Con la cola llena el cliente se descarta y los demás siguen recibiendo eventos."""
+    async def escenario():
+        difusor = DifusorEventos(tamano_cola=2)
+        lento, rapido = difusor.suscribir(), difusor.suscribir()
+        recibidos = []
+        for i in range(3):
+            difusor.publicar("n", {"i": i})
+            await asyncio.sleep(0)
+            recibidos.append((await rapido.siguiente(1)).datos["i"])
+        return await lento.siguiente(1), lento.descartada, recibidos, difusor
+    
+    evento, descartada, recibidos, difusor = asyncio.run(escenario())
+    
+    assert evento is None
+    assert descartada
+    assert recibidos == [0, 1, 2]
+    assert (difusor.suscriptores, difusor.descartadas) == (1, 1)
+
+
+def test_flujo_envia_latidos_y_cancela_la_suscripcion_al_terminar():
+    """Sin eventos se envían latidos; al descartar el cliente el flujo termina y se da de baja."""
+    async def escenario():
+        difusor = DifusorEventos(tamano_cola=1)
+        suscripcion = difusor.suscribir()
+        flujo = flujo_eventos(suscripcion, "event: totales\ndata: {}\n\n", latido=0.01)
+        trozos = [await flujo.__anext__() for _ in range(3)]
+        difusor.publicar("n", {})
+        difusor.publicar("n", {})
+        await asyncio.sleep(0)
+        trozos += [trozo async for trozo in flujo]
+        return trozos, difusor.suscriptores
+    
+    trozos, suscriptores = asyncio.run(escenario())
+    
+    assert trozos[:3] == ["retry: 3000\n\n", "event: totales\ndata: {}\n\n", ": latido\n\n"]
+    assert "event:" not in "".join(trozos[3:])
+    assert suscriptores == 0
+
+
+def test_manager_publica_servicios_con_totales_de_hoy():
+    """registrar_servicio y eliminar_servicio publican el servicio y los totales del día."""
+    manager = SalonManager(SQLAlchemyRepository("sqlite:///:memory:"))
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    
+    async def escenario():
+        suscripcion = manager.eventos.suscribir()
+        servicio = manager.registrar_servicio(date.today(), "E001", "Corte", Decimal("25.00")).value
+        manager.registrar_servicio(date(2020, 1, 1), "E001", "Corte", Decimal("80.00"))
+        manager.eliminar_servicio(servicio.id)
+        return servicio, [await suscripcion.siguiente(1) for _ in range(3)]
+    
+    servicio, eventos = asyncio.run(escenario())
+    
+    assert [evento.tipo for evento in eventos] == ["servicio_registrado", "servicio_registrado", "servicio_eliminado"]
+    assert eventos[0].datos["servicio"]["id"] == servicio.id
+    assert eventos[0].datos["totales_hoy"]["ingresos"] == "25.00"
+    assert eventos[1].datos["totales_hoy"]["cantidad"] == 1
+    assert eventos[2].datos == {"id": servicio.id, "totales_hoy": manager.totales_hoy().to_dict()}
+    assert eventos[2].datos["totales_hoy"]["cantidad"] == 0
@@ -0,0 +1,110 @@
+"""
+Tests unitarios para el generador de salones sintéticos.
+"""
+import sqlite3
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from app.manager import SalonManager
+from app.repository import SQLAlchemyRepository
+from benchmarks.generador import CATALOGO, GeneradorServicios, crear_catalogo, generar, pesos_fechas
+
+
+@pytest.fixture(scope="module")
+def salon(tmp_path_factory):
+    """Salón sintético de un año con 20.000 servicios."""
+    ruta = str(tmp_path_factory.mktemp("generador") / "salon.db")
+    generar(ruta, empleados=5, tipos=4, servicios=20_000, desde=date(2023, 1, 1), hasta=date(2023, 12, 31))
+    return ruta
+
+
+class TestGenerar:
+    """Tests para generar."""
+    
+    def test_comisiones_como_registrar_servicio(self, salon):
+        """Verifica que las comisiones coinciden exactamente con las de registrar_servicio."""
+        repository = SQLAlchemyRepository(f"sqlite:///{salon}")
+        porcentajes = {tipo.nombre: tipo.porcentaje_comision for tipo in repository.listar_tipos_servicios()}
+        servicios = repository.listar_servicios()
+        repository.cerrar()
+        
+        assert len(servicios) == 20_000
+        assert len(porcentajes) == 4
+        for servicio in servicios:
+            assert servicio.precio > 0
+            assert servicio.comision_calculada == SalonManager.calcular_comision(
+                servicio.precio, porcentajes[servicio.tipo_servicio]
+            )
+    
+    def test_tipos_con_precio_por_defecto(self, salon):
+        """Verifica que cada tipo se guarda con el precio por defecto de su entrada del catálogo."""
+        repository = SQLAlchemyRepository(f"sqlite:///{salon}")
+        precios = {tipo.nombre: tipo.precio_por_defecto for tipo in repository.listar_tipos_servicios()}
+        repository.cerrar()
+        
+        assert precios == {tipo.nombre: tipo.precio_por_defecto for tipo in crear_catalogo(4)}
+        minimo = min(tipo.precio_por_defecto for tipo in CATALOGO)
+        maximo = max(tipo.precio_por_defecto for tipo in CATALOGO)
+        assert all(precio is not None and minimo <= precio <= maximo for precio in precios.values())
+    
+    def test_patron_semanal_y_estacional(self, salon):
+        """Verifica que no hay servicios en domingo y que diciembre supera a agosto."""
+        with sqlite3.connect(salon) as conexion:
+            fechas = [date.fromisoformat(fila[0]) for fila in conexion.execute("SELECT fecha FROM servicios")]
+        por_dia = Counter(fecha.weekday() for fecha in fechas)
+        por_mes = Counter(fecha.month for fecha in fechas)
+        
+        assert por_dia[6] == 0
+        assert por_dia[5] > por_dia[0]
+        assert por_mes[12] > por_mes[8]
+    
+    def test_recrea_indices(self, salon):
+        """Verifica que los índices de servicios existen tras la carga."""
+        with sqlite3.connect(salon) as conexion:
+            indices = {fila[0] for fila in conexion.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'servicios'"
+            )}
+        
+        assert {"idx_servicios_fecha", "idx_servicios_empleado_fecha", "idx_servicios_tipo_fecha"} <= indices
+    
+    def test_servicios_fuera_del_log_de_cambios(self, salon):
+        """Verifica que la carga no llena el log de cambios y que sus triggers se recrean."""
+        with sqlite3.connect(salon) as conexion:
+            tablas = {fila[0] for fila in conexion.execute("SELECT DISTINCT tabla FROM cambios")}
+            triggers = {fila[0] for fila in conexion.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'servicios'"
+            )}
+        
+        assert tablas == {"empleados", "tipos_servicios"}
+        assert {"servicios_cambios_insertar", "servicios_cambios_eliminar"} <= triggers
+    
+    def test_no_sobrescribe(self, salon):
+        """Verifica que no se reutiliza una base de datos existente."""
+        with pytest.raises(FileExistsError):
+            generar(salon, servicios=10)
+
+
+class TestGeneradorServicios:
+    """Tests para GeneradorServicios."""
+    
+    def test_determinista_con_semilla(self):
+        """Verifica que la misma semilla genera las mismas filas."""
+        tipos = crear_catalogo(3)
+        primero = GeneradorServicios(tipos, 4, date(2024, 1, 1), date(2024, 3, 31), semilla=7).lote(100)
+        segundo = GeneradorServicios(tipos, 4, date(2024, 1, 1), date(2024, 3, 31), semilla=7).lote(100)
+        
+        assert primero == segundo
+    
+    def test_catalogo_ampliado(self):
+        """Verifica que con más tipos que el catálogo se crean variantes con nombre único."""
+        tipos = crear_catalogo(len(CATALOGO) + 2)
+        
+        assert len({tipo.nombre for tipo in tipos}) == len(CATALOGO) + 2
+        assert tipos[len(CATALOGO)].nombre == f"{CATALOGO[0].nombre} 2"
+    
+    def test_rango_sin_dias_laborables(self):
+        """Verifica que se rechaza un rango que solo contiene domingos."""
+        with pytest.raises(ValueError):
+            pesos_fechas(date(2024, 1, 7), date(2024, 1, 7))
@@ -0,0 +1,120 @@
+"""
+Pruebas unitarias para la instrumentación de consultas SQL.
+"""
+import logging
+from datetime import date
+
+import pytest
+
+from app.instrumentacion_sql import consultas_lentas, forma_parametros, medir_consultas
+from app.models import Empleado
+from app.repository import SQLAlchemyRepository
+
+
+def test_cuenta_consultas_del_bloque():
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    repository.guardar_empleado(Empleado(id="E001", nombre="Juan"))
+    
+    with medir_consultas() as estadisticas:
+        repository.obtener_empleado("E001")
+        repository.obtener_empleado("E002")
+    
+    assert estadisticas.consultas == 2
+    assert estadisticas.duracion_db > 0
+
+
+def test_consultas_fuera_de_bloque_no_se_cuentan():
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    with medir_consultas() as estadisticas:
+        pass
+    
+    repository.listar_empleados()
+    
+    assert estadisticas.consultas == 0
+
+
+def test_bloques_anidados_son_independientes():
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    
+    with medir_consultas() as exterior:
+        repository.listar_empleados()
+        with medir_consultas() as interior:
+            repository.listar_empleados()
+        repository.listar_empleados()
+    
+    assert interior.consultas == 1
+    assert exterior.consultas == 2
+
+
+class TestConsultasLentas:
+    """Pruebas para el registro de consultas lentas."""
+    
+    @pytest.fixture(autouse=True)
+    def registrar_todas(self):
+        """Considera lentas todas las sentencias durante la prueba."""
+        consultas_lentas.configurar(0)
+        yield
+        consultas_lentas.configurar(None)
+    
+    def test_registra_metodo_parametros_y_plan(self, caplog):
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        
+        with caplog.at_level(logging.WARNING, logger="app.consultas_lentas"):
+            repository.agregar_servicios_por_periodo("mes", date(2024, 1, 1), date(2024, 3, 31))
+        
+        consulta = consultas_lentas.recientes()[-1]
+        assert consulta.metodo == "agregar_servicios_por_periodo"
+        assert consulta.parametros == "(str, str, str, str)"
+        assert any("idx_servicios_fecha" in paso for paso in consulta.plan)
+        assert not consulta.recorre_servicios
+        assert "agregar_servicios_por_periodo" in caplog.text
+    
+    def test_marca_recorrido_completo_de_servicios(self):
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        
+        repository.listar_servicios()
+        
+        consulta = consultas_lentas.recientes()[-1]
+        assert consulta.metodo == "listar_servicios"
+        assert consulta.plan == ["SCAN servicios"]
+        assert consulta.recorre_servicios
+    
+    def test_plan_se_captura_una_vez_por_forma(self, caplog):
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        
+        with caplog.at_level(logging.WARNING, logger="app.consultas_lentas"):
+            repository.listar_servicios()
+            repository.listar_servicios()
+        
+        # Solo la consulta de servicios (la primera lectura carga también las particiones de sqlite_master)
+        mensajes = [
+            registro.message for registro in caplog.records
+            if "listar_servicios" in registro.message and "FROM servicios" in registro.message
+        ]
+        assert len(mensajes) == 2
+        assert "plan=" in mensajes[0]
+        assert "plan=" not in mensajes[1]
+        assert consultas_lentas.recientes()[-1].recorre_servicios
+    
+    def test_consultas_rapidas_no_se_registran(self):
+        consultas_lentas.configurar(10_000)
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        
+        repository.listar_servicios()
+        
+        assert consultas_lentas.recientes() == []
+    
+    def test_proyeccion_estrecha_usa_indice_cubriente(self):
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        
+        repository.proyectar_servicios(["fecha", "precio"], empleado_id="E001")
+        
+        consulta = consultas_lentas.recientes()[-1]
+        assert consulta.metodo == "proyectar_servicios"
+        assert consulta.plan == ["SEARCH servicios USING COVERING INDEX idx_servicios_empleado_fecha (empleado_id=?)"]
+
+
+def test_forma_parametros():
+    assert forma_parametros(("E001", date(2024, 1, 1)), False) == "(str, date)"
+    assert forma_parametros([("a", 1), ("b", 2)], True) == "2 x (str, int)"
+    assert forma_parametros({"id": "E001"}, False) == "{id: str}"
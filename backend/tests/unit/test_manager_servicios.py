@@ -2,10 +2,10 @@
 Pruebas unitarias para la gestión de servicios en SalonManager.
 """
 import pytest
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
 
-from app.manager import SalonManager
+from app.manager import MAX_PERIODOS_SERIE, SalonManager
 from app.repository import SQLAlchemyRepository
 from app.result import Ok, Err
 from app.errors import ValidationError, NotFoundError
@@ -431,3 +431,105 @@ def test_calcular_pago_desglose_contiene_todos_servicios(manager):
     
     # Verificar total
     assert desglose.total == Decimal("45.00")
+
+
+def test_serie_temporal_diaria_rellena_huecos(manager):
+    """Probar que la serie diaria incluye los días sin servicios con valores en cero."""
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    manager.registrar_servicio(date(2024, 1, 1), "E001", "Corte", Decimal("20.00"))
+    manager.registrar_servicio(date(2024, 1, 1), "E001", "Corte", Decimal("30.00"))
+    manager.registrar_servicio(date(2024, 1, 3), "E001", "Corte", Decimal("10.00"))
+    
+    serie = manager.calcular_serie_temporal("dia", date(2024, 1, 1), date(2024, 1, 4)).value
+    
+    assert [p.periodo for p in serie] == [
+        date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4)
+    ]
+    assert serie[0].ingresos == Decimal("50.00")
+    assert serie[0].comisiones == Decimal("20.00")
+    assert serie[0].beneficios == Decimal("30.00")
+    assert serie[0].cantidad == 2
+    assert serie[1].cantidad == 0
+    assert serie[1].ingresos == Decimal("0")
+    assert serie[2].ingresos == Decimal("10.00")
+
+
+def test_serie_temporal_semanal_y_mensual_agrupa_por_inicio_de_periodo(manager):
+    """Probar que las semanas empiezan en lunes y los meses en el día 1."""
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 50.0)
+    # 2024-01-07 es domingo, 2024-01-08 es lunes
+    manager.registrar_servicio(date(2024, 1, 7), "E001", "Corte", Decimal("10.00"))
+    manager.registrar_servicio(date(2024, 1, 8), "E001", "Corte", Decimal("20.00"))
+    manager.registrar_servicio(date(2024, 3, 15), "E001", "Corte", Decimal("40.00"))
+    
+    semanas = manager.calcular_serie_temporal("semana", date(2024, 1, 1), date(2024, 1, 14)).value
+    assert [(p.periodo, p.ingresos) for p in semanas] == [
+        (date(2024, 1, 1), Decimal("10.00")),
+        (date(2024, 1, 8), Decimal("20.00")),
+    ]
+    
+    meses = manager.calcular_serie_temporal("mes").value
+    assert [(p.periodo, p.cantidad) for p in meses] == [
+        (date(2024, 1, 1), 2),
+        (date(2024, 2, 1), 0),
+        (date(2024, 3, 1), 1),
+    ]
+
+
+def test_serie_temporal_sin_servicios_ni_rango_retorna_vacia(manager):
+    """Probar que sin servicios y sin rango la serie está vacía."""
+    assert manager.calcular_serie_temporal("mes").value == []
+
+
+def test_serie_temporal_rechaza_demasiados_periodos(manager):
+    """Probar que la serie no rellena más de MAX_PERIODOS_SERIE períodos."""
+    resultado = manager.calcular_serie_temporal("dia", date(1, 1, 1), date(9999, 12, 31))
+    
+    assert isinstance(resultado, Err)
+    assert resultado.error.field == "fecha_inicio"
+    
+    hasta = date(2024, 1, 1) + timedelta(days=MAX_PERIODOS_SERIE - 1)
+    assert len(manager.calcular_serie_temporal("dia", date(2024, 1, 1), hasta).value) == MAX_PERIODOS_SERIE
+    assert len(manager.calcular_serie_temporal("mes", date(1900, 1, 1), date(2099, 12, 31)).value) == 2400
+
+
+def test_ranking_por_empleado_ordena_por_metrica_y_limita(manager):
+    """Probar que el ranking ordena por la métrica pedida y respeta el límite."""
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_empleado("E002", "María García")
+    manager.crear_empleado("E003", "Luis Gómez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    manager.crear_tipo_servicio("Tinte", "Tinte completo", 10.0)
+    manager.registrar_servicio(date(2024, 1, 1), "E001", "Corte", Decimal("20.00"))
+    manager.registrar_servicio(date(2024, 1, 2), "E001", "Corte", Decimal("20.00"))
+    manager.registrar_servicio(date(2024, 1, 3), "E002", "Tinte", Decimal("100.00"))
+    manager.registrar_servicio(date(2024, 1, 4), "E003", "Corte", Decimal("5.00"))
+    
+    por_ingresos = manager.calcular_ranking("empleado", "ingresos", 2)
+    assert [(p.clave, p.nombre, p.ingresos) for p in por_ingresos] == [
+        ("E002", "María García", Decimal("100.00")),
+        ("E001", "Juan Pérez", Decimal("40.00")),
+    ]
+    
+    por_comision = manager.calcular_ranking("empleado", "comision", 10)
+    assert [p.clave for p in por_comision] == ["E001", "E002", "E003"]
+    assert por_comision[0].comisiones == Decimal("16.00")
+    
+    por_cantidad = manager.calcular_ranking("tipo_servicio", "cantidad", 10)
+    assert [(p.clave, p.cantidad) for p in por_cantidad] == [("Corte", 3), ("Tinte", 1)]
+
+
+def test_ranking_filtra_por_rango_de_fechas(manager):
+    """Probar que el ranking solo considera servicios dentro del rango."""
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    manager.registrar_servicio(date(2024, 1, 1), "E001", "Corte", Decimal("20.00"))
+    manager.registrar_servicio(date(2024, 2, 1), "E001", "Corte", Decimal("30.00"))
+    
+    ranking = manager.calcular_ranking("empleado", "ingresos", 10, date(2024, 2, 1), date(2024, 2, 28))
+    
+    assert len(ranking) == 1
+    assert ranking[0].ingresos == Decimal("30.00")
+    assert ranking[0].cantidad == 1
@@ -178,3 +178,88 @@ def test_crear_tipo_servicio_con_porcentaje_en_limites(manager):
     resultado = manager.crear_tipo_servicio("Servicio Premium", "Comisión completa", 100.0)
     assert isinstance(resultado, Ok)
     assert resultado.value.porcentaje_comision == 100.0
+
+
+def _registrar_servicios_para_recalculo(manager):
+    """Crea dos empleados y servicios de 'Corte' al 40% en enero y febrero."""
+    from datetime import date
+    from decimal import Decimal
+    manager.crear_empleado("E001", "Juan Pérez")
+    manager.crear_empleado("E002", "María García")
+    manager.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    manager.registrar_servicio(date(2024, 1, 10), "E001", "Corte", Decimal("25.00"))
+    manager.registrar_servicio(date(2024, 1, 20), "E002", "Corte", Decimal("12.25"))
+    manager.registrar_servicio(date(2024, 2, 10), "E001", "Corte", Decimal("50.00"))
+
+
+def test_recalcular_comisiones_actualiza_solo_el_rango(manager):
+    """Probar que el recálculo aplica el nuevo porcentaje solo dentro del rango de fechas."""
+    from datetime import date
+    from decimal import Decimal
+    _registrar_servicios_para_recalculo(manager)
+    
+    resultado = manager.recalcular_comisiones("Corte", date(2024, 1, 1), date(2024, 1, 31), 50.0)
+    
+    assert isinstance(resultado, Ok)
+    recalculo = resultado.value
+    assert recalculo.simulado is False
+    assert recalculo.servicios_actualizados == 2
+    assert [(a.empleado_id, a.comision_anterior, a.comision_nueva) for a in recalculo.ajustes] == [
+        ("E001", Decimal("10.00"), Decimal("12.50")),
+        ("E002", Decimal("4.90"), Decimal("6.12")),  # 6.125 con redondeo bancario
+    ]
+    assert recalculo.diferencia_total == Decimal("3.72")
+    
+    comisiones = {(s.fecha, s.precio): s.comision_calculada for s in manager.obtener_servicios()}
+    assert comisiones[(date(2024, 1, 10), Decimal("25.00"))] == Decimal("12.50")
+    assert comisiones[(date(2024, 1, 20), Decimal("12.25"))] == Decimal("6.12")
+    assert comisiones[(date(2024, 2, 10), Decimal("50.00"))] == Decimal("20.00")
+
+
+def test_recalcular_comisiones_simulado_no_modifica_datos(manager):
+    """Probar que la simulación devuelve diferencias sin tocar los servicios."""
+    from datetime import date
+    from decimal import Decimal
+    _registrar_servicios_para_recalculo(manager)
+    
+    resultado = manager.recalcular_comisiones(
+        "Corte", date(2024, 1, 1), date(2024, 12, 31), 30.0, simular=True
+    )
+    
+    assert isinstance(resultado, Ok)
+    assert resultado.value.simulado is True
+    assert resultado.value.servicios_actualizados == 3
+    assert resultado.value.diferencia_total == Decimal("-8.72")
+    comisiones = sorted(s.comision_calculada for s in manager.obtener_servicios())
+    assert comisiones == [Decimal("4.90"), Decimal("10.00"), Decimal("20.00")]
+
+
+def test_recalcular_comisiones_usa_porcentaje_actual_del_tipo(manager):
+    """Probar que sin porcentaje explícito se aplica el porcentaje vigente del tipo."""
+    from datetime import date
+    _registrar_servicios_para_recalculo(manager)
+    manager.actualizar_tipo_servicio("Corte", 40.0)
+    
+    resultado = manager.recalcular_comisiones("Corte", date(2024, 1, 1), date(2024, 12, 31))
+    
+    assert isinstance(resultado, Ok)
+    assert resultado.value.porcentaje_comision == 40.0
+    assert resultado.value.ajustes == []
+
+
+def test_recalcular_comisiones_tipo_inexistente_o_rango_invalido(manager):
+    """Probar los errores de tipo inexistente, rango invertido y porcentaje fuera de rango."""
+    from datetime import date
+    _registrar_servicios_para_recalculo(manager)
+    
+    resultado = manager.recalcular_comisiones("Tinte", date(2024, 1, 1), date(2024, 1, 31))
+    assert isinstance(resultado, Err)
+    assert isinstance(resultado.error, NotFoundError)
+    
+    resultado = manager.recalcular_comisiones("Corte", date(2024, 2, 1), date(2024, 1, 1))
+    assert isinstance(resultado, Err)
+    assert isinstance(resultado.error, ValidationError)
+    
+    resultado = manager.recalcular_comisiones("Corte", date(2024, 1, 1), date(2024, 1, 31), 150.0)
+    assert isinstance(resultado, Err)
+    assert resultado.error.field == "porcentaje_comision"
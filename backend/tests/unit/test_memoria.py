@@ -0,0 +1,68 @@
+"""
+Tests unitarios para las instantáneas de memoria con tracemalloc.
+"""
+import os
+import tracemalloc
+
+import pytest
+
+from app.memoria import DIRECTORIO_APP, MonitorMemoria, modulo_de_fichero
+
+
+@pytest.fixture
+def monitor():
+    """Monitor que detiene tracemalloc al terminar el test."""
+    monitor = MonitorMemoria(max_instantaneas=2)
+    yield monitor
+    monitor.detener()
+
+
+class TestModuloDeFichero:
+    """Tests para modulo_de_fichero."""
+    
+    def test_ficheros_de_la_aplicacion(self):
+        """Verifica el nombre de módulo de los ficheros del paquete app."""
+        assert modulo_de_fichero(os.path.join(DIRECTORIO_APP, "repository.py")) == "app.repository"
+        assert modulo_de_fichero(os.path.join(DIRECTORIO_APP, "__init__.py")) == "app"
+    
+    def test_ficheros_ajenos(self):
+        """Verifica que los ficheros fuera de app no tienen módulo."""
+        assert modulo_de_fichero(tracemalloc.__file__) is None
+        assert modulo_de_fichero(__file__) is None
+
+
+class TestMonitorMemoria:
+    """Tests para MonitorMemoria."""
+    
+    def test_sin_iniciar_no_toma_instantanea(self):
+        """Verifica que sin tracemalloc activo no se toman instantáneas."""
+        assert not tracemalloc.is_tracing()
+        assert MonitorMemoria().tomar_instantanea() is None
+    
+    def test_atribuye_asignaciones_al_codigo_de_la_aplicacion(self, monitor):
+        """Verifica que la memoria reservada por SQLAlchemy se atribuye a la línea del repositorio que la pide."""
+        from app.models import Empleado
+        from app.repository import SQLAlchemyRepository
+        repository = SQLAlchemyRepository("sqlite:///:memory:")
+        for i in range(500):
+            repository.guardar_empleado(Empleado(id=f"E{i:04d}", nombre=f"Empleado {i}"))
+        monitor.iniciar()
+        
+        antes = monitor.tomar_instantanea()
+        empleados = repository.listar_empleados()
+        despues = monitor.tomar_instantanea()
+        
+        cambios = monitor.diferencia(antes, despues, limite=50)
+        assert any(cambio["modulo"] == "app.repository" and cambio["diferencia_tamano"] > 0
+                   for cambio in cambios)
+        assert all(cambio["modulo"].startswith("app") for cambio in cambios)
+        assert len(empleados) == 500
+        repository.cerrar()
+    
+    def test_conserva_max_instantaneas(self, monitor):
+        """Verifica que se descartan las instantáneas más antiguas."""
+        monitor.iniciar()
+        ids = [monitor.tomar_instantanea().id for _ in range(3)]
+        
+        assert [instantanea.id for instantanea in monitor.listar()] == ids[1:]
+        assert monitor.obtener(ids[0]) is None
@@ -0,0 +1,114 @@
+"""
+Pruebas unitarias para las métricas en formato Prometheus.
+"""
+import pytest
+
+from app.metricas import (
+    DURACION_REPOSITORIO, ERRORES_REPOSITORIO, Familia, FamiliaContadores, FamiliaHistogramas,
+    FamiliaIndicadores, RegistroMetricas, estadisticas_pool, medir_metodos
+)
+from app.repository import SQLAlchemyRepository
+
+
+def test_histograma_expone_buckets_acumulados():
+    registro = RegistroMetricas()
+    familia = registro.registrar(FamiliaHistogramas("prueba_segundos", "Prueba", ("ruta",), limites=(0.1, 1)))
+    for valor in (0.05, 0.5, 0.5, 3):
+        familia.serie("/a").observar(valor)
+    
+    lineas = registro.exponer().splitlines()
+    
+    assert "# TYPE prueba_segundos histogram" in lineas
+    assert 'prueba_segundos_bucket{ruta="/a",le="0.1"} 1' in lineas
+    assert 'prueba_segundos_bucket{ruta="/a",le="1"} 3' in lineas
+    assert 'prueba_segundos_bucket{ruta="/a",le="+Inf"} 4' in lineas
+    assert 'prueba_segundos_sum{ruta="/a"} 4.05' in lineas
+    assert 'prueba_segundos_count{ruta="/a"} 4' in lineas
+
+
+def test_contadores_e_indicadores():
+    registro = RegistroMetricas()
+    contador = registro.registrar(FamiliaContadores("prueba_total", "Prueba", ("estado",)))
+    indicador = registro.registrar(FamiliaIndicadores("prueba_en_curso", "Prueba"))
+    contador.serie("200").incrementar()
+    contador.serie("200").incrementar()
+    indicador.serie().incrementar()
+    
+    texto = registro.exponer()
+    
+    assert 'prueba_total{estado="200"} 2' in texto
+    assert "prueba_en_curso 1" in texto
+
+
+def test_etiquetas_se_escapan():
+    registro = RegistroMetricas()
+    contador = registro.registrar(FamiliaContadores("prueba_total", "Prueba", ("valor",)))
+    contador.serie('a"b\\c').incrementar()
+    
+    assert 'prueba_total{valor="a\\"b\\\\c"} 1' in registro.exponer()
+
+
+def test_numero_de_etiquetas_incorrecto():
+    familia = FamiliaContadores("prueba_total", "Prueba", ("estado",))
+    with pytest.raises(ValueError):
+        familia.serie()
+
+
+def test_familia_es_abstracta():
+    with pytest.raises(TypeError):
+        Familia("prueba_total", "Prueba")
+
+
+def test_recolectores_se_ejecutan_al_exponer():
+    registro = RegistroMetricas()
+    indicador = registro.registrar(FamiliaIndicadores("prueba_valor", "Prueba"))
+    registro.agregar_recolector(lambda: indicador.serie().fijar(7))
+    
+    assert "prueba_valor 7" in registro.exponer()
+
+
+def test_medir_metodos_registra_duracion_y_errores():
+    @medir_metodos(excluir=("no_medido",))
+    class Servicio:
+        def metodo_medido_prueba(self):
+            return 1
+        
+        def metodo_fallido_prueba(self):
+            raise ValueError("fallo")
+        
+        def no_medido(self):
+            return 2
+    
+    servicio = Servicio()
+    servicio.metodo_medido_prueba()
+    with pytest.raises(ValueError):
+        servicio.metodo_fallido_prueba()
+    
+    assert DURACION_REPOSITORIO.serie("metodo_medido_prueba").total == 1
+    assert DURACION_REPOSITORIO.serie("metodo_fallido_prueba").total == 1
+    assert ERRORES_REPOSITORIO.serie("metodo_fallido_prueba").valor == 1
+    assert "no_medido" not in [valores[0] for valores, _ in DURACION_REPOSITORIO.series()]
+
+
+def test_repositorio_esta_medido():
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    antes = DURACION_REPOSITORIO.serie("listar_empleados").total
+    
+    repository.listar_empleados()
+    
+    assert DURACION_REPOSITORIO.serie("listar_empleados").total == antes + 1
+
+
+def test_estadisticas_pool(tmp_path):
+    repository = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'salon.db'}")
+    session = repository.get_session()
+    session.connection()
+    
+    estadisticas = estadisticas_pool(repository.engine)
+    session.close()
+    repository.cerrar()
+    
+    assert estadisticas["en_uso"] == 1
+    assert estadisticas["tamano"] == 5
+    # StaticPool (bases de datos en memoria) no lleva la cuenta
+    assert estadisticas_pool(SQLAlchemyRepository("sqlite:///:memory:").engine) is None
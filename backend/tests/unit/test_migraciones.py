@@ -0,0 +1,166 @@
+"""
+Pruebas unitarias para las migraciones de Alembic.
+"""
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.busqueda import es_tabla_busqueda
+from app.particiones import es_particion
+from app.database import aplicar_migraciones
+from app.orm_models import Base
+from app.repository import SQLAlchemyRepository
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Engine sobre un fichero SQLite vacío."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'salon.db'}")
+    yield engine
+    engine.dispose()
+
+
+def incluir_nombre(nombre, tipo, padres):
+    """Excluye las tablas de búsqueda FTS5 y las particiones de servicios, igual que alembic/env.py."""
+    return not (tipo == "table" and (es_tabla_busqueda(nombre) or es_particion(nombre)))
+
+
+def _objetos_busqueda(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT type, name, sql FROM sqlite_master WHERE name LIKE '%_fts%' ORDER BY name"
+        )).all()
+
+
+def _objetos_cambios(engine):
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name LIKE '%cambios%' ORDER BY name"
+        )).all()
+
+
+def _indices_servicios(engine):
+    return {idx['name']: idx['column_names'] for idx in inspect(engine).get_indexes('servicios')}
+
+
+def test_migraciones_coinciden_con_modelos_orm(engine):
+    """El esquema migrado hasta head es idéntico al declarado en orm_models."""
+    aplicar_migraciones(engine)
+    
+    with engine.connect() as conn:
+        contexto = MigrationContext.configure(conn, opts={"include_name": incluir_nombre})
+        diferencias = compare_metadata(contexto, Base.metadata)
+    
+    assert diferencias == []
+
+
+def test_particiones_no_son_diferencias_de_esquema(engine, tmp_path):
+    """Las particiones de servicios archivados no aparecen en autogenerate."""
+    aplicar_migraciones(engine)
+    repository = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'salon.db'}", crear_esquema=False)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO servicios VALUES ('S1', '2020-05-01', 'E001', 'Corte', 20.0, 8.0)"
+        ))
+    assert repository.archivar_servicios(2020) == {2020: 1}
+    repository.cerrar()
+    
+    with engine.connect() as conn:
+        contexto = MigrationContext.configure(conn, opts={"include_name": incluir_nombre})
+        diferencias = compare_metadata(contexto, Base.metadata)
+    
+    assert diferencias == []
+
+
+def test_migracion_elimina_indices_duplicados_y_crea_cubrientes(engine):
+    """Una base de datos con el esquema anterior queda con los índices cubrientes."""
+    aplicar_migraciones(engine, "0001")
+    assert 'ix_servicios_fecha' in _indices_servicios(engine)
+    
+    aplicar_migraciones(engine)
+    indices = _indices_servicios(engine)
+    
+    assert 'ix_servicios_fecha' not in indices
+    assert 'ix_servicios_empleado_id' not in indices
+    assert indices['idx_servicios_fecha'] == ['fecha', 'precio', 'comision_calculada']
+    assert indices['idx_servicios_empleado_fecha'] == [
+        'empleado_id', 'fecha', 'tipo_servicio', 'precio', 'comision_calculada'
+    ]
+    assert indices['idx_servicios_tipo_fecha'] == ['tipo_servicio', 'fecha']
+
+
+def test_migracion_adopta_base_de_datos_creada_con_create_all(engine):
+    """Las bases de datos creadas antes de Alembic se migran sin perder datos."""
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO empleados (id, nombre) VALUES ('E001', 'Juan')"))
+    
+    aplicar_migraciones(engine)
+    
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT nombre FROM empleados")).scalar() == 'Juan'
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == '0005'
+
+
+def test_reportes_por_fecha_usan_indice_cubriente(engine):
+    """Las sumas por rango de fechas se resuelven solo con el índice."""
+    aplicar_migraciones(engine)
+    
+    with engine.connect() as conn:
+        plan = " ".join(str(fila[-1]) for fila in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT sum(precio), sum(comision_calculada) FROM servicios "
+            "WHERE fecha BETWEEN '2024-01-01' AND '2024-01-31'"
+        )))
+    
+    assert "COVERING INDEX idx_servicios_fecha" in plan
+
+
+def test_migracion_crea_busqueda_igual_que_create_all(engine, tmp_path):
+    """La migración crea los mismos índices FTS5 y triggers que el arranque con create_all y los rellena."""
+    aplicar_migraciones(engine, "0002")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO empleados (id, nombre) VALUES ('E001', 'José Pérez')"))
+    
+    aplicar_migraciones(engine)
+    referencia = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'referencia.db'}")
+    
+    assert _objetos_busqueda(engine) == _objetos_busqueda(referencia.engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM empleados_fts WHERE empleados_fts MATCH 'jose'")).scalar() == 'E001'
+    referencia.cerrar()
+
+
+
+def test_migracion_convierte_busqueda_a_contenido_externo(engine):
+    """Los índices con copia de las filas de 0003 pasan a ser de contenido externo y siguen las escrituras."""
+    aplicar_migraciones(engine, "0004")
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO empleados (id, nombre) VALUES ('E001', 'José Pérez'), ('E002', 'Ana Ruiz')"))
+    
+    aplicar_migraciones(engine)
+    
+    with engine.begin() as conn:
+        assert "content='empleados'" in conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE name = 'empleados_fts'"
+        )).scalar()
+        conn.execute(text("UPDATE empleados SET nombre = 'Josefa Pérez' WHERE id = 'E001'"))
+        conn.execute(text("DELETE FROM empleados WHERE id = 'E002'"))
+        buscar = "SELECT id FROM empleados_fts WHERE empleados_fts MATCH :texto"
+        assert conn.execute(text(buscar), {"texto": "josefa"}).scalars().all() == ['E001']
+        assert conn.execute(text(buscar), {"texto": "ruiz"}).scalars().all() == []
+        conn.execute(text("INSERT INTO empleados_fts (empleados_fts, rank) VALUES ('integrity-check', 1)"))
+
+def test_migracion_crea_log_de_cambios_igual_que_create_all(engine, tmp_path):
+    """La migración crea la tabla cambios y los mismos triggers que el arranque con create_all."""
+    aplicar_migraciones(engine)
+    referencia = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'referencia.db'}")
+    
+    assert _objetos_cambios(engine) == _objetos_cambios(referencia.engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO empleados (id, nombre) VALUES ('E001', 'Juan')"))
+        conn.execute(text("DELETE FROM empleados WHERE id = 'E001'"))
+        assert conn.execute(text("SELECT seq, clave, operacion FROM cambios ORDER BY seq")).all() == [
+            (1, 'E001', 'insertar'), (2, 'E001', 'eliminar')
+        ]
+    referencia.cerrar()
@@ -0,0 +1,207 @@
+"""
+Tests para el archivo de servicios en particiones anuales.
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app.instrumentacion_sql import consultas_lentas
+from app.manager import SalonManager
+from app.models import ServicioRegistrado
+from app.particiones import TABLA_SERVICIOS, es_particion, tabla_particion, tablas_para_rango
+from app.repository import SQLAlchemyRepository
+from app.result import Err
+
+
+def _servicio(id: str, fecha: date, empleado_id: str = "E001", precio: str = "20.00") -> ServicioRegistrado:
+    return ServicioRegistrado(
+        id=id, fecha=fecha, empleado_id=empleado_id, tipo_servicio="Corte",
+        precio=Decimal(precio), comision_calculada=Decimal(precio) * Decimal("0.4")
+    )
+
+
+@pytest.fixture
+def repository():
+    """Repositorio en memoria con servicios de 2022 a 2024."""
+    repository = SQLAlchemyRepository("sqlite:///:memory:")
+    repository.guardar_servicios([
+        _servicio("S1", date(2022, 3, 1)),
+        _servicio("S2", date(2022, 12, 31), "E002", "30.00"),
+        _servicio("S3", date(2023, 1, 1)),
+        _servicio("S4", date(2023, 6, 15), "E002", "50.00"),
+        _servicio("S5", date(2024, 2, 1)),
+    ])
+    return repository
+
+
+def _nombres(tablas):
+    return [tabla.name for tabla in tablas]
+
+
+class TestTablasParaRango:
+    """Tests para la poda de particiones por rango de fechas."""
+
+    def test_sin_particiones_solo_la_tabla_principal(self):
+        assert tablas_para_rango([], date(2020, 1, 1), date(2024, 1, 1)) == [TABLA_SERVICIOS]
+
+    def test_rango_dentro_de_un_anio_archivado(self):
+        tablas = tablas_para_rango([2023, 2022], date(2022, 2, 1), date(2022, 5, 31))
+        assert _nombres(tablas) == ["servicios_2022"]
+
+    def test_rango_que_cruza_al_anio_sin_archivar(self):
+        tablas = tablas_para_rango([2023, 2022], date(2023, 12, 1), date(2024, 1, 31))
+        assert _nombres(tablas) == ["servicios", "servicios_2023"]
+
+    def test_extremo_abierto_incluye_la_tabla_principal(self):
+        assert _nombres(tablas_para_rango([2023, 2022], None, date(2022, 6, 1))) == ["servicios", "servicios_2022"]
+        assert _nombres(tablas_para_rango([2023, 2022])) == ["servicios", "servicios_2023", "servicios_2022"]
+
+    def test_hueco_sin_archivar_entre_particiones(self):
+        tablas = tablas_para_rango([2023, 2021], date(2021, 1, 1), date(2023, 12, 31))
+        assert _nombres(tablas) == ["servicios", "servicios_2023", "servicios_2021"]
+
+    def test_particion_con_indices_propios(self):
+        assert {indice.name for indice in tabla_particion(2022).indexes} == {
+            "idx_servicios_2022_empleado_fecha", "idx_servicios_2022_fecha", "idx_servicios_2022_tipo_fecha"
+        }
+        assert es_particion("servicios_2022")
+        assert not es_particion("servicios_fts")
+
+
+class TestArchivarServicios:
+    """Tests para SQLAlchemyRepository.archivar_servicios y las consultas sobre particiones."""
+
+    def test_mueve_los_anios_hasta_el_indicado(self, repository):
+        assert repository.archivar_servicios(2023) == {2022: 2, 2023: 2}
+        assert repository.archivar_servicios(2023) == {}
+
+        with repository.engine.connect() as conexion:
+            filas = dict(conexion.exec_driver_sql(
+                "SELECT 'servicios', count(*) FROM servicios UNION ALL "
+                "SELECT 'servicios_2022', count(*) FROM servicios_2022 UNION ALL "
+                "SELECT 'servicios_2023', count(*) FROM servicios_2023"
+            ).all())
+        assert filas == {"servicios": 1, "servicios_2022": 2, "servicios_2023": 2}
+
+    def test_consultas_iguales_antes_y_despues_de_archivar(self, repository):
+        def consultas():
+            return (
+                sorted(s.id for s in repository.listar_servicios()),
+                sorted(s.id for s in repository.listar_servicios("E002", date(2022, 6, 1), date(2023, 12, 31))),
+                repository.proyectar_servicios(["id", "precio"], fecha_inicio=date(2022, 12, 1)),
+                repository.agregar_servicios_por_periodo("mes"),
+                repository.agregar_servicios_por_periodo("semana", date(2022, 12, 26), date(2023, 1, 8)),
+                repository.ranking_servicios("empleado", "ingresos", 5, date(2022, 1, 1), date(2023, 12, 31)),
+                repository.ranking_servicios("tipo_servicio", "cantidad", 5),
+            )
+
+        antes = consultas()
+        repository.archivar_servicios(2023)
+
+        assert consultas() == antes
+
+    def test_rango_de_un_anio_archivado_solo_lee_su_particion(self, repository):
+        repository.archivar_servicios(2023)
+        consultas_lentas.configurar(0)
+        try:
+            repository.agregar_servicios_por_periodo("mes", date(2022, 1, 1), date(2022, 12, 31))
+            plan = consultas_lentas.recientes()[-1].plan
+        finally:
+            consultas_lentas.configurar(None)
+
+        assert any("servicios_2022" in paso for paso in plan)
+        assert not any("servicios_2023" in paso or "servicios USING" in paso for paso in plan)
+
+    def test_guardar_en_anio_archivado_va_a_su_particion(self, repository):
+        repository.archivar_servicios(2023)
+
+        repository.guardar_servicio(_servicio("S6", date(2022, 7, 1)))
+        repository.guardar_servicios([_servicio("S7", date(2023, 7, 1)), _servicio("S8", date(2024, 7, 1))])
+
+        servicios_2022 = repository.listar_servicios(fecha_inicio=date(2022, 1, 1), fecha_fin=date(2022, 12, 31))
+        assert {s.id for s in servicios_2022} == {"S1", "S2", "S6"}
+        with repository.engine.connect() as conexion:
+            assert conexion.exec_driver_sql("SELECT id FROM servicios_2023 WHERE id = 'S7'").scalar() == "S7"
+            assert conexion.exec_driver_sql("SELECT id FROM servicios WHERE id = 'S8'").scalar() == "S8"
+
+    def test_cambiar_de_anio_mueve_el_servicio(self, repository):
+        repository.archivar_servicios(2023)
+
+        repository.guardar_servicio(_servicio("S1", date(2024, 3, 1)))
+
+        servicios = repository.listar_servicios()
+        assert len(servicios) == 5
+        assert next(s for s in servicios if s.id == "S1").fecha == date(2024, 3, 1)
+
+    def test_eliminar_y_recalcular_en_particiones(self, repository):
+        repository.archivar_servicios(2023)
+
+        repository.eliminar_servicio("S3")
+        ajustes = repository.recalcular_comisiones("Corte", 50.0, date(2022, 1, 1), date(2024, 12, 31))
+
+        assert sum(ajuste.servicios for ajuste in ajustes) == 4
+        assert {s.id: s.comision_calculada for s in repository.listar_servicios()} == {
+            "S1": Decimal("10.00"), "S2": Decimal("15.00"), "S4": Decimal("25.00"), "S5": Decimal("10.00")
+        }
+
+    def test_archivar_no_se_registra_en_el_log_de_cambios(self, repository):
+        ultimo = repository.listar_cambios(0, 100).ultimo
+
+        repository.archivar_servicios(2023)
+        assert repository.listar_cambios(ultimo, 100).cambios == []
+
+        repository.eliminar_servicio("S1")
+        repository.guardar_servicio(_servicio("S6", date(2023, 5, 1)))
+        pagina = repository.listar_cambios(ultimo, 100)
+
+        assert [(c.tabla, c.clave, c.operacion) for c in pagina.cambios] == [
+            ("servicios", "S1", "eliminar"), ("servicios", "S6", "insertar")
+        ]
+        assert pagina.cambios[1].datos.fecha == date(2023, 5, 1)
+
+
+    def test_anios_archivados_en_cache_hasta_archivar(self, repository):
+        repository.listar_servicios()
+        consultas_lentas.configurar(0)
+        try:
+            repository.listar_servicios()
+            assert not any("sqlite_master" in consulta.sql for consulta in consultas_lentas.recientes())
+        finally:
+            consultas_lentas.configurar(None)
+
+        repository.archivar_servicios(2022)
+
+        assert {s.id for s in repository.listar_servicios(fecha_fin=date(2022, 12, 31))} == {"S1", "S2"}
+
+    def test_ve_las_particiones_creadas_por_otro_proceso(self, tmp_path):
+        ruta = f"sqlite:///{tmp_path / 'salon.db'}"
+        servidor = SQLAlchemyRepository(ruta)
+        servidor.guardar_servicios([_servicio("S1", date(2022, 3, 1)), _servicio("S2", date(2023, 3, 1))])
+        assert len(servidor.listar_servicios(fecha_inicio=date(2022, 1, 1), fecha_fin=date(2022, 12, 31))) == 1
+
+        otro = SQLAlchemyRepository(ruta)
+        assert otro.archivar_servicios(2022) == {2022: 1}
+        otro.cerrar()
+
+        servidor.guardar_servicio(_servicio("S3", date(2022, 7, 1)))
+        servicios_2022 = servidor.listar_servicios(fecha_inicio=date(2022, 1, 1), fecha_fin=date(2022, 12, 31))
+        assert {s.id for s in servicios_2022} == {"S1", "S3"}
+        with servidor.engine.connect() as conexion:
+            assert conexion.exec_driver_sql("SELECT count(*) FROM servicios_2022").scalar() == 2
+        servidor.cerrar()
+
+
+class TestManagerArchivarServicios:
+    """Tests para SalonManager.archivar_servicios."""
+
+    def test_no_archiva_el_anio_en_curso(self, repository):
+        resultado = SalonManager(repository).archivar_servicios(date.today().year)
+
+        assert isinstance(resultado, Err)
+        assert resultado.error.field == "hasta_anio"
+
+    def test_por_defecto_hasta_el_anio_pasado(self, repository):
+        resultado = SalonManager(repository).archivar_servicios()
+
+        assert resultado.value == {2022: 2, 2023: 2, 2024: 1}
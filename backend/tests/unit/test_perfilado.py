@@ -0,0 +1,95 @@
+"""
+Tests unitarios para el perfilado de peticiones.
+"""
+import contextvars
+import threading
+import time
+
+import pytest
+
+from app.perfilado import Perfilador, _perfil_peticion, perfilar_en_hilo
+
+
+def _trabajo():
+    """Función con trabajo de CPU suficiente para aparecer en las muestras."""
+    fin = time.perf_counter() + 0.05
+    while time.perf_counter() < fin:
+        sum(range(100))
+
+
+class TestPerfilador:
+    """Tests para Perfilador."""
+    
+    def test_formato_desconocido(self, tmp_path):
+        """Verifica que se rechaza un formato de perfil desconocido."""
+        with pytest.raises(ValueError):
+            Perfilador(str(tmp_path), formato="svg")
+    
+    def test_muestreo_uno_de_cada_n(self, tmp_path):
+        """Verifica que el muestreo selecciona 1 de cada N peticiones."""
+        perfilador = Perfilador(str(tmp_path), muestreo=3)
+        
+        assert [perfilador.toca_muestreo() for _ in range(6)] == [False, False, True, False, False, True]
+        
+        perfilador.configurar_muestreo(None)
+        assert not any(perfilador.toca_muestreo() for _ in range(6))
+    
+    def test_perfil_collapsed(self, tmp_path):
+        """Verifica que el formato collapsed guarda pilas `marco;marco cuenta`."""
+        perfilador = Perfilador(str(tmp_path))
+        perfil = perfilador.iniciar("collapsed")
+        _trabajo()
+        perfilador.terminar(perfil, "prueba.collapsed")
+        
+        lineas = (tmp_path / "prueba.collapsed").read_text().splitlines()
+        assert lineas
+        pila, cuenta = lineas[0].rsplit(" ", 1)
+        assert int(cuenta) > 0
+        assert any("_trabajo (test_perfilado.py" in linea for linea in lineas)
+    
+    def test_perfilar_en_hilo_agrega_el_hilo_al_perfil(self, tmp_path):
+        """Verifica que un handler envuelto se perfila en el hilo que lo ejecuta si su petición se perfila."""
+        perfilador = Perfilador(str(tmp_path))
+        handler = perfilar_en_hilo(_trabajo)
+        perfil = perfilador.iniciar("collapsed")
+        contexto = _perfil_peticion.set(perfil)
+        try:
+            hilo = threading.Thread(target=contextvars.copy_context().run, args=(handler,))
+            hilo.start()
+            hilo.join()
+        finally:
+            _perfil_peticion.reset(contexto)
+        handler()
+        perfilador.terminar(perfil, "hilo.collapsed")
+        
+        lineas = (tmp_path / "hilo.collapsed").read_text().splitlines()
+        assert any("run (threading.py" in linea and "_trabajo (test_perfilado.py" in linea for linea in lineas)
+    
+    def test_un_perfil_a_la_vez(self, tmp_path):
+        """Verifica que no se inicia un perfil mientras hay otro en curso."""
+        perfilador = Perfilador(str(tmp_path))
+        perfil = perfilador.iniciar("pstats")
+        
+        assert perfilador.iniciar("pstats") is None
+        
+        perfilador.terminar(perfil, "primero.pstats")
+        segundo = perfilador.iniciar("pstats")
+        assert segundo is not None
+        perfilador.terminar(segundo, "segundo.pstats")
+    
+    def test_conserva_max_perfiles(self, tmp_path):
+        """Verifica que se borran los perfiles más antiguos por encima del máximo."""
+        perfilador = Perfilador(str(tmp_path), max_perfiles=2)
+        for nombre in ("a.pstats", "b.pstats", "c.pstats"):
+            perfilador.terminar(perfilador.iniciar("pstats"), nombre)
+        
+        assert [perfil.nombre for perfil in perfilador.listar()] == ["c.pstats", "b.pstats"]
+    
+    def test_ruta_rechaza_nombres_invalidos(self, tmp_path):
+        """Verifica que no se resuelven rutas fuera del directorio de perfiles."""
+        perfilador = Perfilador(str(tmp_path))
+        (tmp_path / "salon.db").write_text("")
+        
+        assert perfilador.ruta("../salon.db") is None
+        assert perfilador.ruta("salon.db") is None
+        assert perfilador.ruta("no-existe.pstats") is None
@@ -0,0 +1,87 @@
+"""
+Tests unitarios para el log de accesos en segundo plano.
+"""
+import io
+import json
+import logging
+
+import pytest
+
+from app.registro_accesos import FormateadorJSON, RegistroAccesos
+
+
+def _registro(muestreo: float = 1.0, tamano_cola: int = 100):
+    salida = io.StringIO()
+    return RegistroAccesos(muestreo, logging.StreamHandler(salida), tamano_cola), salida
+
+
+def _lineas(salida: io.StringIO) -> list:
+    return [json.loads(linea) for linea in salida.getvalue().splitlines()]
+
+
+class TestFormateadorJSON:
+    """Tests para FormateadorJSON."""
+    
+    def test_mensaje_diccionario_y_texto(self):
+        """Verifica que los diccionarios se vuelcan como campos y el texto como mensaje."""
+        formateador = FormateadorJSON()
+        campos = logging.LogRecord("app.accesos", logging.INFO, __file__, 1, {"estado": 200, "ruta": "/"}, None, None)
+        texto = logging.LogRecord("app", logging.WARNING, __file__, 1, "Hola %s", ("Ana",), None)
+        
+        datos_campos = json.loads(formateador.format(campos))
+        datos_texto = json.loads(formateador.format(texto))
+        
+        assert datos_campos["estado"] == 200
+        assert datos_campos["ruta"] == "/"
+        assert datos_campos["logger"] == "app.accesos"
+        assert datos_texto["mensaje"] == "Hola Ana"
+        assert datos_texto["nivel"] == "WARNING"
+
+
+class TestRegistroAccesos:
+    """Tests para RegistroAccesos."""
+    
+    def test_detener_escribe_pendientes(self):
+        """Verifica que los registros se escriben en el hilo escritor y se vacían al detener."""
+        registro, salida = _registro()
+        registro.iniciar()
+        for indice in range(50):
+            registro.registrar({"indice": indice})
+        registro.detener()
+        
+        assert [linea["indice"] for linea in _lineas(salida)] == list(range(50))
+    
+    def test_inicio_perezoso(self):
+        """Verifica que el primer registro inicia el hilo escritor si no se inició."""
+        registro, salida = _registro()
+        registro.registrar({"estado": 200})
+        registro.detener()
+        
+        assert len(_lineas(salida)) == 1
+    
+    def test_cola_llena_descarta_sin_bloquear(self):
+        """Verifica que con la cola llena se descarta y se cuenta en lugar de bloquear."""
+        registro, salida = _registro(tamano_cola=5)
+        for indice in range(8):
+            registro._logger.info({"indice": indice})
+        
+        assert registro.descartados == 3
+        registro.detener()
+        registro.iniciar()
+        registro.detener()
+        assert len(_lineas(salida)) == 5
+    
+    def test_muestreo_solo_afecta_a_exitos(self):
+        """Verifica que los errores se registran siempre y los éxitos según el muestreo."""
+        nunca, _ = _registro(muestreo=0.0)
+        siempre, _ = _registro(muestreo=1.0)
+        
+        assert not nunca.debe_registrar(200)
+        assert nunca.debe_registrar(404)
+        assert nunca.debe_registrar(500)
+        assert siempre.debe_registrar(200)
+    
+    def test_muestreo_fuera_de_rango(self):
+        """Verifica que se rechaza un muestreo que no está entre 0 y 1."""
+        with pytest.raises(ValueError):
+            RegistroAccesos(muestreo=1.5)
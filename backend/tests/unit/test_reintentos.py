@@ -0,0 +1,124 @@
+"""
+Pruebas unitarias para los reintentos ante bloqueos de SQLite.
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import (
+    PoliticaReintentos, contador_reintentos, ejecutar_con_reintentos, es_error_de_bloqueo
+)
+from app.models import Empleado
+from app.repository import SQLAlchemyRepository
+
+
+def _error(mensaje: str) -> OperationalError:
+    return OperationalError("UPDATE servicios", {}, sqlite3.OperationalError(mensaje))
+
+
+class OperacionFallida:
+    """Operación que falla con el error indicado las primeras `fallos` veces."""
+    
+    def __init__(self, fallos: int, error: Exception):
+        self.fallos = fallos
+        self.error = error
+        self.llamadas = 0
+    
+    def __call__(self):
+        self.llamadas += 1
+        if self.llamadas <= self.fallos:
+            raise self.error
+        return "ok"
+
+
+class RelojFalso:
+    """Reloj que avanza solo al dormir."""
+    
+    def __init__(self):
+        self.ahora = 0.0
+    
+    def __call__(self):
+        return self.ahora
+    
+    def dormir(self, segundos):
+        self.ahora += segundos
+
+
+@pytest.fixture(autouse=True)
+def contadores_limpios():
+    contador_reintentos.reiniciar()
+    yield
+
+
+def test_es_error_de_bloqueo():
+    assert es_error_de_bloqueo(_error("database is locked"))
+    assert es_error_de_bloqueo(_error("database table is locked"))
+    assert not es_error_de_bloqueo(_error("no such table: servicios"))
+    assert not es_error_de_bloqueo(ValueError("database is locked"))
+
+
+def test_reintenta_bloqueos_hasta_completar():
+    reloj = RelojFalso()
+    operacion = OperacionFallida(3, _error("database is locked"))
+    
+    resultado = ejecutar_con_reintentos(operacion, PoliticaReintentos(), reloj=reloj, dormir=reloj.dormir)
+    
+    assert resultado == "ok"
+    assert operacion.llamadas == 4
+    assert contador_reintentos.reintentos == 3
+    assert contador_reintentos.agotados == 0
+
+
+def test_esperas_crecen_exponencialmente_con_tope():
+    esperas = []
+    politica = PoliticaReintentos(espera_base=0.01, espera_maxima=0.05, plazo=100)
+    operacion = OperacionFallida(8, _error("database is locked"))
+    
+    ejecutar_con_reintentos(operacion, politica, dormir=esperas.append)
+    
+    for intento, espera in enumerate(esperas):
+        assert 0 <= espera <= min(0.05, 0.01 * 2 ** intento)
+
+
+def test_no_reintenta_otros_errores():
+    operacion = OperacionFallida(1, _error("no such table: servicios"))
+    
+    with pytest.raises(OperationalError):
+        ejecutar_con_reintentos(operacion, PoliticaReintentos(), dormir=lambda _: None)
+    
+    assert operacion.llamadas == 1
+    assert contador_reintentos.reintentos == 0
+
+
+def test_agota_el_plazo_y_relanza():
+    reloj = RelojFalso()
+    operacion = OperacionFallida(1000, _error("database is locked"))
+    politica = PoliticaReintentos(espera_base=0.1, espera_maxima=0.5, plazo=2.0)
+    
+    with pytest.raises(OperationalError):
+        ejecutar_con_reintentos(operacion, politica, reloj=reloj, dormir=reloj.dormir)
+    
+    assert reloj.ahora <= 2.0
+    assert contador_reintentos.agotados == 1
+
+
+def test_repositorio_repite_la_transaccion_bloqueada(monkeypatch):
+    """Un commit bloqueado se deshace y la escritura completa se repite."""
+    repository = SQLAlchemyRepository(
+        "sqlite:///:memory:", reintentos=PoliticaReintentos(espera_base=0.001, espera_maxima=0.001)
+    )
+    commit_original = Session.commit
+    fallos = iter([True, False])
+    
+    def commit_bloqueado(session):
+        if next(fallos, False):
+            raise _error("database is locked")
+        commit_original(session)
+    
+    monkeypatch.setattr(Session, "commit", commit_bloqueado)
+    repository.guardar_empleado(Empleado(id="E001", nombre="Ana"))
+    
+    assert repository.obtener_empleado("E001").nombre == "Ana"
+    assert contador_reintentos.reintentos == 1
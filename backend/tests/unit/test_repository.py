@@ -182,6 +182,15 @@ def test_actualizar_tipo_servicio_existente(repository):
     assert len(tipos) == 1
 
 
+def test_guardar_tipo_servicio_con_precio_por_defecto(repository):
+    """Verifica que el precio por defecto se guarda al crear y al actualizar."""
+    repository.guardar_tipo_servicio(TipoServicio("Corte", "Corte básico", 40.0, Decimal("25.00")))
+    assert repository.obtener_tipo_servicio("Corte").precio_por_defecto == Decimal("25.00")
+    
+    repository.guardar_tipo_servicio(TipoServicio("Corte", "Corte básico", 40.0, Decimal("27.50")))
+    assert repository.obtener_tipo_servicio("Corte").precio_por_defecto == Decimal("27.50")
+
+
 def test_guardar_y_listar_servicio(repository):
     """Verifica que se puede guardar y listar servicios."""
     # Primero crear las entidades relacionadas
@@ -314,3 +323,39 @@ def test_persistencia_despues_de_guardar(repository):
         assert orm_empleado.nombre == "Juan"
     finally:
         session.close()
+
+
+def test_repositorio_en_memoria_comparte_engine_de_lectura(repository):
+    """En memoria no hay engine de lectura separado: vería otra base de datos."""
+    assert repository.read_engine is repository.engine
+
+
+def test_engine_de_lectura_es_solo_lectura(tmp_path):
+    """El engine de lectura abre el fichero en modo solo lectura."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    repo = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'salon.db'}")
+    
+    assert repo.read_engine is not repo.engine
+    with repo.read_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO empleados (id, nombre) VALUES ('E9', 'X')"))
+    with repo.engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    repo.cerrar()
+
+
+def test_lectura_usa_una_misma_instantanea(tmp_path):
+    """Dentro de lectura() no se ven las escrituras confirmadas después de la primera consulta."""
+    repo = SQLAlchemyRepository(f"sqlite:///{tmp_path / 'salon.db'}")
+    repo.guardar_empleado(Empleado(id="E001", nombre="Juan"))
+    
+    with repo.lectura():
+        assert len(repo.listar_empleados()) == 1
+        repo.guardar_empleado(Empleado(id="E002", nombre="María"))
+        assert len(repo.listar_empleados()) == 1
+        assert repo.obtener_empleado("E002") is None
+    
+    assert len(repo.listar_empleados()) == 2
+    repo.cerrar()
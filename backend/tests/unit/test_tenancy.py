@@ -0,0 +1,164 @@
+"""
+Pruebas unitarias para el registro de salones (modo multi-salón).
+"""
+import os
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import inspect
+
+from app.config import Settings
+from app.tenancy import SalonRegistry
+from app.result import Ok, Err
+from app.errors import ValidationError, NotFoundError
+
+
+class RelojFalso:
+    """Reloj controlable para simular el paso del tiempo."""
+    
+    def __init__(self):
+        self.ahora = 0.0
+    
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj():
+    return RelojFalso()
+
+
+def _usar(registry, salon_id):
+    """Obtiene y libera el gestor de un salón, como una petición."""
+    manager = registry.obtener(salon_id).value
+    registry.liberar(manager)
+    return manager
+
+
+@pytest.fixture
+def registry(tmp_path, reloj):
+    """Registro con tres salones creados y capacidad para dos abiertos."""
+    registry = SalonRegistry(str(tmp_path), max_abiertos=2, max_inactividad=60, reloj=reloj)
+    for salon_id in ("centro", "norte", "sur"):
+        assert isinstance(registry.crear_salon(salon_id), Ok)
+    yield registry
+    registry.cerrar_todos()
+
+
+def test_cada_salon_usa_su_propio_fichero(registry, tmp_path):
+    """Los datos de un salón no son visibles desde otro."""
+    centro = registry.obtener("centro").value
+    norte = registry.obtener("norte").value
+    
+    centro.crear_empleado("E001", "Juan Pérez")
+    centro.crear_tipo_servicio("Corte", "Corte básico", 40.0)
+    centro.registrar_servicio(date(2024, 1, 15), "E001", "Corte", Decimal("25.00"))
+    
+    assert len(centro.obtener_servicios()) == 1
+    assert norte.listar_empleados() == []
+    assert os.path.exists(tmp_path / "centro.db")
+    assert os.path.exists(tmp_path / "norte.db")
+
+
+def test_obtener_reutiliza_el_gestor_abierto(registry):
+    """El mismo salón devuelve el mismo gestor mientras está en caché."""
+    assert registry.obtener("centro").value is registry.obtener("centro").value
+
+
+def test_lru_desaloja_el_salon_menos_reciente(registry):
+    """Al superar max_abiertos se cierra el salón usado hace más tiempo."""
+    _usar(registry, "centro")
+    _usar(registry, "norte")
+    _usar(registry, "centro")
+    _usar(registry, "sur")
+    
+    assert registry.abiertos() == ["centro", "sur"]
+
+
+def test_salones_inactivos_se_cierran(registry, reloj):
+    """Los salones sin uso durante max_inactividad se cierran en el siguiente acceso."""
+    _usar(registry, "centro")
+    reloj.ahora = 30
+    _usar(registry, "norte")
+    reloj.ahora = 80
+    _usar(registry, "norte")
+    
+    assert registry.abiertos() == ["norte"]
+
+
+def test_salon_en_uso_no_se_cierra_hasta_liberarlo(registry, reloj, monkeypatch):
+    """Un salón desalojado mientras una petición lo usa se cierra cuando esta lo libera."""
+    centro = registry.obtener("centro").value
+    cerrados = []
+    monkeypatch.setattr(centro.repository, "cerrar", lambda: cerrados.append("centro"))
+    reloj.ahora = 100
+    _usar(registry, "norte")
+    assert registry.abiertos() == ["centro", "norte"]
+    
+    _usar(registry, "sur")
+    
+    assert registry.abiertos() == ["norte", "sur"]
+    assert cerrados == []
+    assert centro.listar_empleados() == []
+    registry.liberar(centro)
+    assert cerrados == ["centro"]
+
+
+def test_abrir_un_salon_no_bloquea_a_los_demas(registry, monkeypatch):
+    """La base de datos de un salón se abre fuera del lock del registro."""
+    _usar(registry, "norte")
+    abrir_original = registry._abrir
+    abriendo = threading.Event()
+    continuar = threading.Event()
+    
+    def abrir_lento(ruta, eventos=None):
+        abriendo.set()
+        continuar.wait(5)
+        return abrir_original(ruta, eventos)
+    
+    monkeypatch.setattr(registry, "_abrir", abrir_lento)
+    hilo = threading.Thread(target=_usar, args=(registry, "centro"))
+    hilo.start()
+    assert abriendo.wait(5)
+    
+    assert _usar(registry, "norte") is not None
+    continuar.set()
+    hilo.join()
+    assert registry.abiertos() == ["norte", "centro"]
+
+
+def test_salones_usan_la_configuracion(tmp_path):
+    """Las bases de datos de los salones se abren con la configuración de la aplicación."""
+    settings = Settings(sqlite_journal_mode="DELETE", usar_migraciones=True, escritura_agrupada=True)
+    registry = SalonRegistry(str(tmp_path), settings=settings)
+    registry.crear_salon("centro")
+    
+    manager = _usar(registry, "centro")
+    try:
+        with manager.repository.engine.connect() as conexion:
+            assert conexion.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert "alembic_version" in inspect(manager.repository.engine).get_table_names()
+        assert manager.escritura_agrupada is not None
+    finally:
+        registry.cerrar_todos()
+
+
+def test_salon_inexistente_retorna_not_found(registry):
+    """Un salón sin base de datos no se crea implícitamente."""
+    resultado = registry.obtener("oeste")
+    
+    assert isinstance(resultado, Err)
+    assert isinstance(resultado.error, NotFoundError)
+    assert not os.path.exists(registry.ruta_salon("oeste"))
+
+
+@pytest.mark.parametrize("salon_id", ["../otro", "Centro", "", "a/b", "x" * 51])
+def test_identificador_invalido_retorna_error(registry, salon_id):
+    """Los identificadores que no son nombres de fichero seguros se rechazan."""
+    resultado = registry.obtener(salon_id)
+    
+    assert isinstance(resultado, Err)
+    assert isinstance(resultado.error, ValidationError)
+    assert resultado.error.field == "salon_id"